@@ -14,14 +14,19 @@ from schafkopf.database.configs import RufspielRawConfig, SoloRawConfig, Hochzei
 from schafkopf.frontend.validator import RufspielValidator, SoloValidator, HochzeitValidator, RamschValidator
 from schafkopf.database.queries import get_runden, get_users, insert_teilnehmer, insert_runde, get_teilnehmer_by_id, \
     get_runde_by_id, inactivate_einzelspiel_by_einzelspiel_id
+from schafkopf.database.session import Sessions
 from schafkopf.database.writer import RufspielWriter, SoloWriter, HochzeitWriter, RamschWriter
+from schafkopf.database.write_behind import write_spiel, is_spiel_submitted
 from schafkopf.frontend.generic_objects import wrap_alert, wrap_stats_by_runde_ids, wrap_rufspiel_card, \
     wrap_next_game_button, wrap_solo_card, wrap_hochzeit_card, \
     wrap_ramsch_card, wrap_stats_by_teilnehmer_ids, wrap_empty_dbc_row
 from schafkopf.frontend.presenter import RufspielPresenter, SoloPresenter, HochzeitPresenter, RamschPresenter
 from schafkopf.frontend.runde_anlegen import wrap_runde_anlegen_layout
 from schafkopf.frontend.spiele_loeschen import wrap_letztes_spiel_loeschen_layout
+from schafkopf.database.page_loaders import load_spielverlauf_seite
 from schafkopf.frontend.spielen import wrap_spielen_layout
+from schafkopf.frontend.spielverlauf import wrap_spielverlauf_layout, wrap_spielverlauf_table, to_cursor_data, \
+    from_cursor_data, get_spielverlauf_filter
 from schafkopf.frontend.statistiken import wrap_statistiken_layout
 from schafkopf.frontend.teilnehmer_anlegen import wrap_teilnehmer_anlegen_layout
 
@@ -37,6 +42,24 @@ if VALID_USERNAME_PASSWORD_PAIRS:
 app.config.suppress_callback_exceptions = True
 app.title = 'Digitale Schafkopfliste'
 
+
+# All queries of a request share one session, which is committed if the request succeeded
+@server.before_request
+def begin_request_session():
+    Sessions.begin_request()
+
+
+@server.after_request
+def end_request_session(response):
+    Sessions.end_request(commit=response.status_code < 400)
+    return response
+
+
+@server.teardown_request
+def rollback_request_session(_):
+    # Only left open if the request failed before after_request
+    Sessions.end_request(commit=False)
+
 app.layout = html.Div([
     # represents the URL bar, doesn't render anything
     dcc.Location(id='url', refresh=True),
@@ -45,6 +68,7 @@ app.layout = html.Div([
         children=[
             dbc.NavItem(dbc.NavLink('Spielen', href='/spielen', external_link=True)),
             dbc.NavItem(dbc.NavLink('Statistiken', href='/statistiken', external_link=True)),
+            dbc.NavItem(dbc.NavLink('Spielverlauf', href='/spielverlauf', external_link=True)),
             dbc.DropdownMenu(
                 children=[
                     dbc.DropdownMenuItem('Konfiguration', header=True),
@@ -75,6 +99,8 @@ def display_page(pathname: str):
         return wrap_spielen_layout()
     elif pathname == '/statistiken':
         return wrap_statistiken_layout()
+    elif pathname == '/spielverlauf':
+        return wrap_spielverlauf_layout()
     elif pathname == '/runde_anlegen':
         return wrap_runde_anlegen_layout()
     elif pathname == '/teilnehmer_anlegen':
@@ -157,6 +183,7 @@ def switch_tab(active_tab: str,
      State('gelegt_mittelhand_id', 'value'),
      State('gelegt_hinterhand_id', 'value'),
      State('gelegt_geberhand_id', 'value'),
+     State('rufspiel_submission_token', 'data'),
      ])
 def calculate_rufspiel(
         rufspiel_spielstand_eintragen_button_n_clicks: int,
@@ -178,10 +205,16 @@ def calculate_rufspiel(
         gelegt_ausspieler_id: List[int],
         gelegt_mittelhand_id: List[int],
         gelegt_hinterhand_id: List[int],
-        gelegt_geberhand_id: List[int]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
+        gelegt_geberhand_id: List[int],
+        rufspiel_submission_token: Union[None, str]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
     teilnehmer_ids = [ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id]
     if _validate_teilnehmer(runde_id, geber_id, teilnehmer_ids) is not None:
         return None, dict(), html.Div(), html.Div(), False
+    if _is_repeated_submit(rufspiel_spielstand_eintragen_button_n_clicks, rufspiel_submission_token):
+        # The game of this form is already stored, it is neither calculated nor written again
+        Sessions.read_own_writes()
+        header, body = wrap_stats_by_runde_ids([runde_id])
+        return dash.no_update, dict(), header, body, True
     gelegt_ids = _get_gelegt_ids(ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id, gelegt_ausspieler_id,
                                  gelegt_mittelhand_id, gelegt_hinterhand_id, gelegt_geberhand_id)
     raw_config = RufspielRawConfig(runde_id=int(runde_id),
@@ -204,7 +237,7 @@ def calculate_rufspiel(
     rufspiel_calculator = RufspielCalculator(rufspiel_validator.validated_config)
     result = RufspielPresenter(rufspiel_calculator).get_result()
     if rufspiel_spielstand_eintragen_button_n_clicks is not None and rufspiel_spielstand_eintragen_button_n_clicks >= 1:
-        RufspielWriter(rufspiel_calculator).write()
+        write_spiel(RufspielWriter(rufspiel_calculator), rufspiel_submission_token)
         header, body = wrap_stats_by_runde_ids([runde_id])
         return result, dict(), header, body, True
     else:
@@ -238,6 +271,7 @@ def calculate_rufspiel(
      State('gelegt_mittelhand_id', 'value'),
      State('gelegt_hinterhand_id', 'value'),
      State('gelegt_geberhand_id', 'value'),
+     State('solo_submission_token', 'data'),
      ])
 def calculate_solo(
         solo_spielstand_eintragen_button_n_clicks: int,
@@ -260,10 +294,16 @@ def calculate_solo(
         gelegt_ausspieler_id: List[int],
         gelegt_mittelhand_id: List[int],
         gelegt_hinterhand_id: List[int],
-        gelegt_geberhand_id: List[int]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
+        gelegt_geberhand_id: List[int],
+        solo_submission_token: Union[None, str]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
     teilnehmer_ids = [ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id]
     if _validate_teilnehmer(runde_id, geber_id, teilnehmer_ids) is not None:
         return None, dict(), html.Div(), html.Div(), False
+    if _is_repeated_submit(solo_spielstand_eintragen_button_n_clicks, solo_submission_token):
+        # The game of this form is already stored, it is neither calculated nor written again
+        Sessions.read_own_writes()
+        header, body = wrap_stats_by_runde_ids([runde_id])
+        return dash.no_update, dict(), header, body, True
     gelegt_ids = _get_gelegt_ids(ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id, gelegt_ausspieler_id,
                                  gelegt_mittelhand_id, gelegt_hinterhand_id, gelegt_geberhand_id)
     raw_config = SoloRawConfig(runde_id=int(runde_id),
@@ -287,7 +327,7 @@ def calculate_solo(
     solo_calculator = SoloCalculator(solo_validator.validated_config)
     result = SoloPresenter(solo_calculator).get_result()
     if solo_spielstand_eintragen_button_n_clicks is not None and solo_spielstand_eintragen_button_n_clicks >= 1:
-        SoloWriter(solo_calculator).write()
+        write_spiel(SoloWriter(solo_calculator), solo_submission_token)
         header, body = wrap_stats_by_runde_ids([runde_id])
         return result, dict(), header, body, True
     else:
@@ -319,6 +359,7 @@ def calculate_solo(
      State('gelegt_mittelhand_id', 'value'),
      State('gelegt_hinterhand_id', 'value'),
      State('gelegt_geberhand_id', 'value'),
+     State('hochzeit_submission_token', 'data'),
      ])
 def calculate_rufspiel(
         hochzeit_spielstand_eintragen_button_n_clicks: int,
@@ -339,10 +380,16 @@ def calculate_rufspiel(
         gelegt_ausspieler_id: List[int],
         gelegt_mittelhand_id: List[int],
         gelegt_hinterhand_id: List[int],
-        gelegt_geberhand_id: List[int]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
+        gelegt_geberhand_id: List[int],
+        hochzeit_submission_token: Union[None, str]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
     teilnehmer_ids = [ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id]
     if _validate_teilnehmer(runde_id, geber_id, teilnehmer_ids) is not None:
         return None, dict(), html.Div(), html.Div(), False
+    if _is_repeated_submit(hochzeit_spielstand_eintragen_button_n_clicks, hochzeit_submission_token):
+        # The game of this form is already stored, it is neither calculated nor written again
+        Sessions.read_own_writes()
+        header, body = wrap_stats_by_runde_ids([runde_id])
+        return dash.no_update, dict(), header, body, True
     gelegt_ids = _get_gelegt_ids(ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id, gelegt_ausspieler_id,
                                  gelegt_mittelhand_id, gelegt_hinterhand_id, gelegt_geberhand_id)
     raw_config = HochzeitRawConfig(runde_id=int(runde_id),
@@ -364,7 +411,7 @@ def calculate_rufspiel(
     hochzeit_calculator = HochzeitCalculator(hochzeit_validator.validated_config)
     result = HochzeitPresenter(hochzeit_calculator).get_result()
     if hochzeit_spielstand_eintragen_button_n_clicks is not None and hochzeit_spielstand_eintragen_button_n_clicks >= 1:
-        HochzeitWriter(hochzeit_calculator).write()
+        write_spiel(HochzeitWriter(hochzeit_calculator), hochzeit_submission_token)
         header, body = wrap_stats_by_runde_ids([runde_id])
         return result, dict(), header, body, True
     else:
@@ -394,6 +441,7 @@ def calculate_rufspiel(
      State('gelegt_mittelhand_id', 'value'),
      State('gelegt_hinterhand_id', 'value'),
      State('gelegt_geberhand_id', 'value'),
+     State('ramsch_submission_token', 'data'),
      ])
 def calculate_ramsch(
         ramsch_spielstand_eintragen_button_n_clicks: int,
@@ -412,10 +460,16 @@ def calculate_ramsch(
         gelegt_ausspieler_id: List[int],
         gelegt_mittelhand_id: List[int],
         gelegt_hinterhand_id: List[int],
-        gelegt_geberhand_id: List[int]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
+        gelegt_geberhand_id: List[int],
+        ramsch_submission_token: Union[None, str]) -> Tuple[Union[None, dbc.Row], Dict, html.Div, html.Div, bool]:
     teilnehmer_ids = [ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id]
     if _validate_teilnehmer(runde_id, geber_id, teilnehmer_ids) is not None:
         return None, dict(), html.Div(), html.Div(), False
+    if _is_repeated_submit(ramsch_spielstand_eintragen_button_n_clicks, ramsch_submission_token):
+        # The game of this form is already stored, it is neither calculated nor written again
+        Sessions.read_own_writes()
+        header, body = wrap_stats_by_runde_ids([runde_id])
+        return dash.no_update, dict(), header, body, True
     gelegt_ids = _get_gelegt_ids(ausspieler_id, mittelhand_id, hinterhand_id, geberhand_id, gelegt_ausspieler_id,
                                  gelegt_mittelhand_id, gelegt_hinterhand_id, gelegt_geberhand_id)
     raw_config = RamschRawConfig(runde_id=int(runde_id),
@@ -435,7 +489,7 @@ def calculate_ramsch(
     ramsch_calculator = RamschCalculator(ramsch_validator.validated_config)
     result = RamschPresenter(ramsch_calculator).get_result()
     if ramsch_spielstand_eintragen_button_n_clicks is not None and ramsch_spielstand_eintragen_button_n_clicks >= 1:
-        RamschWriter(ramsch_calculator).write()
+        write_spiel(RamschWriter(ramsch_calculator), ramsch_submission_token)
         header, body = wrap_stats_by_runde_ids([runde_id])
         return result, dict(), header, body, True
     else:
@@ -698,6 +752,45 @@ def show_stats_all(stats_all_modal_open: Union[None, int],
     return header, body, not stats_all_modal, {'clicks': stats_all_modal_open}, {'clicks': stats_all_modal_close}
 
 
+@app.callback(
+    [Output('spielverlauf_table', 'children'),
+     Output('spielverlauf_cursors', 'data'),
+     Output('spielverlauf_neuere', 'disabled'),
+     Output('spielverlauf_aeltere', 'disabled')],
+    [Input('spielverlauf_runde_ids', 'value'),
+     Input('spielverlauf_teilnehmer_ids', 'value'),
+     Input('spielverlauf_spielarten', 'value'),
+     Input('spielverlauf_neuere', 'n_clicks'),
+     Input('spielverlauf_aeltere', 'n_clicks')],
+    [State('spielverlauf_cursors', 'data')]
+)
+def show_spielverlauf(runde_ids: Union[None, List[str]],
+                      teilnehmer_ids: Union[None, List[str]],
+                      spielarten: Union[None, List[str]],
+                      neuere: Union[None, int],
+                      aeltere: Union[None, int],
+                      cursors: Dict) -> Tuple[html.Div, Dict, bool, bool]:
+    # Pages are read by keyset. The store keeps the cursors of the pages shown so far, the last one is the current
+    # page, and the cursor of the next older page.
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    if 'spielverlauf_aeltere.n_clicks' in triggered and cursors['naechster'] is not None:
+        seiten = cursors['seiten'] + [cursors['naechster']]
+    elif 'spielverlauf_neuere.n_clicks' in triggered and len(cursors['seiten']) > 1:
+        seiten = cursors['seiten'][:-1]
+    else:
+        # A changed filter starts with the newest games
+        seiten = [None]
+    seite = load_spielverlauf_seite(nach=from_cursor_data(seiten[-1]),
+                                    **get_spielverlauf_filter(runde_ids, teilnehmer_ids, spielarten))
+    naechster = to_cursor_data(seite.naechster_cursor)
+    return wrap_spielverlauf_table(seite), {'seiten': seiten, 'naechster': naechster}, len(seiten) == 1, \
+        naechster is None
+
+
+def _is_repeated_submit(n_clicks: Union[None, int], submission_token: Union[None, str]) -> bool:
+    return n_clicks is not None and n_clicks >= 1 and is_spiel_submitted(submission_token)
+
+
 def _get_gelegt_ids(ausspieler_id: Union[None, str], mittelhand_id: Union[None, str], hinterhand_id: Union[None, str],
                     geberhand_id: Union[None, str], gelegt_ausspieler_id: List[int], gelegt_mittelhand_id: List[int],
                     gelegt_hinterhand_id: List[int], gelegt_geberhand_id: List[int]) -> List[int]:
@@ -0,0 +1,67 @@
+import argparse
+import logging
+import random
+import time
+from typing import List
+
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator, \
+    Calculator
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig, Config
+from tests.helpers import build_random_configs
+
+logging.getLogger().setLevel(logging.INFO)
+
+CALCULATORS = {RufspielConfig: RufspielCalculator, SoloConfig: SoloCalculator, HochzeitConfig: HochzeitCalculator,
+               RamschConfig: RamschCalculator}
+
+# Calculator accesses of the Presenter and the Writer for one recorded game before the Abrechnung existed.
+# Every access re-ran the rules (get_teilnehmer_id_to_punkte and get_verlierer_ids even several times internally),
+# so replaying them against an uncached Calculator is a lower bound of the former work.
+LEGACY_ACCESSES = ['get_teilnehmer_id_to_punkte', 'get_spielpunkte',
+                   'get_spielpunkte', 'get_teilnehmer_id_to_punkte'] + ['get_gewinner_ids'] * 4
+
+
+def count_abrechnen(calculator_class: type, cached: bool) -> type:
+    class CountingCalculator(calculator_class):
+        calls = 0
+
+        def get_abrechnung(self):
+            if not cached:
+                self._abrechnung = None
+            return super().get_abrechnung()
+
+        def _abrechnen(self):
+            CountingCalculator.calls += 1
+            return super()._abrechnen()
+
+    return CountingCalculator
+
+
+def record(configs: List[Config], cached: bool) -> int:
+    calculators = {k: count_abrechnen(v, cached) for k, v in CALCULATORS.items()}
+    for c in configs:
+        calculator: Calculator = calculators[type(c)](c)
+        if cached:
+            abrechnung = calculator.get_abrechnung()
+            # Presenter and Writer only read attributes of the shared Abrechnung
+            _ = abrechnung.teilnehmer_id_to_punkte, abrechnung.spielpunkte, abrechnung.gewinner_ids
+        else:
+            for access in LEGACY_ACCESSES:
+                getattr(calculator, access)()
+    return sum(c.calls for c in calculators.values())
+
+
+def benchmark(n: int):
+    configs = build_random_configs(random.Random(0), n)
+    for label, cached in [('Rules re-run per access', False), ('Shared Abrechnung', True)]:
+        start = time.perf_counter()
+        evaluations = record(configs, cached)
+        duration = time.perf_counter() - start
+        logging.info(f'{label:<24} {evaluations / n:.1f} rule evaluations per game, '
+                     f'{duration / n * 1e6:.1f} µs per game')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scoring work per recorded game for Presenter and Writer.')
+    parser.add_argument('-n', type=int, default=20000, help='Number of games')
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.benchmark_teilnahme import init_database
+from schafkopf.database.data_model import Einzelspiel, Resultat, Runde, Teilnehmer
+from schafkopf.database.queries import get_latest_einzelspiel_id, get_resultate_by_einzelspiele_ids, \
+    get_einzelspiele_by_einzelspiel_ids, get_teilnehmer_by_id, get_einzelspiel_ids_by_runde_ids
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+# The former helpers, which build their ORM query on every call
+
+def get_latest_einzelspiel_id_unbaked(session) -> list:
+    return session.query(Einzelspiel.id).filter(Einzelspiel.is_active == True).join(Einzelspiel.runde) \
+        .filter(Runde.is_active == True).order_by(Einzelspiel.id.desc()).limit(1).all()
+
+
+def get_resultate_by_einzelspiele_ids_unbaked(session) -> list:
+    return session.query(Resultat).filter(Resultat.einzelspiel_id.in_([1, 2, 3])).all()
+
+
+def get_einzelspiele_by_einzelspiel_ids_unbaked(session) -> list:
+    return session.query(Einzelspiel).filter(Einzelspiel.is_active == True).filter(Einzelspiel.id.in_([1, 2, 3])) \
+        .all()
+
+
+def get_teilnehmer_by_id_unbaked(session) -> list:
+    return session.query(Teilnehmer).filter(Teilnehmer.id == 3).all()
+
+
+def get_einzelspiel_ids_by_runde_ids_unbaked(session) -> list:
+    return session.query(Einzelspiel.id).filter(Einzelspiel.runde_id.in_([1])).filter(Einzelspiel.is_active == True) \
+        .all()
+
+
+def benchmark(wiederholungen: int):
+    # Few rows, such that the time per call is the Python overhead of building, compiling and loading
+    with tempfile.TemporaryDirectory() as directory:
+        init_database(os.path.join(directory, 'baked.db'), 3, 8)
+        session = Sessions.get_session()
+        for label, unbaked, baked in [
+                ('get_latest_einzelspiel_id', get_latest_einzelspiel_id_unbaked, get_latest_einzelspiel_id),
+                ('get_resultate_by_einzelspiele_ids', get_resultate_by_einzelspiele_ids_unbaked,
+                 lambda s: get_resultate_by_einzelspiele_ids([1, 2, 3], session=s)),
+                ('get_einzelspiele_by_einzelspiel_ids', get_einzelspiele_by_einzelspiel_ids_unbaked,
+                 lambda s: get_einzelspiele_by_einzelspiel_ids([1, 2, 3], session=s)),
+                ('get_teilnehmer_by_id', get_teilnehmer_by_id_unbaked, lambda s: get_teilnehmer_by_id(3, session=s)),
+                ('get_einzelspiel_ids_by_runde_ids', get_einzelspiel_ids_by_runde_ids_unbaked,
+                 lambda s: get_einzelspiel_ids_by_runde_ids([1], session=s))]:
+            microseconds = []
+            for lookup in [unbaked, baked]:
+                lookup(session)
+                start = time.perf_counter()
+                for _ in range(wiederholungen):
+                    lookup(session)
+                microseconds.append((time.perf_counter() - start) / wiederholungen * 1000000)
+            logging.info(f'{label:<36}: {microseconds[0]:7.1f} µs unbaked, {microseconds[1]:7.1f} µs baked')
+        session.close()
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time per call of the hot query helpers with and without baked '
+                                                 'queries.')
+    parser.add_argument('--wiederholungen', type=int, default=5000, help='Calls per helper')
+    args = parser.parse_args()
+    benchmark(args.wiederholungen)
@@ -0,0 +1,42 @@
+import argparse
+import logging
+import random
+import time
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig, BatchConfig
+from tests.helpers import build_random_configs
+
+logging.getLogger().setLevel(logging.INFO)
+
+CALCULATORS = {RufspielConfig: RufspielCalculator, SoloConfig: SoloCalculator, HochzeitConfig: HochzeitCalculator,
+               RamschConfig: RamschCalculator}
+
+
+def benchmark(n: int):
+    configs = build_random_configs(random.Random(0), n)
+
+    start = time.perf_counter()
+    for c in configs:
+        CALCULATORS[type(c)](c).get_teilnehmer_id_to_punkte()
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_config = BatchConfig.from_configs(configs)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    BatchCalculator(batch_config).get_punkte()
+    batch = time.perf_counter() - start
+
+    logging.info(f'{n} games')
+    logging.info(f'Calculator classes: {scalar:.3f}s ({n / scalar:,.0f} games/s)')
+    logging.info(f'BatchCalculator:    {batch:.3f}s ({n / batch:,.0f} games/s), '
+                 f'BatchConfig.from_configs: {build:.3f}s')
+    logging.info(f'Speedup (scoring only): {scalar / batch:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Throughput of the BatchCalculator against the Calculator classes.')
+    parser.add_argument('-n', type=int, default=100000, help='Number of games')
+    benchmark(parser.parse_args().n)
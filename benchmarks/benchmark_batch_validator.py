@@ -0,0 +1,51 @@
+import argparse
+import logging
+import random
+import time
+from typing import List
+
+from schafkopf.database.configs import BatchRawConfig, RawConfig
+from schafkopf.database.snapshot import Snapshot
+from schafkopf.frontend.validator import BatchValidator
+from tests.frontend.test_batch_validator import VALIDATORS, build_snapshot, build_random_raw_configs
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def measure(label: str, raw_configs: List[RawConfig], snapshot: Snapshot):
+    start = time.perf_counter()
+    for raw_config in raw_configs:
+        VALIDATORS[type(raw_config)](raw_config, snapshot)
+    einzeln = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_raw_config = BatchRawConfig.from_raw_configs(raw_configs)
+    umwandlung = time.perf_counter() - start
+    start = time.perf_counter()
+    validator = BatchValidator(batch_raw_config, snapshot)
+    error_mask = validator.get_error_mask()
+    maske = time.perf_counter() - start
+    start = time.perf_counter()
+    validator.get_validation_messages()
+    meldungen = time.perf_counter() - start
+
+    logging.info(f'{label}: {len(raw_configs)} raw configs, {int(error_mask.sum())} invalid')
+    logging.info(f'  Single validators:         {einzeln:7.3f} s')
+    logging.info(f'  BatchRawConfig:            {umwandlung:7.3f} s')
+    logging.info(f'  Error mask:                {maske:7.3f} s, {einzeln / maske:6.1f}x')
+    logging.info(f'  Messages of invalid games: {meldungen:7.3f} s')
+
+
+def benchmark(n: int):
+    snapshot = build_snapshot()
+    raw_configs = build_random_raw_configs(random.Random(1), n)
+    measure('Random games', raw_configs, snapshot)
+    # An import of recorded games is mostly valid
+    valid = [r for r in raw_configs if not VALIDATORS[type(r)](r, snapshot).validation_messages]
+    measure('Valid games', (valid * (n // len(valid) + 1))[:n], snapshot)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Throughput of the BatchValidator against the single validators.')
+    parser.add_argument('-n', type=int, default=50000, help='Number of raw configs')
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,73 @@
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Union, Callable
+
+from schafkopf.database.configs import RufspielConfig, PunkteconfigRef
+from schafkopf.database.data_model import Farbgebung, Punkteconfig
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+# Layout of the configs before they became frozen and slotted, kept here as the baseline
+@dataclass
+class LegacyRufspielConfig:
+    runde_id: int
+    punkteconfig: Punkteconfig
+    geber_id: int
+    teilnehmer_ids: List[int]
+    gelegt_ids: List[int]
+    ansager_id: int
+    kontriert_id: Union[None, int]
+    re_id: Union[None, int]
+    laufende: int
+    spieler_augen: int
+    nicht_spieler_augen: int
+    schwarz: bool
+    partner_id: int
+    rufsau: Farbgebung
+
+
+def build(config_class: type, punkteconfig: Union[Punkteconfig, PunkteconfigRef], n: int) -> List:
+    return [config_class(runde_id=1, punkteconfig=punkteconfig, geber_id=4, teilnehmer_ids=[1, 2, 3, i % 9 + 4],
+                         gelegt_ids=[i % 4 + 1], ansager_id=1, kontriert_id=None, re_id=None, laufende=i % 9,
+                         spieler_augen=i % 121, nicht_spieler_augen=120 - i % 121, schwarz=False, partner_id=2,
+                         rufsau=Farbgebung.BLATT) for i in range(n)]
+
+
+def measure(label: str, factory: Callable[[], List], n: int):
+    # Time and memory are taken in separate runs, tracing allocations slows the instantiation down
+    gc.collect()
+    start = time.perf_counter()
+    configs = factory()
+    duration = time.perf_counter() - start
+    del configs
+    gc.collect()
+    tracemalloc.start()
+    configs = factory()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logging.info(f'{label:<22} {memory / n:6.1f} bytes per config, {memory / 2 ** 20:7.1f} MiB, '
+                 f'{duration:.2f} s ({n / duration:,.0f} configs/s)')
+    del configs
+
+
+def benchmark(n: int):
+    punkteconfig = Punkteconfig(ramsch=20, rufspiel=20, hochzeit=30, laufende=10.0, schneider=10.0, schwarz=10.0,
+                                solo=50)
+    punkteconfig_ref = PunkteconfigRef.from_punkteconfig(punkteconfig)
+    measure('Mutable dataclass', lambda: build(LegacyRufspielConfig, punkteconfig, n), n)
+    measure('Frozen slotted', lambda: build(RufspielConfig, punkteconfig_ref, n), n)
+    configs = build(RufspielConfig, punkteconfig_ref, n)
+    start = time.perf_counter()
+    distinct = len(set(configs))
+    logging.info(f'Hashing {n} frozen configs into a set: {time.perf_counter() - start:.2f} s, {distinct} distinct')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memory and instantiation time of Config instances.')
+    parser.add_argument('-n', type=int, default=1000000, help='Number of configs')
+    benchmark(parser.parse_args().n)
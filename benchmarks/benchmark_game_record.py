@@ -0,0 +1,54 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.game_record import GameRecordWriter, read_records, map_records, to_batch_config, RECORD, \
+    RECORD_DTYPE
+from tests.helpers import build_random_configs, build_punkteconfig
+from tests.database.test_game_record import build_records
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def benchmark(n: int):
+    # 10000 distinct games are repeated to reach n records
+    records = build_records(build_random_configs(random.Random(0), min(n, 10000)))
+    records = (records * (n // len(records) + 1))[:n]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'spiele.skgr')
+        start = time.perf_counter()
+        with GameRecordWriter(path) as writer:
+            writer.write_many(records)
+        logging.info(f'Write {n} records: {time.perf_counter() - start:.2f} s, '
+                     f'{os.path.getsize(path) / 2 ** 20:.1f} MiB ({RECORD.size} bytes per game)')
+
+        start = time.perf_counter()
+        count = sum(1 for _ in read_records(path))
+        logging.info(f'Stream {count} GameRecords: {time.perf_counter() - start:.2f} s')
+
+        start = time.perf_counter()
+        mapped = map_records(path)
+        punkte = BatchCalculator(to_batch_config(mapped, build_punkteconfig())).get_punkte()
+        duration = time.perf_counter() - start
+        assert np.all(punkte == mapped['punkte'])
+        logging.info(f'Memory-map and replay {len(mapped)} games: {duration:.2f} s '
+                     f'({len(mapped) / duration:,.0f} games/s)')
+
+        copy = os.path.join(directory, 'kopie.skgr')
+        start = time.perf_counter()
+        with GameRecordWriter(copy) as writer:
+            writer.write_array(np.asarray(mapped, dtype=RECORD_DTYPE))
+        logging.info(f'Copy {len(mapped)} records from the memory map: {time.perf_counter() - start:.2f} s')
+        del mapped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writing, streaming and replaying binary game records.')
+    parser.add_argument('-n', type=int, default=1000000, help='Number of records')
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,49 @@
+import argparse
+import logging
+import os
+import resource
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig
+from schafkopf.database.importer import import_spiele
+from schafkopf.database.session import Sessions
+from schafkopf.database.snapshot import invalidate_snapshot
+from tests.database.test_importer import build_import_raw_configs, to_spiel, write_file
+from tests.frontend.test_batch_validator import VALIDATORS, build_snapshot
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def benchmark(n: int, chunk_size: int):
+    snapshot = build_snapshot()
+    gueltig = [to_spiel(r) for r in build_import_raw_configs(5000)
+               if len(VALIDATORS[type(r)](r, snapshot).validation_messages) == 0]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'spiele.csv')
+        write_file(path, (gueltig * (n // len(gueltig) + 1))[:n])
+        # Same engine setup as the application uses for SQLite
+        Sessions.engine = create_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}', poolclass=NullPool)
+        Base.metadata.create_all(Sessions.engine)
+        session = Sessions.get_session()
+        session.add(Punkteconfig())
+        session.commit()
+        session.close()
+        invalidate_snapshot()
+        logging.getLogger().setLevel(logging.WARNING)
+        report = import_spiele(path, chunk_size=chunk_size)
+        logging.getLogger().setLevel(logging.INFO)
+        logging.info(f'{report.importiert} games in {report.sekunden:.1f} s, {report.get_spiele_pro_sekunde():.0f} '
+                     f'games/s, file {os.path.getsize(path) / 2 ** 20:.1f} MiB, '
+                     f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB')
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Throughput and peak memory of the history importer.')
+    parser.add_argument('-n', type=int, default=100000, help='Number of games in the file')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Games per transaction')
+    args = parser.parse_args()
+    benchmark(args.n, args.chunk_size)
@@ -0,0 +1,68 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.benchmark_statistiken import add_resultate_and_verdopplungen
+from benchmarks.benchmark_teilnahme import init_database
+from schafkopf.database.analyzer import RESULTAT_SPALTEN
+from schafkopf.database.data_model import Resultat
+from schafkopf.database.queries import get_einzelspiele_by_teilnehmer_ids, get_einzelspiel_ids_by_teilnehmer_ids, \
+    get_resultate_by_einzelspiele_ids, get_resultat_zeilen_by_einzelspiel_ids, stream_resultat_zeilen, \
+    get_einzelspiel_ids_by_runde_ids
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def sum_punkte_of_entities() -> dict:
+    # A scan of the whole history with entities
+    session = Sessions.get_session()
+    punkte = {}
+    for r in session.query(Resultat).all():
+        punkte[r.teilnehmer_id] = punkte.get(r.teilnehmer_id, 0.0) + r.punkte
+    session.close()
+    return punkte
+
+
+def sum_punkte_of_stream() -> dict:
+    punkte = {}
+    for teilnehmer_id, p in stream_resultat_zeilen(['teilnehmer_id', 'punkte']):
+        punkte[teilnehmer_id] = punkte.get(teilnehmer_id, 0.0) + p
+    return punkte
+
+
+def measure(label: str, lookup):
+    tracemalloc.start()
+    start = time.perf_counter()
+    lookup()
+    milliseconds = (time.perf_counter() - start) * 1000
+    megabytes = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    logging.info(f'{label:<32}: {milliseconds:9.1f} ms, peak {megabytes:7.1f} MB')
+
+
+def benchmark(n: int):
+    with tempfile.TemporaryDirectory() as directory:
+        init_database(os.path.join(directory, 'projection.db'), n, 8)
+        add_resultate_and_verdopplungen()
+        einzelspiel_ids = get_einzelspiel_ids_by_runde_ids([1])
+        for label, lookup in [
+                ('Einzelspiele of Teilnehmer', lambda: [e.id for e in get_einzelspiele_by_teilnehmer_ids([1, 2])]),
+                ('Einzelspiel ids of Teilnehmer', lambda: get_einzelspiel_ids_by_teilnehmer_ids([1, 2])),
+                ('Resultate by ids', lambda: get_resultate_by_einzelspiele_ids(einzelspiel_ids)),
+                ('Resultat columns by ids', lambda: get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids,
+                                                                                         RESULTAT_SPALTEN)),
+                ('Punkte of all Resultate', sum_punkte_of_entities),
+                ('Punkte of streamed Resultate', sum_punkte_of_stream)]:
+            measure(label, lookup)
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Entities compared with column projections and streams.')
+    parser.add_argument('-n', type=int, default=30000, help='Number of games')
+    args = parser.parse_args()
+    benchmark(args.n)
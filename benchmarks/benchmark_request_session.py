@@ -0,0 +1,82 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+
+from schafkopf.backend.calculator import RufspielCalculator
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer
+from schafkopf.database.queries import get_einzelspiel_ids_by_runde_ids, get_resultate_by_einzelspiele_ids, \
+    get_teilnehmer, get_runden, get_runde_by_id, set_reference_cache
+from schafkopf.database.session import Sessions
+from schafkopf.database.write_behind import write_spiel, is_spiel_submitted
+from schafkopf.database.writer import RufspielWriter
+from schafkopf.frontend.generic_objects import wrap_rufspiel_card
+from schafkopf.frontend.presenter import RufspielPresenter
+from schafkopf.frontend.validator import RufspielValidator
+from tests.frontend.test_validator import build_rufspiel_raw_config
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def callback():
+    # Queries of the Spielen page: the form, the result and, after the submit, the game and the Runde
+    get_teilnehmer()
+    get_runden()
+    wrap_rufspiel_card('1', '2', '3', '4')
+    validator = RufspielValidator(build_rufspiel_raw_config())
+    calculator = RufspielCalculator(validator.validated_config)
+    RufspielPresenter(calculator).get_result()
+    submission_token = str(uuid.uuid4())
+    if not is_spiel_submitted(submission_token):
+        write_spiel(RufspielWriter(calculator), submission_token)
+    get_runde_by_id(1)
+    get_resultate_by_einzelspiele_ids(get_einzelspiel_ids_by_runde_ids([1]))
+
+
+@contextmanager
+def no_request_scope():
+    yield
+
+
+def init_database(path: str):
+    # Same engine setup as the application uses for SQLite
+    Sessions.engine = create_engine(f'sqlite:///{path}', poolclass=NullPool)
+    Base.metadata.create_all(Sessions.engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'nachname_{i}, vorname_{i}', vorname=f'vorname_{i}',
+                                nachname=f'nachname_{i}') for i in range(1, 5)] +
+                    [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+
+
+def benchmark(n: int):
+    with tempfile.TemporaryDirectory() as directory:
+        for cache in [False, True]:
+            set_reference_cache(enabled=cache)
+            for label, scope in [('session per query', no_request_scope), ('request session', Sessions.request_scope)]:
+                init_database(os.path.join(directory, f'{cache}_{label}.db'))
+                connections = []
+                event.listen(Sessions.engine, 'connect', lambda *args: connections.append(1))
+                start = time.perf_counter()
+                for _ in range(n):
+                    with scope():
+                        callback()
+                milliseconds = (time.perf_counter() - start) / n * 1000
+                logging.info(f'reference cache {"on " if cache else "off"}, {label:<17}: '
+                             f'{len(connections) / n:5.1f} connections, {milliseconds:6.2f} ms per callback')
+                Sessions.engine.dispose()
+        set_reference_cache()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Connections opened per Spielen callback with and without a '
+                                                 'request-scoped session.')
+    parser.add_argument('-n', type=int, default=200, help='Number of callbacks')
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,88 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.configs import BatchConfig, RamschConfig, SoloConfig, RufspielConfig
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer, Einzelspiel, Resultat, Verdopplung, \
+    Doppler, Spielart
+from schafkopf.database.rescoring import rescore
+from tests.helpers import build_random_configs
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def fill(session, n: int):
+    # Writes n random games with Core executemany, the Writers would take minutes for this amount of games
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                     for i in range(1, 9)] +
+                    [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    configs = build_random_configs(random.Random(0), n)
+    calculator = BatchCalculator(BatchConfig.from_configs(configs))
+    punkte = calculator.get_punkte()
+    gewinner = calculator.get_gewinner()
+    spielpunkte = calculator.get_spielpunkte()
+    einzelspiele, resultate, verdopplungen = [], [], []
+    for i, c in enumerate(configs):
+        einzelspiel_id = i + 1
+        ramsch = isinstance(c, RamschConfig)
+        einzelspiele.append(dict(id=einzelspiel_id, runde_id=1, geber_id=c.geber_id,
+                                 ansager_id=None if ramsch else c.ansager_id,
+                                 partner_id=getattr(c, 'partner_id', None),
+                                 ausspieler_id=c.teilnehmer_ids[0], mittelhand_id=c.teilnehmer_ids[1],
+                                 hinterhand_id=c.teilnehmer_ids[2], geberhand_id=c.teilnehmer_ids[3],
+                                 spielart=Spielart.RAMSCH.name if ramsch else
+                                 c.spielart.name if isinstance(c, SoloConfig) else
+                                 Spielart.RUFSPIEL.name if isinstance(c, RufspielConfig) else Spielart.HOCHZEIT.name,
+                                 laufende=0 if ramsch else c.laufende, schwarz=False if ramsch else c.schwarz,
+                                 durchmarsch=ramsch and c.durchmarsch,
+                                 tout=isinstance(c, SoloConfig) and (c.tout_gespielt_gewonnen or
+                                                                     c.tout_gespielt_verloren),
+                                 spielpunkte=spielpunkte[i]))
+        for j, t in enumerate(c.teilnehmer_ids):
+            augen = 30 if ramsch else c.spieler_augen if t in c.get_spieler_ids() else c.nicht_spieler_augen
+            resultate.append(dict(einzelspiel_id=einzelspiel_id, teilnehmer_id=t, augen=augen,
+                                  punkte=punkte[i, j], gewonnen=bool(gewinner[i, j])))
+        dopplungen = [(t, Doppler.GELEGT) for t in c.gelegt_ids]
+        if ramsch:
+            dopplungen += [(t, Doppler.JUNGFRAU) for t in c.jungfrau_ids]
+        else:
+            dopplungen += [(t, d) for t, d in [(c.kontriert_id, Doppler.KONTRIERT), (c.re_id, Doppler.RE)]
+                           if t is not None]
+        verdopplungen += [dict(einzelspiel_id=einzelspiel_id, teilnehmer_id=t, doppler=d.name) for t, d in dopplungen]
+    for table, rows in [(Einzelspiel, einzelspiele), (Resultat, resultate), (Verdopplung, verdopplungen)]:
+        session.execute(table.__table__.insert(), rows)
+    session.commit()
+
+
+def benchmark(n: int, chunk_size: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}')
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        fill(session, n)
+        neu = Punkteconfig(rufspiel=10, hochzeit=20, laufende=5.0, schneider=5.0, schwarz=15.0, solo=40)
+        for label, write in [('What-if report', False), ('Report and write-back', True)]:
+            start = time.perf_counter()
+            report = rescore(neu, write=write, chunk_size=chunk_size, session=session)
+            session.commit()
+            duration = time.perf_counter() - start
+            logging.info(f'{label:<22} {report.einzelspiele} games ({report.geaenderte_einzelspiele} changed) '
+                         f'in {duration:.2f} s, {report.einzelspiele / duration:,.0f} games/s')
+        session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk re-scoring of stored games under another Punkteconfig.')
+    parser.add_argument('-n', type=int, default=100000, help='Number of games')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Games per chunk')
+    args = parser.parse_args()
+    benchmark(args.n, args.chunk_size)
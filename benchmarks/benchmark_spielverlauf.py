@@ -0,0 +1,72 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from sqlalchemy import tuple_
+
+from benchmarks.benchmark_teilnahme import init_database
+from schafkopf.database.data_model import Einzelspiel
+from schafkopf.database.page_loaders import load_spielverlauf_seite
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def get_einzelspiel_ids_by_offset(offset: int, limit: int) -> list:
+    # The OFFSET pagination the keyset replaces
+    session = Sessions.get_session()
+    einzelspiel_ids = [e for e, in session.query(Einzelspiel.id).filter(Einzelspiel.is_active == True)
+                       .order_by(Einzelspiel.created_on.desc(), Einzelspiel.id.desc())
+                       .offset(offset).limit(limit).all()]
+    session.close()
+    return einzelspiel_ids
+
+
+def get_einzelspiel_ids_by_keyset(cursor: tuple, limit: int) -> list:
+    # The first statement of load_spielverlauf_seite, to compare like with like
+    session = Sessions.get_session()
+    query = session.query(Einzelspiel.id).filter(Einzelspiel.is_active == True)
+    if cursor is not None:
+        query = query.filter(tuple_(Einzelspiel.created_on, Einzelspiel.id) < tuple_(*cursor))
+    einzelspiel_ids = [e for e, in query.order_by(Einzelspiel.created_on.desc(), Einzelspiel.id.desc())
+                       .limit(limit).all()]
+    session.close()
+    return einzelspiel_ids
+
+
+def get_cursor(offset: int) -> tuple:
+    session = Sessions.get_session()
+    cursor = session.query(Einzelspiel.created_on, Einzelspiel.id).filter(Einzelspiel.is_active == True) \
+        .order_by(Einzelspiel.created_on.desc(), Einzelspiel.id.desc()).offset(offset - 1).limit(1).one()
+    session.close()
+    return tuple(cursor)
+
+
+def benchmark(n: int, limit: int, wiederholungen: int):
+    with tempfile.TemporaryDirectory() as directory:
+        init_database(os.path.join(directory, 'spielverlauf.db'), n, 100)
+        for seite in [1, 10, 100, 1000, n // limit - 1]:
+            offset = (seite - 1) * limit
+            cursor = get_cursor(offset) if offset > 0 else None
+            assert [z.einzelspiel_id for z in load_spielverlauf_seite(nach=cursor, limit=limit).zeilen] == \
+                   get_einzelspiel_ids_by_offset(offset, limit)
+            for label, lookup in [('offset ids', lambda: get_einzelspiel_ids_by_offset(offset, limit)),
+                                  ('keyset ids', lambda: get_einzelspiel_ids_by_keyset(cursor, limit)),
+                                  ('keyset page', lambda: load_spielverlauf_seite(nach=cursor, limit=limit))]:
+                start = time.perf_counter()
+                for _ in range(wiederholungen):
+                    lookup()
+                milliseconds = (time.perf_counter() - start) / wiederholungen * 1000
+                logging.info(f'page {seite:6d}, {label:<11}: {milliseconds:8.2f} ms')
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pages of the Spielverlauf by OFFSET and by keyset.')
+    parser.add_argument('-n', type=int, default=300000, help='Number of games')
+    parser.add_argument('--limit', type=int, default=25, help='Games per page')
+    parser.add_argument('--wiederholungen', type=int, default=5, help='Repetitions per page')
+    args = parser.parse_args()
+    benchmark(args.n, args.limit, args.wiederholungen)
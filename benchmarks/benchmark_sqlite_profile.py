@@ -0,0 +1,102 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.benchmark_statistiken import add_resultate_and_verdopplungen
+from benchmarks.benchmark_teilnahme import init_database
+from schafkopf.database.data_model import Einzelspiel, Resultat, Teilnahme, Spielart
+from schafkopf.database.page_loaders import load_spielverlauf_seite
+from schafkopf.database.queries import get_teilnahmen, get_resultate_by_einzelspiele_ids
+from schafkopf.database.session import Sessions
+from schafkopf.database.sqlite_profile import PROFILES, create_sqlite_engine
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def write_spiel(rng: random.Random):
+    # A game like insert_spiel writes it: the Einzelspiel, its Resultate and Teilnahmen in one transaction
+    session = Sessions.get_new_session()
+    sitze = rng.sample(range(1, 9), 4)
+    einzelspiel = dict(runde_id=1, geber_id=sitze[3], ausspieler_id=sitze[0], mittelhand_id=sitze[1],
+                       hinterhand_id=sitze[2], geberhand_id=sitze[3], ansager_id=sitze[0], partner_id=sitze[2],
+                       spielart=Spielart.RUFSPIEL.name, spielpunkte=20, is_active=True)
+    try:
+        einzelspiel['id'] = session.execute(Einzelspiel.__table__.insert(), einzelspiel).inserted_primary_key[0]
+        session.execute(Resultat.__table__.insert(),
+                        [dict(teilnehmer_id=t, einzelspiel_id=einzelspiel['id'], augen=61, gewonnen=t in sitze[::2],
+                              punkte=20 if t in sitze[::2] else -20) for t in sitze])
+        session.execute(Teilnahme.__table__.insert(), get_teilnahmen(einzelspiel))
+        session.commit()
+    finally:
+        session.close()
+
+
+def read_seite(rng: random.Random):
+    # The Spielverlauf of one Teilnehmer and the Resultate of its games
+    seite = load_spielverlauf_seite(teilnehmer_ids=[rng.randint(1, 8)])
+    session = Sessions.get_new_session()
+    get_resultate_by_einzelspiele_ids([z.einzelspiel_id for z in seite.zeilen], session=session)
+    session.close()
+
+
+def run(profile: str, lesende: int, sekunden: float) -> dict:
+    counts = dict(reads=0, writes=0, errors=0)
+    latencies = dict(reads=[], writes=[])
+    lock = threading.Lock()
+    ende = time.perf_counter() + sekunden
+
+    def loop(kind: str, work, seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < ende:
+            start = time.perf_counter()
+            try:
+                work(rng)
+            except OperationalError:
+                with lock:
+                    counts['errors'] += 1
+                continue
+            with lock:
+                counts[kind] += 1
+                latencies[kind].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=loop, args=('writes', write_spiel, 0))] + \
+              [threading.Thread(target=loop, args=('reads', read_seite, i + 1)) for i in range(lesende)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for kind, values in latencies.items():
+        values.sort()
+        median = values[len(values) // 2] * 1000 if len(values) > 0 else float('nan')
+        p95 = values[int(len(values) * 0.95)] * 1000 if len(values) > 0 else float('nan')
+        logging.info(f'{profile:<7} {kind:<6}: {counts[kind] / sekunden:8.1f}/s, median {median:7.2f} ms, '
+                     f'p95 {p95:7.2f} ms')
+    logging.info(f'{profile:<7} errors: {counts["errors"]}')
+    return counts
+
+
+def benchmark(n: int, lesende: int, sekunden: float):
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.db')
+            init_database(path, n, 8)
+            add_resultate_and_verdopplungen()
+            Sessions.engine.dispose()
+            Sessions.engine = create_sqlite_engine(f'sqlite:///{path}', PROFILES[profile])
+            run(profile, lesende, sekunden)
+            Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mixed reads and writes of a game night with the SQLite profiles.')
+    parser.add_argument('-n', type=int, default=100000, help='Number of games before the run')
+    parser.add_argument('--lesende', type=int, default=4, help='Number of reading threads')
+    parser.add_argument('--sekunden', type=float, default=10, help='Duration of the run per profile')
+    args = parser.parse_args()
+    benchmark(args.n, args.lesende, args.sekunden)
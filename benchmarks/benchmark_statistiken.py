@@ -0,0 +1,69 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from sqlalchemy import select, literal, case
+
+from benchmarks.benchmark_teilnahme import init_database
+from schafkopf.database.analyzer import load_stats_daten, StatsDaten, RESULTAT_SPALTEN, EINZELSPIEL_SPALTEN, \
+    VERDOPPLUNG_SPALTEN
+from schafkopf.database.data_model import Resultat, Teilnahme, Einzelspiel, Verdopplung
+from schafkopf.database.queries import get_resultat_zeilen_by_einzelspiel_ids, \
+    get_einzelspiel_zeilen_by_einzelspiel_ids, get_verdopplung_zeilen_by_einzelspiel_ids
+from schafkopf.database.query_executor import set_query_pool_size
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def add_resultate_and_verdopplungen():
+    # A Resultat per Teilnahme, the Ansager gives a Kontra
+    session = Sessions.get_session()
+    gewonnen = Teilnahme.teilnehmer_id.in_([Einzelspiel.ansager_id, Einzelspiel.partner_id])
+    session.execute(Resultat.__table__.insert().from_select(
+        ['teilnehmer_id', 'einzelspiel_id', 'augen', 'punkte', 'gewonnen'],
+        select([Teilnahme.teilnehmer_id, Teilnahme.einzelspiel_id, literal(61.0),
+                case([(gewonnen, literal(20.0))], else_=literal(-20.0)), gewonnen])
+        .where(Teilnahme.einzelspiel_id == Einzelspiel.id)))
+    session.execute(Verdopplung.__table__.insert().from_select(
+        ['teilnehmer_id', 'einzelspiel_id', 'doppler'],
+        select([Einzelspiel.ansager_id, Einzelspiel.id, literal('KONTRA')])))
+    session.commit()
+    session.close()
+
+
+def load_stats_daten_sequentially(einzelspiel_ids: list) -> StatsDaten:
+    # The same queries as load_stats_daten, one after the other
+    return StatsDaten(
+        resultate=get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids, RESULTAT_SPALTEN, dataframe=True),
+        einzelspiele=get_einzelspiel_zeilen_by_einzelspiel_ids(einzelspiel_ids, EINZELSPIEL_SPALTEN, dataframe=True),
+        verdopplungen=get_verdopplung_zeilen_by_einzelspiel_ids(einzelspiel_ids, VERDOPPLUNG_SPALTEN, dataframe=True))
+
+
+def benchmark(n: int, pool_size: int, wiederholungen: int):
+    with tempfile.TemporaryDirectory() as directory:
+        init_database(os.path.join(directory, 'statistiken.db'), n, 8)
+        add_resultate_and_verdopplungen()
+        set_query_pool_size(pool_size)
+        for anzahl in [1000, 10000, n]:
+            einzelspiel_ids = list(range(1, anzahl + 1))
+            for label, lookup in [('sequential', load_stats_daten_sequentially),
+                                  ('concurrent', load_stats_daten)]:
+                start = time.perf_counter()
+                for _ in range(wiederholungen):
+                    lookup(einzelspiel_ids)
+                milliseconds = (time.perf_counter() - start) / wiederholungen * 1000
+                logging.info(f'{anzahl:7d} Einzelspiele, {label:<10}: {milliseconds:8.2f} ms')
+        set_query_pool_size()
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Data of the Statistiken page loaded sequentially and concurrently.')
+    parser.add_argument('-n', type=int, default=100000, help='Number of games')
+    parser.add_argument('--pool-size', type=int, default=4, help='Threads of the query pool')
+    parser.add_argument('--wiederholungen', type=int, default=5, help='Repetitions per load')
+    args = parser.parse_args()
+    benchmark(args.n, args.pool_size, args.wiederholungen)
@@ -0,0 +1,94 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, literal
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer, Einzelspiel, Spielart
+from schafkopf.database.queries import backfill_teilnahmen, _get_einzelspiel_ids_by_teilnahmen
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def get_einzelspiel_ids_by_positionen(teilnehmer_ids: list) -> list:
+    # The former lookup, a filter over the four seat columns of Einzelspiel
+    session = Sessions.get_session()
+    query = session.query(Einzelspiel.id).filter(Einzelspiel.is_active == True)
+    positionen = [Einzelspiel.geberhand_id, Einzelspiel.ausspieler_id,
+                  Einzelspiel.mittelhand_id, Einzelspiel.hinterhand_id]
+    if len(teilnehmer_ids) <= 4:
+        for t in teilnehmer_ids:
+            query = query.filter(literal(t).in_(positionen))
+    else:
+        for position in positionen:
+            query = query.filter(position.in_(teilnehmer_ids))
+    einzelspiel_ids = [e for e, in query.all()]
+    session.close()
+    return einzelspiel_ids
+
+
+def get_einzelspiel_ids_by_teilnahmen(teilnehmer_ids: list) -> list:
+    # The filter of get_einzelspiele_by_teilnehmer_ids, only the ids are loaded like for the Spielen page
+    session = Sessions.get_session()
+    einzelspiel_ids = [e for e, in session.query(Einzelspiel.id).filter(Einzelspiel.is_active == True)
+                       .filter(Einzelspiel.id.in_(_get_einzelspiel_ids_by_teilnahmen(teilnehmer_ids))).all()]
+    session.close()
+    return einzelspiel_ids
+
+
+def init_database(path: str, n: int, teilnehmer: int):
+    # Writes n games with random seats in bulk, the Teilnahmen come from the backfill
+    Sessions.engine = create_engine(f'sqlite:///{path}', poolclass=NullPool)
+    Base.metadata.create_all(Sessions.engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'nachname_{i}, vorname_{i}', vorname=f'vorname_{i}',
+                                nachname=f'nachname_{i}') for i in range(1, teilnehmer + 1)] +
+                    [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    rng = random.Random(1)
+    for start in range(0, n, 50000):
+        einzelspiele = []
+        for i in range(start, min(start + 50000, n)):
+            sitze = rng.sample(range(1, teilnehmer + 1), 4)
+            einzelspiele.append(dict(id=i + 1, runde_id=1, geber_id=sitze[3], ausspieler_id=sitze[0],
+                                     mittelhand_id=sitze[1], hinterhand_id=sitze[2], geberhand_id=sitze[3],
+                                     ansager_id=sitze[0], partner_id=sitze[2], spielart=Spielart.RUFSPIEL.name,
+                                     spielpunkte=20, is_active=True))
+        session.execute(Einzelspiel.__table__.insert(), einzelspiele)
+    session.commit()
+    session.close()
+    start = time.perf_counter()
+    teilnahmen = backfill_teilnahmen()
+    logging.info(f'Backfill of {teilnahmen} Teilnahmen: {time.perf_counter() - start:.1f} s')
+
+
+def benchmark(n: int, teilnehmer: int, wiederholungen: int):
+    with tempfile.TemporaryDirectory() as directory:
+        init_database(os.path.join(directory, 'teilnahme.db'), n, teilnehmer)
+        for anzahl in [1, 2, 4, 6]:
+            teilnehmer_ids = list(range(1, anzahl + 1))
+            for label, lookup in [('seat columns', get_einzelspiel_ids_by_positionen),
+                                  ('teilnahme index', get_einzelspiel_ids_by_teilnahmen)]:
+                start = time.perf_counter()
+                for _ in range(wiederholungen):
+                    einzelspiele = len(lookup(teilnehmer_ids))
+                milliseconds = (time.perf_counter() - start) / wiederholungen * 1000
+                logging.info(f'{anzahl} Teilnehmer, {label:<15}: {einzelspiele:6d} Einzelspiele in '
+                             f'{milliseconds:8.2f} ms')
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lookup of the Einzelspiele of Teilnehmer via the seat columns and '
+                                                 'via the Teilnahme table.')
+    parser.add_argument('-n', type=int, default=500000, help='Number of games')
+    parser.add_argument('--teilnehmer', type=int, default=100, help='Number of Teilnehmer')
+    parser.add_argument('--wiederholungen', type=int, default=5, help='Repetitions per lookup')
+    args = parser.parse_args()
+    benchmark(args.n, args.teilnehmer, args.wiederholungen)
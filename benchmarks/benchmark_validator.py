@@ -0,0 +1,67 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Union, Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer
+from schafkopf.database.queries import get_teilnehmer_vorname_by_id, get_punkteconfig_by_runde_id
+from schafkopf.database.session import Sessions
+from schafkopf.frontend.validator import RufspielValidator, RamschValidator
+from tests.frontend.test_validator import build_rufspiel_raw_config, build_ramsch_raw_config
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+class QueryingSnapshot:
+    # Behaves like the validators did before the snapshot: one session and query per lookup
+    @staticmethod
+    def get_teilnehmer_vorname(teilnehmer_id: Union[None, int]) -> Union[None, str]:
+        return get_teilnehmer_vorname_by_id(teilnehmer_id)
+
+    @staticmethod
+    def get_punkteconfig(runde_id: Union[None, int]) -> Union[None, Punkteconfig]:
+        return get_punkteconfig_by_runde_id(runde_id)
+
+
+CASES = [('Rufspiel valid', lambda s: RufspielValidator(build_rufspiel_raw_config(kontriert_id=[3]), s)),
+         ('Rufspiel invalid', lambda s: RufspielValidator(build_rufspiel_raw_config(kontriert_id=[1], re_id=[3]), s)),
+         ('Ramsch valid', lambda s: RamschValidator(build_ramsch_raw_config(manuelle_verlierer_ids=[2]), s)),
+         ('Ramsch invalid', lambda s: RamschValidator(build_ramsch_raw_config(), s))]
+
+
+def measure(validate: Callable, snapshot, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        validate(snapshot)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def benchmark(n: int):
+    with tempfile.TemporaryDirectory() as directory:
+        # Same engine setup as the application uses for SQLite
+        Sessions.engine = create_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}', poolclass=NullPool)
+        Base.metadata.create_all(Sessions.engine)
+        session = Sessions.get_session()
+        session.add_all([Punkteconfig(id=1)] +
+                        [Teilnehmer(id=i, name=f'nachname_{i}, vorname_{i}', vorname=f'vorname_{i}',
+                                    nachname=f'nachname_{i}') for i in range(1, 5)] +
+                        [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+        session.commit()
+        session.close()
+        for label, validate in CASES:
+            before = measure(validate, QueryingSnapshot(), n)
+            after = measure(lambda _: validate(None), None, n)
+            logging.info(f'{label:<17} queries per lookup: {before:8.1f} µs, snapshot: {after:6.1f} µs, '
+                         f'{before / after:5.1f}x')
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latency of RufspielValidator and RamschValidator.')
+    parser.add_argument('-n', type=int, default=500, help='Validations per case')
+    benchmark(parser.parse_args().n)
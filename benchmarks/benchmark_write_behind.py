@@ -0,0 +1,61 @@
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer
+from schafkopf.database.session import Sessions
+from schafkopf.database.write_behind import WriteBehindQueue
+from tests.helpers import build_random_configs, WRITERS
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def benchmark(n: int, batch_size: int):
+    configs = build_random_configs(random.Random(1), n)
+    writers = [WRITERS[type(c)][1](WRITERS[type(c)][0](c)) for c in configs]
+    with tempfile.TemporaryDirectory() as directory:
+        # Same engine setup as the application uses for SQLite
+        Sessions.engine = create_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}', poolclass=NullPool)
+        Base.metadata.create_all(Sessions.engine)
+        session = Sessions.get_session()
+        session.add_all([Punkteconfig(id=1)] +
+                        [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                         for i in range(1, 9)] +
+                        [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+        session.commit()
+        session.close()
+        queue = WriteBehindQueue(f'sqlite:///{os.path.join(directory, "journal.db")}', batch_size=batch_size)
+        logging.getLogger().setLevel(logging.WARNING)
+        for label, write in [('Direct write', lambda w: w.write()), ('Write-behind', queue.put)]:
+            latencies = []
+            for writer in writers:
+                start = time.perf_counter()
+                write(writer)
+                latencies.append(1000 * (time.perf_counter() - start))
+            latencies.sort()
+            logging.getLogger().setLevel(logging.INFO)
+            logging.info(f'{label:<13} median {statistics.median(latencies):6.2f} ms, '
+                         f'p99 {latencies[int(0.99 * len(latencies))]:6.2f} ms per recorded game')
+            logging.getLogger().setLevel(logging.WARNING)
+        start = time.perf_counter()
+        queue.start()
+        queue.flush()
+        queue.stop()
+        logging.getLogger().setLevel(logging.INFO)
+        logging.info(f'Journal of {n} games written in {time.perf_counter() - start:.2f} s')
+        Sessions.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latency of recording a game with and without write-behind.')
+    parser.add_argument('-n', type=int, default=1000, help='Number of games')
+    parser.add_argument('--batch-size', type=int, default=100, help='Games per transaction of the worker')
+    args = parser.parse_args()
+    benchmark(args.n, args.batch_size)
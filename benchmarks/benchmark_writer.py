@@ -0,0 +1,68 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import schafkopf.database.writer
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer
+from schafkopf.database.queries import insert_einzelspiel, insert_resultat, insert_verdopplung, insert_spiel
+from schafkopf.database.session import Sessions
+from schafkopf.database.sqlite_profile import create_sqlite_engine, PROFILES
+from tests.helpers import build_random_configs, WRITERS
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def insert_spiel_orm(einzelspiel: Dict[str, Any], resultate: List[Dict[str, Any]],
+                     verdopplungen: List[Dict[str, Any]]) -> int:
+    # The write path before insert_spiel: one ORM object per row and a flush for the Einzelspiel id
+    # It did not store submission tokens
+    einzelspiel = {k: v for k, v in einzelspiel.items() if k != 'submission_token'}
+    session = Sessions.get_session()
+    einzelspiel_id = insert_einzelspiel(**einzelspiel, session=session).id
+    for resultat in resultate:
+        insert_resultat(einzelspiel_id=einzelspiel_id, **resultat, session=session)
+    for verdopplung in verdopplungen:
+        insert_verdopplung(einzelspiel_id=einzelspiel_id, **verdopplung, session=session)
+    session.commit()
+    session.close()
+    return einzelspiel_id
+
+
+def measure(configs: list) -> float:
+    start = time.perf_counter()
+    for c in configs:
+        calculator_type, writer_type = WRITERS[type(c)]
+        writer_type(calculator_type(c)).write()
+    return len(configs) / (time.perf_counter() - start)
+
+
+def benchmark(n: int):
+    configs = build_random_configs(random.Random(1), n)
+    for label, insert in [('ORM objects', insert_spiel_orm), ('Core bulk inserts', insert_spiel)]:
+        with tempfile.TemporaryDirectory() as directory:
+            # Same engine setup as the application uses for SQLite
+            Sessions.engine = create_sqlite_engine(f'sqlite:///{os.path.join(directory, "benchmark.db")}',
+                                                   PROFILES['DEFAULT'])
+            Base.metadata.create_all(Sessions.engine)
+            session = Sessions.get_session()
+            session.add_all([Punkteconfig(id=1)] +
+                            [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                             for i in range(1, 9)] +
+                            [Runde(id=1, name='Benchmark', ort='Nürnberg', punkteconfig_id=1)])
+            session.commit()
+            session.close()
+            schafkopf.database.writer.insert_spiel = insert
+            writes = measure(configs)
+            logging.info(f'{label:<18} {writes:8.1f} writes/s, {1000 / writes:6.2f} ms per game')
+            Sessions.engine.dispose()
+    schafkopf.database.writer.insert_spiel = insert_spiel
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Games per second written by the Writers to SQLite.')
+    parser.add_argument('-n', type=int, default=1000, help='Number of games')
+    benchmark(parser.parse_args().n)
@@ -0,0 +1,26 @@
+import argparse
+import logging
+
+from schafkopf.database.importer import import_spiele
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def database_import(path: str, chunk_size: int, checkpoint_path: str, resume: bool):
+    report = import_spiele(path, chunk_size=chunk_size, checkpoint_path=checkpoint_path, resume=resume)
+    logging.info(f'{report.spiele} Spiele in {report.sekunden:.1f} s verarbeitet '
+                 f'({report.get_spiele_pro_sekunde():.0f} Spiele/s): {report.importiert} importiert, '
+                 f'{report.abgelehnt} abgelehnt, {report.neue_teilnehmer} neue Teilnehmer, {report.neue_runden} neue '
+                 f'Runden')
+    logging.info(f'Checkpoint: {report.checkpoint} Spiele, fortsetzen mit --resume')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Imports games from a CSV or JSON Lines file, see '
+                                                 'schafkopf.database.importer.SPALTEN for the columns.')
+    parser.add_argument('path', help='CSV file with header or JSON Lines file')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Games per transaction')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file, default: <path>.checkpoint')
+    parser.add_argument('--resume', action='store_true', help='Continue after the games of the checkpoint')
+    args = parser.parse_args()
+    database_import(args.path, args.chunk_size, args.checkpoint, args.resume)
@@ -1,6 +1,7 @@
 import logging
 
 from schafkopf.database.data_model import Base
+from schafkopf.database.migrations import stamp
 from schafkopf.database.queries import insert_default_punkteconfig, insert_user
 from schafkopf.database.session import Sessions
 from schafkopf.utils.settings_utils import get_database_url, get_init_username, get_init_password
@@ -12,6 +13,8 @@ def database_init():
     engine = Sessions.get_engine()
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    # The new schema already contains what the migrations add
+    stamp(engine)
     # Note: here you can change the default configuration of points (currently: 50-20-10)
     insert_default_punkteconfig()
     insert_default_username_password()
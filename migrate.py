@@ -0,0 +1,15 @@
+import logging
+
+from schafkopf.database.migrations import migrate, get_schema_version
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def database_migrate():
+    # Applies the pending migrations to the database of settings.ini or DATABASE_URL, also while the app is running
+    applied = migrate()
+    logging.info(f'{len(applied)} migrations applied, schema version {get_schema_version()}')
+
+
+if __name__ == '__main__':
+    database_migrate()
@@ -0,0 +1,29 @@
+import argparse
+import logging
+
+from schafkopf.database.data_model import Punkteconfig
+from schafkopf.database.rescoring import rescore
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+def database_rescore(punkteconfig: Punkteconfig, write: bool):
+    report = rescore(punkteconfig, write=write)
+    logging.info(f'{report.einzelspiele} Einzelspiele re-scored, {report.geaenderte_einzelspiele} changed')
+    logging.info(f'\n{report.get_dataframe().to_string(index=False)}')
+    if write:
+        logging.info('Resultat.punkte and Einzelspiel.spielpunkte written back')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-scores all active Einzelspiele under another Punkteconfig.')
+    parser.add_argument('--rufspiel', type=int, default=20)
+    parser.add_argument('--hochzeit', type=int, default=30)
+    parser.add_argument('--solo', type=int, default=50)
+    parser.add_argument('--laufende', type=float, default=10)
+    parser.add_argument('--schneider', type=float, default=10)
+    parser.add_argument('--schwarz', type=float, default=10)
+    parser.add_argument('--write', action='store_true', help='Write the new points back into the database')
+    args = parser.parse_args()
+    database_rescore(Punkteconfig(rufspiel=args.rufspiel, hochzeit=args.hochzeit, solo=args.solo,
+                                  laufende=args.laufende, schneider=args.schneider, schwarz=args.schwarz), args.write)
@@ -0,0 +1,92 @@
+import numpy as np
+
+from schafkopf.backend.payout_table import get_payout_table, encode
+from schafkopf.database.configs import BatchConfig
+from schafkopf.database.data_model import Spielart
+
+SOLO_SPIELARTEN = [Spielart.FARBSOLO.value, Spielart.WENZ.value, Spielart.GEIER.value]
+
+
+class BatchCalculator:
+    # Scores many games at once. Follows exactly the rules of RufspielCalculator, SoloCalculator,
+    # HochzeitCalculator and RamschCalculator, row i of every result belongs to game i of the BatchConfig.
+    def __init__(self, config: BatchConfig):
+        self._config = config
+
+    @property
+    def config(self) -> BatchConfig:
+        return self._config
+
+    def is_ramsch(self) -> np.ndarray:
+        return self._config.spielart == Spielart.RAMSCH.value
+
+    def is_solo(self) -> np.ndarray:
+        return np.isin(self._config.spielart, SOLO_SPIELARTEN)
+
+    def is_tout(self) -> np.ndarray:
+        return self._config.tout_gespielt_gewonnen | self._config.tout_gespielt_verloren
+
+    def is_schneider(self) -> np.ndarray:
+        c = self._config
+        schneider = (c.spieler_augen >= 91) | (c.spieler_augen <= 30)
+        return schneider & ~self.is_ramsch() & ~(self.is_solo() & self.is_tout())
+
+    def is_schwarz(self) -> np.ndarray:
+        return self._config.schwarz & ~self.is_ramsch()
+
+    def get_grundpunkte(self) -> np.ndarray:
+        c = self._config
+        p = c.punkteconfig
+        spielart = c.spielart
+        return np.select([spielart == Spielart.RUFSPIEL.value,
+                          spielart == Spielart.HOCHZEIT.value,
+                          self.is_solo(),
+                          self.is_ramsch() & c.durchmarsch],
+                         [p.rufspiel, p.hochzeit, p.solo, p.solo], default=p.rufspiel).astype(np.float64)
+
+    def get_punkte_laufende(self) -> np.ndarray:
+        c = self._config
+        return np.where(self.is_ramsch(), 0.0, c.punkteconfig.laufende * c.laufende)
+
+    def get_verdopplungen(self) -> np.ndarray:
+        c = self._config
+        tout = c.tout_gespielt_gewonnen.astype(np.int64) + c.tout_gespielt_verloren
+        normalspiel_verdopplungen = c.kontriert.astype(np.int64) + c.re + np.where(self.is_solo(), tout, 0)
+        return c.gelegt + np.where(self.is_ramsch(), c.jungfrauen, normalspiel_verdopplungen)
+
+    def get_verdopplung(self) -> np.ndarray:
+        return np.ldexp(1.0, self.get_verdopplungen())
+
+    def get_outcome_codes(self) -> np.ndarray:
+        c = self._config
+        ramsch = self.is_ramsch()
+        return encode(c.spielart, ramsch & c.durchmarsch, self.is_schneider(), self.is_schwarz(),
+                      np.where(ramsch, 0, c.laufende), self.get_verdopplungen())
+
+    def get_spielpunkte(self) -> np.ndarray:
+        return get_payout_table(self._config.punkteconfig).lookup(self.get_outcome_codes())
+
+    def get_gewinner(self) -> np.ndarray:
+        c = self._config
+        positionen = np.arange(4)
+        ansager = positionen == c.ansager[:, None]
+        spieler = ansager | (positionen == c.partner[:, None])
+        spieler_gewinnt = np.where(c.tout_gespielt_gewonnen | c.tout_gespielt_verloren,
+                                   c.tout_gespielt_gewonnen, c.spieler_augen >= 61)
+        normalspiel_gewinner = np.where(spieler_gewinnt[:, None], spieler, ~spieler)
+        ramsch_gewinner = np.where(c.durchmarsch[:, None],
+                                   positionen == c.durchmarsch_spieler[:, None],
+                                   positionen != c.verlierer[:, None])
+        return np.where(self.is_ramsch()[:, None], ramsch_gewinner, normalspiel_gewinner)
+
+    def get_punkte(self) -> np.ndarray:
+        # Returns a games x 4 matrix with the points of every Teilnehmer in the order of config.teilnehmer_ids
+        c = self._config
+        positionen = np.arange(4)
+        ramsch = self.is_ramsch()
+        einzelspieler = np.where(ramsch,
+                                 np.where(c.durchmarsch, c.durchmarsch_spieler, c.verlierer),
+                                 np.where(self.is_solo(), c.ansager, -1))
+        faktor = np.where(positionen == einzelspieler[:, None], 3.0, 1.0)
+        vorzeichen = np.where(self.get_gewinner(), 1.0, -1.0)
+        return vorzeichen * (self.get_spielpunkte()[:, None] * faktor)
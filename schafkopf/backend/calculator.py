@@ -1,28 +1,62 @@
 from abc import abstractmethod
-from typing import List, Dict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Tuple, Union
 
 from schafkopf.database.configs import RufspielConfig, SoloConfig, Config, HochzeitConfig, RufspielHochzeitConfig, \
     NormalspielConfig, RamschConfig
 
 
+@dataclass(frozen=True)
+class Abrechnung:
+    # Result of one game. Computed once per Calculator and shared by Presenter and Writer.
+    spielpunkte: Union[int, float]
+    teilnehmer_id_to_punkte: Mapping[int, Union[int, float]]
+    gewinner_ids: Tuple[int, ...]
+    verlierer_ids: Tuple[int, ...]
+    grundpunkte: Union[int, float]
+    schneider: bool
+    schwarz: bool
+    punkte_schneider: Union[int, float]
+    punkte_schwarz: Union[int, float]
+    laufende: int
+    punkte_laufende: Union[int, float]
+    gelegt: int
+    kontriert: int
+    re: int
+    tout: int
+    jungfrauen: int
+    verdopplung: int
+
+
 class Calculator:
     def __init__(self, config: Config):
         self._config = config
+        self._abrechnung = None
 
-    @abstractmethod
-    def get_spielpunkte(self) -> int:
-        pass
+    def get_abrechnung(self) -> Abrechnung:
+        if self._abrechnung is None:
+            self._abrechnung = self._abrechnen()
+        return self._abrechnung
+
+    def get_spielpunkte(self) -> Union[int, float]:
+        return self.get_abrechnung().spielpunkte
 
-    @abstractmethod
     def get_gewinner_ids(self) -> List[int]:
-        pass
+        return list(self.get_abrechnung().gewinner_ids)
+
+    def get_verlierer_ids(self) -> List[int]:
+        return list(self.get_abrechnung().verlierer_ids)
 
-    @abstractmethod
     def get_teilnehmer_id_to_punkte(self) -> Dict:
+        return dict(self.get_abrechnung().teilnehmer_id_to_punkte)
+
+    @abstractmethod
+    def _abrechnen(self) -> Abrechnung:
         pass
 
-    def get_verlierer_ids(self) -> List[int]:
-        return [s for s in self._config.teilnehmer_ids if s not in self.get_gewinner_ids()]
+    def _get_verlierer_ids(self, gewinner_ids: List[int]) -> List[int]:
+        return [s for s in self._config.teilnehmer_ids if s not in gewinner_ids]
 
 
 class NormalspielCalculator(Calculator):
@@ -34,26 +68,65 @@ class NormalspielCalculator(Calculator):
     def config(self) -> NormalspielConfig:
         return self._config
 
+    def is_schwarz(self) -> bool:
+        return self._config.schwarz
+
+    def is_schneider(self) -> bool:
+        return True if self._config.spieler_augen >= 91 or self._config.spieler_augen <= 30 else False
+
+    def get_punkte_laufende(self) -> int:
+        return self._config.punkteconfig.laufende * self._config.laufende
+
     @abstractmethod
-    def get_spielpunkte(self) -> int:
+    def _get_grundpunkte(self) -> int:
         pass
 
     @abstractmethod
-    def get_gewinner_ids(self) -> List[int]:
+    def _get_gewinner_ids(self) -> List[int]:
         pass
 
     @abstractmethod
-    def get_teilnehmer_id_to_punkte(self) -> Dict:
+    def _get_teilnehmer_id_to_punkte(self, spielpunkte: Union[int, float], gewinner_ids: List[int],
+                                     verlierer_ids: List[int]) -> Dict:
         pass
 
-    def is_schwarz(self) -> bool:
-        return self._config.schwarz
-
-    def is_schneider(self) -> bool:
-        return True if self._config.spieler_augen >= 91 or self._config.spieler_augen <= 30 else False
-
-    def get_punkte_laufende(self) -> int:
-        return self._config.punkteconfig.laufende * self._config.laufende
+    def _get_tout(self) -> int:
+        return 0
+
+    def _abrechnen(self) -> Abrechnung:
+        config = self._config
+        punkteconfig = config.punkteconfig
+        schneider = self.is_schneider()
+        schwarz = self.is_schwarz()
+        grundpunkte = self._get_grundpunkte()
+        punkte_schneider = punkteconfig.schneider if schneider else 0
+        punkte_schwarz = punkteconfig.schwarz if schwarz else 0
+        punkte_laufende = self.get_punkte_laufende()
+        kontriert = 0 if config.kontriert_id is None else 1
+        re = 0 if config.re_id is None else 1
+        tout = self._get_tout()
+        verdopplung = 2 ** (len(config.gelegt_ids) + kontriert + re + tout)
+        spielpunkte = (grundpunkte + punkte_schneider + punkte_schwarz + punkte_laufende) * verdopplung
+        gewinner_ids = self._get_gewinner_ids()
+        verlierer_ids = self._get_verlierer_ids(gewinner_ids)
+        teilnehmer_id_to_punkte = self._get_teilnehmer_id_to_punkte(spielpunkte, gewinner_ids, verlierer_ids)
+        return Abrechnung(spielpunkte=spielpunkte,
+                          teilnehmer_id_to_punkte=MappingProxyType(teilnehmer_id_to_punkte),
+                          gewinner_ids=tuple(gewinner_ids),
+                          verlierer_ids=tuple(verlierer_ids),
+                          grundpunkte=grundpunkte,
+                          schneider=schneider,
+                          schwarz=schwarz,
+                          punkte_schneider=punkte_schneider,
+                          punkte_schwarz=punkte_schwarz,
+                          laufende=config.laufende,
+                          punkte_laufende=punkte_laufende,
+                          gelegt=len(config.gelegt_ids),
+                          kontriert=kontriert,
+                          re=re,
+                          tout=tout,
+                          jungfrauen=0,
+                          verdopplung=verdopplung)
 
 
 class RufspielHochzeitCalculator(NormalspielCalculator):
@@ -66,33 +139,22 @@ class RufspielHochzeitCalculator(NormalspielCalculator):
         return self._config
 
     @abstractmethod
-    def _get_punkte_from_punkteconfig(self) -> int:
+    def _get_grundpunkte(self) -> int:
         pass
 
-    def get_spielpunkte(self) -> int:
-        punkteconfig = self._config.punkteconfig
-        punkte = self._get_punkte_from_punkteconfig()
-        punkte = punkte + punkteconfig.schneider if self.is_schneider() else punkte
-        punkte = punkte + punkteconfig.schwarz if self.is_schwarz() else punkte
-        punkte += self.get_punkte_laufende()
-        return punkte * self._get_verdopplung()
-
-    def get_gewinner_ids(self) -> List[int]:
+    def _get_gewinner_ids(self) -> List[int]:
         spieler = [self._config.ansager_id, self._config.partner_id]
         if self._config.spieler_augen >= 61:
             return [s for s in self._config.teilnehmer_ids if s in spieler]
         else:
             return [s for s in self._config.teilnehmer_ids if s not in spieler]
 
-    def get_teilnehmer_id_to_punkte(self) -> Dict:
-        dc = {s: self.get_spielpunkte() for s in self.get_gewinner_ids()}
-        dc.update({s: -self.get_spielpunkte() for s in self.get_verlierer_ids()})
+    def _get_teilnehmer_id_to_punkte(self, spielpunkte: Union[int, float], gewinner_ids: List[int],
+                                     verlierer_ids: List[int]) -> Dict:
+        dc = {s: spielpunkte for s in gewinner_ids}
+        dc.update({s: -spielpunkte for s in verlierer_ids})
         return dc
 
-    def _get_verdopplung(self) -> int:
-        kontriert_und_re = len(['_' for d in [self._config.kontriert_id, self._config.re_id] if d is not None])
-        return 2 ** (len(self._config.gelegt_ids) + kontriert_und_re)
-
 
 class RufspielCalculator(RufspielHochzeitCalculator):
     def __init__(self, config: RufspielConfig):
@@ -103,7 +165,7 @@ class RufspielCalculator(RufspielHochzeitCalculator):
     def config(self) -> RufspielConfig:
         return self._config
 
-    def _get_punkte_from_punkteconfig(self) -> int:
+    def _get_grundpunkte(self) -> int:
         return self._config.punkteconfig.rufspiel
 
 
@@ -116,15 +178,18 @@ class SoloCalculator(NormalspielCalculator):
     def config(self) -> SoloConfig:
         return self._config
 
-    def get_spielpunkte(self) -> int:
-        punkteconfig = self._config.punkteconfig
-        punkte = punkteconfig.solo
-        punkte = punkte + punkteconfig.schneider if self.is_schneider() else punkte
-        punkte = punkte + punkteconfig.schwarz if self.is_schwarz() else punkte
-        punkte += self.get_punkte_laufende()
-        return punkte * self._get_verdopplung()
+    def is_schneider(self) -> bool:
+        if self._config.tout_gespielt_gewonnen or self._config.tout_gespielt_verloren:
+            return False
+        return super().is_schneider()
 
-    def get_gewinner_ids(self) -> List[int]:
+    def _get_grundpunkte(self) -> int:
+        return self._config.punkteconfig.solo
+
+    def _get_tout(self) -> int:
+        return self._config.tout_gespielt_verloren + self._config.tout_gespielt_gewonnen
+
+    def _get_gewinner_ids(self) -> List[int]:
         spieler = [self._config.ansager_id]
         if self._config.tout_gespielt_gewonnen:
             return [s for s in self._config.teilnehmer_ids if s in spieler]
@@ -135,26 +200,16 @@ class SoloCalculator(NormalspielCalculator):
         else:
             return [s for s in self._config.teilnehmer_ids if s not in spieler]
 
-    def get_teilnehmer_id_to_punkte(self) -> Dict:
-        spielpunkte = self.get_spielpunkte()
-        if self._config.ansager_id in self.get_gewinner_ids():
+    def _get_teilnehmer_id_to_punkte(self, spielpunkte: Union[int, float], gewinner_ids: List[int],
+                                     verlierer_ids: List[int]) -> Dict:
+        if self._config.ansager_id in gewinner_ids:
             dc = {self._config.ansager_id: spielpunkte * 3.0}
-            dc.update({s: -spielpunkte for s in self.get_verlierer_ids()})
+            dc.update({s: -spielpunkte for s in verlierer_ids})
         else:
-            dc = {self._config.ansager_id: - self.get_spielpunkte() * 3.0}
-            dc.update({s: spielpunkte for s in self.get_gewinner_ids()})
+            dc = {self._config.ansager_id: - spielpunkte * 3.0}
+            dc.update({s: spielpunkte for s in gewinner_ids})
         return dc
 
-    def is_schneider(self) -> bool:
-        if self._config.tout_gespielt_gewonnen or self._config.tout_gespielt_verloren:
-            return False
-        return super().is_schneider()
-
-    def _get_verdopplung(self) -> int:
-        kontriert_und_re = len(['_' for d in [self._config.kontriert_id, self._config.re_id] if d is not None])
-        tout = self._config.tout_gespielt_verloren + self._config.tout_gespielt_gewonnen
-        return 2 ** (len(self._config.gelegt_ids) + kontriert_und_re + tout)
-
 
 class HochzeitCalculator(RufspielHochzeitCalculator):
     def __init__(self, config: HochzeitConfig):
@@ -165,7 +220,7 @@ class HochzeitCalculator(RufspielHochzeitCalculator):
     def config(self) -> HochzeitConfig:
         return self._config
 
-    def _get_punkte_from_punkteconfig(self) -> int:
+    def _get_grundpunkte(self) -> int:
         return self._config.punkteconfig.hochzeit
 
 
@@ -178,28 +233,38 @@ class RamschCalculator(Calculator):
     def config(self) -> RamschConfig:
         return self._config
 
-    def get_spielpunkte(self) -> int:
-        punkteconfig = self._config.punkteconfig
-        if self._config.durchmarsch:
-            return punkteconfig.solo * self._get_verdopplung()
-        return punkteconfig.rufspiel * self._get_verdopplung()
-
-    def get_gewinner_ids(self) -> List[int]:
-        if self._config.durchmarsch:
-            verlierer_ids = [s for s in self._config.teilnehmer_ids if s not in [self._config.durchmarsch_id]]
+    def _abrechnen(self) -> Abrechnung:
+        config = self._config
+        grundpunkte = config.punkteconfig.solo if config.durchmarsch else config.punkteconfig.rufspiel
+        jungfrauen = len(['_' for d in config.jungfrau_ids if d is not None])
+        verdopplung = 2 ** (len(config.gelegt_ids) + jungfrauen)
+        spielpunkte = grundpunkte * verdopplung
+        if config.durchmarsch:
+            verlierer_ids = [s for s in config.teilnehmer_ids if s not in [config.durchmarsch_id]]
         else:
-            verlierer_ids = [self._config.verlierer_id]
-        return [s for s in self._config.teilnehmer_ids if s not in verlierer_ids]
-
-    def get_teilnehmer_id_to_punkte(self) -> Dict:
-        if self._config.durchmarsch:
-            dc = {s: self.get_spielpunkte() * 3 for s in self.get_gewinner_ids()}
-            dc.update({s: -self.get_spielpunkte() for s in self.get_verlierer_ids()})
+            verlierer_ids = [config.verlierer_id]
+        gewinner_ids = [s for s in config.teilnehmer_ids if s not in verlierer_ids]
+        verlierer_ids = self._get_verlierer_ids(gewinner_ids)
+        if config.durchmarsch:
+            dc = {s: spielpunkte * 3 for s in gewinner_ids}
+            dc.update({s: -spielpunkte for s in verlierer_ids})
         else:
-            dc = {s: self.get_spielpunkte() for s in self.get_gewinner_ids()}
-            dc.update({s: -self.get_spielpunkte() * 3 for s in self.get_verlierer_ids()})
-        return dc
-
-    def _get_verdopplung(self) -> int:
-        jungfrauen = len(['_' for d in self._config.jungfrau_ids if d is not None])
-        return 2 ** (len(self._config.gelegt_ids) + jungfrauen)
+            dc = {s: spielpunkte for s in gewinner_ids}
+            dc.update({s: -spielpunkte * 3 for s in verlierer_ids})
+        return Abrechnung(spielpunkte=spielpunkte,
+                          teilnehmer_id_to_punkte=MappingProxyType(dc),
+                          gewinner_ids=tuple(gewinner_ids),
+                          verlierer_ids=tuple(verlierer_ids),
+                          grundpunkte=grundpunkte,
+                          schneider=False,
+                          schwarz=False,
+                          punkte_schneider=0,
+                          punkte_schwarz=0,
+                          laufende=0,
+                          punkte_laufende=0,
+                          gelegt=len(config.gelegt_ids),
+                          kontriert=0,
+                          re=0,
+                          tout=0,
+                          jungfrauen=jungfrauen,
+                          verdopplung=verdopplung)
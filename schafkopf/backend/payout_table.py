@@ -0,0 +1,81 @@
+from functools import lru_cache
+from typing import Tuple, Union
+
+import numpy as np
+
+from schafkopf.database.configs import Config, RamschConfig, SoloConfig, NormalspielConfig, HochzeitConfig
+from schafkopf.database.data_model import Punkteconfig, Spielart
+
+# Dimensions of an outcome: Spielart value, Durchmarsch, Schneider, Schwarz, Laufende, number of Verdopplungen.
+# Verdopplungen are at most 4 x gelegt + kontriert + re + tout or 4 x gelegt + 3 x Jungfrau.
+MAX_LAUFENDE = 8
+MAX_VERDOPPLUNGEN = 7
+SHAPE = (max(s.value for s in Spielart) + 1, 2, 2, 2, MAX_LAUFENDE + 1, MAX_VERDOPPLUNGEN + 1)
+
+
+def encode(spielart: Union[int, np.ndarray], durchmarsch: Union[bool, np.ndarray],
+           schneider: Union[bool, np.ndarray], schwarz: Union[bool, np.ndarray], laufende: Union[int, np.ndarray],
+           verdopplungen: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    # Schneider and Schwarz have to be the effective ones, e.g. never Schneider for Tout or Ramsch
+    return np.ravel_multi_index((spielart, np.asarray(durchmarsch, dtype=np.int64),
+                                 np.asarray(schneider, dtype=np.int64), np.asarray(schwarz, dtype=np.int64),
+                                 laufende, verdopplungen), SHAPE)
+
+
+def encode_config(config: Config) -> int:
+    if isinstance(config, RamschConfig):
+        jungfrauen = len([j for j in config.jungfrau_ids if j is not None])
+        return int(encode(Spielart.RAMSCH.value, config.durchmarsch, False, False, 0,
+                          len(config.gelegt_ids) + jungfrauen))
+    if not isinstance(config, NormalspielConfig):
+        raise ValueError(f'No payout for {type(config).__name__}.')
+    schneider = config.spieler_augen >= 91 or config.spieler_augen <= 30
+    verdopplungen = len(config.gelegt_ids) + (config.kontriert_id is not None) + (config.re_id is not None)
+    if isinstance(config, SoloConfig):
+        spielart = config.spielart.value
+        tout = config.tout_gespielt_gewonnen + config.tout_gespielt_verloren
+        schneider = schneider and tout == 0
+        verdopplungen += tout
+    else:
+        spielart = Spielart.HOCHZEIT.value if isinstance(config, HochzeitConfig) else Spielart.RUFSPIEL.value
+    return int(encode(spielart, False, schneider, config.schwarz, config.laufende, verdopplungen))
+
+
+class PayoutTable:
+    # Spielpunkte of every possible outcome under one Punkteconfig, indexed by the code of encode
+    def __init__(self, tarif: Tuple[float, float, float, float, float, float]):
+        rufspiel, hochzeit, solo, laufende, schneider, schwarz = tarif
+        s, d, sn, sw, lf, v = np.meshgrid(*[np.arange(n) for n in SHAPE], indexing='ij')
+        ramsch = s == Spielart.RAMSCH.value
+        grundpunkte = np.select([s == Spielart.HOCHZEIT.value,
+                                 np.isin(s, [Spielart.FARBSOLO.value, Spielart.WENZ.value, Spielart.GEIER.value]),
+                                 ramsch & (d == 1)],
+                                [hochzeit, solo, solo], default=rufspiel).astype(np.float64)
+        punkte = grundpunkte + np.where((sn == 1) & ~ramsch, schneider, 0.0)
+        punkte = punkte + np.where((sw == 1) & ~ramsch, schwarz, 0.0)
+        punkte = punkte + np.where(ramsch, 0.0, laufende * lf)
+        self._spielpunkte = (punkte * np.ldexp(1.0, v)).ravel()
+        self._spielpunkte.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self._spielpunkte)
+
+    def get_spielpunkte(self, code: int) -> float:
+        return float(self._spielpunkte[code])
+
+    def get_config_spielpunkte(self, config: Config) -> float:
+        return self.get_spielpunkte(encode_config(config))
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        return self._spielpunkte[codes]
+
+
+def get_payout_table(punkteconfig: Punkteconfig) -> PayoutTable:
+    return _get_payout_table((punkteconfig.rufspiel, punkteconfig.hochzeit, punkteconfig.solo,
+                              punkteconfig.laufende, punkteconfig.schneider, punkteconfig.schwarz))
+
+
+@lru_cache(maxsize=32)
+def _get_payout_table(tarif: Tuple[float, float, float, float, float, float]) -> PayoutTable:
+    # Built lazily on first use of a tariff, Punkteconfig rows themselves are not hashable by value
+    return PayoutTable(tarif)
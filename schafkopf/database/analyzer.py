@@ -1,23 +1,52 @@
-from typing import List, Tuple
+from typing import List, Tuple, NamedTuple, Union
 
 import numpy as np
 import pandas as pd
 
 from schafkopf.database.data_model import Spielart
-from schafkopf.database.queries import get_teilnehmer, get_teilnehmer_name_by_id, \
-    get_verdopplungen_by_einzelspiel_ids, \
-    get_resultate_by_einzelspiele_ids, get_einzelspiele_by_einzelspiel_ids
+from schafkopf.database.queries import get_teilnehmer, get_teilnehmer_namen_by_ids, \
+    get_verdopplung_zeilen_by_einzelspiel_ids, get_resultat_zeilen_by_einzelspiel_ids, \
+    get_einzelspiel_zeilen_by_einzelspiel_ids
+from schafkopf.database.query_executor import run_queries
 
+# The columns the statistics read
+RESULTAT_SPALTEN = ['einzelspiel_id', 'teilnehmer_id', 'punkte', 'gewonnen']
+EINZELSPIEL_SPALTEN = ['id', 'spielart', 'ansager_id', 'partner_id']
+VERDOPPLUNG_SPALTEN = ['teilnehmer_id', 'doppler']
 
-def get_list_dataframe_by_einzelspiele_ids(einzelspiele_ids: List[int]) -> pd.DataFrame:
-    resultate = get_resultate_by_einzelspiele_ids(einzelspiel_ids=einzelspiele_ids, dataframe=True)
+
+class StatsDaten(NamedTuple):
+    # The data of the statistics of Einzelspiele, einzelspiele and verdopplungen only for the details
+    resultate: pd.DataFrame
+    einzelspiele: Union[None, pd.DataFrame] = None
+    verdopplungen: Union[None, pd.DataFrame] = None
+
+
+def load_stats_daten(einzelspiel_ids: List[int], details: bool = True) -> StatsDaten:
+    # The independent queries run concurrently on the query executor
+    queries = dict(resultate=lambda s: get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids, RESULTAT_SPALTEN,
+                                                                              dataframe=True, session=s))
+    if details:
+        queries.update(
+            einzelspiele=lambda s: get_einzelspiel_zeilen_by_einzelspiel_ids(einzelspiel_ids, EINZELSPIEL_SPALTEN,
+                                                                             dataframe=True, session=s),
+            verdopplungen=lambda s: get_verdopplung_zeilen_by_einzelspiel_ids(einzelspiel_ids, VERDOPPLUNG_SPALTEN,
+                                                                              dataframe=True, session=s))
+    return StatsDaten(**run_queries(queries))
+
+
+def get_list_dataframe_by_einzelspiele_ids(einzelspiele_ids: List[int],
+                                           resultate: Union[None, pd.DataFrame] = None) -> pd.DataFrame:
+    if resultate is None:
+        resultate = get_resultat_zeilen_by_einzelspiel_ids(einzelspiele_ids, RESULTAT_SPALTEN, dataframe=True)
     resultate = resultate[['einzelspiel_id', 'teilnehmer_id', 'punkte']]
     resultate.set_index(['einzelspiel_id', 'teilnehmer_id'], inplace=True)
     resultate = resultate.unstack()
     resultate.sort_index(ascending=True, inplace=True)
     resultate.fillna(0.0, inplace=True)
     resultate = resultate.cumsum()
-    columns = {col: get_teilnehmer_name_by_id(col) for col in resultate.columns.get_level_values(1)}
+    teilnehmer_id_to_name, _ = get_teilnehmer_namen_by_ids(resultate.columns.get_level_values(1))
+    columns = {col: teilnehmer_id_to_name.get(col) for col in resultate.columns.get_level_values(1)}
     resultate.rename(columns={'punkte': 'Punkte'}, level=0, inplace=True)
     resultate.rename(columns=columns, level=1, inplace=True)
     resultate['Einzelspiele'] = np.arange(len(resultate)) + 1
@@ -33,8 +62,10 @@ def get_list_dataframe_by_einzelspiele_ids(einzelspiele_ids: List[int]) -> pd.Da
     return resultate
 
 
-def get_ranking_dataframe_by_runde_ids(einzelspiele_ids: List[int]) -> pd.DataFrame:
-    resultate = get_resultate_by_einzelspiele_ids(einzelspiel_ids=einzelspiele_ids, dataframe=True)
+def get_ranking_dataframe_by_runde_ids(einzelspiele_ids: List[int],
+                                       resultate: Union[None, pd.DataFrame] = None) -> pd.DataFrame:
+    if resultate is None:
+        resultate = get_resultat_zeilen_by_einzelspiel_ids(einzelspiele_ids, RESULTAT_SPALTEN, dataframe=True)
     grouped_einzelspiele = resultate.groupby('teilnehmer_id')['einzelspiel_id'].count().to_frame()
     grouped_resultate = resultate.groupby(['teilnehmer_id'])['punkte'].sum().to_frame()
     grouped = pd.concat([grouped_einzelspiele, grouped_resultate], axis=1, join='inner')
@@ -48,10 +79,13 @@ def get_ranking_dataframe_by_runde_ids(einzelspiele_ids: List[int]) -> pd.DataFr
 
 
 def get_stats_by_einzelspiel_ids(
-        einzelspiel_ids: List[int]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame,
-                                             pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    einzelspiele = get_einzelspiele_by_einzelspiel_ids(einzelspiel_ids=einzelspiel_ids, dataframe=True)
-    resultate = get_resultate_by_einzelspiele_ids(einzelspiel_ids=einzelspiel_ids, dataframe=True)
+        einzelspiel_ids: List[int],
+        daten: Union[None, StatsDaten] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame,
+                                                        pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    if daten is None or daten.einzelspiele is None:
+        daten = load_stats_daten(einzelspiel_ids)
+    einzelspiele = daten.einzelspiele
+    resultate = daten.resultate
 
     resultate_df = pd.merge(left=resultate, right=einzelspiele, how='left', left_on='einzelspiel_id', right_on='id')
     resultate_df['gewonnen'] = resultate_df['gewonnen'].astype(int)
@@ -127,8 +161,7 @@ def get_stats_by_einzelspiel_ids(
     ramschspieler_verloren = ramsch_resultate_df.groupby(['teilnehmer_id'])['verloren'].sum().to_frame()
     ramschspieler_verloren.rename(columns={'verloren': 'Ramsch verl.'}, inplace=True)
 
-    verdopplungen = get_verdopplungen_by_einzelspiel_ids(einzelspiel_ids=einzelspiel_ids, dataframe=True)
-    verdopplungen = verdopplungen.groupby(['teilnehmer_id', 'doppler'])['doppler'].count().to_frame()
+    verdopplungen = daten.verdopplungen.groupby(['teilnehmer_id', 'doppler'])['doppler'].count().to_frame()
     verdopplungen = verdopplungen.unstack()
     verdopplungen.columns = verdopplungen.columns.droplevel()
 
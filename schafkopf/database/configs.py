@@ -1,21 +1,75 @@
 from abc import abstractmethod
-from dataclasses import dataclass
-from typing import List, Union
+from dataclasses import dataclass, fields
+from typing import List, Union, Tuple
+
+import numpy as np
 
 from schafkopf.database.data_model import Farbgebung, Punkteconfig, Spielart
 
 
-@dataclass
-class Config:
+class Frozen:
+    # Base of the frozen, slotted configs. Lists passed by validators and Dash callbacks are stored as tuples,
+    # so every config is hashable and can be shared, e.g. as a cache key.
+    __slots__ = ()
+    _sequences = ()
+
+    def __post_init__(self):
+        for name in self._sequences:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                object.__setattr__(self, name, tuple(value))
+
+    def __getstate__(self) -> List:
+        return [getattr(self, f.name) for f in fields(self)]
+
+    def __setstate__(self, state: List):
+        for f, value in zip(fields(self), state):
+            object.__setattr__(self, f.name, value)
+
+
+@dataclass(frozen=True)
+class PunkteconfigRef(Frozen):
+    # Immutable copy of the columns of a Punkteconfig row, hashable and usable outside of any session
+    __slots__ = ('id', 'name', 'ramsch', 'rufspiel', 'hochzeit', 'laufende', 'schneider', 'schwarz', 'solo')
+    id: Union[None, int]
+    name: Union[None, str]
+    ramsch: int
+    rufspiel: int
+    hochzeit: int
+    laufende: float
+    schneider: float
+    schwarz: float
+    solo: int
+
+    @staticmethod
+    def from_punkteconfig(punkteconfig: Union[Punkteconfig, 'PunkteconfigRef']) -> 'PunkteconfigRef':
+        if isinstance(punkteconfig, PunkteconfigRef):
+            return punkteconfig
+        return PunkteconfigRef(id=punkteconfig.id, name=punkteconfig.name, ramsch=punkteconfig.ramsch,
+                               rufspiel=punkteconfig.rufspiel, hochzeit=punkteconfig.hochzeit,
+                               laufende=punkteconfig.laufende, schneider=punkteconfig.schneider,
+                               schwarz=punkteconfig.schwarz, solo=punkteconfig.solo)
+
+
+@dataclass(frozen=True)
+class Config(Frozen):
+    __slots__ = ('runde_id', 'punkteconfig', 'geber_id', 'teilnehmer_ids', 'gelegt_ids')
+    _sequences = ('teilnehmer_ids', 'gelegt_ids')
     runde_id: int
-    punkteconfig: Punkteconfig
+    punkteconfig: PunkteconfigRef
     geber_id: int
-    teilnehmer_ids: List[int]
-    gelegt_ids: List[int]
+    teilnehmer_ids: Tuple[int, ...]
+    gelegt_ids: Tuple[int, ...]
 
+    def __post_init__(self):
+        super().__post_init__()
+        if isinstance(self.punkteconfig, Punkteconfig):
+            object.__setattr__(self, 'punkteconfig', PunkteconfigRef.from_punkteconfig(self.punkteconfig))
 
-@dataclass
+
+@dataclass(frozen=True)
 class NormalspielConfig(Config):
+    __slots__ = ('ansager_id', 'kontriert_id', 're_id', 'laufende', 'spieler_augen', 'nicht_spieler_augen', 'schwarz')
     ansager_id: int
     kontriert_id: Union[None, int]
     re_id: Union[None, int]
@@ -33,8 +87,9 @@ class NormalspielConfig(Config):
         pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class RufspielHochzeitConfig(NormalspielConfig):
+    __slots__ = ('partner_id',)
     partner_id: int
 
     def get_nicht_spieler_ids(self) -> List[int]:
@@ -44,8 +99,9 @@ class RufspielHochzeitConfig(NormalspielConfig):
         pass
 
 
-@dataclass
+@dataclass(frozen=True)
 class RufspielConfig(RufspielHochzeitConfig):
+    __slots__ = ('rufsau',)
     rufsau: Farbgebung
 
     def get_spieler_ids(self) -> List[int]:
@@ -55,8 +111,9 @@ class RufspielConfig(RufspielHochzeitConfig):
         return [t for t in self.teilnehmer_ids if t not in [self.ansager_id, self.partner_id]]
 
 
-@dataclass
+@dataclass(frozen=True)
 class SoloConfig(NormalspielConfig):
+    __slots__ = ('spielart', 'farbe', 'tout_gespielt_gewonnen', 'tout_gespielt_verloren')
     spielart: Spielart
     farbe: Union[None, Farbgebung]
     tout_gespielt_gewonnen: bool
@@ -69,8 +126,10 @@ class SoloConfig(NormalspielConfig):
         return [t for t in self.teilnehmer_ids if t not in [self.ansager_id]]
 
 
-@dataclass
+@dataclass(frozen=True)
 class HochzeitConfig(RufspielHochzeitConfig):
+    __slots__ = ()
+
     def get_spieler_ids(self) -> List[int]:
         return [t for t in self.teilnehmer_ids if t in [self.ansager_id, self.partner_id]]
 
@@ -78,9 +137,12 @@ class HochzeitConfig(RufspielHochzeitConfig):
         return [t for t in self.teilnehmer_ids if t not in [self.ansager_id, self.partner_id]]
 
 
-@dataclass
+@dataclass(frozen=True)
 class RamschConfig(Config):
-    jungfrau_ids: List[int]
+    __slots__ = ('jungfrau_ids', 'ausspieler_augen', 'mittelhand_augen', 'hinterhand_augen', 'geberhand_augen',
+                 'verlierer_id', 'durchmarsch_id', 'durchmarsch')
+    _sequences = Config._sequences + ('jungfrau_ids',)
+    jungfrau_ids: Tuple[int, ...]
     ausspieler_augen: int
     mittelhand_augen: int
     hinterhand_augen: int
@@ -90,53 +152,308 @@ class RamschConfig(Config):
     durchmarsch: bool
 
 
-@dataclass
-class RawConfig:
+@dataclass(frozen=True)
+class RawConfig(Frozen):
+    __slots__ = ('runde_id', 'geber_id', 'teilnehmer_ids', 'gelegt_ids')
+    _sequences = ('teilnehmer_ids', 'gelegt_ids')
     runde_id: Union[None, int]
     geber_id: Union[None, int]
-    teilnehmer_ids: Union[None, List[int]]
-    gelegt_ids: List[int]
+    teilnehmer_ids: Union[None, Tuple[int, ...]]
+    gelegt_ids: Tuple[int, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class NormalspielRawConfig(RawConfig):
+    __slots__ = ('ansager_id', 'kontriert_id', 're_id', 'laufende', 'spieler_nichtspieler_augen', 'augen', 'schwarz')
+    _sequences = RawConfig._sequences + ('kontriert_id', 're_id')
     ansager_id: Union[None, int]
-    kontriert_id: List[int]
-    re_id: List[int]
+    kontriert_id: Tuple[int, ...]
+    re_id: Tuple[int, ...]
     laufende: Union[None, int]
     spieler_nichtspieler_augen: Union[None, int]
     augen: Union[None, int]
     schwarz: Union[None, int]
 
 
-@dataclass
+@dataclass(frozen=True)
 class RufspielHochzeitRawConfig(NormalspielRawConfig):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(frozen=True)
 class RufspielRawConfig(RufspielHochzeitRawConfig):
+    __slots__ = ('rufsau', 'partner_id')
     rufsau: Union[None, str]
     partner_id: Union[None, int]
 
 
-@dataclass
+@dataclass(frozen=True)
 class SoloRawConfig(NormalspielRawConfig):
+    __slots__ = ('spielart', 'farbe', 'tout')
+    _sequences = NormalspielRawConfig._sequences + ('farbe', 'tout')
     spielart: Union[None, str]
-    farbe: List[str]
-    tout: List[int]
+    farbe: Tuple[str, ...]
+    tout: Tuple[int, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class HochzeitRawConfig(RufspielHochzeitRawConfig):
+    __slots__ = ('partner_id',)
     partner_id: Union[None, int]
 
 
-@dataclass
+@dataclass(frozen=True)
 class RamschRawConfig(RawConfig):
-    jungfrau_ids: List[int]
+    __slots__ = ('jungfrau_ids', 'ausspieler_augen', 'mittelhand_augen', 'hinterhand_augen', 'geberhand_augen',
+                 'manuelle_verlierer_ids')
+    _sequences = RawConfig._sequences + ('jungfrau_ids', 'manuelle_verlierer_ids')
+    jungfrau_ids: Tuple[int, ...]
     ausspieler_augen: Union[None, int]
     mittelhand_augen: Union[None, int]
     hinterhand_augen: Union[None, int]
     geberhand_augen: Union[None, int]
-    manuelle_verlierer_ids: List[int]
+    manuelle_verlierer_ids: Tuple[int, ...]
+
+
+@dataclass
+class BatchConfig:
+    # Columnar representation of many games sharing one Punkteconfig. Every array has one entry per game,
+    # positions refer to the column in teilnehmer_ids (Ausspieler, Mittelhand, Hinterhand, Geberhand), -1 means none.
+    punkteconfig: Union[Punkteconfig, PunkteconfigRef]
+    teilnehmer_ids: np.ndarray
+    spielart: np.ndarray
+    spieler_augen: np.ndarray
+    laufende: np.ndarray
+    gelegt: np.ndarray
+    kontriert: np.ndarray
+    re: np.ndarray
+    tout_gespielt_gewonnen: np.ndarray
+    tout_gespielt_verloren: np.ndarray
+    schwarz: np.ndarray
+    jungfrauen: np.ndarray
+    durchmarsch: np.ndarray
+    ansager: np.ndarray
+    partner: np.ndarray
+    verlierer: np.ndarray
+    durchmarsch_spieler: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.spielart)
+
+    @staticmethod
+    def from_configs(configs: List[Config]) -> 'BatchConfig':
+        if len(configs) == 0:
+            raise ValueError('At least one config is required to build a BatchConfig.')
+        columns = {name: [] for name in ['teilnehmer_ids', 'spielart', 'spieler_augen', 'laufende', 'gelegt',
+                                         'kontriert', 're', 'tout_gespielt_gewonnen', 'tout_gespielt_verloren',
+                                         'schwarz', 'jungfrauen', 'durchmarsch', 'ansager', 'partner', 'verlierer',
+                                         'durchmarsch_spieler']}
+        for c in configs:
+            position = {t: i for i, t in enumerate(c.teilnehmer_ids)}
+            columns['teilnehmer_ids'].append(list(c.teilnehmer_ids))
+            columns['gelegt'].append(len(c.gelegt_ids))
+            if isinstance(c, RamschConfig):
+                columns['spielart'].append(Spielart.RAMSCH.value)
+                columns['spieler_augen'].append(0)
+                columns['laufende'].append(0)
+                columns['kontriert'].append(False)
+                columns['re'].append(False)
+                columns['tout_gespielt_gewonnen'].append(False)
+                columns['tout_gespielt_verloren'].append(False)
+                columns['schwarz'].append(False)
+                columns['jungfrauen'].append(len([j for j in c.jungfrau_ids if j is not None]))
+                columns['durchmarsch'].append(c.durchmarsch)
+                columns['ansager'].append(-1)
+                columns['partner'].append(-1)
+                columns['verlierer'].append(position.get(c.verlierer_id, -1))
+                columns['durchmarsch_spieler'].append(position.get(c.durchmarsch_id, -1))
+                continue
+            if isinstance(c, SoloConfig):
+                columns['spielart'].append(c.spielart.value)
+                columns['tout_gespielt_gewonnen'].append(c.tout_gespielt_gewonnen)
+                columns['tout_gespielt_verloren'].append(c.tout_gespielt_verloren)
+                columns['partner'].append(-1)
+            else:
+                spielart = Spielart.HOCHZEIT if isinstance(c, HochzeitConfig) else Spielart.RUFSPIEL
+                columns['spielart'].append(spielart.value)
+                columns['tout_gespielt_gewonnen'].append(False)
+                columns['tout_gespielt_verloren'].append(False)
+                columns['partner'].append(position.get(c.partner_id, -1))
+            columns['spieler_augen'].append(c.spieler_augen)
+            columns['laufende'].append(c.laufende)
+            columns['kontriert'].append(c.kontriert_id is not None)
+            columns['re'].append(c.re_id is not None)
+            columns['schwarz'].append(bool(c.schwarz))
+            columns['jungfrauen'].append(0)
+            columns['durchmarsch'].append(False)
+            columns['ansager'].append(position.get(c.ansager_id, -1))
+            columns['verlierer'].append(-1)
+            columns['durchmarsch_spieler'].append(-1)
+        booleans = ['kontriert', 're', 'tout_gespielt_gewonnen', 'tout_gespielt_verloren', 'schwarz', 'durchmarsch']
+        arrays = {name: np.asarray(values, dtype=bool if name in booleans else np.int64)
+                  for name, values in columns.items()}
+        return BatchConfig(punkteconfig=configs[0].punkteconfig, **arrays)
+
+
+@dataclass
+class BatchRawConfig:
+    # Columnar representation of many raw configs, e.g. of an import. Lists of ids keep their order and are padded
+    # with -1, -1 also means None for single values and 0 for Farbgebung values. spielart holds the Spielart of every
+    # game, 0 for a Solo without chosen Spielart.
+    spielart: np.ndarray
+    runde_id: np.ndarray
+    geber_id: np.ndarray
+    teilnehmer_ids: np.ndarray
+    gelegt_ids: np.ndarray
+    ansager_id: np.ndarray
+    partner_id: np.ndarray
+    rufsau: np.ndarray
+    kontriert_id: np.ndarray
+    re_id: np.ndarray
+    laufende: np.ndarray
+    spieler_nichtspieler_augen: np.ndarray
+    augen: np.ndarray
+    schwarz: np.ndarray
+    farbe: np.ndarray
+    tout_gewonnen: np.ndarray
+    tout_verloren: np.ndarray
+    jungfrau_ids: np.ndarray
+    ausspieler_augen: np.ndarray
+    mittelhand_augen: np.ndarray
+    hinterhand_augen: np.ndarray
+    geberhand_augen: np.ndarray
+    manuelle_verlierer_ids: np.ndarray
+
+    _values = ('runde_id', 'geber_id', 'ansager_id', 'partner_id', 'laufende', 'spieler_nichtspieler_augen', 'augen',
+               'schwarz', 'ausspieler_augen', 'mittelhand_augen', 'hinterhand_augen', 'geberhand_augen')
+    _lists = ('teilnehmer_ids', 'gelegt_ids', 'kontriert_id', 're_id', 'jungfrau_ids', 'manuelle_verlierer_ids')
+
+    def __len__(self) -> int:
+        return len(self.spielart)
+
+    @staticmethod
+    def from_raw_configs(raw_configs: List[RawConfig]) -> 'BatchRawConfig':
+        if len(raw_configs) == 0:
+            raise ValueError('At least one raw config is required to build a BatchRawConfig.')
+        columns = {f.name: [] for f in fields(BatchRawConfig)}
+        for c in raw_configs:
+            if isinstance(c, RufspielRawConfig):
+                columns['spielart'].append(Spielart.RUFSPIEL.value)
+            elif isinstance(c, HochzeitRawConfig):
+                columns['spielart'].append(Spielart.HOCHZEIT.value)
+            elif isinstance(c, SoloRawConfig):
+                columns['spielart'].append(0 if c.spielart is None else Spielart[c.spielart].value)
+            elif isinstance(c, RamschRawConfig):
+                columns['spielart'].append(Spielart.RAMSCH.value)
+            else:
+                raise ValueError(f'No BatchRawConfig for {type(c).__name__}.')
+            for name in BatchRawConfig._values:
+                value = getattr(c, name, None)
+                columns[name].append(-1 if value is None else value)
+            for name in BatchRawConfig._lists:
+                columns[name].append(getattr(c, name, None) or ())
+            rufsau = getattr(c, 'rufsau', None)
+            columns['rufsau'].append(0 if rufsau is None else Farbgebung[rufsau].value)
+            columns['farbe'].append([Farbgebung[f].value for f in getattr(c, 'farbe', ())])
+            tout = getattr(c, 'tout', ())
+            columns['tout_gewonnen'].append(0 in tout)
+            columns['tout_verloren'].append(1 in tout)
+        arrays = {name: np.asarray(columns[name], dtype=np.int64) for name in ('spielart', 'rufsau') +
+                  BatchRawConfig._values}
+        arrays.update({name: _pad(columns[name], -1, 4 if name == 'teilnehmer_ids' else 1)
+                       for name in BatchRawConfig._lists})
+        arrays['farbe'] = _pad(columns['farbe'], 0, 1)
+        arrays['tout_gewonnen'] = np.asarray(columns['tout_gewonnen'], dtype=bool)
+        arrays['tout_verloren'] = np.asarray(columns['tout_verloren'], dtype=bool)
+        return BatchRawConfig(**arrays)
+
+    def take(self, indices: Union[List[int], np.ndarray]) -> 'BatchRawConfig':
+        return BatchRawConfig(**{f.name: getattr(self, f.name)[indices] for f in fields(self)})
+
+    def to_batch_config(self, punkteconfig: Union[Punkteconfig, PunkteconfigRef]) -> BatchConfig:
+        # Only for games without errors in the BatchValidator, builds what the validators put into the validated configs
+        teilnehmer_ids = self.teilnehmer_ids[:, :4]
+        ramsch = self.spielart == Spielart.RAMSCH.value
+        solo = ~np.isin(self.spielart, [Spielart.RUFSPIEL.value, Spielart.HOCHZEIT.value, Spielart.RAMSCH.value])
+        augen = np.stack([self.ausspieler_augen, self.mittelhand_augen, self.hinterhand_augen, self.geberhand_augen],
+                         axis=1)
+        mit_max_augen = augen == augen.max(axis=1)[:, None]
+        durchmarsch = ramsch & (augen.max(axis=1) >= 91)
+        verlierer = np.where(mit_max_augen.sum(axis=1) == 1, np.argmax(mit_max_augen, axis=1),
+                             get_positionen(teilnehmer_ids, self.manuelle_verlierer_ids[:, 0]))
+        return BatchConfig(punkteconfig=punkteconfig,
+                           teilnehmer_ids=teilnehmer_ids,
+                           spielart=self.spielart,
+                           spieler_augen=np.where(ramsch, 0, np.where(self.spieler_nichtspieler_augen == 1, self.augen,
+                                                                      120 - self.augen)),
+                           laufende=np.where(ramsch | (self.laufende == -1), 0, self.laufende),
+                           gelegt=(self.gelegt_ids != -1).sum(axis=1),
+                           kontriert=self.kontriert_id[:, 0] != -1,
+                           re=self.re_id[:, 0] != -1,
+                           tout_gespielt_gewonnen=solo & self.tout_gewonnen,
+                           tout_gespielt_verloren=solo & self.tout_verloren,
+                           schwarz=~ramsch & (self.schwarz == 1),
+                           jungfrauen=np.where(ramsch, (self.jungfrau_ids != -1).sum(axis=1), 0),
+                           durchmarsch=durchmarsch,
+                           ansager=np.where(ramsch, -1, get_positionen(teilnehmer_ids, self.ansager_id)),
+                           partner=np.where(ramsch | solo, -1, get_positionen(teilnehmer_ids, self.partner_id)),
+                           verlierer=np.where(ramsch & ~durchmarsch, verlierer, -1),
+                           durchmarsch_spieler=np.where(durchmarsch, np.argmax(mit_max_augen, axis=1), -1))
+
+    def get_raw_config(self, i: int) -> RawConfig:
+        return self.get_raw_configs([i])[0]
+
+    def get_raw_configs(self, indices: Union[List[int], np.ndarray]) -> List[RawConfig]:
+        # Inverse of from_raw_configs for the given games, lists come back as tuples
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {f.name: getattr(self, f.name)[indices].tolist() for f in fields(self)}
+        for name in self._values:
+            columns[name] = [None if v == -1 else v for v in columns[name]]
+        for name in self._lists + ('farbe',):
+            # Padding is always at the end of a row
+            lengths = (getattr(self, name)[indices] != (0 if name == 'farbe' else -1)).sum(axis=1).tolist()
+            columns[name] = [tuple(v[:k]) for v, k in zip(columns[name], lengths)]
+        raw_configs = []
+        for row in range(len(indices)):
+            values = {name: columns[name][row] for name in self._values}
+            lists = {name: columns[name][row] for name in self._lists}
+            common = dict(runde_id=values['runde_id'], geber_id=values['geber_id'],
+                          teilnehmer_ids=lists['teilnehmer_ids'], gelegt_ids=lists['gelegt_ids'])
+            spielart = columns['spielart'][row]
+            if spielart == Spielart.RAMSCH.value:
+                raw_configs.append(RamschRawConfig(jungfrau_ids=lists['jungfrau_ids'],
+                                                   ausspieler_augen=values['ausspieler_augen'],
+                                                   mittelhand_augen=values['mittelhand_augen'],
+                                                   hinterhand_augen=values['hinterhand_augen'],
+                                                   geberhand_augen=values['geberhand_augen'],
+                                                   manuelle_verlierer_ids=lists['manuelle_verlierer_ids'],
+                                                   **common))
+                continue
+            common.update(ansager_id=values['ansager_id'], kontriert_id=lists['kontriert_id'], re_id=lists['re_id'],
+                          laufende=values['laufende'], spieler_nichtspieler_augen=values['spieler_nichtspieler_augen'],
+                          augen=values['augen'], schwarz=values['schwarz'])
+            if spielart == Spielart.RUFSPIEL.value:
+                rufsau = columns['rufsau'][row]
+                raw_configs.append(RufspielRawConfig(rufsau=None if rufsau == 0 else Farbgebung(rufsau).name,
+                                                     partner_id=values['partner_id'], **common))
+            elif spielart == Spielart.HOCHZEIT.value:
+                raw_configs.append(HochzeitRawConfig(partner_id=values['partner_id'], **common))
+            else:
+                tout = (0,) * columns['tout_gewonnen'][row] + (1,) * columns['tout_verloren'][row]
+                raw_configs.append(SoloRawConfig(spielart=None if spielart == 0 else Spielart(spielart).name,
+                                                 farbe=tuple(Farbgebung(f).name for f in columns['farbe'][row]),
+                                                 tout=tout, **common))
+        return raw_configs
+
+
+def _pad(rows: List[Tuple[int, ...]], fill: int, width: int) -> np.ndarray:
+    array = np.full((len(rows), max([width] + [len(r) for r in rows])), fill, dtype=np.int64)
+    for i, r in enumerate(rows):
+        array[i, :len(r)] = r
+    return array
+
+
+def get_positionen(teilnehmer_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    # Column of every id in teilnehmer_ids, -1 if it is not among them
+    seats = teilnehmer_ids == ids[:, None]
+    return np.where(seats.any(axis=1), np.argmax(seats, axis=1), -1)
@@ -2,7 +2,7 @@ import enum
 from datetime import datetime
 
 from sqlalchemy import Integer, String, \
-    Column, DateTime, ForeignKey, Float, Boolean, UniqueConstraint, PrimaryKeyConstraint
+    Column, DateTime, ForeignKey, Float, Boolean, UniqueConstraint, PrimaryKeyConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -32,6 +32,20 @@ class Spielart(enum.Enum):
     HOCHZEIT = 6
 
 
+class Sitz(enum.Enum):
+    AUSSPIELER = 1
+    MITTELHAND = 2
+    HINTERHAND = 3
+    GEBERHAND = 4
+
+
+class Rolle(enum.Enum):
+    ANSAGER = 1
+    PARTNER = 2
+    GEGENSPIELER = 3
+    RAMSCHSPIELER = 4
+
+
 class User(Base):
     __tablename__ = 'user'
     id = Column(Integer)
@@ -66,6 +80,8 @@ class Runde(Base):
     punkteconfig = relationship('Punkteconfig', backref='runde')
     created_on = Column(DateTime(), default=datetime.now)
     updated_on = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+    __table_args__ = (Index('runde_aktiv_datum_idx', 'datum', sqlite_where=is_active == True,
+                            postgresql_where=is_active == True),)
 
 
 class Punkteconfig(Base):
@@ -113,8 +129,18 @@ class Einzelspiel(Base):
     durchmarsch = Column(Boolean, nullable=False, default=False)
     tout = Column(Boolean, nullable=False, default=False)
     spielpunkte = Column(Float, nullable=False)
+    submission_token = Column(String(36), nullable=True)
     created_on = Column(DateTime(), default=datetime.now)
     updated_on = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+    # Partial indexes over the active Einzelspiele for the Einzelspiele of Runden, the latest Einzelspiel and the
+    # Spielverlauf
+    __table_args__ = (Index('einzelspiel_submission_token_idx', 'submission_token', unique=True),
+                      Index('einzelspiel_aktiv_runde_idx', 'runde_id', 'id', sqlite_where=is_active == True,
+                            postgresql_where=is_active == True),
+                      Index('einzelspiel_aktiv_idx', 'id', sqlite_where=is_active == True,
+                            postgresql_where=is_active == True),
+                      Index('einzelspiel_aktiv_created_on_idx', 'created_on', 'id', sqlite_where=is_active == True,
+                            postgresql_where=is_active == True))
 
 
 class Resultat(Base):
@@ -130,7 +156,8 @@ class Resultat(Base):
     created_on = Column(DateTime(), default=datetime.now)
     updated_on = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
     __table_args__ = (PrimaryKeyConstraint('id', name='resultat_pk'),
-                      UniqueConstraint('teilnehmer_id', 'einzelspiel_id'))
+                      UniqueConstraint('teilnehmer_id', 'einzelspiel_id'),
+                      Index('resultat_einzelspiel_idx', 'einzelspiel_id'))
 
 
 class Verdopplung(Base):
@@ -144,4 +171,34 @@ class Verdopplung(Base):
     created_on = Column(DateTime(), default=datetime.now)
     updated_on = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
     __table_args__ = (PrimaryKeyConstraint('id', name='verdopplung_pk'),
-                      UniqueConstraint('teilnehmer_id', 'einzelspiel_id', 'doppler'))
+                      UniqueConstraint('teilnehmer_id', 'einzelspiel_id', 'doppler'),
+                      Index('verdopplung_einzelspiel_idx', 'einzelspiel_id'))
+
+
+class Teilnahme(Base):
+    # One row per seat of an Einzelspiel, such that the Einzelspiele of Teilnehmer are found via an index
+    __tablename__ = 'teilnahme'
+    einzelspiel_id = Column(Integer, ForeignKey('einzelspiel.id'), nullable=False)
+    einzelspiel = relationship('Einzelspiel', backref='teilnahmen')
+    teilnehmer_id = Column(Integer, ForeignKey('teilnehmer.id'), nullable=False)
+    teilnehmer = relationship('Teilnehmer', backref='teilnahmen')
+    sitz = Column(String(20), nullable=False)
+    rolle = Column(String(20), nullable=False)
+    __table_args__ = (PrimaryKeyConstraint('einzelspiel_id', 'teilnehmer_id', name='teilnahme_pk'),
+                      Index('teilnahme_teilnehmer_idx', 'teilnehmer_id', 'einzelspiel_id'))
+
+
+class WriteBehindStand(Base):
+    __tablename__ = 'write_behind_stand'
+    journal = Column(String(36), primary_key=True)
+    eintrag_id = Column(Integer, nullable=False, default=0)
+    created_on = Column(DateTime(), default=datetime.now)
+    updated_on = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+
+
+class SchemaVersion(Base):
+    # The applied migrations, see schafkopf.database.migrations
+    __tablename__ = 'schema_version'
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
+    applied_on = Column(DateTime(), default=datetime.now)
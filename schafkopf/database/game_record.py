@@ -0,0 +1,283 @@
+import struct
+from dataclasses import dataclass
+from typing import Tuple, List, Iterable, Iterator, Union
+
+import numpy as np
+
+from schafkopf.backend.calculator import Abrechnung
+from schafkopf.database.configs import Config, RamschConfig, SoloConfig, RufspielConfig, HochzeitConfig, \
+    NormalspielConfig, PunkteconfigRef, BatchConfig, Frozen
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung, Spielart, Farbgebung, Doppler, \
+    Punkteconfig
+
+# File layout: header (magic, version, record size) followed by fixed-width little-endian records
+MAGIC = b'SKGR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<II4IIBB4BBbbHHd4d')
+RECORD_DTYPE = np.dtype([('einzelspiel_id', '<u4'), ('runde_id', '<u4'), ('teilnehmer_ids', '<u4', (4,)),
+                         ('geber_id', '<u4'), ('spielart', 'u1'), ('farbe', 'u1'), ('augen', 'u1', (4,)),
+                         ('laufende', 'u1'), ('ansager', 'i1'), ('partner', 'i1'), ('verdopplungen', '<u2'),
+                         ('flags', '<u2'), ('spielpunkte', '<f8'), ('punkte', '<f8', (4,))])
+
+# Verdopplungen bitmask, one bit per seat (Ausspieler, Mittelhand, Hinterhand, Geberhand) and Doppler
+DOPPLER_SHIFT = {Doppler.GELEGT: 0, Doppler.KONTRIERT: 4, Doppler.RE: 8, Doppler.JUNGFRAU: 12}
+
+# Flags bitmask, the bits 8 - 11 hold the gewonnen flag of every seat
+SCHNEIDER = 1
+SCHWARZ = 2
+DURCHMARSCH = 4
+TOUT = 8
+ACTIVE = 16
+GEWONNEN_SHIFT = 8
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(16)], dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class GameRecord(Frozen):
+    __slots__ = ('einzelspiel_id', 'runde_id', 'teilnehmer_ids', 'geber_id', 'spielart', 'farbe', 'augen', 'laufende',
+                 'ansager', 'partner', 'verdopplungen', 'flags', 'spielpunkte', 'punkte')
+    _sequences = ('teilnehmer_ids', 'augen', 'punkte')
+    einzelspiel_id: int
+    runde_id: int
+    teilnehmer_ids: Tuple[int, int, int, int]
+    geber_id: int
+    spielart: Spielart
+    farbe: Union[None, Farbgebung]
+    augen: Tuple[int, int, int, int]
+    laufende: int
+    ansager: int
+    partner: int
+    verdopplungen: int
+    flags: int
+    spielpunkte: float
+    punkte: Tuple[float, float, float, float]
+
+    def pack(self) -> bytes:
+        return RECORD.pack(self.einzelspiel_id, self.runde_id, *self.teilnehmer_ids, self.geber_id,
+                           self.spielart.value, 0 if self.farbe is None else self.farbe.value, *self.augen,
+                           self.laufende, self.ansager, self.partner, self.verdopplungen, self.flags,
+                           self.spielpunkte, *self.punkte)
+
+    @staticmethod
+    def unpack(buffer: bytes, offset: int = 0) -> 'GameRecord':
+        return GameRecord._from_values(RECORD.unpack_from(buffer, offset))
+
+    @staticmethod
+    def _from_values(v: Tuple) -> 'GameRecord':
+        return GameRecord(einzelspiel_id=v[0], runde_id=v[1], teilnehmer_ids=v[2:6], geber_id=v[6],
+                          spielart=Spielart(v[7]), farbe=None if v[8] == 0 else Farbgebung(v[8]), augen=v[9:13],
+                          laufende=v[13], ansager=v[14], partner=v[15], verdopplungen=v[16], flags=v[17],
+                          spielpunkte=v[18], punkte=v[19:23])
+
+    def get_seats(self, doppler: Doppler) -> List[int]:
+        bits = self.verdopplungen >> DOPPLER_SHIFT[doppler]
+        return [seat for seat in range(4) if bits & (1 << seat)]
+
+    def get_gewonnen(self) -> List[bool]:
+        return [bool(self.flags & (1 << (GEWONNEN_SHIFT + seat))) for seat in range(4)]
+
+    @staticmethod
+    def from_config(config: Config, abrechnung: Abrechnung, einzelspiel_id: int = 0,
+                    is_active: bool = True) -> 'GameRecord':
+        teilnehmer_ids = tuple(config.teilnehmer_ids)
+        seat = {t: i for i, t in enumerate(teilnehmer_ids)}
+        verdopplungen = _bits(DOPPLER_SHIFT[Doppler.GELEGT], [seat[t] for t in config.gelegt_ids])
+        flags = (ACTIVE if is_active else 0) | \
+                _bits(GEWONNEN_SHIFT, [seat[t] for t in abrechnung.gewinner_ids]) | \
+                (SCHNEIDER if abrechnung.schneider else 0) | (SCHWARZ if abrechnung.schwarz else 0)
+        if isinstance(config, RamschConfig):
+            return GameRecord(einzelspiel_id=einzelspiel_id, runde_id=config.runde_id, teilnehmer_ids=teilnehmer_ids,
+                              geber_id=config.geber_id, spielart=Spielart.RAMSCH, farbe=None,
+                              augen=(config.ausspieler_augen, config.mittelhand_augen, config.hinterhand_augen,
+                                     config.geberhand_augen),
+                              laufende=0, ansager=-1, partner=-1,
+                              verdopplungen=verdopplungen | _bits(DOPPLER_SHIFT[Doppler.JUNGFRAU],
+                                                                  [seat[t] for t in config.jungfrau_ids]),
+                              flags=flags | (DURCHMARSCH if config.durchmarsch else 0),
+                              spielpunkte=abrechnung.spielpunkte,
+                              punkte=tuple(abrechnung.teilnehmer_id_to_punkte[t] for t in teilnehmer_ids))
+        if not isinstance(config, NormalspielConfig):
+            raise ValueError(f'No game record for {type(config).__name__}.')
+        spieler_ids = config.get_spieler_ids()
+        if config.kontriert_id is not None:
+            verdopplungen |= _bits(DOPPLER_SHIFT[Doppler.KONTRIERT], [seat[config.kontriert_id]])
+        if config.re_id is not None:
+            verdopplungen |= _bits(DOPPLER_SHIFT[Doppler.RE], [seat[config.re_id]])
+        if isinstance(config, SoloConfig):
+            spielart, farbe, partner = config.spielart, config.farbe, -1
+            if config.tout_gespielt_gewonnen or config.tout_gespielt_verloren:
+                flags |= TOUT
+        else:
+            spielart = Spielart.RUFSPIEL if isinstance(config, RufspielConfig) else Spielart.HOCHZEIT
+            farbe = config.rufsau if isinstance(config, RufspielConfig) else None
+            partner = seat[config.partner_id]
+        return GameRecord(einzelspiel_id=einzelspiel_id, runde_id=config.runde_id, teilnehmer_ids=teilnehmer_ids,
+                          geber_id=config.geber_id, spielart=spielart, farbe=farbe,
+                          augen=tuple(config.spieler_augen if t in spieler_ids else config.nicht_spieler_augen
+                                      for t in teilnehmer_ids),
+                          laufende=config.laufende, ansager=seat[config.ansager_id], partner=partner,
+                          verdopplungen=verdopplungen, flags=flags, spielpunkte=abrechnung.spielpunkte,
+                          punkte=tuple(abrechnung.teilnehmer_id_to_punkte[t] for t in teilnehmer_ids))
+
+    def to_config(self, punkteconfig: Union[Punkteconfig, PunkteconfigRef]) -> Config:
+        t = self.teilnehmer_ids
+        common = dict(runde_id=self.runde_id, punkteconfig=punkteconfig, geber_id=self.geber_id, teilnehmer_ids=t,
+                      gelegt_ids=[t[s] for s in self.get_seats(Doppler.GELEGT)])
+        gewonnen = self.get_gewonnen()
+        if self.spielart == Spielart.RAMSCH:
+            durchmarsch = bool(self.flags & DURCHMARSCH)
+            return RamschConfig(jungfrau_ids=[t[s] for s in self.get_seats(Doppler.JUNGFRAU)],
+                                ausspieler_augen=self.augen[0], mittelhand_augen=self.augen[1],
+                                hinterhand_augen=self.augen[2], geberhand_augen=self.augen[3],
+                                verlierer_id=None if durchmarsch else t[gewonnen.index(False)],
+                                durchmarsch_id=t[gewonnen.index(True)] if durchmarsch else None,
+                                durchmarsch=durchmarsch, **common)
+        kontriert = self.get_seats(Doppler.KONTRIERT)
+        re = self.get_seats(Doppler.RE)
+        spieler_augen = self.augen[self.ansager]
+        common.update(ansager_id=t[self.ansager], kontriert_id=t[kontriert[0]] if kontriert else None,
+                      re_id=t[re[0]] if re else None, laufende=self.laufende, spieler_augen=spieler_augen,
+                      nicht_spieler_augen=120 - spieler_augen, schwarz=bool(self.flags & SCHWARZ))
+        if self.spielart == Spielart.RUFSPIEL:
+            return RufspielConfig(partner_id=t[self.partner], rufsau=self.farbe, **common)
+        if self.spielart == Spielart.HOCHZEIT:
+            return HochzeitConfig(partner_id=t[self.partner], **common)
+        tout = bool(self.flags & TOUT)
+        return SoloConfig(spielart=self.spielart, farbe=self.farbe,
+                          tout_gespielt_gewonnen=tout and gewonnen[self.ansager],
+                          tout_gespielt_verloren=tout and not gewonnen[self.ansager], **common)
+
+    @staticmethod
+    def from_rows(einzelspiel: Einzelspiel, resultate: List[Resultat],
+                  verdopplungen: List[Verdopplung]) -> 'GameRecord':
+        e = einzelspiel
+        teilnehmer_ids = (e.ausspieler_id, e.mittelhand_id, e.hinterhand_id, e.geberhand_id)
+        seat = {t: i for i, t in enumerate(teilnehmer_ids)}
+        teilnehmer_id_to_resultat = {r.teilnehmer_id: r for r in resultate}
+        bits = 0
+        for v in verdopplungen:
+            bits |= 1 << (DOPPLER_SHIFT[Doppler[v.doppler]] + seat[v.teilnehmer_id])
+        flags = (SCHNEIDER if e.schneider else 0) | (SCHWARZ if e.schwarz else 0) | \
+                (DURCHMARSCH if e.durchmarsch else 0) | (TOUT if e.tout else 0) | (ACTIVE if e.is_active else 0) | \
+                _bits(GEWONNEN_SHIFT, [seat[r.teilnehmer_id] for r in resultate if r.gewonnen])
+        return GameRecord(einzelspiel_id=e.id, runde_id=e.runde_id, teilnehmer_ids=teilnehmer_ids,
+                          geber_id=e.geber_id, spielart=Spielart[e.spielart],
+                          farbe=None if e.farbe is None else Farbgebung[e.farbe],
+                          augen=tuple(int(teilnehmer_id_to_resultat[t].augen) for t in teilnehmer_ids),
+                          laufende=e.laufende, ansager=seat.get(e.ansager_id, -1),
+                          partner=seat.get(e.partner_id, -1), verdopplungen=bits, flags=flags,
+                          spielpunkte=e.spielpunkte,
+                          punkte=tuple(teilnehmer_id_to_resultat[t].punkte for t in teilnehmer_ids))
+
+    def to_rows(self) -> Tuple[Einzelspiel, List[Resultat], List[Verdopplung]]:
+        t = self.teilnehmer_ids
+        einzelspiel_id = None if self.einzelspiel_id == 0 else self.einzelspiel_id
+        einzelspiel = Einzelspiel(id=einzelspiel_id, runde_id=self.runde_id, is_active=bool(self.flags & ACTIVE),
+                                  ansager_id=None if self.ansager < 0 else t[self.ansager],
+                                  partner_id=None if self.partner < 0 else t[self.partner], geber_id=self.geber_id,
+                                  ausspieler_id=t[0], mittelhand_id=t[1], hinterhand_id=t[2], geberhand_id=t[3],
+                                  farbe=None if self.farbe is None else self.farbe.name, laufende=self.laufende,
+                                  spielart=self.spielart.name, schneider=bool(self.flags & SCHNEIDER),
+                                  schwarz=bool(self.flags & SCHWARZ), durchmarsch=bool(self.flags & DURCHMARSCH),
+                                  tout=bool(self.flags & TOUT), spielpunkte=self.spielpunkte)
+        resultate = [Resultat(teilnehmer_id=t[s], einzelspiel_id=einzelspiel_id, augen=self.augen[s],
+                              punkte=self.punkte[s], gewonnen=g) for s, g in enumerate(self.get_gewonnen())]
+        verdopplungen = [Verdopplung(teilnehmer_id=t[s], einzelspiel_id=einzelspiel_id, doppler=d.name)
+                         for d in DOPPLER_SHIFT for s in self.get_seats(d)]
+        return einzelspiel, resultate, verdopplungen
+
+
+class GameRecordWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def __enter__(self) -> 'GameRecordWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, record: GameRecord):
+        self._file.write(record.pack())
+
+    def write_many(self, records: Iterable[GameRecord]):
+        self._file.write(b''.join(r.pack() for r in records))
+
+    def write_array(self, records: np.ndarray):
+        self._file.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+def read_records(path: str, chunk_records: int = 65536) -> Iterator[GameRecord]:
+    # Streams the records of a file without loading it completely
+    with open(path, 'rb') as f:
+        _read_header(f.read(HEADER.size))
+        while True:
+            chunk = f.read(chunk_records * RECORD.size)
+            if len(chunk) == 0:
+                break
+            if len(chunk) % RECORD.size != 0:
+                raise ValueError(f'Truncated game record file {path}.')
+            for values in RECORD.iter_unpack(chunk):
+                yield GameRecord._from_values(values)
+
+
+def map_records(path: str) -> np.ndarray:
+    # Memory-maps all records of a file as a read-only structured array with RECORD_DTYPE
+    with open(path, 'rb') as f:
+        _read_header(f.read(HEADER.size))
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size)
+
+
+def to_batch_config(records: np.ndarray, punkteconfig: Union[Punkteconfig, PunkteconfigRef]) -> BatchConfig:
+    # Builds the input of the BatchCalculator directly from a structured array of records, e.g. from map_records
+    if len(records) == 0:
+        raise ValueError('At least one record is required to build a BatchConfig.')
+    flags = records['flags'].astype(np.int64)
+    bits = records['verdopplungen'].astype(np.int64)
+    gewonnen = ((flags[:, None] >> (GEWONNEN_SHIFT + np.arange(4))) & 1) == 1
+    ansager = records['ansager'].astype(np.int64)
+    spieler = np.maximum(ansager, 0)[:, None]
+    ansager_gewonnen = np.take_along_axis(gewonnen, spieler, axis=1)[:, 0]
+    tout = (flags & TOUT) != 0
+    durchmarsch = (flags & DURCHMARSCH) != 0
+    ramsch = records['spielart'] == Spielart.RAMSCH.value
+    return BatchConfig(punkteconfig=punkteconfig,
+                       teilnehmer_ids=records['teilnehmer_ids'].astype(np.int64),
+                       spielart=records['spielart'].astype(np.int64),
+                       spieler_augen=np.where(ansager >= 0,
+                                              np.take_along_axis(records['augen'], spieler, axis=1)[:, 0], 0)
+                       .astype(np.int64),
+                       laufende=records['laufende'].astype(np.int64),
+                       gelegt=_POPCOUNT[(bits >> DOPPLER_SHIFT[Doppler.GELEGT]) & 15],
+                       kontriert=((bits >> DOPPLER_SHIFT[Doppler.KONTRIERT]) & 15) != 0,
+                       re=((bits >> DOPPLER_SHIFT[Doppler.RE]) & 15) != 0,
+                       tout_gespielt_gewonnen=tout & ansager_gewonnen,
+                       tout_gespielt_verloren=tout & ~ansager_gewonnen,
+                       schwarz=(flags & SCHWARZ) != 0,
+                       jungfrauen=_POPCOUNT[(bits >> DOPPLER_SHIFT[Doppler.JUNGFRAU]) & 15],
+                       durchmarsch=durchmarsch,
+                       ansager=ansager,
+                       partner=records['partner'].astype(np.int64),
+                       verlierer=np.where(ramsch & ~durchmarsch, np.argmin(gewonnen, axis=1), -1),
+                       durchmarsch_spieler=np.where(durchmarsch, np.argmax(gewonnen, axis=1), -1))
+
+
+def _read_header(buffer: bytes):
+    if len(buffer) != HEADER.size:
+        raise ValueError('Not a game record file.')
+    magic, version, size = HEADER.unpack(buffer)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError(f'Unsupported game record file (magic {magic}, version {version}, record size {size}).')
+
+
+def _bits(shift: int, seats: Iterable[int]) -> int:
+    bits = 0
+    for seat in seats:
+        bits |= 1 << (shift + seat)
+    return bits
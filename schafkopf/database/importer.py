@@ -0,0 +1,361 @@
+import csv
+import datetime
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple, Union, Any
+
+import numpy as np
+from sqlalchemy import select, func, text
+from sqlalchemy.orm import sessionmaker
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.configs import BatchRawConfig, RawConfig, RufspielRawConfig, HochzeitRawConfig, \
+    SoloRawConfig, RamschRawConfig, PunkteconfigRef
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung, Teilnehmer, Runde, Spielart, \
+    Farbgebung, Doppler, Teilnahme
+from schafkopf.database.queries import build_session, close_session, get_default_punkteconfig, \
+    invalidate_reference_cache, get_teilnahmen
+from schafkopf.database.snapshot import get_snapshot, invalidate_snapshot
+from schafkopf.frontend.validator import BatchValidator
+
+logging.getLogger().setLevel(logging.INFO)
+
+# Columns of an import file with one game per line, as CSV with header or as JSON Lines. Teilnehmer are given by name
+# as 'Nachname, Vorname', several Teilnehmer as list in JSON or separated by ';' in CSV. Empty columns are allowed.
+# For Hochzeit the ansager is the Hochzeitsannehmer and the partner the Hochzeitsanbieter. augen are the Augen of the
+# Spieler, tout is 'gewonnen' or 'verloren'. Runden are identified by runde, datum (YYYY-MM-DD) and ort.
+SPALTEN = ['runde', 'datum', 'ort', 'spielart', 'geber', 'ausspieler', 'mittelhand', 'hinterhand', 'geberhand',
+           'gelegt', 'ansager', 'partner', 'rufsau', 'farbe', 'kontra', 're', 'laufende', 'augen', 'schwarz', 'tout',
+           'ausspieler_augen', 'mittelhand_augen', 'hinterhand_augen', 'geberhand_augen', 'jungfrauen', 'verlierer']
+SITZE = ['ausspieler', 'mittelhand', 'hinterhand', 'geberhand']
+SPIELART_NAMES = {s.value: s.name for s in Spielart}
+FARBGEBUNG_NAMES = {f.value: f.name for f in Farbgebung}
+
+
+@dataclass
+class ImportReport:
+    spiele: int = 0
+    importiert: int = 0
+    abgelehnt: int = 0
+    neue_teilnehmer: int = 0
+    neue_runden: int = 0
+    sekunden: float = 0.0
+    checkpoint: int = 0
+
+    def get_spiele_pro_sekunde(self) -> float:
+        return self.spiele / self.sekunden if self.sekunden > 0 else 0.0
+
+
+def read_spiele(path: str) -> Iterator[Dict[str, Any]]:
+    # Streams the games of a CSV or JSON Lines file, the format is chosen by the file extension
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip() != '':
+                    yield json.loads(line)
+
+
+def import_spiele(path: str,
+                  chunk_size: int = 5000,
+                  checkpoint_path: Union[None, str] = None,
+                  resume: bool = False,
+                  session: sessionmaker() = None) -> ImportReport:
+    # Imports the games of path in chunks of chunk_size games: Teilnehmer and Runden are created in bulk, the games
+    # are validated with the BatchValidator, scored with the BatchCalculator and inserted with one executemany per
+    # table and chunk. After every committed chunk the number of processed games is written to checkpoint_path, with
+    # resume=True an interrupted import continues after it. Meant for an otherwise idle database, the Einzelspiel ids
+    # of a chunk are assigned after the current maximum.
+    checkpoint_path = f'{path}.checkpoint' if checkpoint_path is None else checkpoint_path
+    start = _read_checkpoint(checkpoint_path) if resume else 0
+    actual_session = build_session(session)
+    report = ImportReport(checkpoint=start)
+    teilnehmer = {}
+    runden = {}
+    begin = time.perf_counter()
+    spiele = enumerate(read_spiele(path), start=1)
+    for _ in islice(spiele, start):
+        pass
+    while True:
+        chunk = list(islice(spiele, chunk_size))
+        if len(chunk) == 0:
+            break
+        _import_chunk(actual_session, chunk, teilnehmer, runden, report)
+        report.spiele += len(chunk)
+        report.checkpoint = chunk[-1][0]
+        report.sekunden = time.perf_counter() - begin
+        _write_checkpoint(checkpoint_path, report.checkpoint)
+        logging.info(f'{report.checkpoint} Spiele verarbeitet, {report.importiert} importiert, '
+                     f'{report.abgelehnt} abgelehnt, {report.get_spiele_pro_sekunde():.0f} Spiele/s')
+    report.sekunden = time.perf_counter() - begin
+    close_session(actual_session, session)
+    return report
+
+
+def _import_chunk(session: sessionmaker(), chunk: List[Tuple[int, Dict[str, Any]]], teilnehmer: Dict[str, int],
+                  runden: Dict[Tuple[str, datetime.datetime, str], int], report: ImportReport):
+    spiele = []
+    for nummer, zeile in chunk:
+        spiel, m = _parse(zeile)
+        if len(m) > 0:
+            _reject(report, nummer, m)
+        else:
+            spiele.append((nummer, spiel))
+    if len(spiele) == 0:
+        return
+    namen = {n for _, spiel in spiele for n in _get_namen(spiel)}
+    report.neue_teilnehmer += _resolve_teilnehmer(session, namen, teilnehmer)
+    report.neue_runden += _resolve_runden(session, {spiel['runde'] for _, spiel in spiele}, runden)
+    session.commit()
+    invalidate_snapshot()
+    invalidate_reference_cache()
+    snapshot = get_snapshot(teilnehmer_ids=set(teilnehmer.values()), runde_ids=set(runden.values()))
+
+    raw_config = BatchRawConfig.from_raw_configs([_to_raw_config(spiel, teilnehmer, runden) for _, spiel in spiele])
+    validator = BatchValidator(raw_config, snapshot)
+    for i, m in validator.get_validation_messages().items():
+        _reject(report, spiele[i][0], m)
+    gueltig = np.flatnonzero(~validator.get_error_mask())
+    if len(gueltig) == 0:
+        return
+
+    raw_config = raw_config.take(gueltig)
+    next_id = session.execute(select([func.max(Einzelspiel.__table__.c.id)])).scalar()
+    einzelspiel_ids = (0 if next_id is None else next_id) + 1 + np.arange(len(gueltig))
+    punkteconfigs = [snapshot.get_punkteconfig(r) for r in raw_config.runde_id.tolist()]
+    einzelspiele, resultate = [], []
+    for punkteconfig in set(punkteconfigs):
+        auswahl = np.array([p == punkteconfig for p in punkteconfigs])
+        e, r = _get_rows(raw_config.take(auswahl), einzelspiel_ids[auswahl], punkteconfig)
+        einzelspiele += e
+        resultate += r
+    session.execute(Einzelspiel.__table__.insert(), einzelspiele)
+    session.execute(Resultat.__table__.insert(), resultate)
+    session.execute(Teilnahme.__table__.insert(), [t for e in einzelspiele for t in get_teilnahmen(e)])
+    verdopplungen = _get_verdopplungen(raw_config, einzelspiel_ids)
+    if len(verdopplungen) > 0:
+        session.execute(Verdopplung.__table__.insert(), verdopplungen)
+    if session.get_bind().dialect.name == 'postgresql':
+        # The ids were assigned here, the sequence has to follow
+        session.execute(text("SELECT setval(pg_get_serial_sequence('einzelspiel', 'id'), "
+                             "(SELECT MAX(id) FROM einzelspiel))"))
+    session.commit()
+    report.importiert += len(gueltig)
+
+
+def _get_rows(raw_config: BatchRawConfig, einzelspiel_ids: np.ndarray,
+              punkteconfig: PunkteconfigRef) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    batch_config = raw_config.to_batch_config(punkteconfig)
+    calculator = BatchCalculator(batch_config)
+    ramsch = calculator.is_ramsch()
+    solo = calculator.is_solo()
+    farbe = np.select([raw_config.spielart == Spielart.RUFSPIEL.value, solo],
+                      [raw_config.rufsau, raw_config.farbe[:, 0]], default=0)
+    spalten = dict(id=einzelspiel_ids,
+                   runde_id=raw_config.runde_id,
+                   ansager_id=np.where(ramsch, -1, raw_config.ansager_id),
+                   partner_id=np.where(ramsch | solo, -1, raw_config.partner_id),
+                   geber_id=raw_config.geber_id,
+                   ausspieler_id=batch_config.teilnehmer_ids[:, 0],
+                   mittelhand_id=batch_config.teilnehmer_ids[:, 1],
+                   hinterhand_id=batch_config.teilnehmer_ids[:, 2],
+                   geberhand_id=batch_config.teilnehmer_ids[:, 3],
+                   laufende=batch_config.laufende,
+                   schneider=calculator.is_schneider(),
+                   schwarz=calculator.is_schwarz(),
+                   durchmarsch=batch_config.durchmarsch,
+                   tout=solo & calculator.is_tout(),
+                   spielpunkte=calculator.get_spielpunkte())
+    spalten = {name: werte.tolist() for name, werte in spalten.items()}
+    spalten['spielart'] = [SPIELART_NAMES[s] for s in raw_config.spielart.tolist()]
+    spalten['farbe'] = [FARBGEBUNG_NAMES.get(f) for f in farbe.tolist()]
+    for name in ['ansager_id', 'partner_id']:
+        spalten[name] = [None if t == -1 else t for t in spalten[name]]
+    einzelspiele = [dict(zip(spalten, werte)) for werte in zip(*spalten.values())]
+
+    positionen = np.arange(4)
+    spieler = (positionen == batch_config.ansager[:, None]) | (positionen == batch_config.partner[:, None])
+    ramsch_augen = np.stack([raw_config.ausspieler_augen, raw_config.mittelhand_augen, raw_config.hinterhand_augen,
+                             raw_config.geberhand_augen], axis=1)
+    augen = np.where(ramsch[:, None], ramsch_augen,
+                     np.where(spieler, batch_config.spieler_augen[:, None], 120 - batch_config.spieler_augen[:, None]))
+    resultate = [dict(einzelspiel_id=e, teilnehmer_id=t, augen=a, punkte=p, gewonnen=g)
+                 for e, t, a, p, g in zip(np.repeat(einzelspiel_ids, 4).tolist(),
+                                          batch_config.teilnehmer_ids.ravel().tolist(),
+                                          augen.ravel().astype(np.float64).tolist(),
+                                          calculator.get_punkte().ravel().tolist(),
+                                          calculator.get_gewinner().ravel().tolist())]
+    return einzelspiele, resultate
+
+
+def _get_verdopplungen(raw_config: BatchRawConfig, einzelspiel_ids: np.ndarray) -> List[Dict[str, Any]]:
+    verdopplungen = []
+    for doppler, ids in [(Doppler.GELEGT, raw_config.gelegt_ids), (Doppler.KONTRIERT, raw_config.kontriert_id),
+                         (Doppler.RE, raw_config.re_id), (Doppler.JUNGFRAU, raw_config.jungfrau_ids)]:
+        zeilen, spalten = np.nonzero(ids != -1)
+        verdopplungen += [dict(einzelspiel_id=e, teilnehmer_id=t, doppler=doppler.name)
+                          for e, t in zip(einzelspiel_ids[zeilen].tolist(), ids[zeilen, spalten].tolist())]
+    return verdopplungen
+
+
+def _parse(zeile: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    # Normalizes a line of the file, returns the messages of the checks the app does before the validators
+    spiel = {name: _text(zeile.get(name)) for name in ['spielart', 'rufsau', 'farbe', 'tout']}
+    spiel.update({name: _name(zeile.get(name)) for name in ['geber', 'ansager', 'partner'] + SITZE})
+    for name in ['gelegt', 'kontra', 're', 'jungfrauen', 'verlierer']:
+        spiel[name] = [_name(n) for n in _liste(zeile.get(name))]
+    m = []
+    for name in ['laufende', 'augen', 'schwarz', 'ausspieler_augen', 'mittelhand_augen', 'hinterhand_augen',
+                 'geberhand_augen']:
+        try:
+            spiel[name] = _zahl(zeile.get(name))
+        except ValueError:
+            m.append(f'Ungültige Zahl in {name}: {zeile.get(name)}.')
+    try:
+        datum = datetime.datetime.strptime(_text(zeile.get('datum')) or '', '%Y-%m-%d')
+    except ValueError:
+        datum = None
+        m.append('Bitte gültiges Datum angeben.')
+    runde, ort = _text(zeile.get('runde')), _text(zeile.get('ort'))
+    if runde is None or ort is None:
+        m.append('Bitte wählen Sie eine Runde.')
+    spiel['runde'] = (runde, datum, ort)
+    if spiel['spielart'] not in [s.name for s in Spielart]:
+        m.append(f'Unbekannte Spielart: {spiel["spielart"]}.')
+    for name in ['rufsau', 'farbe']:
+        if spiel[name] is not None and spiel[name] not in [f.name for f in Farbgebung]:
+            m.append(f'Unbekannte Farbe: {spiel[name]}.')
+    if spiel['tout'] not in [None, 'gewonnen', 'verloren']:
+        m.append(f'Ungültiger Ausgang des Touts: {spiel["tout"]}. Bitte gewonnen oder verloren angeben.')
+    if spiel['geber'] is None:
+        m.append(f'Bitte wählen einen Geber.')
+    sitze = [spiel[s] for s in SITZE]
+    if None in sitze:
+        m.append(f'Bitte wählen Sie vier Teilnehmer.')
+    elif len(set(sitze)) != 4:
+        m.append(f'Bitte wählen Sie eindeutige Teilnehmer.')
+    if spiel['geber'] is not None and spiel['geber'] in sitze[:-1]:
+        m.append(f'Bitte positionieren Sie den Geber eindeutig auf die Geberhand.')
+    for name in ['gelegt', 'ansager', 'partner', 'kontra', 're', 'jungfrauen', 'verlierer']:
+        for n in spiel[name] if isinstance(spiel[name], list) else [spiel[name]]:
+            if n is not None and n not in sitze:
+                m.append(f'{n} ({name}) spielt nicht mit.')
+    for n in sorted(set(_get_namen(spiel))):
+        if len([t for t in n.split(',') if t.strip() != '']) != 2:
+            m.append(f'Ungültiger Name: {n}. Bitte als "Nachname, Vorname" angeben.')
+    return spiel, m
+
+
+def _to_raw_config(spiel: Dict[str, Any], teilnehmer: Dict[str, int],
+                   runden: Dict[Tuple[str, datetime.datetime, str], int]) -> RawConfig:
+    def ids(name: str) -> List[int]:
+        return [teilnehmer[n] for n in spiel[name]]
+
+    def id_(name: str) -> Union[None, int]:
+        return None if spiel[name] is None else teilnehmer[spiel[name]]
+
+    common = dict(runde_id=runden[spiel['runde']], geber_id=id_('geber'), teilnehmer_ids=[id_(s) for s in SITZE],
+                  gelegt_ids=ids('gelegt'))
+    if spiel['spielart'] == Spielart.RAMSCH.name:
+        return RamschRawConfig(jungfrau_ids=ids('jungfrauen'),
+                               ausspieler_augen=spiel['ausspieler_augen'],
+                               mittelhand_augen=spiel['mittelhand_augen'],
+                               hinterhand_augen=spiel['hinterhand_augen'],
+                               geberhand_augen=spiel['geberhand_augen'],
+                               manuelle_verlierer_ids=ids('verlierer'),
+                               **common)
+    common.update(ansager_id=id_('ansager'), kontriert_id=ids('kontra'), re_id=ids('re'), laufende=spiel['laufende'],
+                  spieler_nichtspieler_augen=1, augen=spiel['augen'], schwarz=spiel['schwarz'])
+    if spiel['spielart'] == Spielart.RUFSPIEL.name:
+        return RufspielRawConfig(rufsau=spiel['rufsau'], partner_id=id_('partner'), **common)
+    if spiel['spielart'] == Spielart.HOCHZEIT.name:
+        return HochzeitRawConfig(partner_id=id_('partner'), **common)
+    return SoloRawConfig(spielart=spiel['spielart'],
+                         farbe=[] if spiel['farbe'] is None else [spiel['farbe']],
+                         tout={None: [], 'gewonnen': [0], 'verloren': [1]}[spiel['tout']],
+                         **common)
+
+
+def _resolve_teilnehmer(session: sessionmaker(), namen: set, teilnehmer: Dict[str, int]) -> int:
+    # Looks up unknown names and creates the missing Teilnehmer with one executemany, returns the number created
+    t = Teilnehmer.__table__
+    unbekannt = sorted(n for n in namen if n not in teilnehmer)
+    if len(unbekannt) == 0:
+        return 0
+    teilnehmer.update(session.execute(select([t.c.name, t.c.id]).where(t.c.name.in_(unbekannt))).fetchall())
+    fehlend = [n for n in unbekannt if n not in teilnehmer]
+    if len(fehlend) > 0:
+        session.execute(t.insert(), [dict(name=n, nachname=n.split(',')[0].strip(), vorname=n.split(',')[1].strip())
+                                     for n in fehlend])
+        teilnehmer.update(session.execute(select([t.c.name, t.c.id]).where(t.c.name.in_(fehlend))).fetchall())
+    return len(fehlend)
+
+
+def _resolve_runden(session: sessionmaker(), keys: set,
+                    runden: Dict[Tuple[str, datetime.datetime, str], int]) -> int:
+    r = Runde.__table__
+    fehlend = 0
+    for key in sorted(k for k in keys if k not in runden):
+        name, datum, ort = key
+        runde_id = session.execute(select([r.c.id]).where((r.c.name == name) & (r.c.datum == datum) & (r.c.ort == ort))
+                                   .order_by(r.c.id)).scalar()
+        if runde_id is None:
+            runde_id = session.execute(r.insert().values(name=name, datum=datum, ort=ort,
+                                                         punkteconfig_id=get_default_punkteconfig(session).id)) \
+                .inserted_primary_key[0]
+            fehlend += 1
+        runden[key] = runde_id
+    return fehlend
+
+
+def _get_namen(spiel: Dict[str, Any]) -> List[str]:
+    namen = [spiel[name] for name in ['geber', 'ansager', 'partner'] + SITZE if spiel[name] is not None]
+    return namen + [n for name in ['gelegt', 'kontra', 're', 'jungfrauen', 'verlierer'] for n in spiel[name]]
+
+
+def _reject(report: ImportReport, nummer: int, m: List[str]):
+    report.abgelehnt += 1
+    logging.warning(f'Spiel {nummer} abgelehnt: {" ".join(m)}')
+
+
+def _text(value: Any) -> Union[None, str]:
+    return None if value is None or str(value).strip() == '' else str(value).strip()
+
+
+def _name(value: Any) -> Union[None, str]:
+    # "Nachname, Vorname" with exactly one blank, such that e.g. "Huber,Sepp" is the same Teilnehmer as "Huber, Sepp"
+    name = _text(value)
+    if name is None or name.count(',') != 1:
+        return name
+    nachname, vorname = name.split(',')
+    return f'{nachname.strip()}, {vorname.strip()}'
+
+
+def _liste(value: Any) -> List[str]:
+    werte = value if isinstance(value, list) else ('' if value is None else str(value)).split(';')
+    return [w for w in (_text(w) for w in werte) if w is not None]
+
+
+def _zahl(value: Any) -> Union[None, int]:
+    if isinstance(value, bool):
+        return int(value)
+    return None if _text(value) is None else int(_text(value))
+
+
+def _read_checkpoint(checkpoint_path: str) -> int:
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path) as f:
+        return json.load(f)['spiele']
+
+
+def _write_checkpoint(checkpoint_path: str, spiele: int):
+    # Replaced atomically, so an interrupted run leaves the last complete checkpoint
+    with open(f'{checkpoint_path}.tmp', 'w') as f:
+        json.dump({'spiele': spiele}, f)
+    os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
@@ -0,0 +1,51 @@
+import enum
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung
+
+
+class Laden(enum.Enum):
+    # SELECTIN loads the related rows of all entities with one more statement per relationship, JOINED joins them into
+    # the statement of the entities
+    SELECTIN = 1
+    JOINED = 2
+
+
+EINZELSPIEL_TEILNEHMER = [Einzelspiel.ansager, Einzelspiel.partner, Einzelspiel.geber, Einzelspiel.ausspieler,
+                          Einzelspiel.mittelhand, Einzelspiel.hinterhand, Einzelspiel.geberhand]
+
+
+@dataclass(frozen=True)
+class Ladeplan:
+    # The relationships of Einzelspiele which a query helper loads with them, instead of one lazy load per Einzelspiel
+    # and relationship. With resultate and verdopplungen, teilnehmer also loads their Teilnehmer. Hashable, hence part
+    # of the cache key of baked queries.
+    runde: bool = False
+    teilnehmer: bool = False
+    resultate: bool = False
+    verdopplungen: bool = False
+    laden: Laden = Laden.SELECTIN
+
+    def get_options(self) -> List:
+        load = joinedload if self.laden == Laden.JOINED else selectinload
+        options = []
+        if self.runde:
+            options.append(load(Einzelspiel.runde))
+        if self.teilnehmer:
+            options.extend(load(t) for t in EINZELSPIEL_TEILNEHMER)
+        # Collections always by selectin, a join would repeat the row of the Einzelspiel per element
+        if self.resultate:
+            options.append(selectinload(Einzelspiel.resultate).joinedload(Resultat.teilnehmer) if self.teilnehmer
+                           else selectinload(Einzelspiel.resultate))
+        if self.verdopplungen:
+            options.append(selectinload(Einzelspiel.verdopplungen).joinedload(Verdopplung.teilnehmer)
+                           if self.teilnehmer else selectinload(Einzelspiel.verdopplungen))
+        return options
+
+
+# Everything of a list of games: Runde, seats, Resultate and Verdopplungen with the names of the Teilnehmer. For
+# callers which walk the relationships of whole games, the pages load columns instead.
+SPIELLISTE = Ladeplan(runde=True, teilnehmer=True, resultate=True, verdopplungen=True)
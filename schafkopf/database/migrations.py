@@ -0,0 +1,107 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List
+
+from sqlalchemy import inspect, select, text, Index
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung, Runde, Teilnahme, WriteBehindStand, \
+    SchemaVersion
+from schafkopf.database.queries import backfill_teilnahmen
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def _add_analyzer_indexes(connection: Connection):
+    # Einzelspiele of Runden and the latest Einzelspiel only read active rows, hence partial indexes over those.
+    # Resultate and Verdopplungen are read by einzelspiel_id, their unique constraints start with teilnehmer_id.
+    for index in [_get_index(Einzelspiel, 'einzelspiel_aktiv_runde_idx'),
+                  _get_index(Einzelspiel, 'einzelspiel_aktiv_idx'),
+                  _get_index(Resultat, 'resultat_einzelspiel_idx'),
+                  _get_index(Verdopplung, 'verdopplung_einzelspiel_idx'),
+                  _get_index(Runde, 'runde_aktiv_datum_idx')]:
+        _create_index(connection, index)
+
+
+def _add_submission_tokens_and_teilnahmen(connection: Connection):
+    # Databases from before the submission tokens of the Spielen page and before the Teilnahme table
+    if 'submission_token' not in [c['name'] for c in inspect(connection).get_columns(Einzelspiel.__tablename__)]:
+        connection.execute(text('ALTER TABLE einzelspiel ADD COLUMN submission_token VARCHAR(36)'))
+    _create_index(connection, _get_index(Einzelspiel, 'einzelspiel_submission_token_idx'))
+    Teilnahme.__table__.create(connection, checkfirst=True)
+    WriteBehindStand.__table__.create(connection, checkfirst=True)
+    backfill_teilnahmen(Session(bind=connection))
+
+
+def _add_spielverlauf_index(connection: Connection):
+    # Keyset pagination of the Spielverlauf over the active Einzelspiele by (created_on, id)
+    _create_index(connection, _get_index(Einzelspiel, 'einzelspiel_aktiv_created_on_idx'))
+
+
+# Append only. Every upgrade checks what is there already, such that an interrupted migration can run again.
+MIGRATIONS = [Migration(1, 'analyzer_indexes', _add_analyzer_indexes),
+              Migration(2, 'submission_tokens_and_teilnahmen', _add_submission_tokens_and_teilnahmen),
+              Migration(3, 'spielverlauf_index', _add_spielverlauf_index)]
+
+
+def migrate(engine: Engine = None) -> List[int]:
+    # Applies the pending migrations, each in a transaction of its own, and returns their versions. Nothing is dropped,
+    # the database stays usable for the running application.
+    engine = Sessions.get_engine() if engine is None else engine
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    applied = []
+    for migration in MIGRATIONS:
+        with engine.begin() as connection:
+            if migration.version in _get_versions(connection):
+                continue
+            migration.upgrade(connection)
+            connection.execute(SchemaVersion.__table__.insert().values(version=migration.version,
+                                                                       name=migration.name))
+        logging.info(f'Migration {migration.version} ({migration.name}) applied')
+        applied.append(migration.version)
+    return applied
+
+
+def stamp(engine: Engine = None):
+    # Records all migrations as applied, for databases created with Base.metadata.create_all
+    engine = Sessions.get_engine() if engine is None else engine
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        versions = _get_versions(connection)
+        for migration in MIGRATIONS:
+            if migration.version not in versions:
+                connection.execute(SchemaVersion.__table__.insert().values(version=migration.version,
+                                                                           name=migration.name))
+
+
+def get_schema_version(engine: Engine = None) -> int:
+    engine = Sessions.get_engine() if engine is None else engine
+    SchemaVersion.__table__.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return max(_get_versions(connection), default=0)
+
+
+def _get_versions(connection: Connection) -> List[int]:
+    return [v for v, in connection.execute(select([SchemaVersion.__table__.c.version])).fetchall()]
+
+
+def _get_index(model, name: str) -> Index:
+    return next(i for i in model.__table__.indexes if i.name == name)
+
+
+def _create_index(connection: Connection, index: Index):
+    # A plain CREATE INDEX in the transaction of the migration, it blocks writes to the table until the migration
+    # commits. CONCURRENTLY cannot run in a transaction and would wait for the locks of the migration itself, e.g. after
+    # the ALTER TABLE of submission tokens. For large tables on PostgreSQL, create the index by hand beforehand with
+    # CREATE INDEX CONCURRENTLY and the same name, the migration then skips it.
+    if index.name not in [i['name'] for i in inspect(connection).get_indexes(index.table.name)]:
+        index.create(connection)
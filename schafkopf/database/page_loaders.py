@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Union, List, Dict, Tuple, NamedTuple, Iterable
+
+from sqlalchemy import exists, tuple_
+from sqlalchemy.orm import sessionmaker
+
+from schafkopf.database.data_model import Einzelspiel, Runde, Resultat, Teilnehmer, Teilnahme, Verdopplung
+from schafkopf.database.queries import build_session, close_session, get_teilnehmer, get_runden
+from schafkopf.database.session import reader_scoped
+
+
+# Loaders of the pages: each fetches what its layout shows with at most two statements of its own, Teilnehmer and
+# Runden come from the reference cache. The view models are plain values, usable after the session is closed.
+# load_runde_anlegen_seite and load_spielverlauf_seite only show data and read from the reader engine (reader_scoped).
+# load_spielerauswahl_seite and load_letztes_spiel_seite read from the writer, they need the latest game: the seats of
+# the next game follow from it and it is the one to delete.
+
+@dataclass(frozen=True)
+class RundeEintrag:
+    id: int
+    datum: datetime
+    name: str
+    ort: str
+
+
+@dataclass(frozen=True)
+class Sitzordnung:
+    geber_id: Union[None, int] = None
+    ausspieler_id: Union[None, int] = None
+    mittelhand_id: Union[None, int] = None
+    hinterhand_id: Union[None, int] = None
+    geberhand_id: Union[None, int] = None
+
+    def get_teilnehmer_ids(self) -> List[int]:
+        return list({self.geber_id, self.ausspieler_id, self.mittelhand_id, self.hinterhand_id, self.geberhand_id})
+
+
+@dataclass(frozen=True)
+class SpielerauswahlSeite:
+    # Spielen and Statistiken: all Teilnehmer and Runden, with the Runde and the seats of the next game preselected
+    teilnehmer_id_to_name: Dict[int, str]
+    runden: List[RundeEintrag]
+    runde_id: Union[None, int]
+    sitzordnung: Sitzordnung
+
+
+@dataclass(frozen=True)
+class LetztesSpielSeite:
+    einzelspiel_id: int
+    runde_name: str
+    created_on: datetime
+    spielart: str
+    teilnehmer_id_to_punkte: Dict[int, float]
+    teilnehmer_id_to_vorname: Dict[int, str]
+
+
+@dataclass(frozen=True)
+class RundeAnlegenSeite:
+    namen: List[str]
+    orte: List[str]
+
+
+# Position in the Spielverlauf: created_on and id of the last Einzelspiel of a page
+Cursor = Tuple[datetime, int]
+
+
+class SpielverlaufZeile(NamedTuple):
+    einzelspiel_id: int
+    created_on: datetime
+    runde_name: str
+    spielart: str
+    spielpunkte: float
+    teilnehmer_id_to_punkte: Dict[int, float]
+    teilnehmer_id_to_name: Dict[int, str]
+    verdopplungen: List[Tuple[int, str]]
+
+
+@dataclass(frozen=True)
+class SpielverlaufSeite:
+    zeilen: List[SpielverlaufZeile]
+    naechster_cursor: Union[None, Cursor]
+
+
+def load_spielerauswahl_seite(session: sessionmaker() = None) -> SpielerauswahlSeite:
+    actual_session = build_session(session)
+    letztes_spiel = _get_latest_einzelspiel_query(actual_session, Einzelspiel.runde_id, Einzelspiel.geber_id,
+                                                  Einzelspiel.ausspieler_id, Einzelspiel.mittelhand_id,
+                                                  Einzelspiel.hinterhand_id, Einzelspiel.geberhand_id).first()
+    teilnehmer = get_teilnehmer(session=session)
+    runden = get_runden(session=session)
+    close_session(actual_session, session)
+    return SpielerauswahlSeite(teilnehmer_id_to_name={t.id: t.name for t in teilnehmer},
+                               runden=[RundeEintrag(id=r.id, datum=r.datum, name=r.name, ort=r.ort) for r in runden],
+                               runde_id=None if letztes_spiel is None else letztes_spiel.runde_id,
+                               sitzordnung=get_naechste_sitzordnung(letztes_spiel))
+
+
+def get_naechste_sitzordnung(einzelspiel) -> Sitzordnung:
+    # The seats move on by one. With five Teilnehmer the Geber of the last game sat out and takes the Geberhand.
+    if einzelspiel is None:
+        return Sitzordnung()
+    if einzelspiel.geber_id != einzelspiel.geberhand_id:
+        geberhand_id = einzelspiel.geber_id
+    else:
+        geberhand_id = einzelspiel.ausspieler_id
+    return Sitzordnung(geber_id=einzelspiel.ausspieler_id, ausspieler_id=einzelspiel.mittelhand_id,
+                       mittelhand_id=einzelspiel.hinterhand_id, hinterhand_id=einzelspiel.geberhand_id,
+                       geberhand_id=geberhand_id)
+
+
+def load_letztes_spiel_seite(session: sessionmaker() = None) -> Union[None, LetztesSpielSeite]:
+    # The latest game with its Runde, Resultate and the Vornamen of the Teilnehmer in one statement
+    actual_session = build_session(session)
+    einzelspiel_id = _get_latest_einzelspiel_query(actual_session, Einzelspiel.id).as_scalar()
+    zeilen = actual_session.query(Einzelspiel.id, Einzelspiel.created_on, Einzelspiel.spielart,
+                                  Runde.name.label('runde_name'), Resultat.teilnehmer_id, Resultat.punkte,
+                                  Teilnehmer.vorname) \
+        .join(Runde, Einzelspiel.runde_id == Runde.id) \
+        .join(Resultat, Resultat.einzelspiel_id == Einzelspiel.id) \
+        .join(Teilnehmer, Resultat.teilnehmer_id == Teilnehmer.id) \
+        .filter(Einzelspiel.id == einzelspiel_id) \
+        .order_by(Resultat.id).all()
+    close_session(actual_session, session)
+    if len(zeilen) == 0:
+        return None
+    return LetztesSpielSeite(einzelspiel_id=zeilen[0].id, runde_name=zeilen[0].runde_name,
+                             created_on=zeilen[0].created_on, spielart=zeilen[0].spielart,
+                             teilnehmer_id_to_punkte={z.teilnehmer_id: z.punkte for z in zeilen},
+                             teilnehmer_id_to_vorname={z.teilnehmer_id: z.vorname for z in zeilen})
+
+
+@reader_scoped
+def load_runde_anlegen_seite(session: sessionmaker() = None) -> RundeAnlegenSeite:
+    # Names and places of the active Runden as suggestions for the new one
+    actual_session = build_session(session)
+    runden = actual_session.query(Runde.name, Runde.ort).filter(Runde.is_active == True).all()
+    close_session(actual_session, session)
+    return RundeAnlegenSeite(namen=sorted({r.name for r in runden}), orte=sorted({r.ort for r in runden}))
+
+
+@reader_scoped
+def load_spielverlauf_seite(runde_ids: Iterable[int] = (),
+                            teilnehmer_ids: Iterable[int] = (),
+                            spielarten: Iterable[str] = (),
+                            nach: Union[None, Cursor] = None,
+                            limit: int = 25,
+                            session: sessionmaker() = None) -> SpielverlaufSeite:
+    # The active Einzelspiele, newest first, with at least one of the Runden, all of the Teilnehmer and one of the
+    # Spielarten. Paginated by keyset on (created_on, id): the page after the cursor nach is read via the index like
+    # the first one, whatever its number. Three statements of plain rows per page.
+    actual_session = build_session(session)
+    query = actual_session.query(Einzelspiel.id, Einzelspiel.created_on, Runde.name, Einzelspiel.spielart,
+                                 Einzelspiel.spielpunkte) \
+        .join(Runde, Einzelspiel.runde_id == Runde.id) \
+        .filter(Einzelspiel.is_active == True)
+    runde_ids = {int(r) for r in runde_ids}
+    if len(runde_ids) > 0:
+        query = query.filter(Einzelspiel.runde_id.in_(runde_ids))
+    spielarten = set(spielarten)
+    if len(spielarten) > 0:
+        query = query.filter(Einzelspiel.spielart.in_(spielarten))
+    for teilnehmer_id in {int(t) for t in teilnehmer_ids}:
+        query = query.filter(exists().where(Teilnahme.einzelspiel_id == Einzelspiel.id)
+                             .where(Teilnahme.teilnehmer_id == teilnehmer_id))
+    if nach is not None:
+        query = query.filter(tuple_(Einzelspiel.created_on, Einzelspiel.id) < tuple_(*nach))
+    einzelspiele = query.order_by(Einzelspiel.created_on.desc(), Einzelspiel.id.desc()).limit(limit + 1).all()
+    naechster_cursor = (einzelspiele[limit - 1][1], einzelspiele[limit - 1][0]) if len(einzelspiele) > limit else None
+    einzelspiele = einzelspiele[:limit]
+    einzelspiel_ids = [e[0] for e in einzelspiele]
+    punkte, namen, verdopplungen = {}, {}, {}
+    if len(einzelspiel_ids) > 0:
+        for einzelspiel_id, teilnehmer_id, p, name in actual_session \
+                .query(Resultat.einzelspiel_id, Resultat.teilnehmer_id, Resultat.punkte, Teilnehmer.name) \
+                .join(Teilnehmer, Resultat.teilnehmer_id == Teilnehmer.id) \
+                .filter(Resultat.einzelspiel_id.in_(einzelspiel_ids)).order_by(Resultat.id).all():
+            punkte.setdefault(einzelspiel_id, {})[teilnehmer_id] = p
+            namen.setdefault(einzelspiel_id, {})[teilnehmer_id] = name
+        for einzelspiel_id, teilnehmer_id, doppler in actual_session \
+                .query(Verdopplung.einzelspiel_id, Verdopplung.teilnehmer_id, Verdopplung.doppler) \
+                .filter(Verdopplung.einzelspiel_id.in_(einzelspiel_ids)).order_by(Verdopplung.id).all():
+            verdopplungen.setdefault(einzelspiel_id, []).append((teilnehmer_id, doppler))
+    close_session(actual_session, session)
+    return SpielverlaufSeite(zeilen=[SpielverlaufZeile(einzelspiel_id=e, created_on=c, runde_name=r, spielart=s,
+                                                       spielpunkte=p, teilnehmer_id_to_punkte=punkte.get(e, {}),
+                                                       teilnehmer_id_to_name=namen.get(e, {}),
+                                                       verdopplungen=verdopplungen.get(e, []))
+                                     for e, c, r, s, p in einzelspiele],
+                             naechster_cursor=naechster_cursor)
+
+
+def _get_latest_einzelspiel_query(session: sessionmaker(), *columns):
+    # Same order as get_latest_einzelspiel_id: the last active Einzelspiel of an active Runde
+    return session.query(*columns) \
+        .filter(Einzelspiel.is_active == True) \
+        .join(Runde, Einzelspiel.runde_id == Runde.id) \
+        .filter(Runde.is_active == True) \
+        .order_by(Einzelspiel.id.desc()).limit(1)
@@ -1,92 +1,244 @@
 import datetime
+import functools
+import inspect
 import logging
-from typing import Union, List, Optional, Tuple
+import threading
+import time
+from contextlib import contextmanager
+from typing import Union, List, Optional, Tuple, Dict, Any, Iterable, Callable, Iterator
 
 import pandas as pd
-from sqlalchemy import literal
-from sqlalchemy.orm import sessionmaker
-
-from schafkopf.database.data_model import Teilnehmer, Runde, Punkteconfig, Einzelspiel, Resultat, Verdopplung, User
+from sqlalchemy import event, case, select, func, literal, union_all, exists, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext import baked
+from sqlalchemy.orm import sessionmaker, Session, object_session, joinedload, raiseload, Query
+
+from schafkopf.database.data_model import Teilnehmer, Runde, Punkteconfig, Einzelspiel, Resultat, Verdopplung, User, \
+    Teilnahme, Sitz, Rolle, Spielart
+from schafkopf.database.loader_options import Ladeplan
 from schafkopf.database.session import Sessions
 
 logging.getLogger().setLevel(logging.INFO)
 
 
+# Baked queries of the hottest helpers: the ORM query is built and compiled once per process, a call only binds its
+# parameters. Lists of ids are expanding parameters.
+_bakery = baked.bakery()
+
+_TEILNEHMER_BY_ID = _bakery(lambda s: s.query(Teilnehmer).filter(Teilnehmer.id == bindparam('teilnehmer_id')))
+
+_RESULTATE_BY_EINZELSPIEL_IDS = _bakery(
+    lambda s: s.query(Resultat).filter(Resultat.einzelspiel_id.in_(bindparam('einzelspiel_ids', expanding=True))))
+
+_EINZELSPIELE_BY_EINZELSPIEL_IDS = _bakery(
+    lambda s: s.query(Einzelspiel).filter(Einzelspiel.id.in_(bindparam('einzelspiel_ids', expanding=True))))
+
+_AKTIVE_EINZELSPIELE_BY_EINZELSPIEL_IDS = _bakery(
+    lambda s: s.query(Einzelspiel).filter(Einzelspiel.is_active == True)
+    .filter(Einzelspiel.id.in_(bindparam('einzelspiel_ids', expanding=True))))
+
+_EINZELSPIEL_IDS_BY_RUNDE_IDS = _bakery(
+    lambda s: s.query(Einzelspiel.id).filter(Einzelspiel.runde_id.in_(bindparam('runde_ids', expanding=True))))
+
+_AKTIVE_EINZELSPIEL_IDS_BY_RUNDE_IDS = _bakery(
+    lambda s: s.query(Einzelspiel.id).filter(Einzelspiel.runde_id.in_(bindparam('runde_ids', expanding=True)))
+    .filter(Einzelspiel.is_active == True))
+
+_LATEST_EINZELSPIEL_ID = _bakery(
+    lambda s: s.query(Einzelspiel.id).filter(Einzelspiel.is_active == True).join(Einzelspiel.runde)
+    .filter(Runde.is_active == True).order_by(Einzelspiel.id.desc()).limit(1))
+
+
+def _raise_on_lazy_load(query: Query) -> Query:
+    return query.options(raiseload('*'))
+
+
+@contextmanager
+def lazy_load_guard():
+    # For tests: every relationship which is not loaded by the options of its query, see Ladeplan, raises instead of
+    # loading lazily. The bakery is emptied, such that all queries are compiled with the guard, and does not cache
+    # while it is active.
+    _bakery.cache.clear()
+    event.listen(Query, 'before_compile', _raise_on_lazy_load, retval=True)
+    try:
+        yield
+    finally:
+        event.remove(Query, 'before_compile', _raise_on_lazy_load)
+
+
+_SITZE = [(Sitz.AUSSPIELER, 'ausspieler_id'), (Sitz.MITTELHAND, 'mittelhand_id'), (Sitz.HINTERHAND, 'hinterhand_id'),
+          (Sitz.GEBERHAND, 'geberhand_id')]
+
+
+class _ReferenceCache:
+    # Results of the queries of Teilnehmer, Runden and Punkteconfigs in this process. Entries are dropped after inserts,
+    # updates or deletes of these tables, when Sessions.engine is replaced and at the latest after ttl seconds, which
+    # covers changes by other processes.
+    enabled = True
+    ttl = 300.0
+    engine = None
+    entries = {}
+    hits = 0
+    misses = 0
+    lock = threading.Lock()
+
+
+def set_reference_cache(enabled: bool = True, ttl: float = 300.0):
+    # Tests which change reference data behind the back of the ORM can switch the cache off
+    with _ReferenceCache.lock:
+        _ReferenceCache.enabled = enabled
+        _ReferenceCache.ttl = ttl
+        _ReferenceCache.entries = {}
+
+
+def invalidate_reference_cache(*_):
+    with _ReferenceCache.lock:
+        _ReferenceCache.entries = {}
+
+
+def get_reference_cache_stats() -> Dict[str, int]:
+    with _ReferenceCache.lock:
+        return dict(hits=_ReferenceCache.hits, misses=_ReferenceCache.misses, entries=len(_ReferenceCache.entries))
+
+
+def _reference_data(function: Callable) -> Callable:
+    # Caches the results of calls without a session of the caller, see _ReferenceCache. Lists and dataframes are
+    # copied, the cached objects are detached from any session.
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def cached_function(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        if not _ReferenceCache.enabled or arguments.arguments['session'] is not None:
+            return function(*args, **kwargs)
+        request_session = Sessions.get_request_session()
+        if request_session is not None and request_session.info.get('reference_data_changed', False):
+            # The request reads its own changes, which are not committed yet
+            return function(*args, **kwargs)
+        key = (function.__name__,) + tuple(v for k, v in arguments.arguments.items() if k != 'session')
+        with _ReferenceCache.lock:
+            if _ReferenceCache.engine is not Sessions.engine:
+                _ReferenceCache.engine = Sessions.engine
+                _ReferenceCache.entries = {}
+            entry = _ReferenceCache.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                _ReferenceCache.hits += 1
+                return _copy(entry[0])
+            _ReferenceCache.misses += 1
+            entries = _ReferenceCache.entries
+        # Loaded with a session of its own, such that the cached objects are not expired by the commit of a request
+        own_session = Sessions.get_new_session()
+        try:
+            arguments.arguments['session'] = own_session
+            result = function(*arguments.args, **arguments.kwargs)
+        finally:
+            own_session.close()
+        with _ReferenceCache.lock:
+            # Not stored if the cache was invalidated while the query ran
+            if _ReferenceCache.entries is entries:
+                entries[key] = (result, time.monotonic() + _ReferenceCache.ttl)
+        return _copy(result)
+
+    return cached_function
+
+
+def _copy(result: Any) -> Any:
+    if isinstance(result, list):
+        return list(result)
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    return result
+
+
 def get_teilnehmer_by_nachname_vorname(nachname: str, vorname: str, dataframe: bool = False,
                                        session: sessionmaker() = None) -> Union[List[Teilnehmer], pd.DataFrame]:
     actual_session = Sessions.get_session() if session is None else session
     query = actual_session.query(Teilnehmer).filter(Teilnehmer.vorname == vorname) \
         .filter(Teilnehmer.nachname == nachname)
-    teilnehmer = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    teilnehmer = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return teilnehmer
 
 
+@_reference_data
 def get_teilnehmer(dataframe: bool = False, session: sessionmaker() = None) -> Union[List[Teilnehmer], pd.DataFrame]:
     actual_session = Sessions.get_session() if session is None else session
     query = actual_session.query(Teilnehmer).order_by(Teilnehmer.nachname.asc(), Teilnehmer.vorname.asc())
-    teilnehmer = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    teilnehmer = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return teilnehmer
 
 
+@_reference_data
 def get_teilnehmer_by_id(teilnehmer_id: Union[None, int], session: sessionmaker() = None) -> Union[None, Teilnehmer]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     if teilnehmer_id is None:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
         return None
-    teilnehmer = actual_session.query(Teilnehmer).filter(Teilnehmer.id == teilnehmer_id).all()
-    _close_session(actual_session, session)
+    teilnehmer = _TEILNEHMER_BY_ID(actual_session).params(teilnehmer_id=teilnehmer_id).all()
+    close_session(actual_session, session)
     return teilnehmer[0]
 
 
 def get_teilnehmers_by_ids(teilnehmer_ids: List[Union[None, int]],
                            dataframe: bool = False,
                            session: sessionmaker() = None) -> Union[List[Union[None, Teilnehmer]], pd.DataFrame]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     query = actual_session.query(Teilnehmer).filter(Teilnehmer.id.in_(teilnehmer_ids))
-    teilnehmers = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    teilnehmers = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return teilnehmers
 
 
+def get_teilnehmer_namen_by_ids(teilnehmer_ids: Iterable[Union[None, int]],
+                                session: sessionmaker() = None) -> Tuple[Dict[int, str], Dict[int, str]]:
+    # Name and Vorname of every Teilnehmer by id with one query, None and unknown ids are left out
+    teilnehmer_ids = {int(t) for t in teilnehmer_ids if t is not None}
+    if len(teilnehmer_ids) == 0:
+        return {}, {}
+    actual_session = build_session(session)
+    teilnehmer = actual_session.query(Teilnehmer.id, Teilnehmer.name, Teilnehmer.vorname) \
+        .filter(Teilnehmer.id.in_(teilnehmer_ids)).all()
+    close_session(actual_session, session)
+    return {t.id: t.name for t in teilnehmer}, {t.id: t.vorname for t in teilnehmer}
+
+
 def get_teilnehmer_name_by_id(teilnehmer_id: Union[None, int], session: sessionmaker() = None) -> Union[None, str]:
-    actual_session = _build_session(session)
-    teilnehmer = get_teilnehmer_by_id(teilnehmer_id, actual_session)
-    _close_session(actual_session, session)
+    teilnehmer = get_teilnehmer_by_id(teilnehmer_id, session)
     if teilnehmer is None:
         return None
     return teilnehmer.name
 
 
 def get_teilnehmer_vorname_by_id(teilnehmer_id: Union[None, int], session: sessionmaker() = None) -> Union[None, str]:
-    actual_session = _build_session(session)
-    teilnehmer = get_teilnehmer_by_id(teilnehmer_id, actual_session)
-    _close_session(actual_session, session)
+    teilnehmer = get_teilnehmer_by_id(teilnehmer_id, session)
     if teilnehmer is None:
         return None
     return teilnehmer.vorname
 
 
+@_reference_data
 def get_runde_by_id(runde_id: Union[None, int], session: sessionmaker() = None) -> Union[None, Runde]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     if runde_id is None:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
         return None
     runde = actual_session.query(Runde).filter(Runde.id == runde_id).all()
-    _close_session(actual_session, session)
+    close_session(actual_session, session)
     return runde[0]
 
 
+@_reference_data
 def get_runden(active: bool = True, dataframe: bool = False,
                session: sessionmaker() = None) -> Union[List[Runde], pd.DataFrame]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     if active:
         query = actual_session.query(Runde).filter(Runde.is_active == active).order_by(Runde.datum.asc())
     else:
         query = actual_session.query(Runde).order_by(Runde.created_on.asc())
-    runden = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    runden = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return runden
 
 
@@ -94,9 +246,9 @@ def get_resultate_by_einzelspiele_ids(einzelspiel_ids: List[int],
                                       dataframe: bool = False,
                                       session: sessionmaker() = None) -> Union[None, List[Resultat], pd.DataFrame]:
     actual_session = Sessions.get_session() if session is None else session
-    query = actual_session.query(Resultat).filter(Resultat.einzelspiel_id.in_(einzelspiel_ids))
-    resultate = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    query = _RESULTATE_BY_EINZELSPIEL_IDS(actual_session).params(einzelspiel_ids=list(einzelspiel_ids))
+    resultate = query.all() if not dataframe else _read_dataframe(_get_statement(query), actual_session)
+    close_session(actual_session, session)
     return resultate
 
 
@@ -106,7 +258,7 @@ def insert_resultat(teilnehmer_id: int,
                     punkte: float,
                     gewonnen: bool,
                     session: sessionmaker() = None) -> Resultat:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     resultat = Resultat(teilnehmer_id=teilnehmer_id, einzelspiel_id=einzelspiel_id, augen=augen,
                         punkte=punkte, gewonnen=gewonnen)
     actual_session.add(resultat)
@@ -116,38 +268,42 @@ def insert_resultat(teilnehmer_id: int,
     return resultat
 
 
+@_reference_data
 def get_default_punkteconfig(session: sessionmaker() = None) -> Punkteconfig:
     actual_session = Sessions.get_session() if session is None else session
     query = actual_session.query(Punkteconfig).filter(Punkteconfig.name == 'sauspiel_config_plus_hochzeit')
     punkteconfig = query.all()[0]
-    _close_session(actual_session, session)
+    close_session(actual_session, session)
     return punkteconfig
 
 
+@_reference_data
 def get_punkteconfig_by_runde_id(runde_id: Union[None, int],
                                  session: sessionmaker() = None) -> Union[None, Punkteconfig]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     if runde_id is None:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
         return None
-    runde = actual_session.query(Runde).filter(Runde.id == runde_id).all()
+    runde = actual_session.query(Runde).options(joinedload(Runde.punkteconfig)).filter(Runde.id == runde_id).all()
     punkteconfig = runde[0].punkteconfig
-    _close_session(actual_session, session)
+    close_session(actual_session, session)
     return punkteconfig
 
 
 def get_einzelspiele_by_einzelspiel_ids(einzelspiel_ids: List[int],
                                         active: bool = True,
                                         dataframe: bool = False,
-                                        session: sessionmaker() = None) -> Union[None, List[Einzelspiel], pd.DataFrame]:
+                                        session: sessionmaker() = None,
+                                        ladeplan: Union[None, Ladeplan] = None) -> Union[None, List[Einzelspiel],
+                                                                                         pd.DataFrame]:
     actual_session = Sessions.get_session() if session is None else session
-    if active:
-        query = actual_session.query(Einzelspiel).filter(Einzelspiel.is_active == active) \
-            .filter(Einzelspiel.id.in_(einzelspiel_ids))
-    else:
-        query = actual_session.query(Einzelspiel).filter(Einzelspiel.id.in_(einzelspiel_ids))
-    einzelspiele = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    baked_query = _AKTIVE_EINZELSPIELE_BY_EINZELSPIEL_IDS if active else _EINZELSPIELE_BY_EINZELSPIEL_IDS
+    if ladeplan is not None and not dataframe:
+        # The Ladeplan is part of the cache key
+        baked_query = baked_query.with_criteria(lambda q: q.options(*ladeplan.get_options()), ladeplan)
+    query = baked_query(actual_session).params(einzelspiel_ids=list(einzelspiel_ids))
+    einzelspiele = query.all() if not dataframe else _read_dataframe(_get_statement(query), actual_session)
+    close_session(actual_session, session)
     return einzelspiele
 
 
@@ -160,60 +316,148 @@ def inactivate_einzelspiel_by_einzelspiel_id(einzelspiel_id: int, session: sessi
     except Exception:
         return False
     finally:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
     return True
 
 
 def get_einzelspiele_by_teilnehmer_ids(teilnehmer_ids: List[int],
                                        active: bool = True,
                                        dataframe: bool = False,
-                                       session: sessionmaker() = None) -> Union[List[Einzelspiel], pd.DataFrame]:
+                                       session: sessionmaker() = None,
+                                       ladeplan: Union[None, Ladeplan] = None) -> Union[List[Einzelspiel],
+                                                                                        pd.DataFrame]:
     if len(teilnehmer_ids) == 0:
         if dataframe:
             return pd.DataFrame()
         else:
             return []
     actual_session = Sessions.get_session() if session is None else session
-    query = actual_session.query(Einzelspiel)
-    positionen = [Einzelspiel.geberhand_id, Einzelspiel.ausspieler_id,
-                  Einzelspiel.mittelhand_id, Einzelspiel.hinterhand_id]
+    query = actual_session.query(Einzelspiel) \
+        .filter(Einzelspiel.id.in_(_get_einzelspiel_ids_by_teilnahmen(teilnehmer_ids)))
     if active:
         query = query.filter(Einzelspiel.is_active == active)
-    if len(teilnehmer_ids) <= 4:
-        for t in teilnehmer_ids:
-            query = query.filter(literal(t).in_(positionen))
-    else:
-        query = query.filter(Einzelspiel.geberhand_id.in_(teilnehmer_ids)) \
-            .filter(Einzelspiel.ausspieler_id.in_(teilnehmer_ids)) \
-            .filter(Einzelspiel.mittelhand_id.in_(teilnehmer_ids)) \
-            .filter(Einzelspiel.hinterhand_id.in_(teilnehmer_ids))
-    einzelspiele = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    if ladeplan is not None and not dataframe:
+        query = query.options(*ladeplan.get_options())
+    einzelspiele = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return einzelspiele
 
 
+def get_einzelspiel_ids_by_teilnehmer_ids(teilnehmer_ids: List[int],
+                                          active: bool = True,
+                                          session: sessionmaker() = None) -> List[int]:
+    # Like get_einzelspiele_by_teilnehmer_ids, but only the ids
+    if len(teilnehmer_ids) == 0:
+        return []
+    actual_session = build_session(session)
+    query = actual_session.query(Einzelspiel.id) \
+        .filter(Einzelspiel.id.in_(_get_einzelspiel_ids_by_teilnahmen(teilnehmer_ids)))
+    if active:
+        query = query.filter(Einzelspiel.is_active == True)
+    einzelspiel_ids = [e for e, in query.order_by(Einzelspiel.id).all()]
+    close_session(actual_session, session)
+    return einzelspiel_ids
+
+
+def _get_einzelspiel_ids_by_teilnahmen(teilnehmer_ids: List[int]):
+    # Up to four Teilnehmer: Einzelspiele in which all of them sit. More than four: Einzelspiele in which only they sit.
+    # Both are Einzelspiele with min(len(teilnehmer_ids), 4) matching seats, found via the index of the Teilnahmen.
+    teilnehmer_ids = {int(t) for t in teilnehmer_ids}
+    return select([Teilnahme.einzelspiel_id]).where(Teilnahme.teilnehmer_id.in_(teilnehmer_ids)) \
+        .group_by(Teilnahme.einzelspiel_id).having(func.count() == min(len(teilnehmer_ids), 4))
+
+
 def get_verdopplungen_by_einzelspiel_ids(einzelspiel_ids: List[int],
                                          dataframe: bool = False,
                                          session: sessionmaker() = None) -> Union[List[Verdopplung], pd.DataFrame]:
     actual_session = Sessions.get_session() if session is None else session
     query = actual_session.query(Verdopplung).filter(Verdopplung.einzelspiel_id.in_(einzelspiel_ids))
-    verdopplungen = query.all() if not dataframe else pd.read_sql(query.statement, actual_session.bind)
-    _close_session(actual_session, session)
+    verdopplungen = query.all() if not dataframe else _read_dataframe(query.statement, actual_session)
+    close_session(actual_session, session)
     return verdopplungen
 
 
+# Projections: only the given columns of the rows, as named tuples or as a dataframe with these columns. Memory and
+# time scale with the columns actually needed instead of with whole entities.
+
+def get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids: List[int],
+                                           spalten: Iterable[str],
+                                           dataframe: bool = False,
+                                           session: sessionmaker() = None) -> Union[List[Tuple], pd.DataFrame]:
+    statement = _select_zeilen(Resultat, spalten).where(Resultat.einzelspiel_id.in_(list(einzelspiel_ids)))
+    return _get_zeilen(statement, dataframe, session)
+
+
+def get_einzelspiel_zeilen_by_einzelspiel_ids(einzelspiel_ids: List[int],
+                                              spalten: Iterable[str],
+                                              active: bool = True,
+                                              dataframe: bool = False,
+                                              session: sessionmaker() = None) -> Union[List[Tuple], pd.DataFrame]:
+    statement = _select_zeilen(Einzelspiel, spalten).where(Einzelspiel.id.in_(list(einzelspiel_ids)))
+    if active:
+        statement = statement.where(Einzelspiel.is_active == True)
+    return _get_zeilen(statement, dataframe, session)
+
+
+def get_verdopplung_zeilen_by_einzelspiel_ids(einzelspiel_ids: List[int],
+                                              spalten: Iterable[str],
+                                              dataframe: bool = False,
+                                              session: sessionmaker() = None) -> Union[List[Tuple], pd.DataFrame]:
+    statement = _select_zeilen(Verdopplung, spalten).where(Verdopplung.einzelspiel_id.in_(list(einzelspiel_ids)))
+    return _get_zeilen(statement, dataframe, session)
+
+
+# Streams for scans over the whole history: the rows arrive in batches of batch_size from a server-side cursor where
+# the database has one, hence only a batch is held in memory at a time.
+
+def stream_einzelspiel_zeilen(spalten: Iterable[str],
+                              active: bool = True,
+                              batch_size: int = 1000,
+                              session: sessionmaker() = None) -> Iterator[Tuple]:
+    statement = _select_zeilen(Einzelspiel, spalten).order_by(Einzelspiel.id)
+    if active:
+        statement = statement.where(Einzelspiel.is_active == True)
+    return _stream_zeilen(statement, batch_size, session)
+
+
+def stream_resultat_zeilen(spalten: Iterable[str],
+                           batch_size: int = 1000,
+                           session: sessionmaker() = None) -> Iterator[Tuple]:
+    return _stream_zeilen(_select_zeilen(Resultat, spalten).order_by(Resultat.id), batch_size, session)
+
+
+def _select_zeilen(model, spalten: Iterable[str]):
+    return select([model.__table__.c[s] for s in spalten])
+
+
+def _get_zeilen(statement, dataframe: bool, session: sessionmaker()) -> Union[List[Tuple], pd.DataFrame]:
+    actual_session = build_session(session)
+    zeilen = actual_session.execute(statement).fetchall() if not dataframe \
+        else _read_dataframe(statement, actual_session)
+    close_session(actual_session, session)
+    return zeilen
+
+
+def _stream_zeilen(statement, batch_size: int, session: sessionmaker()) -> Iterator[Tuple]:
+    actual_session = build_session(session)
+    try:
+        result = actual_session.execute(statement.execution_options(stream_results=True))
+        while True:
+            zeilen = result.fetchmany(batch_size)
+            if len(zeilen) == 0:
+                break
+            yield from zeilen
+    finally:
+        close_session(actual_session, session)
+
+
 def get_einzelspiel_ids_by_runde_ids(runde_ids: List[int],
                                      active: bool = True,
                                      session: sessionmaker() = None) -> List[int]:
-    actual_session = _build_session(session)
-    if active:
-        einzelspiel_ids = [e[0] for e in
-                           actual_session.query(Einzelspiel.id).filter(Einzelspiel.runde_id.in_(runde_ids)).filter(
-                               Einzelspiel.is_active == active).all()]
-    else:
-        einzelspiel_ids = [e[0] for e in
-                           actual_session.query(Einzelspiel.id).filter(Einzelspiel.runde_id.in_(runde_ids)).all()]
-    _close_session(actual_session, session)
+    actual_session = build_session(session)
+    baked_query = _AKTIVE_EINZELSPIEL_IDS_BY_RUNDE_IDS if active else _EINZELSPIEL_IDS_BY_RUNDE_IDS
+    einzelspiel_ids = [e[0] for e in baked_query(actual_session).params(runde_ids=list(runde_ids)).all()]
+    close_session(actual_session, session)
     return einzelspiel_ids
 
 
@@ -222,38 +466,34 @@ def get_runde_id_by_einzelspiel_id(einzelspiel_id: int,
     actual_session = Sessions.get_session() if session is None else session
     runde_id = actual_session.query(Einzelspiel.runde_id).filter(Einzelspiel.id == einzelspiel_id).all()
     runde_id = runde_id[0][0] if len(runde_id) == 1 else None
-    _close_session(actual_session, session)
+    close_session(actual_session, session)
     return runde_id
 
 
-def get_latest_einzelspiel_id(session: sessionmaker() = None) -> Union[None, int]:
-    actual_session = _build_session(session)
-    einzelspiel_id = actual_session.query(Einzelspiel.id) \
-        .filter(Einzelspiel.is_active == True) \
-        .join(Einzelspiel.runde) \
-        .filter(Runde.is_active == True) \
-        .order_by(Einzelspiel.id.desc()).limit(1).all()
-    einzelspiel_id = einzelspiel_id[0][0] if len(einzelspiel_id) == 1 else None
-    _close_session(actual_session, session)
+def get_einzelspiel_id_by_submission_token(submission_token: Union[None, str],
+                                           session: sessionmaker() = None) -> Union[None, int]:
+    actual_session = build_session(session)
+    if submission_token is None:
+        close_session(actual_session, session)
+        return None
+    einzelspiel_id = actual_session.query(Einzelspiel.id).filter(Einzelspiel.submission_token == submission_token) \
+        .scalar()
+    close_session(actual_session, session)
     return einzelspiel_id
 
 
-def get_latest_result(session: sessionmaker() = None) -> Union[None, pd.DataFrame]:
-    actual_session = _build_session(session)
-    einzelspiel_id = get_latest_einzelspiel_id()
-    if einzelspiel_id is None:
-        return None
-    resultate = get_resultate_by_einzelspiele_ids([einzelspiel_id], dataframe=True)
-    teilnehmer = get_teilnehmers_by_ids(resultate["teilnehmer_id"].to_list(), dataframe=True)
-    result = pd.merge(resultate, teilnehmer, left_on=["teilnehmer_id"], right_on=["id"])[["teilnehmer_id", "punkte"]]
-    _close_session(actual_session, session)
-    return result
+def get_latest_einzelspiel_id(session: sessionmaker() = None) -> Union[None, int]:
+    actual_session = build_session(session)
+    einzelspiel_id = _LATEST_EINZELSPIEL_ID(actual_session).all()
+    einzelspiel_id = einzelspiel_id[0][0] if len(einzelspiel_id) == 1 else None
+    close_session(actual_session, session)
+    return einzelspiel_id
 
 
 def get_users(session: sessionmaker() = None) -> Union[None, List[User]]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     users = actual_session.query(User).all()
-    _close_session(actual_session, session)
+    close_session(actual_session, session)
     return users
 
 
@@ -263,7 +503,7 @@ def insert_einzelspiel(runde_id: int, ansager_id: Union[None, int], geber_id: in
                        schneider: bool = False, schwarz: bool = False, partner_id: Union[None, int] = None,
                        durchmarsch: Union[None, bool] = False, tout: Union[None, bool] = False,
                        session: sessionmaker() = None) -> Einzelspiel:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     einzelspiel = Einzelspiel(runde_id=runde_id, ansager_id=ansager_id,
                               partner_id=partner_id, geber_id=geber_id, ausspieler_id=ausspieler_id,
                               mittelhand_id=mittelhand_id, hinterhand_id=hinterhand_id, geberhand_id=geberhand_id,
@@ -277,9 +517,86 @@ def insert_einzelspiel(runde_id: int, ansager_id: Union[None, int], geber_id: in
     return einzelspiel
 
 
+def insert_spiel(einzelspiel: Dict[str, Any], resultate: List[Dict[str, Any]], verdopplungen: List[Dict[str, Any]],
+                 session: sessionmaker() = None) -> int:
+    # Writes one game with Core inserts in a single transaction: the Einzelspiel, whose id comes back via RETURNING
+    # or the cursor, then all Resultate, Teilnahmen and Verdopplungen as one executemany each. Returns the Einzelspiel
+    # id.
+    actual_session = build_session(session)
+    table = Einzelspiel.__table__
+    # As with the ORM, None falls back to the column default, e.g. for schwarz of an unchecked box
+    einzelspiel = {k: v for k, v in einzelspiel.items() if v is not None or table.c[k].default is None}
+    # A savepoint, such that a failed insert only undoes this game and not the rest of the transaction, e.g. of the
+    # request
+    savepoint = actual_session.begin_nested()
+    try:
+        einzelspiel_id = actual_session.execute(table.insert().values(**einzelspiel)).inserted_primary_key[0]
+        actual_session.execute(Resultat.__table__.insert(),
+                               [dict(resultat, einzelspiel_id=einzelspiel_id) for resultat in resultate])
+        actual_session.execute(Teilnahme.__table__.insert(), get_teilnahmen(dict(einzelspiel, id=einzelspiel_id)))
+        if len(verdopplungen) > 0:
+            actual_session.execute(Verdopplung.__table__.insert(),
+                                   [dict(verdopplung, einzelspiel_id=einzelspiel_id) for verdopplung in verdopplungen])
+        savepoint.commit()
+        if session is None:
+            actual_session.commit()
+    except IntegrityError:
+        savepoint.rollback()
+        # A concurrent submit of the same form won the unique index on the submission token, its game is the answer.
+        # On SQLite the insert waits for the commit of the other submit and fails with "database is locked" after
+        # the busy timeout.
+        if einzelspiel.get('submission_token') is None:
+            raise
+        einzelspiel_id = get_einzelspiel_id_by_submission_token(einzelspiel['submission_token'], actual_session)
+        if einzelspiel_id is None:
+            raise
+    finally:
+        close_session(actual_session, session)
+    return einzelspiel_id
+
+
+def get_teilnahmen(einzelspiel: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Rows of the Teilnahmen of an Einzelspiel given as a dict with its id
+    teilnahmen = []
+    for sitz, spalte in _SITZE:
+        teilnehmer_id = einzelspiel[spalte]
+        if einzelspiel.get('spielart') == Spielart.RAMSCH.name:
+            rolle = Rolle.RAMSCHSPIELER
+        elif teilnehmer_id == einzelspiel.get('ansager_id'):
+            rolle = Rolle.ANSAGER
+        elif teilnehmer_id == einzelspiel.get('partner_id'):
+            rolle = Rolle.PARTNER
+        else:
+            rolle = Rolle.GEGENSPIELER
+        teilnahmen.append(dict(einzelspiel_id=einzelspiel['id'], teilnehmer_id=teilnehmer_id, sitz=sitz.name,
+                               rolle=rolle.name))
+    return teilnahmen
+
+
+def backfill_teilnahmen(session: sessionmaker() = None) -> int:
+    # Inserts the Teilnahmen of all Einzelspiele without any with one INSERT ... SELECT, returns their number
+    actual_session = build_session(session)
+    e = Einzelspiel.__table__
+    ohne_teilnahmen = ~exists().where(Teilnahme.einzelspiel_id == e.c.id)
+    selects = []
+    for sitz, spalte in _SITZE:
+        rolle = case([(e.c.spielart == Spielart.RAMSCH.name, Rolle.RAMSCHSPIELER.name),
+                      (e.c.ansager_id == e.c[spalte], Rolle.ANSAGER.name),
+                      (e.c.partner_id == e.c[spalte], Rolle.PARTNER.name)], else_=Rolle.GEGENSPIELER.name)
+        selects.append(select([e.c.id, e.c[spalte], literal(sitz.name), rolle]).where(ohne_teilnahmen))
+    try:
+        rowcount = actual_session.execute(Teilnahme.__table__.insert().from_select(
+            ['einzelspiel_id', 'teilnehmer_id', 'sitz', 'rolle'], union_all(*selects))).rowcount
+        if session is None:
+            actual_session.commit()
+    finally:
+        close_session(actual_session, session)
+    return rowcount
+
+
 def insert_teilnehmer(vorname: str, nachname: str,
                       session: sessionmaker() = None) -> Tuple[Optional[int], List[str]]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     vorname = '' if vorname is None else vorname.strip()
     nachname = '' if nachname is None else nachname.strip()
     validation_messages = []
@@ -290,7 +607,7 @@ def insert_teilnehmer(vorname: str, nachname: str,
     if nachname == '':
         validation_messages.append(f'Ein leerer Nachname ist nicht erlaubt.')
     if len(validation_messages) > 0:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
         return None, validation_messages
     teilnehmer = Teilnehmer(name=f'{nachname}, {vorname}', vorname=vorname, nachname=nachname)
     actual_session.add(teilnehmer)
@@ -299,22 +616,24 @@ def insert_teilnehmer(vorname: str, nachname: str,
     if session is None:
         actual_session.commit()
         actual_session.close()
+        invalidate_reference_cache()
     return teilnehmer_id, []
 
 
 def insert_default_punkteconfig(session: sessionmaker() = None) -> Punkteconfig:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     punkteconfig = Punkteconfig()
     actual_session.add(punkteconfig)
     actual_session.flush()
     if session is None:
         actual_session.commit()
         actual_session.close()
+        invalidate_reference_cache()
     return punkteconfig
 
 
 def insert_user(username: str, password: str, session: sessionmaker() = None) -> User:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     user = User(username=username, password=password)
     actual_session.add(user)
     actual_session.flush()
@@ -325,7 +644,7 @@ def insert_user(username: str, password: str, session: sessionmaker() = None) ->
 
 
 def insert_runde(datum: str, name: str, ort: str, session: sessionmaker() = None) -> Tuple[Optional[int], List[str]]:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     punkteconfig = get_default_punkteconfig(actual_session)
     name = '' if name is None else name.strip()
     ort = '' if ort is None else ort.strip()
@@ -337,7 +656,7 @@ def insert_runde(datum: str, name: str, ort: str, session: sessionmaker() = None
     if datum == '':
         validation_messages.append('Bitte gültiges Datum angeben.')
     if len(validation_messages) > 0:
-        _close_session(actual_session, session)
+        close_session(actual_session, session)
         return None, validation_messages
     datum = datetime.datetime.strptime(datum, '%Y-%m-%d')
     runde = Runde(datum=datum, name=name, ort=ort, punkteconfig_id=punkteconfig.id)
@@ -347,12 +666,13 @@ def insert_runde(datum: str, name: str, ort: str, session: sessionmaker() = None
     if session is None:
         actual_session.commit()
         actual_session.close()
+        invalidate_reference_cache()
     return runde_id, []
 
 
 def insert_verdopplung(teilnehmer_id: int, einzelspiel_id: int, doppler: str,
                        session: sessionmaker() = None) -> Verdopplung:
-    actual_session = _build_session(session)
+    actual_session = build_session(session)
     verdopplung = Verdopplung(teilnehmer_id=teilnehmer_id, einzelspiel_id=einzelspiel_id, doppler=doppler)
     actual_session.add(verdopplung)
     if session is None:
@@ -362,11 +682,43 @@ def insert_verdopplung(teilnehmer_id: int, einzelspiel_id: int, doppler: str,
     return verdopplung
 
 
-def _close_session(actual_session: sessionmaker(), session: sessionmaker()):
+def _read_dataframe(statement, session: sessionmaker()) -> pd.DataFrame:
+    # Through the connection of the session, such that a request reads its changes which are not committed yet. Flushes
+    # first like a Query.
+    if session.autoflush:
+        session.flush()
+    return pd.read_sql(statement, session.connection())
+
+
+def _get_statement(query: baked.Result):
+    # The SELECT of a baked query with its parameters, e.g. for pd.read_sql
+    return query._as_query().statement
+
+
+def close_session(actual_session: sessionmaker(), session: sessionmaker()):
     if session is None:
         actual_session.close()
 
 
-def _build_session(session: sessionmaker()) -> sessionmaker():
+def build_session(session: sessionmaker()) -> sessionmaker():
     actual_session = Sessions.get_session() if session is None else session
     return actual_session
+
+
+def _invalidate_reference_cache_on_flush(_, __, target):
+    invalidate_reference_cache()
+    session = object_session(target)
+    if session is not None:
+        session.info['reference_data_changed'] = True
+
+
+def _invalidate_reference_cache_on_commit(session: Session):
+    # A request commits at its end, long after the flush. Entries loaded in between could hold the old data.
+    if session.info.pop('reference_data_changed', False):
+        invalidate_reference_cache()
+
+
+for _mapped_class in [Teilnehmer, Runde, Punkteconfig]:
+    for _identifier in ['after_insert', 'after_update', 'after_delete']:
+        event.listen(_mapped_class, _identifier, _invalidate_reference_cache_on_flush)
+event.listen(Session, 'after_commit', _invalidate_reference_cache_on_commit)
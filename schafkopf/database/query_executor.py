@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Union
+
+from sqlalchemy.orm import Session
+
+from schafkopf.database.session import Sessions
+from schafkopf.utils.settings_utils import get_query_pool_size
+
+
+class _ExecutorHolder:
+    executor = None
+    pool_size = None
+    lock = threading.Lock()
+
+
+def set_query_pool_size(pool_size: Union[None, int] = None):
+    # None takes the pool_size of the QueryPool section of settings.ini, 4 without it
+    with _ExecutorHolder.lock:
+        if _ExecutorHolder.executor is not None:
+            _ExecutorHolder.executor.shutdown(wait=False)
+            _ExecutorHolder.executor = None
+        _ExecutorHolder.pool_size = pool_size
+
+
+def get_query_executor() -> ThreadPoolExecutor:
+    with _ExecutorHolder.lock:
+        if _ExecutorHolder.executor is None:
+            pool_size = _ExecutorHolder.pool_size
+            if pool_size is None:
+                try:
+                    pool_size = get_query_pool_size()
+                except ValueError:
+                    pool_size = 4
+            _ExecutorHolder.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='query')
+        return _ExecutorHolder.executor
+
+
+def run_queries(queries: Dict[str, Callable[[Session], Any]]) -> Dict[str, Any]:
+    # Runs independent read queries concurrently and returns their results by name once all have arrived. Every
+    # query gets a session of the reader engine and a connection of its own. A request which has written runs them
+    # one after the other in its session instead, such that they see its changes. The first failing query raises its
+    # exception here.
+    if Sessions.reads_own_writes():
+        return {name: query(Sessions.get_request_session()) for name, query in queries.items()}
+    executor = get_query_executor()
+    futures = {name: executor.submit(_run_query, query) for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _run_query(query: Callable[[Session], Any]) -> Any:
+    session = Sessions.get_new_reader_session()
+    try:
+        return query(session)
+    finally:
+        session.close()
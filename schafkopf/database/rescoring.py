@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Union, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, bindparam, and_
+from sqlalchemy.orm import sessionmaker
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.configs import BatchConfig, get_positionen
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung, Punkteconfig, Spielart, Doppler
+from schafkopf.database.queries import build_session, close_session
+
+SPIELART_TO_VALUE = {s.name: s.value for s in Spielart}
+
+
+@dataclass
+class RescoringReport:
+    einzelspiele: int = 0
+    geaenderte_einzelspiele: int = 0
+    written: bool = False
+    teilnehmer_id_to_punkte_alt: Dict[int, float] = field(default_factory=dict)
+    teilnehmer_id_to_punkte_neu: Dict[int, float] = field(default_factory=dict)
+
+    def get_dataframe(self) -> pd.DataFrame:
+        teilnehmer_ids = sorted(self.teilnehmer_id_to_punkte_alt)
+        df = pd.DataFrame({'teilnehmer_id': teilnehmer_ids,
+                           'Punkte alt': [self.teilnehmer_id_to_punkte_alt[t] for t in teilnehmer_ids],
+                           'Punkte neu': [self.teilnehmer_id_to_punkte_neu[t] for t in teilnehmer_ids]})
+        df['Differenz'] = df['Punkte neu'] - df['Punkte alt']
+        return df
+
+    def _add(self, teilnehmer_ids: np.ndarray, punkte_alt: np.ndarray, punkte_neu: np.ndarray):
+        unique_ids, inverse = np.unique(teilnehmer_ids.ravel(), return_inverse=True)
+        summe_alt = np.bincount(inverse, weights=punkte_alt.ravel(), minlength=len(unique_ids))
+        summe_neu = np.bincount(inverse, weights=punkte_neu.ravel(), minlength=len(unique_ids))
+        for teilnehmer_id, alt, neu in zip(unique_ids.tolist(), summe_alt.tolist(), summe_neu.tolist()):
+            self.teilnehmer_id_to_punkte_alt[teilnehmer_id] = self.teilnehmer_id_to_punkte_alt.get(teilnehmer_id,
+                                                                                                   0.0) + alt
+            self.teilnehmer_id_to_punkte_neu[teilnehmer_id] = self.teilnehmer_id_to_punkte_neu.get(teilnehmer_id,
+                                                                                                   0.0) + neu
+
+
+def rescore(punkteconfig: Punkteconfig,
+            runde_ids: Union[None, List[int]] = None,
+            active: bool = True,
+            write: bool = False,
+            chunk_size: int = 10000,
+            session: sessionmaker() = None) -> RescoringReport:
+    # Re-scores the stored games under another Punkteconfig in chunks of chunk_size Einzelspiele. With write=True
+    # the changed Resultat.punkte and Einzelspiel.spielpunkte are written back, one transaction per chunk. A given
+    # session is not committed, its transaction belongs to the caller.
+    actual_session = build_session(session)
+    report = RescoringReport(written=write)
+    last_id = 0
+    while True:
+        chunk = _get_chunk(actual_session, punkteconfig, last_id, chunk_size, runde_ids, active)
+        if chunk is None:
+            break
+        einzelspiel_ids, resultat_ids, batch_config, punkte_alt, spielpunkte_alt = chunk
+        calculator = BatchCalculator(batch_config)
+        punkte_neu = calculator.get_punkte()
+        spielpunkte_neu = calculator.get_spielpunkte()
+        geaendert = np.any(punkte_neu != punkte_alt, axis=1) | (spielpunkte_neu != spielpunkte_alt)
+        report.einzelspiele += len(einzelspiel_ids)
+        report.geaenderte_einzelspiele += int(geaendert.sum())
+        report._add(batch_config.teilnehmer_ids, punkte_alt, punkte_neu)
+        if write and geaendert.any():
+            _write_chunk(actual_session, einzelspiel_ids[geaendert], spielpunkte_neu[geaendert],
+                         resultat_ids[geaendert], punkte_neu[geaendert], commit=session is None)
+        last_id = int(einzelspiel_ids[-1])
+    close_session(actual_session, session)
+    return report
+
+
+def _get_chunk(session: sessionmaker(), punkteconfig: Punkteconfig, last_id: int, chunk_size: int,
+               runde_ids: Union[None, List[int]],
+               active: bool) -> Union[None, Tuple[np.ndarray, np.ndarray, BatchConfig, np.ndarray, np.ndarray]]:
+    e = Einzelspiel.__table__
+    bedingungen = [e.c.id > last_id]
+    if active:
+        bedingungen.append(e.c.is_active == True)
+    if runde_ids is not None:
+        bedingungen.append(e.c.runde_id.in_(runde_ids))
+    query = select([e.c.id, e.c.spielart, e.c.laufende, e.c.schwarz, e.c.durchmarsch, e.c.tout, e.c.ansager_id,
+                    e.c.partner_id, e.c.ausspieler_id, e.c.mittelhand_id, e.c.hinterhand_id, e.c.geberhand_id,
+                    e.c.spielpunkte]).where(and_(*bedingungen)).order_by(e.c.id).limit(chunk_size)
+    rows = [tuple(row) for row in session.execute(query).fetchall()]
+    if len(rows) == 0:
+        return None
+    (ids, spielarten, laufende, schwarz, durchmarsch, tout, ansager_ids, partner_ids, ausspieler_ids, mittelhand_ids,
+     hinterhand_ids, geberhand_ids, spielpunkte) = zip(*rows)
+    einzelspiel_ids = np.array(ids, dtype=np.int64)
+    spielarten = np.array([SPIELART_TO_VALUE[s] for s in spielarten], dtype=np.int64)
+    teilnehmer_ids = np.array([ausspieler_ids, mittelhand_ids, hinterhand_ids, geberhand_ids], dtype=np.int64).T
+    spielpunkte_alt = np.array(spielpunkte, dtype=np.float64)
+
+    # Resultate and Verdopplungen are fetched by id range to avoid huge IN lists, joined with the Einzelspiele to
+    # skip those of other Runden and inactive ones
+    bedingungen.append(e.c.id <= int(einzelspiel_ids[-1]))
+    r = Resultat.__table__
+    resultate = np.array([tuple(row) for row in session.execute(
+        select([r.c.einzelspiel_id, r.c.teilnehmer_id, r.c.id, r.c.augen, r.c.punkte, r.c.gewonnen])
+        .select_from(r.join(e, r.c.einzelspiel_id == e.c.id)).where(and_(*bedingungen))).fetchall()],
+                         dtype=np.float64).reshape(-1, 6)
+    found, row, seat = _locate(einzelspiel_ids, teilnehmer_ids, resultate[:, 0], resultate[:, 1])
+    resultate = resultate[found]
+    resultat_ids = np.zeros((len(rows), 4), dtype=np.int64)
+    augen = np.zeros((len(rows), 4), dtype=np.float64)
+    punkte_alt = np.zeros((len(rows), 4), dtype=np.float64)
+    gewonnen = np.zeros((len(rows), 4), dtype=bool)
+    resultat_ids[row, seat] = resultate[:, 2]
+    augen[row, seat] = resultate[:, 3]
+    punkte_alt[row, seat] = resultate[:, 4]
+    gewonnen[row, seat] = resultate[:, 5] == 1
+
+    v = Verdopplung.__table__
+    verdopplungen = session.execute(
+        select([v.c.einzelspiel_id, v.c.doppler, func.count()])
+        .select_from(v.join(e, v.c.einzelspiel_id == e.c.id)).where(and_(*bedingungen))
+        .group_by(v.c.einzelspiel_id, v.c.doppler)).fetchall()
+    doppler = {d.name: np.zeros(len(rows), dtype=np.int64) for d in Doppler}
+    positions = np.searchsorted(einzelspiel_ids, [d[0] for d in verdopplungen])
+    for position, (einzelspiel_id, name, count) in zip(positions, verdopplungen):
+        if position < len(rows) and einzelspiel_ids[position] == einzelspiel_id:
+            doppler[name][position] = count
+
+    ansager = get_positionen(teilnehmer_ids, np.array([-1 if a is None else a for a in ansager_ids], dtype=np.int64))
+    ansager_gewonnen = np.take_along_axis(gewonnen, np.maximum(ansager, 0)[:, None], axis=1)[:, 0]
+    tout = np.array(tout, dtype=bool)
+    durchmarsch = np.array(durchmarsch, dtype=bool)
+    batch_config = BatchConfig(punkteconfig=punkteconfig,
+                               teilnehmer_ids=teilnehmer_ids,
+                               spielart=spielarten,
+                               spieler_augen=np.take_along_axis(augen, np.maximum(ansager, 0)[:, None],
+                                                                axis=1)[:, 0].astype(np.int64),
+                               laufende=np.array(laufende, dtype=np.int64),
+                               gelegt=doppler[Doppler.GELEGT.name],
+                               kontriert=doppler[Doppler.KONTRIERT.name] > 0,
+                               re=doppler[Doppler.RE.name] > 0,
+                               tout_gespielt_gewonnen=tout & ansager_gewonnen,
+                               tout_gespielt_verloren=tout & ~ansager_gewonnen,
+                               schwarz=np.array(schwarz, dtype=bool),
+                               jungfrauen=doppler[Doppler.JUNGFRAU.name],
+                               durchmarsch=durchmarsch,
+                               ansager=ansager,
+                               partner=get_positionen(teilnehmer_ids,
+                                                      np.array([-1 if p is None else p for p in partner_ids],
+                                                               dtype=np.int64)),
+                               verlierer=np.where(durchmarsch, -1, np.argmin(gewonnen, axis=1)),
+                               durchmarsch_spieler=np.where(durchmarsch, np.argmax(gewonnen, axis=1), -1))
+    return einzelspiel_ids, resultat_ids, batch_config, punkte_alt, spielpunkte_alt
+
+
+def _locate(einzelspiel_ids: np.ndarray, teilnehmer_ids: np.ndarray, resultat_einzelspiel_ids: np.ndarray,
+            resultat_teilnehmer_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Maps every Resultat row to the row of its Einzelspiel and the seat of its Teilnehmer
+    row = np.searchsorted(einzelspiel_ids, resultat_einzelspiel_ids.astype(np.int64))
+    row = np.minimum(row, len(einzelspiel_ids) - 1)
+    found = einzelspiel_ids[row] == resultat_einzelspiel_ids
+    seats = teilnehmer_ids[row] == resultat_teilnehmer_ids.astype(np.int64)[:, None]
+    found &= seats.any(axis=1)
+    return found, row[found], np.argmax(seats[found], axis=1)
+
+
+def _write_chunk(session: sessionmaker(), einzelspiel_ids: np.ndarray, spielpunkte: np.ndarray,
+                 resultat_ids: np.ndarray, punkte: np.ndarray, commit: bool):
+    e = Einzelspiel.__table__
+    r = Resultat.__table__
+    session.execute(e.update().where(e.c.id == bindparam('b_id')).values(spielpunkte=bindparam('b_spielpunkte')),
+                    [{'b_id': i, 'b_spielpunkte': p} for i, p in zip(einzelspiel_ids.tolist(), spielpunkte.tolist())])
+    session.execute(r.update().where(r.c.id == bindparam('b_id')).values(punkte=bindparam('b_punkte')),
+                    [{'b_id': i, 'b_punkte': p} for i, p in zip(resultat_ids.ravel().tolist(), punkte.ravel().tolist())
+                     if i > 0])
+    if commit:
+        session.commit()
@@ -1,34 +1,181 @@
+import functools
 import os
+import threading
+from contextlib import contextmanager
+from typing import Callable
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import QueuePool
 
-from schafkopf.utils.settings_utils import get_db, get_database_url, Database
+from schafkopf.database.sqlite_profile import create_sqlite_engine, get_sqlite_profile
+from schafkopf.utils.settings_utils import get_db, get_database_url, get_reader_database_url, Database
+
+
+class RequestSession(Session):
+    # While it is the session of a request, commit only flushes and close does nothing, such that all query helpers,
+    # validators and writers of a callback share one transaction and one connection. The request commits or rolls
+    # back at its end, see Sessions.end_request. Whether it has written is kept in info['has_written'], its later reads
+    # then stay on the writer engine.
+    request_scoped = False
+
+    def execute(self, clause, *args, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info['has_written'] = True
+        return super().execute(clause, *args, **kwargs)
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self.info['has_written'] = True
+        super().flush(objects)
+
+    def commit(self):
+        if self.request_scoped:
+            self.flush()
+        else:
+            super().commit()
+
+    def close(self):
+        if not self.request_scoped:
+            super().close()
 
 
 class Sessions:
     if 'DATABASE_URL' in os.environ:
         # On Heroku Server for production environment
         engine = create_engine(os.environ['DATABASE_URL'], poolclass=QueuePool, pool_size=15, max_overflow=0)
+        reader_engine = None
+        if 'READER_DATABASE_URL' in os.environ:
+            reader_engine = create_engine(os.environ['READER_DATABASE_URL'], poolclass=QueuePool, pool_size=15,
+                                          max_overflow=0)
     else:
         if get_db() == Database.SQLITE:
-            # Using sqlite
-            engine = create_engine(get_database_url(), poolclass=NullPool)
+            # Using sqlite, with the profile of settings.ini
+            engine = create_sqlite_engine(get_database_url(), get_sqlite_profile())
+            try:
+                reader_engine = create_sqlite_engine(get_reader_database_url(), get_sqlite_profile(), read_only=True)
+            except ValueError:
+                reader_engine = None
         elif get_db() == Database.POSTGRES:
             # Using the Heroku postgres database locally
             # This is the explanation on Heroku, but it die not work for me
             # engine = psycopg2.connect(os.environ['DATABASE_URL'], sslmode='require')
             # This works if we add a +psycopg2 to the database url
             engine = create_engine(get_database_url())
+            try:
+                reader_engine = create_engine(get_reader_database_url())
+            except ValueError:
+                reader_engine = None
         else:
             raise ValueError
 
+    factory = sessionmaker(class_=RequestSession)
+    _request = threading.local()
+
     @staticmethod
     def get_engine():
         return Sessions.engine
 
+    @staticmethod
+    def get_reader_engine():
+        # Statistics and other reads which may lag behind, e.g. on a replica or a snapshot file. Without a reader_url
+        # the writer engine.
+        return Sessions.engine if Sessions.reader_engine is None else Sessions.reader_engine
+
     @staticmethod
     def get_session():
-        my_session = sessionmaker(bind=Sessions.engine)
-        return my_session()
+        # The session of the current reader scope, otherwise the one of the current request, otherwise a new one
+        session = getattr(Sessions._request, 'reader_session', None)
+        if session is not None:
+            return session
+        session = Sessions.get_request_session()
+        return Sessions.get_new_session() if session is None else session
+
+    @staticmethod
+    def get_request_session():
+        return getattr(Sessions._request, 'session', None)
+
+    @staticmethod
+    def get_new_session():
+        # For work which must not join the transaction of a request, e.g. caches and background threads
+        return Sessions.factory(bind=Sessions.engine)
+
+    @staticmethod
+    def get_new_reader_session():
+        return Sessions.factory(bind=Sessions.get_reader_engine())
+
+    @staticmethod
+    def reads_own_writes() -> bool:
+        # True once the request has written, its reads then see its changes which are not committed yet
+        session = Sessions.get_request_session()
+        return session is not None and session.info.get('has_written', False)
+
+    @staticmethod
+    def read_own_writes():
+        # Keeps the reads of this request on the writer, e.g. to show a game written by an earlier request
+        session = Sessions.get_request_session()
+        if session is not None:
+            session.info['has_written'] = True
+
+    @staticmethod
+    @contextmanager
+    def reader_scope():
+        # The query helpers called without a session share one session of the reader engine. A request which has
+        # written keeps reading through its own session instead.
+        if Sessions.get_reader_engine() is Sessions.engine or Sessions.reads_own_writes() or \
+                getattr(Sessions._request, 'reader_session', None) is not None:
+            yield
+            return
+        session = Sessions.get_new_reader_session()
+        session.request_scoped = True
+        Sessions._request.reader_session = session
+        try:
+            yield
+        finally:
+            Sessions._request.reader_session = None
+            session.request_scoped = False
+            session.rollback()
+            session.close()
+
+    @staticmethod
+    def begin_request():
+        session = Sessions.get_new_session()
+        session.request_scoped = True
+        Sessions._request.session = session
+
+    @staticmethod
+    def end_request(commit: bool = True):
+        session = Sessions.get_request_session()
+        if session is None:
+            return
+        Sessions._request.session = None
+        session.request_scoped = False
+        try:
+            if commit:
+                session.commit()
+            else:
+                session.rollback()
+        finally:
+            session.close()
+
+    @staticmethod
+    @contextmanager
+    def request_scope():
+        Sessions.begin_request()
+        try:
+            yield
+        except BaseException:
+            Sessions.end_request(commit=False)
+            raise
+        Sessions.end_request()
+
+
+def reader_scoped(function: Callable) -> Callable:
+    # Runs the function in Sessions.reader_scope
+    @functools.wraps(function)
+    def reader_scoped_function(*args, **kwargs):
+        with Sessions.reader_scope():
+            return function(*args, **kwargs)
+
+    return reader_scoped_function
@@ -0,0 +1,72 @@
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Union, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from schafkopf.database.configs import PunkteconfigRef
+from schafkopf.database.data_model import Teilnehmer, Runde, Punkteconfig
+from schafkopf.database.session import Sessions
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    # Read-only copy of all Teilnehmer and of the Punkteconfig of every Runde. Validators read from it instead of
+    # querying the database per message.
+    teilnehmer_id_to_name: Mapping[int, str]
+    teilnehmer_id_to_vorname: Mapping[int, str]
+    runde_id_to_punkteconfig: Mapping[int, PunkteconfigRef]
+
+    def get_teilnehmer_name(self, teilnehmer_id: Union[None, int]) -> Union[None, str]:
+        return None if teilnehmer_id is None else self.teilnehmer_id_to_name.get(teilnehmer_id)
+
+    def get_teilnehmer_vorname(self, teilnehmer_id: Union[None, int]) -> Union[None, str]:
+        return None if teilnehmer_id is None else self.teilnehmer_id_to_vorname.get(teilnehmer_id)
+
+    def get_punkteconfig(self, runde_id: Union[None, int]) -> Union[None, PunkteconfigRef]:
+        return None if runde_id is None else self.runde_id_to_punkteconfig.get(runde_id)
+
+    def contains(self, teilnehmer_ids: Iterable[int] = (), runde_ids: Iterable[int] = ()) -> bool:
+        return all(t in self.teilnehmer_id_to_name for t in teilnehmer_ids) and \
+               all(r in self.runde_id_to_punkteconfig for r in runde_ids)
+
+
+def load_snapshot(session: sessionmaker() = None) -> Snapshot:
+    actual_session = Sessions.get_session() if session is None else session
+    teilnehmer = actual_session.query(Teilnehmer.id, Teilnehmer.name, Teilnehmer.vorname).all()
+    runden = actual_session.query(Runde.id, Punkteconfig).join(Punkteconfig, Runde.punkteconfig_id == Punkteconfig.id)
+    runde_id_to_punkteconfig = {runde_id: PunkteconfigRef.from_punkteconfig(p) for runde_id, p in runden.all()}
+    if session is None:
+        actual_session.close()
+    return Snapshot(teilnehmer_id_to_name=MappingProxyType({t.id: t.name for t in teilnehmer}),
+                    teilnehmer_id_to_vorname=MappingProxyType({t.id: t.vorname for t in teilnehmer}),
+                    runde_id_to_punkteconfig=MappingProxyType(runde_id_to_punkteconfig))
+
+
+class _SnapshotHolder:
+    snapshot = None
+
+
+def get_snapshot(teilnehmer_ids: Iterable[int] = (), runde_ids: Iterable[int] = ()) -> Snapshot:
+    # Returns the snapshot of this process. It is reloaded after inserts, updates or deletes of Teilnehmer, Runde or
+    # Punkteconfig and whenever a requested id is missing, e.g. because another process added it.
+    snapshot = _SnapshotHolder.snapshot
+    if snapshot is None or not snapshot.contains(teilnehmer_ids, runde_ids):
+        snapshot = load_snapshot()
+        _SnapshotHolder.snapshot = snapshot
+        logging.info(f'Snapshot loaded with {len(snapshot.teilnehmer_id_to_name)} Teilnehmer and '
+                     f'{len(snapshot.runde_id_to_punkteconfig)} Runden')
+    return snapshot
+
+
+def invalidate_snapshot(*_):
+    _SnapshotHolder.snapshot = None
+
+
+for _mapped_class in [Teilnehmer, Runde, Punkteconfig]:
+    for _identifier in ['after_insert', 'after_update', 'after_delete']:
+        event.listen(_mapped_class, _identifier, invalidate_snapshot)
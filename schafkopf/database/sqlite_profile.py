@@ -0,0 +1,102 @@
+import dataclasses
+import os
+from dataclasses import dataclass
+from typing import Dict, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from schafkopf.utils.settings_utils import get_section
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    # Pragmas set on every new connection, None keeps the default of SQLite. Without a pool_size every session opens
+    # the file again.
+    journal_mode: Union[None, str] = None
+    synchronous: Union[None, str] = None
+    cache_size: Union[None, int] = None
+    mmap_size: Union[None, int] = None
+    temp_store: Union[None, str] = None
+    busy_timeout: Union[None, int] = None
+    pool_size: Union[None, int] = None
+    max_overflow: int = 0
+
+    def get_pragmas(self) -> Dict[str, Union[str, int]]:
+        return {p: getattr(self, p) for p in ['journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store',
+                                              'busy_timeout'] if getattr(self, p) is not None}
+
+
+# DEFAULT is the former behaviour. With WAL the readers of a game night no longer block the writer and vice versa,
+# synchronous NORMAL is durable in WAL mode except for a power loss, a negative cache_size is in KiB.
+PROFILES = dict(DEFAULT=SqliteProfile(),
+                WAL=SqliteProfile(journal_mode='WAL', synchronous='NORMAL', cache_size=-64000, mmap_size=268435456,
+                                  temp_store='MEMORY', busy_timeout=5000, pool_size=5, max_overflow=10))
+
+
+def get_sqlite_profile() -> SqliteProfile:
+    # The profile of the SQLite section of settings.ini, each entry besides profile overrides one of its fields
+    try:
+        entries = dict(get_section('SQLite'))
+    except ValueError:
+        return PROFILES['DEFAULT']
+    name = entries.pop('profile', 'WAL').upper()
+    if name not in PROFILES:
+        raise ValueError(f'Ini is not valid. Unknown SQLite profile {name}.')
+    fields = {f.name: f for f in dataclasses.fields(SqliteProfile)}
+    unknown = set(entries) - set(fields)
+    if len(unknown) > 0:
+        raise ValueError(f'Ini is not valid. Unknown SQLite entries {", ".join(sorted(unknown))}.')
+    overrides = {k: int(v) if k in ['cache_size', 'mmap_size', 'busy_timeout', 'pool_size', 'max_overflow']
+                 else v.upper() for k, v in entries.items()}
+    return dataclasses.replace(PROFILES[name], **overrides)
+
+
+def create_sqlite_engine(database_url: str, profile: SqliteProfile, read_only: bool = False) -> Engine:
+    if profile.pool_size is None:
+        engine = create_engine(database_url, poolclass=NullPool)
+    else:
+        # Pooled connections move between the threads of a gunicorn worker, one thread at a time
+        engine = create_engine(database_url, poolclass=QueuePool, pool_size=profile.pool_size,
+                               max_overflow=profile.max_overflow, connect_args={'check_same_thread': False})
+        event.listen(engine, 'connect', _remember_pid)
+        event.listen(engine, 'checkout', _check_pid)
+    # pysqlite sends no BEGIN before a SAVEPOINT, the savepoint would start the transaction and its RELEASE commit it.
+    # Hence the driver leaves the transactions to SQLAlchemy, which begins them.
+    event.listen(engine, 'connect', _disable_driver_transactions)
+    event.listen(engine, 'begin', _begin)
+    pragmas = profile.get_pragmas()
+    if read_only:
+        # Reader engines, e.g. for a snapshot file, refuse to write
+        pragmas['query_only'] = 'ON'
+    if len(pragmas) > 0:
+        event.listen(engine, 'connect', lambda dbapi_connection, _: _set_pragmas(dbapi_connection, pragmas))
+    return engine
+
+
+def _set_pragmas(dbapi_connection, pragmas: Dict[str, Union[str, int]]):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in pragmas.items():
+        cursor.execute(f'PRAGMA {pragma}={value}')
+    cursor.close()
+
+
+def _disable_driver_transactions(dbapi_connection, _):
+    dbapi_connection.isolation_level = None
+
+
+def _begin(connection):
+    connection.execute('BEGIN')
+
+
+def _remember_pid(_, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+def _check_pid(_, connection_record, connection_proxy):
+    # A connection of the pool must not be shared with a forked worker process, the worker opens its own
+    if connection_record.info['pid'] != os.getpid():
+        connection_record.connection = connection_proxy.connection = None
+        raise DisconnectionError(f'Connection of process {connection_record.info["pid"]} used in {os.getpid()}')
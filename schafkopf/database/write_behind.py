@@ -0,0 +1,228 @@
+import atexit
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Union, List, Tuple, Dict, Any
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, DateTime, select, func, event, \
+    Index
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import WriteBehindStand, Einzelspiel
+from schafkopf.database.queries import insert_spiel, get_einzelspiel_id_by_submission_token
+from schafkopf.database.session import Sessions
+from schafkopf.database.writer import Writer
+from schafkopf.utils.settings_utils import get_write_behind_journal_url, get_write_behind_batch_size
+
+logging.getLogger().setLevel(logging.INFO)
+
+
+class WriteBehindQueue:
+    # Durable queue in front of insert_spiel. put returns as soon as the game is committed to a local SQLite journal,
+    # a background thread writes the journal into the database in batches. Entries are written in the order of their
+    # journal id, hence the games of a Runde keep their order. The id of the last written entry is stored in the same
+    # transaction as the games (WriteBehindStand), so after a crash every entry is written exactly once, also without
+    # a submission token. Tokens only skip games which were also written directly.
+    def __init__(self, journal_url: str, batch_size: int = 100, interval: float = 1.0, max_backoff: float = 60.0):
+        self._batch_size = batch_size
+        self._interval = interval
+        self._max_backoff = max_backoff
+        self._journal_engine = create_engine(journal_url, poolclass=NullPool)
+        event.listen(self._journal_engine, 'connect', _set_synchronous_full)
+        metadata = MetaData()
+        self._eintrag = Table('eintrag', metadata,
+                              Column('id', Integer, primary_key=True),
+                              Column('runde_id', Integer, nullable=False),
+                              Column('spiel', Text, nullable=False),
+                              Column('submission_token', String(36), nullable=True),
+                              Column('created_on', DateTime(), default=datetime.now),
+                              Index('eintrag_submission_token_idx', 'submission_token', unique=True),
+                              sqlite_autoincrement=True)
+        self._journal = Table('journal', metadata, Column('id', String(36), primary_key=True))
+        metadata.create_all(self._journal_engine)
+        # The journal id tells the entries of a recreated journal file apart from the ones already written
+        with self._journal_engine.begin() as connection:
+            self._journal_id = connection.execute(select([self._journal.c.id])).scalar()
+            if self._journal_id is None:
+                self._journal_id = str(uuid.uuid4())
+                connection.execute(self._journal.insert().values(id=self._journal_id))
+        WriteBehindStand.__table__.create(Sessions.get_engine(), checkfirst=True)
+        self._eintrag_id = self._load_eintrag_id()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._written = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        if self.get_depth() > 0:
+            logging.info(f'Write-behind: {self.get_depth()} games of the journal are written again')
+
+    def start(self):
+        self._thread.start()
+
+    def put(self, writer: Writer, submission_token: Union[None, str] = None):
+        einzelspiel, resultate, verdopplungen = writer.get_spiel(submission_token)
+        self.put_spiel(einzelspiel, resultate, verdopplungen)
+
+    def put_spiel(self, einzelspiel: Dict[str, Any], resultate: List[Dict[str, Any]],
+                  verdopplungen: List[Dict[str, Any]]):
+        # A game whose submission token is already in the journal is not put again
+        try:
+            with self._journal_engine.begin() as connection:
+                connection.execute(self._eintrag.insert().values(
+                    runde_id=einzelspiel['runde_id'], submission_token=einzelspiel.get('submission_token'),
+                    spiel=json.dumps([einzelspiel, resultate, verdopplungen])))
+        except IntegrityError:
+            if einzelspiel.get('submission_token') is None:
+                raise
+        self._wake.set()
+
+    def contains(self, submission_token: str) -> bool:
+        query = select([self._eintrag.c.id]).where(self._eintrag.c.submission_token == submission_token)
+        with self._journal_engine.connect() as connection:
+            return connection.execute(query).first() is not None
+
+    def get_depth(self, runde_id: Union[None, int] = None) -> int:
+        # Number of games in the journal which are not in the database yet
+        query = select([func.count()]).select_from(self._eintrag).where(self._eintrag.c.id > self._eintrag_id)
+        if runde_id is not None:
+            query = query.where(self._eintrag.c.runde_id == runde_id)
+        with self._journal_engine.connect() as connection:
+            return connection.execute(query).scalar()
+
+    def flush(self, timeout: Union[None, float] = None) -> bool:
+        self._wake.set()
+        with self._written:
+            return self._written.wait_for(lambda: self.get_depth() == 0, timeout)
+
+    def stop(self, timeout: Union[None, float] = None):
+        # Writes what is in the journal and stops the thread, what is left is written after the next start
+        self._stopped.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def write_batch(self) -> int:
+        eintraege = self._get_eintraege()
+        if len(eintraege) > 0:
+            session = Sessions.get_new_session()
+            try:
+                spiele = [json.loads(spiel) for _, spiel in eintraege]
+                # Games of a submission token which was also written directly, e.g. by another process, are skipped
+                tokens = [s[0].get('submission_token') for s in spiele if s[0].get('submission_token') is not None]
+                geschrieben = {t for t, in session.query(Einzelspiel.submission_token)
+                               .filter(Einzelspiel.submission_token.in_(tokens)).all()} if len(tokens) > 0 else set()
+                for spiel in spiele:
+                    if spiel[0].get('submission_token') not in geschrieben:
+                        insert_spiel(*spiel, session=session)
+                stand = WriteBehindStand.__table__
+                rowcount = session.execute(stand.update()
+                                           .where(stand.c.journal == self._journal_id)
+                                           .where(stand.c.eintrag_id == self._eintrag_id)
+                                           .values(eintrag_id=eintraege[-1][0], updated_on=datetime.now())).rowcount
+                if rowcount != 1:
+                    # Another process wrote this journal in the meantime
+                    session.rollback()
+                    self._eintrag_id = self._load_eintrag_id()
+                    return 0
+                session.commit()
+            finally:
+                session.close()
+            self._eintrag_id = eintraege[-1][0]
+        self._delete_written()
+        return len(eintraege)
+
+    def _get_eintraege(self) -> List[Tuple[int, str]]:
+        query = select([self._eintrag.c.id, self._eintrag.c.spiel]).where(self._eintrag.c.id > self._eintrag_id) \
+            .order_by(self._eintrag.c.id).limit(self._batch_size)
+        with self._journal_engine.connect() as connection:
+            return [(e.id, e.spiel) for e in connection.execute(query).fetchall()]
+
+    def _delete_written(self):
+        with self._journal_engine.begin() as connection:
+            connection.execute(self._eintrag.delete().where(self._eintrag.c.id <= self._eintrag_id))
+
+    def _load_eintrag_id(self) -> int:
+        stand = WriteBehindStand.__table__
+        with Sessions.get_engine().begin() as connection:
+            eintrag_id = connection.execute(select([stand.c.eintrag_id])
+                                            .where(stand.c.journal == self._journal_id)).scalar()
+            if eintrag_id is None:
+                eintrag_id = 0
+                connection.execute(stand.insert().values(journal=self._journal_id, eintrag_id=eintrag_id))
+        return eintrag_id
+
+    def _run(self):
+        backoff = self._interval
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            try:
+                while True:
+                    written = self.write_batch()
+                    with self._written:
+                        self._written.notify_all()
+                    if written == 0:
+                        break
+                    logging.info(f'Write-behind: {written} games written, queue depth {self.get_depth()}')
+                backoff = self._interval
+            except Exception:
+                # The games stay in the journal and are tried again
+                logging.exception(f'Write-behind: writing failed, queue depth {self.get_depth()}, '
+                                  f'next try in {backoff:.0f} s')
+                if self._stopped.wait(backoff):
+                    return
+                backoff = min(2 * backoff, self._max_backoff)
+            if self._stopped.is_set():
+                return
+
+
+def _set_synchronous_full(dbapi_connection, _):
+    # put only returns after the journal is on disk, also in WAL mode
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA synchronous=FULL')
+    cursor.close()
+
+
+class _QueueHolder:
+    queue = None
+    lock = threading.Lock()
+
+
+def get_write_behind_queue() -> Union[None, WriteBehindQueue]:
+    # The queue of this process if settings.ini has a WriteBehind section, otherwise None
+    try:
+        journal_url = get_write_behind_journal_url()
+    except ValueError:
+        return None
+    with _QueueHolder.lock:
+        if _QueueHolder.queue is None:
+            try:
+                batch_size = get_write_behind_batch_size()
+            except ValueError:
+                batch_size = 100
+            _QueueHolder.queue = WriteBehindQueue(journal_url, batch_size=batch_size)
+            _QueueHolder.queue.start()
+            atexit.register(_QueueHolder.queue.stop, 10.0)
+        return _QueueHolder.queue
+
+
+def write_spiel(writer: Writer, submission_token: Union[None, str] = None) -> Union[None, int]:
+    # Writes the game of the writer into the database or, in write-behind mode, into the journal. Only the direct
+    # write returns the Einzelspiel id.
+    queue = get_write_behind_queue()
+    if queue is None:
+        return writer.write(submission_token)
+    queue.put(writer, submission_token)
+    return None
+
+
+def is_spiel_submitted(submission_token: Union[None, str]) -> bool:
+    # True if the game of the submission token is in the database or in the journal
+    if submission_token is None:
+        return False
+    if get_einzelspiel_id_by_submission_token(submission_token) is not None:
+        return True
+    queue = get_write_behind_queue()
+    return queue is not None and queue.contains(submission_token)
@@ -1,16 +1,56 @@
 from abc import abstractmethod
-from typing import Union
+from typing import Union, Dict, Any, List, Tuple
 
 from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, NormalspielCalculator, \
-    RufspielHochzeitCalculator, HochzeitCalculator, RamschCalculator
-from schafkopf.database.configs import RamschConfig
-from schafkopf.database.data_model import Spielart, Doppler, Einzelspiel
-from schafkopf.database.queries import insert_einzelspiel, insert_resultat, insert_verdopplung
-from schafkopf.database.session import Sessions
+    RufspielHochzeitCalculator, HochzeitCalculator, RamschCalculator, Abrechnung
+from schafkopf.database.configs import RamschConfig, NormalspielConfig, Config
+from schafkopf.database.data_model import Spielart, Doppler
+from schafkopf.database.queries import insert_spiel
 
 
 class Writer:
-    pass
+    def __init__(self):
+        self._calculator = None
+
+    def write(self, submission_token: Union[None, str] = None) -> int:
+        # Einzelspiel, Resultate and Verdopplungen are written in one transaction, see insert_spiel. A game with an
+        # already stored submission token is not written again, its Einzelspiel id is returned instead.
+        return insert_spiel(*self.get_spiel(submission_token))
+
+    def get_spiel(self, submission_token: Union[None, str] = None) \
+            -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        # Rows of the Einzelspiel, its Resultate and its Verdopplungen, without the Einzelspiel id
+        config = self._calculator.config
+        abrechnung = self._calculator.get_abrechnung()
+        einzelspiel = dict(runde_id=config.runde_id,
+                           geber_id=config.geber_id,
+                           ausspieler_id=config.teilnehmer_ids[0],
+                           mittelhand_id=config.teilnehmer_ids[1],
+                           hinterhand_id=config.teilnehmer_ids[2],
+                           geberhand_id=config.teilnehmer_ids[3],
+                           spielpunkte=abrechnung.spielpunkte,
+                           submission_token=submission_token)
+        einzelspiel.update(self._get_einzelspiel(config, abrechnung))
+        return einzelspiel, self._get_resultate(config, abrechnung), self._get_verdopplungen(config)
+
+    @abstractmethod
+    def _get_einzelspiel(self, config: Config, abrechnung: Abrechnung) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def _get_resultate(self, config: Config, abrechnung: Abrechnung) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def _get_verdopplungen(self, config: Config) -> List[Dict[str, Any]]:
+        pass
+
+    @staticmethod
+    def _resultat(teilnehmer_id: int, augen: float, abrechnung: Abrechnung) -> Dict[str, Any]:
+        return dict(teilnehmer_id=teilnehmer_id,
+                    augen=augen,
+                    punkte=abrechnung.teilnehmer_id_to_punkte.get(teilnehmer_id),
+                    gewonnen=True if teilnehmer_id in abrechnung.gewinner_ids else False)
 
 
 class NormalspielWriter(Writer):
@@ -18,38 +58,19 @@ class NormalspielWriter(Writer):
         super().__init__()
         self._calculator = calculator
 
-    @staticmethod
-    def _eintrag(session, einzelspiel, config, calculator):
-        teilnehmer_id_to_punkte = calculator.get_teilnehmer_id_to_punkte()
-        for spieler in config.get_spieler_ids():
-            insert_resultat(teilnehmer_id=spieler,
-                            einzelspiel_id=einzelspiel.id,
-                            augen=config.spieler_augen,
-                            punkte=teilnehmer_id_to_punkte.get(spieler),
-                            gewonnen=True if spieler in calculator.get_gewinner_ids() else False,
-                            session=session)
-        for nicht_spieler in config.get_nicht_spieler_ids():
-            insert_resultat(teilnehmer_id=nicht_spieler,
-                            einzelspiel_id=einzelspiel.id,
-                            augen=config.nicht_spieler_augen,
-                            punkte=teilnehmer_id_to_punkte.get(nicht_spieler),
-                            gewonnen=True if nicht_spieler in calculator.get_gewinner_ids() else False,
-                            session=session)
-        for teilnehmer_gelegt in config.gelegt_ids:
-            insert_verdopplung(teilnehmer_id=teilnehmer_gelegt,
-                               einzelspiel_id=einzelspiel.id,
-                               doppler=Doppler.GELEGT.name,
-                               session=session)
+    def _get_resultate(self, config: NormalspielConfig, abrechnung: Abrechnung) -> List[Dict[str, Any]]:
+        return [self._resultat(spieler, config.spieler_augen, abrechnung) for spieler in config.get_spieler_ids()] + \
+               [self._resultat(nicht_spieler, config.nicht_spieler_augen, abrechnung)
+                for nicht_spieler in config.get_nicht_spieler_ids()]
+
+    def _get_verdopplungen(self, config: NormalspielConfig) -> List[Dict[str, Any]]:
+        verdopplungen = [dict(teilnehmer_id=teilnehmer_gelegt, doppler=Doppler.GELEGT.name)
+                         for teilnehmer_gelegt in config.gelegt_ids]
         if config.kontriert_id is not None:
-            insert_verdopplung(teilnehmer_id=config.kontriert_id,
-                               einzelspiel_id=einzelspiel.id,
-                               doppler=Doppler.KONTRIERT.name,
-                               session=session)
+            verdopplungen.append(dict(teilnehmer_id=config.kontriert_id, doppler=Doppler.KONTRIERT.name))
         if config.re_id is not None:
-            insert_verdopplung(teilnehmer_id=config.re_id,
-                               einzelspiel_id=einzelspiel.id,
-                               doppler=Doppler.RE.name,
-                               session=session)
+            verdopplungen.append(dict(teilnehmer_id=config.re_id, doppler=Doppler.RE.name))
+        return verdopplungen
 
 
 class RufspielHochzeitWriter(NormalspielWriter):
@@ -57,28 +78,14 @@ class RufspielHochzeitWriter(NormalspielWriter):
         super().__init__(calculator)
         self._calculator = calculator
 
-    def write(self):
-        calculator = self._calculator
-        config = calculator.config
-        session = Sessions.get_session()
-        einzelspiel = insert_einzelspiel(runde_id=config.runde_id,
-                                         ansager_id=config.ansager_id,
-                                         partner_id=config.partner_id,
-                                         geber_id=config.geber_id,
-                                         ausspieler_id=config.teilnehmer_ids[0],
-                                         mittelhand_id=config.teilnehmer_ids[1],
-                                         hinterhand_id=config.teilnehmer_ids[2],
-                                         geberhand_id=config.teilnehmer_ids[3],
-                                         farbe=self._get_farbe(),
-                                         laufende=config.laufende,
-                                         spielart=self._get_spielart(),
-                                         schneider=calculator.is_schneider(),
-                                         schwarz=calculator.is_schwarz(),
-                                         spielpunkte=calculator.get_spielpunkte(),
-                                         session=session)
-        self._eintrag(session, einzelspiel, config, calculator)
-        session.commit()
-        session.close()
+    def _get_einzelspiel(self, config: NormalspielConfig, abrechnung: Abrechnung) -> Dict[str, Any]:
+        return dict(ansager_id=config.ansager_id,
+                    partner_id=config.partner_id,
+                    farbe=self._get_farbe(),
+                    laufende=config.laufende,
+                    spielart=self._get_spielart(),
+                    schneider=abrechnung.schneider,
+                    schwarz=abrechnung.schwarz)
 
     @abstractmethod
     def _get_farbe(self) -> Union[None, str]:
@@ -106,28 +113,14 @@ class SoloWriter(NormalspielWriter):
         super().__init__(calculator)
         self._calculator = calculator
 
-    def write(self):
-        calculator = self._calculator
-        config = calculator.config
-        session = Sessions.get_session()
-        einzelspiel = insert_einzelspiel(runde_id=config.runde_id,
-                                         ansager_id=config.ansager_id,
-                                         geber_id=config.geber_id,
-                                         ausspieler_id=config.teilnehmer_ids[0],
-                                         mittelhand_id=config.teilnehmer_ids[1],
-                                         hinterhand_id=config.teilnehmer_ids[2],
-                                         geberhand_id=config.teilnehmer_ids[3],
-                                         farbe=None if config.farbe is None else config.farbe.name,
-                                         laufende=config.laufende,
-                                         spielart=config.spielart.name,
-                                         schneider=calculator.is_schneider(),
-                                         schwarz=calculator.is_schwarz(),
-                                         tout=config.tout_gespielt_verloren or config.tout_gespielt_gewonnen,
-                                         spielpunkte=calculator.get_spielpunkte(),
-                                         session=session)
-        self._eintrag(session, einzelspiel, config, calculator)
-        session.commit()
-        session.close()
+    def _get_einzelspiel(self, config: NormalspielConfig, abrechnung: Abrechnung) -> Dict[str, Any]:
+        return dict(ansager_id=config.ansager_id,
+                    farbe=None if config.farbe is None else config.farbe.name,
+                    laufende=config.laufende,
+                    spielart=config.spielart.name,
+                    schneider=abrechnung.schneider,
+                    schwarz=abrechnung.schwarz,
+                    tout=config.tout_gespielt_verloren or config.tout_gespielt_gewonnen)
 
 
 class HochzeitWriter(RufspielHochzeitWriter):
@@ -147,44 +140,20 @@ class RamschWriter(Writer):
         super().__init__()
         self._calculator = calculator
 
-    def write(self):
-        calculator = self._calculator
-        config = calculator.config
-        session = Sessions.get_session()
-        einzelspiel = insert_einzelspiel(runde_id=config.runde_id,
-                                         ansager_id=None,
-                                         geber_id=config.geber_id,
-                                         ausspieler_id=config.teilnehmer_ids[0],
-                                         mittelhand_id=config.teilnehmer_ids[1],
-                                         hinterhand_id=config.teilnehmer_ids[2],
-                                         geberhand_id=config.teilnehmer_ids[3],
-                                         spielart=Spielart.RAMSCH.name,
-                                         spielpunkte=calculator.get_spielpunkte(),
-                                         durchmarsch=config.durchmarsch,
-                                         session=session)
-        self._eintrag(session, einzelspiel, config, calculator)
-        session.commit()
-        session.close()
-
-    @staticmethod
-    def _eintrag(session, einzelspiel: Einzelspiel, config: RamschConfig, calculator: RamschCalculator):
-        for teilnehmer, augen in zip(config.teilnehmer_ids, [config.ausspieler_augen,
-                                                             config.mittelhand_augen,
-                                                             config.hinterhand_augen,
-                                                             config.geberhand_augen]):
-            insert_resultat(teilnehmer_id=teilnehmer,
-                            einzelspiel_id=einzelspiel.id,
-                            augen=augen,
-                            punkte=calculator.get_teilnehmer_id_to_punkte().get(teilnehmer),
-                            gewonnen=True if teilnehmer in calculator.get_gewinner_ids() else False,
-                            session=session)
-        for teilnehmer_gelegt in config.gelegt_ids:
-            insert_verdopplung(teilnehmer_id=teilnehmer_gelegt,
-                               einzelspiel_id=einzelspiel.id,
-                               doppler=Doppler.GELEGT.name,
-                               session=session)
-        for teilnehmer_jungfrau in config.jungfrau_ids:
-            insert_verdopplung(teilnehmer_id=teilnehmer_jungfrau,
-                               einzelspiel_id=einzelspiel.id,
-                               doppler=Doppler.JUNGFRAU.name,
-                               session=session)
+    def _get_einzelspiel(self, config: RamschConfig, abrechnung: Abrechnung) -> Dict[str, Any]:
+        return dict(ansager_id=None,
+                    spielart=Spielart.RAMSCH.name,
+                    durchmarsch=config.durchmarsch)
+
+    def _get_resultate(self, config: RamschConfig, abrechnung: Abrechnung) -> List[Dict[str, Any]]:
+        return [self._resultat(teilnehmer, augen, abrechnung)
+                for teilnehmer, augen in zip(config.teilnehmer_ids, [config.ausspieler_augen,
+                                                                     config.mittelhand_augen,
+                                                                     config.hinterhand_augen,
+                                                                     config.geberhand_augen])]
+
+    def _get_verdopplungen(self, config: RamschConfig) -> List[Dict[str, Any]]:
+        return [dict(teilnehmer_id=teilnehmer_gelegt, doppler=Doppler.GELEGT.name)
+                for teilnehmer_gelegt in config.gelegt_ids] + \
+               [dict(teilnehmer_id=teilnehmer_jungfrau, doppler=Doppler.JUNGFRAU.name)
+                for teilnehmer_jungfrau in config.jungfrau_ids]
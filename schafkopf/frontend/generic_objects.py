@@ -1,3 +1,4 @@
+import uuid
 from typing import List, Dict, Union, Tuple
 
 import dash_bootstrap_components as dbc
@@ -7,10 +8,11 @@ import pandas as pd
 import plotly.express as px
 
 from schafkopf.database.analyzer import get_ranking_dataframe_by_runde_ids, get_list_dataframe_by_einzelspiele_ids, \
-    get_stats_by_einzelspiel_ids
+    get_stats_by_einzelspiel_ids, load_stats_daten
 from schafkopf.database.data_model import Farbgebung, Spielart
-from schafkopf.database.queries import get_einzelspiel_ids_by_runde_ids, get_teilnehmers_by_ids, \
-    get_einzelspiele_by_teilnehmer_ids
+from schafkopf.database.queries import get_einzelspiel_ids_by_runde_ids, get_teilnehmer_namen_by_ids, \
+    get_einzelspiel_ids_by_teilnehmer_ids
+from schafkopf.database.session import reader_scoped
 
 
 def wrap_empty_dbc_row() -> dbc.Row:
@@ -203,10 +205,11 @@ def wrap_alert(messages: List[str], color: str = 'info', xl: int = 6, xs: int =
     return dbc.Row([dbc.Col([html.Div(dbc.Alert(m, color=color))], xl=xl, xs=xs) for m in messages])
 
 
+@reader_scoped
 def wrap_stats_by_teilnehmer_ids(teilnehmer_ids: Union[None, List[str]],
                                  details: bool = False) -> Tuple[html.Div, html.Div]:
     teilnehmer_ids = [int(t) for t in teilnehmer_ids if t is not None]
-    einzelspiel_ids = [e.id for e in get_einzelspiele_by_teilnehmer_ids(teilnehmer_ids)]
+    einzelspiel_ids = get_einzelspiel_ids_by_teilnehmer_ids(teilnehmer_ids)
     return _wrap_stats_by_einzelspiele_ids(einzelspiel_ids, details)
 
 
@@ -221,6 +224,7 @@ def _wrap_stats_by_einzelspiele_ids(einzelspiel_ids: Union[None, List[int]],
     return header, body
 
 
+@reader_scoped
 def wrap_stats_by_runde_ids(runde_ids: Union[None, List[str]], details: bool = False) -> Tuple[html.Div, html.Div]:
     runde_ids = [int(r) for r in runde_ids if r is not None]
     if len(runde_ids) == 0:
@@ -240,8 +244,8 @@ def wrap_stats_by_runde_ids(runde_ids: Union[None, List[str]], details: bool = F
 
 def wrap_rufspiel_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str, geberhand_id: str) -> dbc.Card:
     teilnehmer_ids = [int(ausspieler_id), int(mittelhand_id), int(hinterhand_id), int(geberhand_id)]
-    teilnehmers = [get_teilnehmers_by_ids([teilnehmer_id])[0] for teilnehmer_id in teilnehmer_ids]
-    teilnehmers_options = [{'label': f'{t.vorname}', 'value': t.id} for t in teilnehmers]
+    _, teilnehmer_id_to_vorname = get_teilnehmer_namen_by_ids(teilnehmer_ids)
+    teilnehmers_options = [{'label': f'{teilnehmer_id_to_vorname[t]}', 'value': t} for t in teilnehmer_ids]
     farb_options = []
     for f in Farbgebung:
         if f == Farbgebung.HERZ:
@@ -284,15 +288,16 @@ def wrap_rufspiel_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: st
                     dbc.Button('Spiel eintragen', id='rufspiel_spielstand_eintragen_button',
                                color='primary', block=True)),
             ], xl=12, xs=12),
-        ])
+        ]),
+        wrap_submission_token_store('rufspiel_submission_token')
     ]))
     return card
 
 
 def wrap_solo_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str, geberhand_id: str) -> dbc.Card:
     teilnehmer_ids = [int(ausspieler_id), int(mittelhand_id), int(hinterhand_id), int(geberhand_id)]
-    teilnehmers = [get_teilnehmers_by_ids([teilnehmer_id])[0] for teilnehmer_id in teilnehmer_ids]
-    teilnehmers_options = [{'label': f'{t.vorname}', 'value': t.id} for t in teilnehmers]
+    _, teilnehmer_id_to_vorname = get_teilnehmer_namen_by_ids(teilnehmer_ids)
+    teilnehmers_options = [{'label': f'{teilnehmer_id_to_vorname[t]}', 'value': t} for t in teilnehmer_ids]
     farb_options = [{'label': f'{f.name.lower().capitalize()}', 'value': f'{f.name}'} for f in Farbgebung]
     soli_options = [{'label': f'{f.name.lower().capitalize()}', 'value': f'{f.name}'} for f in Spielart if
                     f.value in [2, 3, 4]]
@@ -337,15 +342,16 @@ def wrap_solo_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str, g
                     dbc.Button('Spiel eintragen', id='solo_spielstand_eintragen_button',
                                color='primary', block=True)),
             ], xl=12, xs=12),
-        ])
+        ]),
+        wrap_submission_token_store('solo_submission_token')
     ]))
     return card
 
 
 def wrap_hochzeit_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str, geberhand_id: str) -> dbc.Card:
     teilnehmer_ids = [int(ausspieler_id), int(mittelhand_id), int(hinterhand_id), int(geberhand_id)]
-    teilnehmers = [get_teilnehmers_by_ids([teilnehmer_id])[0] for teilnehmer_id in teilnehmer_ids]
-    teilnehmers_options = [{'label': f'{t.vorname}', 'value': t.id} for t in teilnehmers]
+    _, teilnehmer_id_to_vorname = get_teilnehmer_namen_by_ids(teilnehmer_ids)
+    teilnehmers_options = [{'label': f'{teilnehmer_id_to_vorname[t]}', 'value': t} for t in teilnehmer_ids]
     farb_options = []
     for f in Farbgebung:
         if f == Farbgebung.HERZ:
@@ -387,15 +393,16 @@ def wrap_hochzeit_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: st
                     dbc.Button('Spiel eintragen', id='hochzeit_spielstand_eintragen_button',
                                color='primary', block=True)),
             ], xl=12, xs=12),
-        ])
+        ]),
+        wrap_submission_token_store('hochzeit_submission_token')
     ]))
     return card
 
 
 def wrap_ramsch_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str, geberhand_id: str) -> dbc.Card:
     teilnehmer_ids = [int(ausspieler_id), int(mittelhand_id), int(hinterhand_id), int(geberhand_id)]
-    teilnehmers = [get_teilnehmers_by_ids([teilnehmer_id])[0] for teilnehmer_id in teilnehmer_ids]
-    teilnehmers_options = [{'label': f'{t.vorname}', 'value': t.id} for t in teilnehmers]
+    _, teilnehmer_id_to_vorname = get_teilnehmer_namen_by_ids(teilnehmer_ids)
+    teilnehmers_options = [{'label': f'{teilnehmer_id_to_vorname[t]}', 'value': t} for t in teilnehmer_ids]
     card = dbc.Card(dbc.CardBody([
         dbc.Row([
             dbc.Col([
@@ -412,19 +419,19 @@ def wrap_ramsch_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str,
                 dbc.Row([
                     dbc.Col(
                         [wrap_ramsch_augen_div(augen_id='ramsch_ausspieler_augen',
-                                               teilnehmer_name=teilnehmers[0].vorname)
+                                               teilnehmer_name=teilnehmer_id_to_vorname[teilnehmer_ids[0]])
                          ], xl=6, xs=12),
                     dbc.Col(
                         [wrap_ramsch_augen_div(augen_id='ramsch_mittelhand_augen',
-                                               teilnehmer_name=teilnehmers[1].vorname)
+                                               teilnehmer_name=teilnehmer_id_to_vorname[teilnehmer_ids[1]])
                          ], xl=6, xs=12),
                     dbc.Col(
                         [wrap_ramsch_augen_div(augen_id='ramsch_hinterhand_augen',
-                                               teilnehmer_name=teilnehmers[2].vorname)
+                                               teilnehmer_name=teilnehmer_id_to_vorname[teilnehmer_ids[2]])
                          ], xl=6, xs=12),
                     dbc.Col(
                         [wrap_ramsch_augen_div(augen_id='ramsch_geberhand_augen',
-                                               teilnehmer_name=teilnehmers[3].vorname)
+                                               teilnehmer_name=teilnehmer_id_to_vorname[teilnehmer_ids[3]])
                          ], xl=6, xs=12)
                 ])
             ], xl=6, xs=12)
@@ -440,26 +447,34 @@ def wrap_ramsch_card(ausspieler_id: str, mittelhand_id: str, hinterhand_id: str,
                     dbc.Button('Spiel eintragen', id='ramsch_spielstand_eintragen_button',
                                color='primary', block=True)),
             ], xl=12, xs=12),
-        ])
+        ]),
+        wrap_submission_token_store('ramsch_submission_token')
     ]))
     return card
 
 
+def wrap_submission_token_store(id: str) -> dcc.Store:
+    # Every rendered form gets a token of its own, repeated submits of the same form are written only once
+    return dcc.Store(id=id, data=str(uuid.uuid4()))
+
+
 def wrap_next_game_button() -> html.Div:
     txt = 'Zum nächsten Spiel'
     return html.Div(html.A(dbc.Button(txt, color='primary', id='close', className='ml-auto'), href='/'))
 
 
 def _build_body(einzelspiele_ids: List[int], details: bool):
-    ranking_dataframe = get_ranking_dataframe_by_runde_ids(einzelspiele_ids)
-    list_dataframe = get_list_dataframe_by_einzelspiele_ids(einzelspiele_ids)
+    # All parts of the body share the data, loaded with concurrent queries
+    daten = load_stats_daten(einzelspiele_ids, details)
+    ranking_dataframe = get_ranking_dataframe_by_runde_ids(einzelspiele_ids, daten.resultate)
+    list_dataframe = get_list_dataframe_by_einzelspiele_ids(einzelspiele_ids, daten.resultate)
     ranking_div = wrap_dataframe_table_div(ranking_dataframe)
     ranking_div = html.Div([html.H5('Punktestand'), ranking_div])
     fig = px.line(list_dataframe, x='Einzelspiele', y='Punkte', color='Teilnehmer')
     graph_div = html.Div([html.H5('Verlauf des Punktestands'), html.Div(dbc.Row(dbc.Col(dcc.Graph(figure=fig))))])
     if details:
         spielstatistik, gewonnen, ansager, solo, partner, gegenspieler, ramschspieler, verdopplungen \
-            = get_stats_by_einzelspiel_ids(einzelspiele_ids)
+            = get_stats_by_einzelspiel_ids(einzelspiele_ids, daten)
         spielstatistik_div = html.Div([html.H5('Statistiken der Spielarten'),
                                        wrap_dataframe_table_div(spielstatistik)])
         gewonnen_div = html.Div([html.H5('Teilnehmerstatistiken'),
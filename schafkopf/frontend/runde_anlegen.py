@@ -5,14 +5,13 @@ import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
 
-from schafkopf.database.queries import get_runden
+from schafkopf.database.page_loaders import load_runde_anlegen_seite
 from schafkopf.frontend.generic_objects import wrap_empty_dbc_row, wrap_footer_row
 
 
 def wrap_runde_anlegen_layout():
     current = pathlib.Path(__file__).name.split('.')[0]
-    namen = get_runden(dataframe=True).sort_values("name")["name"].unique().tolist()
-    orte = get_runden(dataframe=True).sort_values("ort")["ort"].unique().tolist()
+    seite = load_runde_anlegen_seite()
     return html.Div([
         dcc.Store(id='create_runde_modal_open_n_clicks', data={'n_clicks': 0}),
         dcc.Store(id='create_runde_modal_close_n_clicks', data={'n_clicks': 0}),
@@ -30,7 +29,7 @@ def wrap_runde_anlegen_layout():
                 dbc.Col([
                     html.Div(html.H5('Runde anlegen'))
                 ])], justify='start'),
-            html.Datalist(id='name_list', children=[html.Option(value=name) for name in namen]),
+            html.Datalist(id='name_list', children=[html.Option(value=name) for name in seite.namen]),
             dbc.Row([
                 dbc.Col([
                     dbc.FormGroup(
@@ -41,7 +40,7 @@ def wrap_runde_anlegen_layout():
                     )
                 ], xl=6, xs=12),
             ]),
-            html.Datalist(id='ort_list', children=[html.Option(value=ort) for ort in orte]),
+            html.Datalist(id='ort_list', children=[html.Option(value=ort) for ort in seite.orte]),
             dbc.Row([
                 dbc.Col([
                     dbc.FormGroup(
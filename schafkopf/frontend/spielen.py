@@ -1,27 +1,17 @@
 import dash_bootstrap_components as dbc
 import dash_html_components as html
 
-from schafkopf.database.queries import get_teilnehmer, \
-    get_latest_einzelspiel_id, get_runde_id_by_einzelspiel_id, get_einzelspiele_by_einzelspiel_ids, get_runden
+from schafkopf.database.page_loaders import load_spielerauswahl_seite
 from schafkopf.frontend.generic_objects import wrap_empty_dbc_row, wrap_select_div, wrap_checklist_div, \
     wrap_footer_row
 
 
 def wrap_spielen_layout():
-    teilnehmers_options = [{'label': f'{s.name}', 'value': f'{s.id}'} for s in get_teilnehmer()]
-    einzelspiel_id = get_latest_einzelspiel_id()
-    runde_id = get_runde_id_by_einzelspiel_id(einzelspiel_id)
-    einzelspiel = get_einzelspiele_by_einzelspiel_ids([einzelspiel_id])
-    geber_id = einzelspiel[0].ausspieler_id if len(einzelspiel) == 1 else None
-    ausspieler_id = einzelspiel[0].mittelhand_id if len(einzelspiel) == 1 else None
-    mittelhand_id = einzelspiel[0].hinterhand_id if len(einzelspiel) == 1 else None
-    hinterhand_id = einzelspiel[0].geberhand_id if len(einzelspiel) == 1 else None
-    if len(einzelspiel) == 1 and einzelspiel[0].geber_id != einzelspiel[0].geberhand_id:
-        geberhand_id = einzelspiel[0].geber_id
-    elif len(einzelspiel) == 1 and einzelspiel[0].geber_id == einzelspiel[0].geberhand_id:
-        geberhand_id = einzelspiel[0].ausspieler_id
-    else:
-        geberhand_id = None
+    seite = load_spielerauswahl_seite()
+    teilnehmers_options = [{'label': f'{name}', 'value': f'{teilnehmer_id}'}
+                           for teilnehmer_id, name in seite.teilnehmer_id_to_name.items()]
+    runden_options = [{'label': f'{r.datum.strftime("%d. %b %Y")} - {r.name} - {r.ort}', 'value': f'{r.id}'}
+                      for r in seite.runden]
     return html.Div([
         html.Div([
             dbc.Modal([
@@ -60,17 +50,15 @@ def wrap_spielen_layout():
                     dbc.Row([
                         dbc.Col([
                             wrap_select_div(form_text='Runde', id='runde_id',
-                                            options=[{'label': f'{r.datum.strftime("%d. %b %Y")} - {r.name} - '
-                                                               f'{r.ort}',
-                                                      'value': f'{r.id}'} for r in get_runden()],
-                                            value=runde_id),
+                                            options=runden_options,
+                                            value=seite.runde_id),
                         ], xl=12, xs=12)]),
                     wrap_empty_dbc_row(),
                     dbc.Row([
                         dbc.Col([
                             wrap_select_div(form_text='Geber', id='geber_id',
                                             options=teilnehmers_options,
-                                            value=geber_id
+                                            value=seite.sitzordnung.geber_id
                                             ),
                         ], xl=10, xs=10)]),
                     wrap_empty_dbc_row(),
@@ -78,7 +66,7 @@ def wrap_spielen_layout():
                         dbc.Col([
                             wrap_select_div(form_text='Ausspieler', id='ausspieler_id',
                                             options=teilnehmers_options,
-                                            value=ausspieler_id
+                                            value=seite.sitzordnung.ausspieler_id
                                             ),
                         ], xl=10, xs=10),
                         dbc.Col([
@@ -91,7 +79,7 @@ def wrap_spielen_layout():
                         dbc.Col([
                             wrap_select_div(form_text='Mittelhand', id='mittelhand_id',
                                             options=teilnehmers_options,
-                                            value=mittelhand_id
+                                            value=seite.sitzordnung.mittelhand_id
                                             ),
                         ], xl=10, xs=10),
                         dbc.Col([
@@ -104,7 +92,7 @@ def wrap_spielen_layout():
                         dbc.Col([
                             wrap_select_div(form_text='Hinterhand', id='hinterhand_id',
                                             options=teilnehmers_options,
-                                            value=hinterhand_id
+                                            value=seite.sitzordnung.hinterhand_id
                                             ),
                         ], xl=10, xs=10),
                         dbc.Col([
@@ -117,7 +105,7 @@ def wrap_spielen_layout():
                         dbc.Col([
                             wrap_select_div(form_text='Geberhand', id='geberhand_id',
                                             options=teilnehmers_options,
-                                            value=geberhand_id
+                                            value=seite.sitzordnung.geberhand_id
                                             ),
                         ], xl=10, xs=10),
                         dbc.Col([
@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import List, Dict, Union
+
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+
+from schafkopf.database.data_model import Spielart
+from schafkopf.database.page_loaders import SpielverlaufSeite, Cursor
+from schafkopf.database.queries import get_teilnehmer, get_runden
+from schafkopf.frontend.generic_objects import wrap_empty_dbc_row, wrap_dash_dropdown_div, wrap_footer_row, \
+    wrap_alert, wrap_html_tbody
+
+
+def wrap_spielverlauf_layout():
+    return html.Div([
+        dcc.Store(id='spielverlauf_cursors', data={'seiten': [None], 'naechster': None}),
+        dbc.Container([
+            wrap_empty_dbc_row(),
+            dbc.Row([
+                dbc.Col([
+                    html.Div(html.H4('Spielverlauf'))
+                ])], justify='start'),
+            dbc.Row([
+                dbc.Col([
+                    wrap_dash_dropdown_div(form_text='Runden', id='spielverlauf_runde_ids',
+                                           options=[{'label': f'{r.datum.strftime("%d. %b %Y")} - {r.name} - '
+                                                              f'{r.ort}', 'value': f'{r.id}'} for r in get_runden()],
+                                           value=[]),
+                ], xl=4, xs=12),
+                dbc.Col([
+                    wrap_dash_dropdown_div(form_text='Teilnehmer', id='spielverlauf_teilnehmer_ids',
+                                           options=[{'label': f'{t.name}', 'value': f'{t.id}'}
+                                                    for t in get_teilnehmer()],
+                                           value=[]),
+                ], xl=4, xs=12),
+                dbc.Col([
+                    wrap_dash_dropdown_div(form_text='Spielarten', id='spielverlauf_spielarten',
+                                           options=[{'label': f'{s.name.capitalize()}', 'value': f'{s.name}'}
+                                                    for s in Spielart],
+                                           value=[]),
+                ], xl=4, xs=12),
+            ]),
+            html.Div(id='spielverlauf_table'),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Button('Neuere Spiele', id='spielverlauf_neuere', color='primary', block=True, disabled=True),
+                ], xl=3, xs=6),
+                dbc.Col([
+                    dbc.Button('Ältere Spiele', id='spielverlauf_aeltere', color='primary', block=True),
+                ], xl=3, xs=6),
+            ]),
+            wrap_footer_row()
+        ]),
+    ])
+
+
+def wrap_spielverlauf_table(seite: SpielverlaufSeite) -> html.Div:
+    if len(seite.zeilen) == 0:
+        return html.Div([wrap_empty_dbc_row(), wrap_alert(['Keine Spiele vorhanden'])])
+    zeilen = []
+    for z in seite.zeilen:
+        punkte = [f'{z.teilnehmer_id_to_name.get(t)} {int(p):+d}' for t, p in z.teilnehmer_id_to_punkte.items()]
+        verdopplungen = [f'{z.teilnehmer_id_to_name.get(t)} {d.capitalize()}' for t, d in z.verdopplungen]
+        zeilen.append(html.Tr([html.Td(z.created_on.strftime('%d.%m.%Y %H:%M')), html.Td(z.runde_name),
+                               html.Td(z.spielart.capitalize()), html.Td(int(z.spielpunkte)),
+                               html.Td(', '.join(punkte)), html.Td(', '.join(verdopplungen))]))
+    header = html.Thead(html.Tr([html.Th(h) for h in ['Datum', 'Runde', 'Spielart', 'Spielpunkte', 'Punkte',
+                                                        'Verdopplungen']]))
+    return html.Div([wrap_empty_dbc_row(),
+                     dbc.Table([header, wrap_html_tbody(zeilen)], striped=True, bordered=True, hover=True)])
+
+
+def to_cursor_data(cursor: Union[None, Cursor]) -> Union[None, List]:
+    # The cursors are kept in a dcc.Store, hence as JSON
+    return None if cursor is None else [cursor[0].isoformat(), cursor[1]]
+
+
+def from_cursor_data(data: Union[None, List]) -> Union[None, Cursor]:
+    return None if data is None else (datetime.fromisoformat(data[0]), data[1])
+
+
+def get_spielverlauf_filter(runde_ids: Union[None, List[str]], teilnehmer_ids: Union[None, List[str]],
+                            spielarten: Union[None, List[str]]) -> Dict:
+    return dict(runde_ids=[int(r) for r in runde_ids or []], teilnehmer_ids=[int(t) for t in teilnehmer_ids or []],
+                spielarten=spielarten or [])
@@ -1,15 +1,22 @@
 from abc import abstractmethod
-from typing import List, Union
+from typing import List, Union, Dict
+
+import numpy as np
 
 from schafkopf.database.configs import RufspielRawConfig, RufspielConfig, SoloRawConfig, SoloConfig, HochzeitRawConfig, \
-    HochzeitConfig, RufspielHochzeitRawConfig, NormalspielRawConfig, RawConfig, RamschRawConfig, RamschConfig
+    HochzeitConfig, RufspielHochzeitRawConfig, NormalspielRawConfig, RawConfig, RamschRawConfig, RamschConfig, \
+    BatchRawConfig
 from schafkopf.database.data_model import Farbgebung, Spielart
-from schafkopf.database.queries import get_teilnehmer_vorname_by_id, get_punkteconfig_by_runde_id
+from schafkopf.database.snapshot import Snapshot, get_snapshot
 
 
 class Validator:
-    def __init__(self, raw_config: RawConfig):
+    def __init__(self, raw_config: RawConfig, snapshot: Snapshot = None):
         self._raw_config = raw_config
+        if snapshot is None:
+            snapshot = get_snapshot(teilnehmer_ids=[t for t in self._list(raw_config.teilnehmer_ids) if t is not None],
+                                    runde_ids=[] if raw_config.runde_id is None else [raw_config.runde_id])
+        self._snapshot = snapshot
         self._validated = False
         self._validation_messages = []
         self._validated_config = None
@@ -23,6 +30,9 @@ class Validator:
     def _validate(self):
         pass
 
+    def _vorname(self, teilnehmer_id: Union[None, int]) -> Union[None, str]:
+        return self._snapshot.get_teilnehmer_vorname(teilnehmer_id)
+
     @staticmethod
     def _integer(var: Union[None, int]) -> int:
         return 0 if var is None else var
@@ -37,15 +47,14 @@ class Validator:
 
 
 class NormalspielValidator(Validator):
-    def __init__(self, raw_config: NormalspielRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: NormalspielRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     def _validate(self):
         pass
 
-    @staticmethod
-    def _validate_kontra_and_re(m: List[str], kontriert_id: List[int], re_id: List[int]):
+    def _validate_kontra_and_re(self, m: List[str], kontriert_id: List[int], re_id: List[int]):
         if len(kontriert_id) >= 2:
             m.append(f'Maximal ein Teilnehmer kann Kontra geben. Momentan: {len(kontriert_id)}.')
         if len(re_id) >= 2:
@@ -53,19 +62,18 @@ class NormalspielValidator(Validator):
         if len(kontriert_id) == 0 and len(re_id) == 1:
             teilnehmer_re = re_id[0]
             m.append(
-                f'Re darf nicht ohne Kontra geben werden. Momentan Re: {get_teilnehmer_vorname_by_id(teilnehmer_re)}')
+                f'Re darf nicht ohne Kontra geben werden. Momentan Re: {self._vorname(teilnehmer_re)}')
 
 
 class RufspielHochzeitValidator(NormalspielValidator):
-    def __init__(self, raw_config: RufspielHochzeitRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: RufspielHochzeitRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     def _validate(self):
         pass
 
-    @staticmethod
-    def _rufspiel_hochzeit_validation(m: List[str], teilnehmer_ids: List[int], ansager_id: Union[None, int],
+    def _rufspiel_hochzeit_validation(self, m: List[str], teilnehmer_ids: List[int], ansager_id: Union[None, int],
                                       partner_id: Union[None, int], kontriert_id: List[int], re_id: List[int],
                                       augen: Union[None, int], laufende: int, schwarz: Union[None, bool],
                                       spieler_nichtspieler_augen: Union[None, bool]):
@@ -74,20 +82,20 @@ class RufspielHochzeitValidator(NormalspielValidator):
                 if len(kontriert_id) == 1 and ansager_id is not None and partner_id is not None:
                     if kontriert_id[0] == ansager_id:
                         m.append(
-                            f'Spieler darf nicht Kontra geben. Momentan: {get_teilnehmer_vorname_by_id(ansager_id)}.')
+                            f'Spieler darf nicht Kontra geben. Momentan: {self._vorname(ansager_id)}.')
                     if kontriert_id[0] == partner_id:
                         m.append(
-                            f'Spieler darf nicht Kontra geben. Momentan: {get_teilnehmer_vorname_by_id(partner_id)}.')
+                            f'Spieler darf nicht Kontra geben. Momentan: {self._vorname(partner_id)}.')
                 if len(re_id) == 1 and ansager_id is not None and partner_id is not None:
                     nicht_spieler = [t for t in teilnehmer_ids if t not in [ansager_id, partner_id]]
                     if re_id[0] == nicht_spieler[0]:
                         m.append(f'Nicht-Spieler darf nicht Re geben. '
-                                 f'Momentan: {get_teilnehmer_vorname_by_id(nicht_spieler[0])}.')
+                                 f'Momentan: {self._vorname(nicht_spieler[0])}.')
                     if re_id[0] == nicht_spieler[1]:
                         m.append(f'Nicht-Spieler darf nicht Re geben. '
-                                 f'Momentan: {get_teilnehmer_vorname_by_id(nicht_spieler[1])}.')
+                                 f'Momentan: {self._vorname(nicht_spieler[1])}.')
             else:
-                m.append(f'Ansager und Partner identisch: {get_teilnehmer_vorname_by_id(ansager_id)}.')
+                m.append(f'Ansager und Partner identisch: {self._vorname(ansager_id)}.')
         if laufende not in [0, 3, 4, 5, 6, 7, 8] or laufende is None:
             m.append(f'Ungültige Anzahl an Laufenden. Bitte 0, 3, 4, 5, 6, 7 oder 8 wählen.')
         if augen is None:
@@ -99,8 +107,8 @@ class RufspielHochzeitValidator(NormalspielValidator):
 
 
 class RufspielValidator(RufspielHochzeitValidator):
-    def __init__(self, raw_config: RufspielRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: RufspielRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     @property
@@ -138,7 +146,7 @@ class RufspielValidator(RufspielHochzeitValidator):
             re_id = None if len(re_id) == 0 else re_id[0]
             self._validated = True
             self._validated_config = RufspielConfig(runde_id=runde_id,
-                                                    punkteconfig=get_punkteconfig_by_runde_id(runde_id),
+                                                    punkteconfig=self._snapshot.get_punkteconfig(runde_id),
                                                     geber_id=geber_id,
                                                     teilnehmer_ids=teilnehmer_ids,
                                                     gelegt_ids=gelegt_ids,
@@ -156,8 +164,8 @@ class RufspielValidator(RufspielHochzeitValidator):
 
 
 class SoloValidator(NormalspielValidator):
-    def __init__(self, raw_config: SoloRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: SoloRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     @property
@@ -200,13 +208,13 @@ class SoloValidator(NormalspielValidator):
             m.append(f'Ungültige Anzahl an Laufenden für {spielart.name.lower().capitalize()}. '
                      f'Bitte 0, 2, 3 oder 4 wählen.')
         if ansager_id is not None and len(kontriert_id) == 1 and kontriert_id[0] == ansager_id:
-            m.append(f'Spieler darf nicht Kontra geben. Momentan: {get_teilnehmer_vorname_by_id(ansager_id)}.')
+            m.append(f'Spieler darf nicht Kontra geben. Momentan: {self._vorname(ansager_id)}.')
         if len(re_id) == 1 and ansager_id is not None:
             nicht_spieler = [t for t in teilnehmer_ids if t not in [ansager_id]]
             for single_re_id in re_id:
                 if single_re_id in nicht_spieler:
                     m.append(f'Nicht-Spieler darf nicht Re geben. Momentan: '
-                             f'{get_teilnehmer_vorname_by_id(nicht_spieler[0])}.')
+                             f'{self._vorname(nicht_spieler[0])}.')
         if tout_gespielt_gewonnen and tout_gespielt_verloren:
             m.append('Ein Tout kann nur gewonnen oder verloren werden. Bitte maximal einen Ausgang des Touts auswählen')
 
@@ -231,7 +239,7 @@ class SoloValidator(NormalspielValidator):
             farbe = None if len(farbe) == 0 else Farbgebung[self._raw_config.farbe[0]]
             self._validated = True
             self._validated_config = SoloConfig(runde_id=runde_id,
-                                                punkteconfig=get_punkteconfig_by_runde_id(runde_id),
+                                                punkteconfig=self._snapshot.get_punkteconfig(runde_id),
                                                 geber_id=geber_id,
                                                 teilnehmer_ids=teilnehmer_ids,
                                                 gelegt_ids=gelegt_ids,
@@ -251,8 +259,8 @@ class SoloValidator(NormalspielValidator):
 
 
 class HochzeitValidator(RufspielHochzeitValidator):
-    def __init__(self, raw_config: HochzeitRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: HochzeitRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     @property
@@ -289,7 +297,7 @@ class HochzeitValidator(RufspielHochzeitValidator):
             re_id = None if len(re_id) == 0 else re_id[0]
             self._validated = True
             self._validated_config = HochzeitConfig(runde_id=runde_id,
-                                                    punkteconfig=get_punkteconfig_by_runde_id(runde_id),
+                                                    punkteconfig=self._snapshot.get_punkteconfig(runde_id),
                                                     geber_id=geber_id,
                                                     teilnehmer_ids=teilnehmer_ids,
                                                     gelegt_ids=gelegt_ids,
@@ -306,8 +314,8 @@ class HochzeitValidator(RufspielHochzeitValidator):
 
 
 class RamschValidator(Validator):
-    def __init__(self, raw_config: RamschRawConfig):
-        super().__init__(raw_config)
+    def __init__(self, raw_config: RamschRawConfig, snapshot: Snapshot = None):
+        super().__init__(raw_config, snapshot)
         self._raw_config = raw_config
 
     @property
@@ -341,7 +349,7 @@ class RamschValidator(Validator):
         augen_valid = True
         for augen_teilnehmer in augen_teilnehmers:
             if augen_teilnehmer[0] is None:
-                m.append(f'Ungültige Augen für {get_teilnehmer_vorname_by_id(augen_teilnehmer[1])} angegeben. Bitte '
+                m.append(f'Ungültige Augen für {self._vorname(augen_teilnehmer[1])} angegeben. Bitte '
                          f'eine Zahl von 0 - 120 angeben.')
                 augen_valid = False
         if augen_valid:
@@ -359,20 +367,20 @@ class RamschValidator(Validator):
                     falsche_jungfrauen = [augen_teilnehmer[1] for augen_teilnehmer in augen_teilnehmers if
                                           augen_teilnehmer[0] > 0 and augen_teilnehmer[1] in jungfrau_ids]
                     if len(falsche_jungfrauen) > 0:
-                        falsche_jungfrauen = '; '.join([get_teilnehmer_vorname_by_id(falsche_jungfrau) for
+                        falsche_jungfrauen = '; '.join([self._vorname(falsche_jungfrau) for
                                                         falsche_jungfrau in falsche_jungfrauen])
                         m.append(f'Jungfrau darf nicht mehr als 0 Augen haben. Momentan: {falsche_jungfrauen}')
                 else:
                     durchmarsch_id = augen_teilnehmers_mit_max_augen[0][1]
                     if len(jungfrau_ids) > 0:
-                        falsche_jungfrauen = '; '.join([get_teilnehmer_vorname_by_id(jungfrau_id) for
+                        falsche_jungfrauen = '; '.join([self._vorname(jungfrau_id) for
                                                         jungfrau_id in jungfrau_ids])
                         m.append(
                             f'Bei einem Durchmarsch darf es keine Jungfrauen geben. Momentan: {falsche_jungfrauen}')
                 if len(augen_teilnehmers_mit_max_augen) == 1:
                     if not durchmarsch:
                         verlierer_id = augen_teilnehmers_mit_max_augen[0][1]
-                    max_augen_teilnehmer = get_teilnehmer_vorname_by_id(augen_teilnehmers_mit_max_augen[0][1])
+                    max_augen_teilnehmer = self._vorname(augen_teilnehmers_mit_max_augen[0][1])
                     if len(manuelle_verlierer_ids) != 0:
                         if durchmarsch:
                             m.append(f'{max_augen_teilnehmer} hat mit {max_augen} Augen einen erfolgreichen Durchmarsch'
@@ -381,9 +389,9 @@ class RamschValidator(Validator):
                             m.append(f'{max_augen_teilnehmer} hat mit {max_augen} Augen eindeutig verloren. Verlierer '
                                      f'darf nicht manuell angegeben werden.')
                 elif len(augen_teilnehmers_mit_max_augen) > 1:
-                    reale_verlierer = '; '.join([get_teilnehmer_vorname_by_id(augen_teilnehmer[1]) for
+                    reale_verlierer = '; '.join([self._vorname(augen_teilnehmer[1]) for
                                                  augen_teilnehmer in augen_teilnehmers_mit_max_augen])
-                    manuelle_verlierer = '; '.join([get_teilnehmer_vorname_by_id(v) for v in manuelle_verlierer_ids])
+                    manuelle_verlierer = '; '.join([self._vorname(v) for v in manuelle_verlierer_ids])
                     if len(manuelle_verlierer_ids) == 0:
                         m.append(f'Bei Augengleichheit muss ein manueller Verlierer gewählt werden. Manuellen '
                                  f'Verlierer aus folgenden Teilnehmern wählen: {reale_verlierer}')
@@ -404,7 +412,7 @@ class RamschValidator(Validator):
                 raise Exception(f'Validation of Ramsch not successful. Cannot return config.')
             self._validated = True
             self._validated_config = RamschConfig(runde_id=runde_id,
-                                                  punkteconfig=get_punkteconfig_by_runde_id(runde_id),
+                                                  punkteconfig=self._snapshot.get_punkteconfig(runde_id),
                                                   geber_id=geber_id,
                                                   teilnehmer_ids=teilnehmer_ids,
                                                   gelegt_ids=gelegt_ids,
@@ -418,3 +426,113 @@ class RamschValidator(Validator):
                                                   durchmarsch=False if durchmarsch_id is None else True)
         else:
             self._validation_messages = m
+
+
+class BatchValidator:
+    # Evaluates the rules of the validators above for all games of a BatchRawConfig at once. The error mask matches
+    # the verdicts of the single validators, messages are only built for the failing games by validating them one by
+    # one, so they are identical as well.
+    def __init__(self, config: BatchRawConfig, snapshot: Snapshot = None):
+        self._config = config
+        self._snapshot = snapshot
+        self._error_mask = None
+
+    def get_error_mask(self) -> np.ndarray:
+        if self._error_mask is None:
+            spielart = self._config.spielart
+            self._error_mask = np.select(
+                [np.isin(spielart, [Spielart.RUFSPIEL.value, Spielart.HOCHZEIT.value]),
+                 spielart == Spielart.RAMSCH.value],
+                [self._rufspiel_hochzeit_errors(), self._ramsch_errors()], default=self._solo_errors())
+        return self._error_mask
+
+    def get_validation_messages(self) -> Dict[int, List[str]]:
+        failing = np.flatnonzero(self.get_error_mask())
+        if len(failing) == 0:
+            return {}
+        snapshot = self._snapshot
+        if snapshot is None:
+            c = self._config
+            teilnehmer_ids = np.concatenate([getattr(c, name)[failing].ravel() for name in BatchRawConfig._lists])
+            snapshot = get_snapshot(teilnehmer_ids=np.unique(teilnehmer_ids[teilnehmer_ids != -1]).tolist(),
+                                    runde_ids=np.unique(c.runde_id[failing][c.runde_id[failing] != -1]).tolist())
+        messages = {}
+        for i, raw_config in zip(failing.tolist(), self._config.get_raw_configs(failing)):
+            messages[i] = _VALIDATORS[type(raw_config)](raw_config, snapshot).validation_messages
+        return messages
+
+    def _kontra_and_re_errors(self) -> np.ndarray:
+        c = self._config
+        kontriert, re = self._count(c.kontriert_id), self._count(c.re_id)
+        return (kontriert >= 2) | (re >= 2) | ((kontriert == 0) & (re == 1))
+
+    def _augen_errors(self, ausgenommen: np.ndarray) -> np.ndarray:
+        c = self._config
+        spieler_augen = np.where(c.spieler_nichtspieler_augen == 1, c.augen, 120 - c.augen)
+        return (c.augen == -1) | ((c.augen != -1) & ~ausgenommen & (c.schwarz == 1) & ~np.isin(spieler_augen, [0, 120]))
+
+    def _rufspiel_hochzeit_errors(self) -> np.ndarray:
+        c = self._config
+        pflichtfeld = (c.runde_id == -1) | (c.ansager_id == -1) | (c.partner_id == -1) | \
+                      ((c.spielart == Spielart.RUFSPIEL.value) & (c.rufsau == 0))
+        spieler = (c.ansager_id != -1) & (c.partner_id != -1)
+        verschieden = spieler & (c.ansager_id != c.partner_id)
+        kontra = verschieden & (self._count(c.kontriert_id) == 1) & (
+                (c.kontriert_id[:, 0] == c.ansager_id) | (c.kontriert_id[:, 0] == c.partner_id))
+        # Only the first two Nicht-Spieler are compared, as in _rufspiel_hochzeit_validation
+        nicht_spieler = (c.teilnehmer_ids != -1) & (c.teilnehmer_ids != c.ansager_id[:, None]) & (
+                c.teilnehmer_ids != c.partner_id[:, None])
+        nicht_spieler &= np.cumsum(nicht_spieler, axis=1) <= 2
+        re = verschieden & (self._count(c.re_id) == 1) & np.any(nicht_spieler & (c.teilnehmer_ids == c.re_id[:, :1]),
+                                                                axis=1)
+        laufende = ~np.isin(np.where(c.laufende == -1, 0, c.laufende), [0, 3, 4, 5, 6, 7, 8])
+        return pflichtfeld | self._kontra_and_re_errors() | kontra | re | (spieler & ~verschieden) | laufende | \
+            self._augen_errors(np.zeros(len(c), dtype=bool))
+
+    def _solo_errors(self) -> np.ndarray:
+        c = self._config
+        pflichtfeld = (c.runde_id == -1) | (c.ansager_id == -1) | (c.spielart == 0)
+        farben = self._count(c.farbe, 0)
+        wenz_geier = np.isin(c.spielart, [Spielart.WENZ.value, Spielart.GEIER.value])
+        farbsolo = c.spielart == Spielart.FARBSOLO.value
+        farbe = (farben > 1) | ((farben == 1) & wenz_geier) | ((farben == 0) & farbsolo)
+        laufende = np.where(c.laufende == -1, 0, c.laufende)
+        laufende = (farbsolo & ~np.isin(laufende, [0, 3, 4, 5, 6, 7, 8])) | \
+            (wenz_geier & ~np.isin(laufende, [0, 2, 3, 4]))
+        ansager = c.ansager_id != -1
+        kontra = ansager & (self._count(c.kontriert_id) == 1) & (c.kontriert_id[:, 0] == c.ansager_id)
+        nicht_spieler = (c.teilnehmer_ids != -1) & (c.teilnehmer_ids != c.ansager_id[:, None])
+        re = ansager & (self._count(c.re_id) == 1) & np.any(nicht_spieler & (c.teilnehmer_ids == c.re_id[:, :1]),
+                                                            axis=1)
+        tout_gespielt = c.tout_gewonnen ^ c.tout_verloren
+        spieler_augen = np.where(c.spieler_nichtspieler_augen == 1, c.augen, 120 - c.augen)
+        tout = (c.tout_gewonnen & c.tout_verloren) | (tout_gespielt & (c.schwarz == 1)) | (
+                (c.augen != -1) & tout_gespielt & c.tout_gewonnen & (spieler_augen < 120))
+        return pflichtfeld | self._kontra_and_re_errors() | farbe | laufende | kontra | re | tout | \
+            self._augen_errors(tout_gespielt)
+
+    def _ramsch_errors(self) -> np.ndarray:
+        c = self._config
+        teilnehmer_ids = c.teilnehmer_ids[:, :4]
+        augen = np.stack([c.ausspieler_augen, c.mittelhand_augen, c.hinterhand_augen, c.geberhand_augen], axis=1)
+        gueltig = np.all(augen != -1, axis=1) & (augen.sum(axis=1) == 120)
+        max_augen = augen.max(axis=1)
+        mit_max_augen = augen == max_augen[:, None]
+        anzahl_max_augen = mit_max_augen.sum(axis=1)
+        durchmarsch = max_augen >= 91
+        jungfrau = np.any((teilnehmer_ids[:, :, None] == c.jungfrau_ids[:, None, :]) &
+                          (c.jungfrau_ids[:, None, :] != -1), axis=2)
+        jungfrauen = np.where(durchmarsch, self._count(c.jungfrau_ids) > 0, np.any(jungfrau & (augen > 0), axis=1))
+        manuelle_verlierer = self._count(c.manuelle_verlierer_ids)
+        verlierer = np.where(anzahl_max_augen == 1, manuelle_verlierer != 0,
+                             (manuelle_verlierer != 1) | ~np.any(
+                                 mit_max_augen & (teilnehmer_ids == c.manuelle_verlierer_ids[:, :1]), axis=1))
+        return (c.runde_id == -1) | ~gueltig | jungfrauen | verlierer
+
+    @staticmethod
+    def _count(ids: np.ndarray, none: int = -1) -> np.ndarray:
+        return (ids != none).sum(axis=1)
+
+
+_VALIDATORS = {RufspielRawConfig: RufspielValidator, SoloRawConfig: SoloValidator,
+               HochzeitRawConfig: HochzeitValidator, RamschRawConfig: RamschValidator}
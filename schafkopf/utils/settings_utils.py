@@ -1,5 +1,6 @@
 import configparser
 import enum
+from typing import Dict
 
 ini = 'settings.ini'
 
@@ -17,6 +18,10 @@ def get_database_url() -> str:
     return get_entry('Database', 'database_url')
 
 
+def get_reader_database_url() -> str:
+    return get_entry('Database', 'reader_url')
+
+
 def get_init_username() -> str:
     return get_entry('Auth', 'username')
 
@@ -25,6 +30,25 @@ def get_init_password() -> str:
     return get_entry('Auth', 'password')
 
 
+def get_write_behind_journal_url() -> str:
+    return get_entry('WriteBehind', 'journal_url')
+
+
+def get_write_behind_batch_size() -> int:
+    return int(get_entry('WriteBehind', 'batch_size'))
+
+
+def get_query_pool_size() -> int:
+    return int(get_entry('QueryPool', 'pool_size'))
+
+
+def get_section(section: str) -> Dict[str, str]:
+    config = _get_settings_ini_config()
+    if section not in config:
+        raise ValueError(f'Ini is not valid. "{section}" section is missing.')
+    return dict(config[section])
+
+
 def get_entry(section: str, entry: str) -> str:
     config = _get_settings_ini_config()
     if section not in config:
@@ -0,0 +1,38 @@
+import random
+
+import numpy as np
+import pytest
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig, BatchConfig
+from tests.helpers import build_random_configs
+
+CALCULATORS = {RufspielConfig: RufspielCalculator, SoloConfig: SoloCalculator, HochzeitConfig: HochzeitCalculator,
+               RamschConfig: RamschCalculator}
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_batch_calculator_matches_calculators(seed: int):
+    configs = build_random_configs(random.Random(seed), 2000)
+    calculator = BatchCalculator(BatchConfig.from_configs(configs))
+    punkte = calculator.get_punkte()
+    spielpunkte = calculator.get_spielpunkte()
+    gewinner = calculator.get_gewinner()
+    for i, c in enumerate(configs):
+        scalar = CALCULATORS[type(c)](c)
+        assert spielpunkte[i] == scalar.get_spielpunkte()
+        assert {t: punkte[i, j] for j, t in enumerate(c.teilnehmer_ids)} == scalar.get_teilnehmer_id_to_punkte()
+        assert [t for j, t in enumerate(c.teilnehmer_ids) if gewinner[i, j]] == scalar.get_gewinner_ids()
+
+
+def test_batch_calculator_zero_sum():
+    configs = build_random_configs(random.Random(4), 500)
+    punkte = BatchCalculator(BatchConfig.from_configs(configs)).get_punkte()
+    assert punkte.shape == (500, 4)
+    assert np.all(punkte.sum(axis=1) == 0.0)
+
+
+def test_batch_config_requires_configs():
+    with pytest.raises(ValueError):
+        BatchConfig.from_configs([])
@@ -1,3 +1,4 @@
+from dataclasses import FrozenInstanceError
 from typing import Dict, List, Tuple, Any, Union
 
 import pytest
@@ -260,6 +261,39 @@ def test_ramsch(gelegt_teilnehmer_names: List[str],
     assert transform_dc_teilnehmer_id_to_teilnehmer_name(result, teilnehmers) == expected
 
 
+def test_abrechnung():
+    runde, ansager, partner, gegner1, gegner2 = init_in_memory_database()
+    c = SoloConfig(runde_id=runde.id,
+                   punkteconfig=runde.punkteconfig,
+                   geber_id=ansager.id,
+                   teilnehmer_ids=[ansager.id, partner.id, gegner1.id, gegner2.id],
+                   gelegt_ids=[partner.id],
+                   ansager_id=ansager.id,
+                   spielart=Spielart.WENZ,
+                   kontriert_id=gegner1.id,
+                   re_id=None,
+                   farbe=None,
+                   tout_gespielt_gewonnen=False,
+                   tout_gespielt_verloren=False,
+                   laufende=2,
+                   spieler_augen=95,
+                   nicht_spieler_augen=25,
+                   schwarz=False)
+    solo = SoloCalculator(c)
+    abrechnung = solo.get_abrechnung()
+    assert solo.get_abrechnung() is abrechnung
+    assert (abrechnung.grundpunkte, abrechnung.punkte_schneider, abrechnung.punkte_schwarz,
+            abrechnung.punkte_laufende, abrechnung.verdopplung) == (50, 10, 0, 20, 4)
+    assert abrechnung.spielpunkte == 320
+    assert abrechnung.gewinner_ids == (ansager.id,)
+    assert abrechnung.verlierer_ids == (partner.id, gegner1.id, gegner2.id)
+    assert dict(abrechnung.teilnehmer_id_to_punkte) == solo.get_teilnehmer_id_to_punkte()
+    with pytest.raises(FrozenInstanceError):
+        abrechnung.spielpunkte = 0
+    with pytest.raises(TypeError):
+        abrechnung.teilnehmer_id_to_punkte[ansager.id] = 0
+
+
 def transform_teilnehmer_names_to_teilnehmer_ids(inputs: List[str], teilnehmer: List[Teilnehmer]) -> List[int]:
     return [{s.name: s.id for s in teilnehmer}[i] for i in inputs]
 
@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.backend.payout_table import get_payout_table, encode_config, encode, SHAPE
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig, BatchConfig
+from schafkopf.database.data_model import Punkteconfig, Spielart
+from tests.helpers import build_random_configs, build_punkteconfig
+
+CALCULATORS = {RufspielConfig: RufspielCalculator, SoloConfig: SoloCalculator, HochzeitConfig: HochzeitCalculator,
+               RamschConfig: RamschCalculator}
+
+PUNKTECONFIGS = [build_punkteconfig(),
+                 Punkteconfig(rufspiel=10, hochzeit=15, laufende=5.0, schneider=2.5, schwarz=20.0, solo=40),
+                 Punkteconfig(rufspiel=5, hochzeit=5, laufende=0.0, schneider=0.0, schwarz=0.0, solo=25)]
+
+
+@pytest.mark.parametrize('punkteconfig', PUNKTECONFIGS)
+def test_payout_table_matches_calculators(punkteconfig: Punkteconfig):
+    table = get_payout_table(punkteconfig)
+    for c in build_random_configs(random.Random(6), 3000, punkteconfig):
+        assert table.get_config_spielpunkte(c) == CALCULATORS[type(c)](c).get_spielpunkte()
+
+
+@pytest.mark.parametrize('punkteconfig', PUNKTECONFIGS)
+def test_payout_table_covers_all_outcomes(punkteconfig: Punkteconfig):
+    # Every Normalspiel outcome is built once as a config and scored by its Calculator
+    table = get_payout_table(punkteconfig)
+    teilnehmer_ids = [1, 2, 3, 4]
+    for spielart in [Spielart.RUFSPIEL, Spielart.HOCHZEIT, Spielart.FARBSOLO, Spielart.WENZ, Spielart.GEIER]:
+        for laufende in range(9):
+            for gelegt in range(5):
+                for kontriert, re, tout in [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1)]:
+                    if tout and spielart in [Spielart.RUFSPIEL, Spielart.HOCHZEIT]:
+                        continue
+                    for spieler_augen, schwarz in [(70, False), (95, False), (120, True), (0, True)]:
+                        common = dict(runde_id=1, punkteconfig=punkteconfig, geber_id=4,
+                                      teilnehmer_ids=teilnehmer_ids, gelegt_ids=teilnehmer_ids[:gelegt],
+                                      ansager_id=1, kontriert_id=3 if kontriert else None, re_id=1 if re else None,
+                                      laufende=laufende, spieler_augen=spieler_augen,
+                                      nicht_spieler_augen=120 - spieler_augen, schwarz=schwarz)
+                        if spielart == Spielart.RUFSPIEL:
+                            c = RufspielConfig(partner_id=2, rufsau=None, **common)
+                        elif spielart == Spielart.HOCHZEIT:
+                            c = HochzeitConfig(partner_id=2, **common)
+                        else:
+                            c = SoloConfig(spielart=spielart, farbe=None, tout_gespielt_gewonnen=bool(tout),
+                                           tout_gespielt_verloren=False, **common)
+                        assert table.get_config_spielpunkte(c) == CALCULATORS[type(c)](c).get_spielpunkte()
+    for durchmarsch in [False, True]:
+        for gelegt in range(5):
+            for jungfrauen in range(4):
+                c = RamschConfig(runde_id=1, punkteconfig=punkteconfig, geber_id=4, teilnehmer_ids=teilnehmer_ids,
+                                 gelegt_ids=teilnehmer_ids[:gelegt], jungfrau_ids=teilnehmer_ids[1:1 + jungfrauen],
+                                 ausspieler_augen=30, mittelhand_augen=30, hinterhand_augen=30, geberhand_augen=30,
+                                 verlierer_id=None if durchmarsch else 1, durchmarsch_id=1 if durchmarsch else None,
+                                 durchmarsch=durchmarsch)
+                assert table.get_config_spielpunkte(c) == RamschCalculator(c).get_spielpunkte()
+
+
+def test_payout_table_batch_lookup():
+    configs = build_random_configs(random.Random(7), 1000)
+    calculator = BatchCalculator(BatchConfig.from_configs(configs))
+    codes = calculator.get_outcome_codes()
+    assert codes.tolist() == [encode_config(c) for c in configs]
+    assert np.all(get_payout_table(build_punkteconfig()).lookup(codes) == calculator.get_spielpunkte())
+
+
+def test_payout_table_cached_per_tarif():
+    assert get_payout_table(build_punkteconfig()) is get_payout_table(build_punkteconfig())
+    assert get_payout_table(PUNKTECONFIGS[0]) is not get_payout_table(PUNKTECONFIGS[1])
+    assert len(get_payout_table(build_punkteconfig())) == int(np.prod(SHAPE))
+
+
+def test_payout_table_rejects_unknown_outcomes():
+    with pytest.raises(ValueError):
+        encode(Spielart.RUFSPIEL.value, False, False, False, 9, 0)
+    with pytest.raises(ValueError):
+        encode(Spielart.RUFSPIEL.value, False, False, False, 0, 8)
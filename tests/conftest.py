@@ -0,0 +1,18 @@
+from typing import List
+
+import pytest
+
+from schafkopf.database.configs import Config
+from tests.helpers import init_database_with_random_games, record_statements
+
+
+@pytest.fixture
+def database(monkeypatch) -> List[Config]:
+    # An in-memory database of Sessions without games, modules override it with their own
+    return init_database_with_random_games(monkeypatch, 0)
+
+
+@pytest.fixture
+def statements(database) -> list:
+    # The statements sent to the database of Sessions during the test
+    return record_statements()
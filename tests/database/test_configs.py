@@ -0,0 +1,52 @@
+import pickle
+from dataclasses import FrozenInstanceError, replace
+
+import pytest
+
+from schafkopf.database.configs import RufspielConfig, RamschConfig, SoloRawConfig, PunkteconfigRef
+from schafkopf.database.data_model import Farbgebung
+from tests.helpers import build_punkteconfig
+
+
+def build_rufspiel_config(**kwargs) -> RufspielConfig:
+    values = dict(runde_id=1, punkteconfig=build_punkteconfig(), geber_id=4, teilnehmer_ids=[1, 2, 3, 4],
+                  gelegt_ids=[2], ansager_id=1, kontriert_id=None, re_id=None, partner_id=3, rufsau=Farbgebung.BLATT,
+                  laufende=3, spieler_augen=70, nicht_spieler_augen=50, schwarz=False)
+    values.update(kwargs)
+    return RufspielConfig(**values)
+
+
+def test_config_is_frozen_and_slotted():
+    c = build_rufspiel_config()
+    assert c.teilnehmer_ids == (1, 2, 3, 4)
+    assert c.gelegt_ids == (2,)
+    assert isinstance(c.punkteconfig, PunkteconfigRef)
+    assert c.punkteconfig.rufspiel == 20 and c.punkteconfig.laufende == 10.0
+    assert not hasattr(c, '__dict__')
+    with pytest.raises(FrozenInstanceError):
+        c.laufende = 4
+    with pytest.raises(AttributeError):
+        c.unknown = 1
+
+
+def test_config_is_hashable():
+    c = build_rufspiel_config()
+    assert c == build_rufspiel_config()
+    assert hash(c) == hash(build_rufspiel_config())
+    assert c != build_rufspiel_config(laufende=4)
+    assert len({c, build_rufspiel_config(), replace(c, laufende=4)}) == 2
+    assert replace(c, laufende=4).punkteconfig is c.punkteconfig
+
+
+def test_configs_pickle():
+    c = build_rufspiel_config()
+    r = RamschConfig(runde_id=1, punkteconfig=c.punkteconfig, geber_id=4, teilnehmer_ids=[1, 2, 3, 4],
+                     gelegt_ids=[], jungfrau_ids=[2, 3], ausspieler_augen=120, mittelhand_augen=0,
+                     hinterhand_augen=0, geberhand_augen=0, verlierer_id=None, durchmarsch_id=1, durchmarsch=True)
+    raw = SoloRawConfig(runde_id=1, geber_id=4, teilnehmer_ids=[1, 2, 3, 4], gelegt_ids=[], ansager_id=1,
+                        kontriert_id=[], re_id=[], laufende=None, spieler_nichtspieler_augen=1, augen=61, schwarz=None,
+                        spielart='WENZ', farbe=[], tout=[0])
+    assert r.jungfrau_ids == (2, 3)
+    assert raw.tout == (0,) and raw.farbe == ()
+    for config in [c, r, raw]:
+        assert pickle.loads(pickle.dumps(config)) == config
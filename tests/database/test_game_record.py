@@ -0,0 +1,84 @@
+import os
+import random
+from typing import List
+
+import numpy as np
+import pytest
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.configs import Config
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung
+from schafkopf.database.game_record import GameRecord, GameRecordWriter, read_records, map_records, \
+    to_batch_config, RECORD
+from schafkopf.database.session import Sessions
+from tests.helpers import build_random_configs, build_punkteconfig, WRITERS, init_database_with_random_games
+
+
+def build_records(configs: List[Config]) -> List[GameRecord]:
+    return [GameRecord.from_config(c, WRITERS[type(c)][0](c).get_abrechnung(), einzelspiel_id=i + 1)
+            for i, c in enumerate(configs)]
+
+
+def test_game_record_config_round_trip():
+    configs = build_random_configs(random.Random(8), 2000)
+    for c, record in zip(configs, build_records(configs)):
+        assert len(record.pack()) == RECORD.size
+        assert GameRecord.unpack(record.pack()) == record
+        assert record.to_config(c.punkteconfig) == c
+
+
+def test_game_record_file_round_trip(tmp_path):
+    configs = build_random_configs(random.Random(9), 5000)
+    records = build_records(configs)
+    path = os.path.join(tmp_path, 'spiele.skgr')
+    with GameRecordWriter(path) as writer:
+        writer.write(records[0])
+        writer.write_many(records[1:])
+    assert list(read_records(path, chunk_records=1000)) == records
+
+    mapped = map_records(path)
+    assert len(mapped) == len(records)
+    assert mapped['einzelspiel_id'].tolist() == list(range(1, len(records) + 1))
+    calculator = BatchCalculator(to_batch_config(mapped, build_punkteconfig()))
+    assert np.all(calculator.get_punkte() == mapped['punkte'])
+    assert np.all(calculator.get_spielpunkte() == mapped['spielpunkte'])
+
+    copy = os.path.join(tmp_path, 'kopie.skgr')
+    with GameRecordWriter(copy) as writer:
+        writer.write_array(mapped)
+    assert list(read_records(copy)) == records
+
+
+def test_game_record_rejects_other_files(tmp_path):
+    path = os.path.join(tmp_path, 'spiele.skgr')
+    with open(path, 'wb') as f:
+        f.write(b'no game records')
+    with pytest.raises(ValueError):
+        list(read_records(path))
+    with pytest.raises(ValueError):
+        map_records(path)
+
+
+def test_game_record_orm_round_trip(monkeypatch):
+    configs = init_database_with_random_games(monkeypatch, 200)
+    session = Sessions.get_session()
+    for c, einzelspiel in zip(configs, session.query(Einzelspiel).order_by(Einzelspiel.id).all()):
+        record = GameRecord.from_rows(einzelspiel, einzelspiel.resultate, einzelspiel.verdopplungen)
+        assert record == GameRecord.from_config(c, WRITERS[type(c)][0](c).get_abrechnung(), einzelspiel.id)
+        assert record.to_config(c.punkteconfig) == c
+
+        e, resultate, verdopplungen = record.to_rows()
+        for column in Einzelspiel.__table__.columns.keys():
+            if column not in ['created_on', 'updated_on']:
+                assert getattr(e, column) == getattr(einzelspiel, column)
+        assert _resultate(resultate) == _resultate(einzelspiel.resultate)
+        assert _verdopplungen(verdopplungen) == _verdopplungen(einzelspiel.verdopplungen)
+    session.close()
+
+
+def _resultate(resultate: List[Resultat]) -> set:
+    return {(r.teilnehmer_id, r.einzelspiel_id, r.augen, r.punkte, r.gewonnen) for r in resultate}
+
+
+def _verdopplungen(verdopplungen: List[Verdopplung]) -> set:
+    return {(v.teilnehmer_id, v.einzelspiel_id, v.doppler) for v in verdopplungen}
@@ -0,0 +1,175 @@
+import csv
+import json
+import random
+from typing import List, Dict, Any
+
+import pytest
+
+import schafkopf.database.importer
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.database.configs import RawConfig, RamschRawConfig, SoloRawConfig, RufspielRawConfig
+from schafkopf.database.data_model import Punkteconfig, Teilnehmer, Runde
+from schafkopf.database.importer import import_spiele, SPALTEN, SITZE
+from schafkopf.database.session import Sessions
+from schafkopf.database.snapshot import invalidate_snapshot
+from schafkopf.database.writer import RufspielWriter, SoloWriter, HochzeitWriter, RamschWriter
+from tests.frontend.test_batch_validator import build_random_raw_configs, VALIDATORS
+from tests.helpers import init_in_memory_engine, dump_database
+
+CALCULATORS = {RufspielWriter: RufspielCalculator, SoloWriter: SoloCalculator, HochzeitWriter: HochzeitCalculator,
+               RamschWriter: RamschCalculator}
+WRITERS = {'RufspielRawConfig': RufspielWriter, 'SoloRawConfig': SoloWriter, 'HochzeitRawConfig': HochzeitWriter,
+           'RamschRawConfig': RamschWriter}
+
+
+def init_empty_database(monkeypatch):
+    monkeypatch.setattr(Sessions, 'engine', init_in_memory_engine())
+    session = Sessions.get_session()
+    session.add(Punkteconfig())
+    session.commit()
+    session.close()
+    invalidate_snapshot()
+
+
+def name(teilnehmer_id: int) -> str:
+    return f'Nachname{teilnehmer_id}, Vorname{teilnehmer_id}'
+
+
+def to_spiel(r: RawConfig) -> Dict[str, Any]:
+    # Line of an import file for a raw config of the BatchValidator tests, augen are the Augen of the Spieler
+    spiel = dict(runde='' if r.runde_id is None else 'Sonntagsspiel', datum='2020-01-05', ort='Nürnberg',
+                 geber=name(r.geber_id), gelegt=[name(t) for t in r.gelegt_ids])
+    spiel.update({s: name(t) for s, t in zip(SITZE, r.teilnehmer_ids)})
+    if isinstance(r, RamschRawConfig):
+        spiel.update(spielart='RAMSCH', ausspieler_augen=r.ausspieler_augen, mittelhand_augen=r.mittelhand_augen,
+                     hinterhand_augen=r.hinterhand_augen, geberhand_augen=r.geberhand_augen,
+                     jungfrauen=[name(t) for t in r.jungfrau_ids],
+                     verlierer=[name(t) for t in r.manuelle_verlierer_ids])
+        return spiel
+    augen = r.augen if r.augen is None or r.spieler_nichtspieler_augen == 1 else 120 - r.augen
+    spiel.update(ansager=None if r.ansager_id is None else name(r.ansager_id), kontra=[name(t) for t in r.kontriert_id],
+                 re=[name(t) for t in r.re_id], laufende=r.laufende, augen=augen, schwarz=r.schwarz)
+    if isinstance(r, SoloRawConfig):
+        spiel.update(spielart=r.spielart, farbe=r.farbe[0] if len(r.farbe) == 1 else None,
+                     tout={(): None, (0,): 'gewonnen', (1,): 'verloren'}[r.tout])
+    else:
+        spiel.update(spielart='RUFSPIEL' if isinstance(r, RufspielRawConfig) else 'HOCHZEIT',
+                     partner=None if r.partner_id is None else name(r.partner_id), rufsau=getattr(r, 'rufsau', None))
+    return spiel
+
+
+def build_import_raw_configs(n: int) -> List[RawConfig]:
+    # Without what a file cannot express: Teilnehmer who do not play, both outcomes of a Tout, several Farben
+    raw_configs = []
+    for r in build_random_raw_configs(random.Random(9), n):
+        ids = [getattr(r, a) for a in ['ansager_id', 'partner_id'] if getattr(r, a, None) is not None]
+        for a in ['gelegt_ids', 'kontriert_id', 're_id', 'jungfrau_ids', 'manuelle_verlierer_ids']:
+            ids += list(getattr(r, a, ()))
+        if 5 in ids or len(getattr(r, 'tout', ())) > 1 or len(getattr(r, 'farbe', ())) > 1:
+            continue
+        if isinstance(r, SoloRawConfig) and r.spielart is None:
+            continue
+        raw_configs.append(r)
+    return raw_configs
+
+
+def write_file(path: str, spiele: List[Dict[str, Any]]):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=SPALTEN)
+            writer.writeheader()
+            for spiel in spiele:
+                writer.writerow({k: ';'.join(v) if isinstance(v, list) else v for k, v in spiel.items()})
+        else:
+            for spiel in spiele:
+                f.write(json.dumps(spiel) + '\n')
+
+
+@pytest.mark.parametrize('extension', ['csv', 'jsonl'])
+def test_import_matches_writers(monkeypatch, tmpdir, extension: str):
+    raw_configs = build_import_raw_configs(1500)
+    init_empty_database(monkeypatch)
+    session = Sessions.get_session()
+    session.add_all([Teilnehmer(id=i, name=name(i), vorname=f'Vorname{i}', nachname=f'Nachname{i}')
+                     for i in range(1, 5)] + [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    gueltig = 0
+    for r in raw_configs:
+        validator = VALIDATORS[type(r)](r)
+        if len(validator.validation_messages) == 0:
+            writer_type = WRITERS[type(r).__name__]
+            writer_type(CALCULATORS[writer_type](validator.validated_config)).write()
+            gueltig += 1
+    expected = dump_database()
+
+    init_empty_database(monkeypatch)
+    path = str(tmpdir.join(f'spiele.{extension}'))
+    write_file(path, [to_spiel(r) for r in raw_configs])
+    report = import_spiele(path, chunk_size=400)
+    assert report.spiele == len(raw_configs)
+    assert report.importiert == gueltig
+    assert report.abgelehnt == len(raw_configs) - gueltig
+    assert report.neue_teilnehmer == 4
+    assert report.neue_runden == 1
+    assert report.checkpoint == len(raw_configs)
+    assert 0 < gueltig < len(raw_configs)
+    assert dump_database() == expected
+
+
+def test_import_resume(monkeypatch, tmpdir):
+    raw_configs = build_import_raw_configs(600)
+    init_empty_database(monkeypatch)
+    path = str(tmpdir.join('spiele.jsonl'))
+    write_file(path, [to_spiel(r) for r in raw_configs])
+    complete = import_spiele(path, checkpoint_path=str(tmpdir.join('complete.checkpoint')))
+    expected = dump_database()
+
+    init_empty_database(monkeypatch)
+    import_chunk = schafkopf.database.importer._import_chunk
+    chunks = []
+
+    def interrupted_import_chunk(*args):
+        if len(chunks) == 2:
+            raise KeyboardInterrupt
+        chunks.append(args[1])
+        import_chunk(*args)
+
+    monkeypatch.setattr(schafkopf.database.importer, '_import_chunk', interrupted_import_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        import_spiele(path, chunk_size=100)
+    with open(f'{path}.checkpoint') as f:
+        assert json.load(f) == {'spiele': 200}
+    monkeypatch.setattr(schafkopf.database.importer, '_import_chunk', import_chunk)
+    report = import_spiele(path, chunk_size=100, resume=True)
+    assert report.spiele == len(raw_configs) - 200
+    assert report.checkpoint == len(raw_configs)
+    assert dump_database() == expected
+    assert complete.importiert == len(expected[0])
+    assert import_spiele(path, resume=True).spiele == 0
+
+
+def test_import_rejects_lines(monkeypatch, tmpdir):
+    init_empty_database(monkeypatch)
+    path = str(tmpdir.join('spiele.jsonl'))
+    spiel = dict(runde='Sonntagsspiel', datum='2020-01-05', ort='Nürnberg', spielart='WENZ', geber=name(4),
+                 ausspieler=name(1), mittelhand=name(2), hinterhand=name(3), geberhand=name(4), ansager=name(2),
+                 augen=61)
+    write_file(path, [spiel, dict(spiel, spielart='BOCK'), dict(spiel, ansager='Fremder, Gast'),
+                      dict(spiel, mittelhand='Ohne Komma', ansager=name(1)), dict(spiel, datum='5.1.2020'),
+                      dict(spiel, geber=name(1)), dict(spiel, laufende=7)])
+    report = import_spiele(path)
+    assert (report.importiert, report.abgelehnt, report.neue_teilnehmer) == (1, 6, 4)
+
+
+def test_import_normalizes_namen(monkeypatch, tmpdir):
+    init_empty_database(monkeypatch)
+    path = str(tmpdir.join('spiele.jsonl'))
+    spiel = dict(runde='Sonntagsspiel', datum='2020-01-05', ort='Nürnberg', spielart='WENZ', geber=name(4),
+                 ausspieler=name(1), mittelhand=name(2), hinterhand=name(3), geberhand=name(4), ansager=name(2),
+                 augen=61)
+    write_file(path, [spiel, dict(spiel, mittelhand='Nachname2,Vorname2', ansager='Nachname2 ,  Vorname2',
+                                  kontra=['  Nachname1,Vorname1 '])])
+    report = import_spiele(path)
+    assert (report.importiert, report.abgelehnt, report.neue_teilnehmer) == (2, 0, 4)
+    assert [t[1] for t in dump_database()[4]] == [name(i) for i in range(1, 5)]
@@ -0,0 +1,65 @@
+from typing import List
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from schafkopf.database.data_model import Einzelspiel
+from schafkopf.database.loader_options import Ladeplan, Laden, SPIELLISTE
+from schafkopf.database.queries import get_einzelspiele_by_einzelspiel_ids, get_einzelspiele_by_teilnehmer_ids, \
+    get_punkteconfig_by_runde_id, get_einzelspiel_ids_by_runde_ids, get_latest_einzelspiel_id, lazy_load_guard
+from schafkopf.database.session import Sessions
+from tests.helpers import init_database_with_random_games
+
+
+@pytest.fixture
+def database(monkeypatch):
+    init_database_with_random_games(monkeypatch, 30)
+
+
+def _render(einzelspiele: List[Einzelspiel]) -> List[str]:
+    # A list of games with the Runde, the seats, the Punkte and the Verdopplungen by name
+    return [f'{e.runde.name} {e.geber.name} {e.ausspieler.name} {e.mittelhand.name} {e.hinterhand.name} '
+            f'{e.geberhand.name} {e.ansager.name if e.ansager else ""} {e.partner.name if e.partner else ""} '
+            f'{[(r.teilnehmer.name, r.punkte) for r in e.resultate]} '
+            f'{[(v.teilnehmer.name, v.doppler) for v in e.verdopplungen]}' for e in einzelspiele]
+
+
+@pytest.mark.parametrize('laden, anzahl', [(Laden.SELECTIN, 11), (Laden.JOINED, 3)])
+def test_ladeplan_constant_number_of_queries(statements: list, laden: Laden, anzahl: int):
+    session = Sessions.get_session()
+    expected = _render(get_einzelspiele_by_einzelspiel_ids(list(range(1, 31)), session=session))
+    session.close()
+    for einzelspiel_ids in [[1, 2], list(range(1, 31))]:
+        session = Sessions.get_session()
+        statements.clear()
+        with lazy_load_guard():
+            einzelspiele = get_einzelspiele_by_einzelspiel_ids(einzelspiel_ids, session=session,
+                                                               ladeplan=Ladeplan(runde=True, teilnehmer=True,
+                                                                                 resultate=True, verdopplungen=True,
+                                                                                 laden=laden))
+            assert _render(einzelspiele) == expected[:len(einzelspiel_ids)]
+        # Many-to-one relationships already in the session need no statement
+        assert len(statements) <= anzahl
+        session.close()
+
+
+def test_lazy_load_guard(statements: list):
+    session = Sessions.get_session()
+    with lazy_load_guard():
+        einzelspiele = get_einzelspiele_by_einzelspiel_ids([1, 2], session=session)
+        with pytest.raises(InvalidRequestError):
+            _ = einzelspiele[0].runde
+        einzelspiele = get_einzelspiele_by_teilnehmer_ids([1], session=session, ladeplan=Ladeplan(runde=True))
+        assert all(e.runde.name == 'Sonntagsspiel' for e in einzelspiele)
+        with pytest.raises(InvalidRequestError):
+            _ = einzelspiele[0].resultate
+        # Queries of columns and the Punkteconfig of a Runde do not load lazily
+        assert get_punkteconfig_by_runde_id(1, session=session).id == 1
+        assert len(get_einzelspiel_ids_by_runde_ids([1], session=session)) == 30
+        assert get_latest_einzelspiel_id(session=session) == 30
+    session.close()
+    # Without the guard the relationships load lazily as before
+    session = Sessions.get_session()
+    assert get_einzelspiele_by_einzelspiel_ids([1], session=session)[0].runde.name == 'Sonntagsspiel'
+    assert len(_render(get_einzelspiele_by_teilnehmer_ids([1], session=session, ladeplan=SPIELLISTE))) > 0
+    session.close()
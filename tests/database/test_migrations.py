@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, text
+
+from schafkopf.database.migrations import migrate, stamp, get_schema_version, MIGRATIONS
+from schafkopf.database.page_loaders import load_spielverlauf_seite
+from schafkopf.database.queries import get_einzelspiel_ids_by_runde_ids, get_latest_einzelspiel_id, get_runden, \
+    get_resultate_by_einzelspiele_ids, get_verdopplungen_by_einzelspiel_ids
+from schafkopf.database.session import Sessions
+from tests.helpers import dump_database, init_database_with_random_games, record_statements
+
+INDEXES = ['einzelspiel_aktiv_runde_idx', 'einzelspiel_aktiv_idx', 'resultat_einzelspiel_idx',
+           'verdopplung_einzelspiel_idx', 'runde_aktiv_datum_idx', 'einzelspiel_submission_token_idx',
+           'teilnahme_teilnehmer_idx', 'einzelspiel_aktiv_created_on_idx']
+
+
+def get_index_names() -> list:
+    inspector = inspect(Sessions.get_engine())
+    return [i['name'] for table in inspector.get_table_names() for i in inspector.get_indexes(table)]
+
+
+def downgrade_to_first_schema():
+    # The schema before the migrations: no secondary indexes, no submission tokens, no Teilnahmen
+    with Sessions.get_engine().begin() as connection:
+        for index in INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {index}'))
+        connection.execute(text('DROP TABLE teilnahme'))
+        connection.execute(text('DROP TABLE write_behind_stand'))
+        connection.execute(text('ALTER TABLE einzelspiel DROP COLUMN submission_token'))
+
+
+def test_migrate_keeps_data(monkeypatch):
+    init_database_with_random_games(monkeypatch, 150)
+    expected = dump_database()
+    downgrade_to_first_schema()
+    assert get_schema_version() == 0
+    assert migrate() == [m.version for m in MIGRATIONS]
+    assert dump_database() == expected
+    assert set(INDEXES).issubset(get_index_names())
+    assert get_schema_version() == MIGRATIONS[-1].version
+    assert migrate() == []
+
+
+def test_migrate_created_schema(monkeypatch):
+    # A schema of create_all is complete, init.py stamps it. Unstamped, the migrations find everything in place.
+    init_database_with_random_games(monkeypatch, 10)
+    expected = dump_database()
+    assert len(migrate()) == len(MIGRATIONS)
+    assert dump_database() == expected
+    init_database_with_random_games(monkeypatch, 0)
+    stamp()
+    assert migrate() == []
+
+
+@pytest.mark.parametrize('query, index', [
+    (lambda s: get_einzelspiel_ids_by_runde_ids([1], session=s), 'einzelspiel_aktiv_runde_idx'),
+    (lambda s: get_latest_einzelspiel_id(session=s), 'einzelspiel_aktiv_idx'),
+    (lambda s: get_runden(session=s), 'runde_aktiv_datum_idx'),
+    (lambda s: get_resultate_by_einzelspiele_ids([1, 2, 3], session=s), 'resultat_einzelspiel_idx'),
+    (lambda s: get_verdopplungen_by_einzelspiel_ids([1, 2, 3], session=s), 'verdopplung_einzelspiel_idx'),
+    (lambda s: load_spielverlauf_seite(nach=(datetime.now(), 10 ** 9), session=s), 'einzelspiel_aktiv_created_on_idx')])
+def test_queries_use_indexes(monkeypatch, query, index: str):
+    init_database_with_random_games(monkeypatch, 150)
+    downgrade_to_first_schema()
+    migrate()
+    statements = record_statements(parameters=True)
+    session = Sessions.get_session()
+    query(session)
+    session.close()
+    # Without the EXPLAIN statements recorded below
+    statements = list(statements)
+    with Sessions.get_engine().connect() as connection:
+        plan = [str(row) for statement, parameters in statements
+                for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()]
+    assert any(index in p for p in plan), plan
@@ -0,0 +1,131 @@
+from datetime import datetime
+
+import pytest
+
+from schafkopf.database.data_model import Einzelspiel, Runde, Resultat, Verdopplung, Spielart
+from schafkopf.database.page_loaders import load_spielerauswahl_seite, load_letztes_spiel_seite, \
+    load_runde_anlegen_seite, Sitzordnung, load_spielverlauf_seite
+from schafkopf.database.queries import get_latest_einzelspiel_id, get_resultate_by_einzelspiele_ids, \
+    inactivate_einzelspiel_by_einzelspiel_id, get_teilnehmer, get_runden
+from schafkopf.database.session import Sessions
+from tests.helpers import init_database_with_random_games, record_statements
+
+
+@pytest.fixture
+def database(monkeypatch):
+    init_database_with_random_games(monkeypatch, 20)
+    session = Sessions.get_session()
+    session.add(Runde(id=2, name='Montagsspiel', ort='Fürth', punkteconfig_id=1))
+    session.commit()
+    session.close()
+    # Teilnehmer and Runden are in the reference cache after the first page load
+    get_teilnehmer()
+    get_runden()
+
+
+def get_latest_einzelspiel() -> Einzelspiel:
+    session = Sessions.get_session()
+    einzelspiel = session.query(Einzelspiel).filter(Einzelspiel.id == get_latest_einzelspiel_id()).one()
+    session.close()
+    return einzelspiel
+
+
+def test_load_spielerauswahl_seite(statements: list):
+    seite = load_spielerauswahl_seite()
+    assert len(statements) == 1
+    letztes = get_latest_einzelspiel()
+    assert seite.runde_id == letztes.runde_id == 1
+    assert seite.sitzordnung.geber_id == letztes.ausspieler_id
+    assert seite.sitzordnung.ausspieler_id == letztes.mittelhand_id
+    assert seite.sitzordnung.mittelhand_id == letztes.hinterhand_id
+    assert seite.sitzordnung.hinterhand_id == letztes.geberhand_id
+    assert list(seite.teilnehmer_id_to_name.values()) == [t.name for t in get_teilnehmer()]
+    assert [r.id for r in seite.runden] == [r.id for r in get_runden()]
+
+
+def test_naechste_sitzordnung_with_five_teilnehmer(statements: list):
+    session = Sessions.get_session()
+    session.query(Einzelspiel).filter(Einzelspiel.id == get_latest_einzelspiel_id()) \
+        .update({Einzelspiel.geber_id: 8, Einzelspiel.ausspieler_id: 1, Einzelspiel.mittelhand_id: 2,
+                 Einzelspiel.hinterhand_id: 3, Einzelspiel.geberhand_id: 4}, synchronize_session=False)
+    session.commit()
+    session.close()
+    assert load_spielerauswahl_seite().sitzordnung == Sitzordnung(geber_id=1, ausspieler_id=2, mittelhand_id=3,
+                                                                  hinterhand_id=4, geberhand_id=8)
+
+
+def test_load_letztes_spiel_seite(statements: list):
+    seite = load_letztes_spiel_seite()
+    assert len(statements) == 1
+    letztes = get_latest_einzelspiel()
+    assert (seite.einzelspiel_id, seite.runde_name, seite.spielart) == (letztes.id, 'Sonntagsspiel', letztes.spielart)
+    assert seite.teilnehmer_id_to_punkte == {r.teilnehmer_id: r.punkte
+                                             for r in get_resultate_by_einzelspiele_ids([letztes.id])}
+    assert seite.teilnehmer_id_to_vorname == {t: f'vorname_{t}' for t in seite.teilnehmer_id_to_punkte}
+    # Deleted games are skipped
+    inactivate_einzelspiel_by_einzelspiel_id(letztes.id)
+    assert load_letztes_spiel_seite().einzelspiel_id == get_latest_einzelspiel_id() < letztes.id
+
+
+def test_load_pages_without_games(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    assert load_letztes_spiel_seite() is None
+    seite = load_spielerauswahl_seite()
+    assert seite.runde_id is None
+    assert seite.sitzordnung == Sitzordnung()
+
+
+def test_load_runde_anlegen_seite(statements: list):
+    seite = load_runde_anlegen_seite()
+    assert len(statements) == 1
+    assert seite.namen == ['Montagsspiel', 'Sonntagsspiel']
+    assert seite.orte == ['Fürth', 'Nürnberg']
+
+
+def get_spielverlauf(**filter) -> list:
+    zeilen = []
+    seite = load_spielverlauf_seite(limit=7, **filter)
+    zeilen += seite.zeilen
+    while seite.naechster_cursor is not None:
+        seite = load_spielverlauf_seite(limit=7, nach=seite.naechster_cursor, **filter)
+        assert len(seite.zeilen) > 0
+        zeilen += seite.zeilen
+    return zeilen
+
+
+def test_load_spielverlauf_seite(monkeypatch):
+    init_database_with_random_games(monkeypatch, 100)
+    session = Sessions.get_session()
+    session.add(Runde(id=2, name='Montagsspiel', ort='Fürth', punkteconfig_id=1))
+    # Games recorded within the same second are ordered by id
+    session.query(Einzelspiel).filter(Einzelspiel.id > 50).update({Einzelspiel.created_on: datetime(2020, 6, 7)})
+    session.query(Einzelspiel).filter(Einzelspiel.id % 10 == 0).update({Einzelspiel.is_active: False})
+    session.query(Einzelspiel).filter(Einzelspiel.id % 3 == 0).update({Einzelspiel.runde_id: 2})
+    session.commit()
+    einzelspiele = session.query(Einzelspiel).filter(Einzelspiel.is_active == True) \
+        .order_by(Einzelspiel.created_on.desc(), Einzelspiel.id.desc()).all()
+    resultate = session.query(Resultat).all()
+    verdopplungen = session.query(Verdopplung).order_by(Verdopplung.id).all()
+    session.close()
+
+    zeilen = get_spielverlauf()
+    assert [z.einzelspiel_id for z in zeilen] == [e.id for e in einzelspiele]
+    for z in zeilen[:20]:
+        assert z.teilnehmer_id_to_punkte == {r.teilnehmer_id: r.punkte for r in resultate
+                                             if r.einzelspiel_id == z.einzelspiel_id}
+        assert z.teilnehmer_id_to_name == {t: f'Spieler_{t}' for t in z.teilnehmer_id_to_punkte}
+        assert z.verdopplungen == [(v.teilnehmer_id, v.doppler) for v in verdopplungen
+                                   if v.einzelspiel_id == z.einzelspiel_id]
+    assert [z.einzelspiel_id for z in get_spielverlauf(runde_ids=[2], spielarten=[Spielart.RUFSPIEL.name])] == \
+           [e.id for e in einzelspiele if e.runde_id == 2 and e.spielart == Spielart.RUFSPIEL.name]
+    assert [z.einzelspiel_id for z in get_spielverlauf(teilnehmer_ids=[1, 2])] == \
+           [e.id for e in einzelspiele if {1, 2}.issubset({e.ausspieler_id, e.mittelhand_id, e.hinterhand_id,
+                                                          e.geberhand_id})]
+    # Every page costs the same three statements
+    statements = record_statements()
+    seite = load_spielverlauf_seite(limit=7)
+    assert len(statements) == 3
+    statements.clear()
+    load_spielverlauf_seite(limit=7, nach=seite.naechster_cursor)
+    assert len(statements) == 3
+    assert load_spielverlauf_seite(teilnehmer_ids=[99]).zeilen == []
@@ -0,0 +1,175 @@
+import random
+
+import pytest
+
+from schafkopf.database.data_model import Teilnehmer, Teilnahme, Einzelspiel, Resultat, Verdopplung
+from schafkopf.database.queries import get_teilnehmer, get_teilnehmer_by_id, get_runden, get_punkteconfig_by_runde_id, \
+    get_teilnehmer_name_by_id, insert_teilnehmer, insert_runde, insert_default_punkteconfig, set_reference_cache, \
+    get_reference_cache_stats, invalidate_reference_cache, get_einzelspiele_by_teilnehmer_ids, backfill_teilnahmen, \
+    get_resultate_by_einzelspiele_ids, get_einzelspiele_by_einzelspiel_ids, get_einzelspiel_ids_by_runde_ids, \
+    get_latest_einzelspiel_id, inactivate_einzelspiel_by_einzelspiel_id, _bakery, \
+    get_einzelspiel_ids_by_teilnehmer_ids, get_resultat_zeilen_by_einzelspiel_ids, \
+    get_einzelspiel_zeilen_by_einzelspiel_ids, get_verdopplung_zeilen_by_einzelspiel_ids, stream_einzelspiel_zeilen, \
+    stream_resultat_zeilen
+from tests.helpers import dump_database, init_database_with_random_games
+from schafkopf.database.session import Sessions
+
+
+@pytest.fixture
+def database(monkeypatch):
+    yield init_database_with_random_games(monkeypatch, 0)
+    set_reference_cache()
+
+
+def test_reference_cache_hits(statements: list):
+    stats = get_reference_cache_stats()
+    teilnehmer = get_teilnehmer()
+    assert [t.name for t in get_teilnehmer()] == [t.name for t in teilnehmer]
+    assert get_teilnehmer_by_id(3).name == get_teilnehmer_name_by_id(3) == 'Spieler_3'
+    assert get_punkteconfig_by_runde_id(1).id == get_punkteconfig_by_runde_id(1).id == 1
+    # The Punkteconfig of a Runde is joined to it
+    assert len(statements) == 3
+    assert get_reference_cache_stats()['hits'] - stats['hits'] == 3
+    assert get_reference_cache_stats()['misses'] - stats['misses'] == 3
+    # Callers get a list of their own
+    get_teilnehmer().clear()
+    assert len(get_teilnehmer()) == 8
+    # Calls with a session of the caller are not cached
+    session = Sessions.get_session()
+    assert get_teilnehmer_by_id(3, session).name == 'Spieler_3'
+    session.close()
+    assert len(statements) == 4
+
+
+def test_reference_cache_invalidation(statements: list):
+    assert len(get_teilnehmer()) == 8
+    assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+    assert len(get_teilnehmer()) == 9
+    assert len(get_runden()) == 1
+    insert_default_punkteconfig()
+    assert insert_runde(datum='2020-01-05', name='Neue Runde', ort='Fürth')[1] == []
+    assert len(get_runden()) == 2
+    # Writes behind the back of the ORM are seen after an explicit invalidation
+    assert get_teilnehmer_by_id(3).name == 'Spieler_3'
+    session = Sessions.get_session()
+    session.execute(Teilnehmer.__table__.update().where(Teilnehmer.id == 3).values(name='Umbenannt'))
+    session.commit()
+    session.close()
+    assert get_teilnehmer_by_id(3).name == 'Spieler_3'
+    invalidate_reference_cache()
+    assert get_teilnehmer_by_id(3).name == 'Umbenannt'
+
+
+def test_reference_cache_opt_out_and_ttl(statements: list):
+    set_reference_cache(enabled=False)
+    get_teilnehmer()
+    get_teilnehmer()
+    assert len(statements) == 2
+    set_reference_cache(ttl=0.0)
+    get_teilnehmer()
+    get_teilnehmer()
+    assert len(statements) == 4
+
+
+def test_reference_cache_per_engine(statements: list, monkeypatch):
+    assert len(get_teilnehmer()) == 8
+    init_database_with_random_games(monkeypatch, 0)
+    session = Sessions.get_session()
+    session.query(Teilnehmer).filter(Teilnehmer.id > 4).delete()
+    session.commit()
+    session.close()
+    invalidate_reference_cache()
+    assert len(get_teilnehmer()) == 4
+
+
+def test_backfill_teilnahmen_matches_writers(monkeypatch):
+    init_database_with_random_games(monkeypatch, 200)
+    expected = dump_database()
+    session = Sessions.get_session()
+    session.query(Teilnahme).filter(Teilnahme.einzelspiel_id > 50).delete()
+    session.commit()
+    session.close()
+    assert backfill_teilnahmen() == 150 * 4
+    assert dump_database() == expected
+    assert backfill_teilnahmen() == 0
+
+
+def test_get_einzelspiele_by_teilnehmer_ids(monkeypatch):
+    init_database_with_random_games(monkeypatch, 200)
+    session = Sessions.get_session()
+    einzelspiele = session.query(Einzelspiel).all()
+    session.close()
+    rng = random.Random(4)
+    for n in [1, 2, 4, 5, 6, 8]:
+        teilnehmer_ids = rng.sample(range(1, 9), n)
+        expected = set()
+        for e in einzelspiele:
+            sitze = {e.ausspieler_id, e.mittelhand_id, e.hinterhand_id, e.geberhand_id}
+            # Up to four Teilnehmer have to sit all, more than four cover all seats
+            if sitze.issubset(teilnehmer_ids) if n > 4 else sitze.issuperset(teilnehmer_ids):
+                expected.add(e.id)
+        assert {e.id for e in get_einzelspiele_by_teilnehmer_ids(teilnehmer_ids)} == expected
+        assert get_einzelspiel_ids_by_teilnehmer_ids(teilnehmer_ids) == sorted(expected)
+    assert get_einzelspiele_by_teilnehmer_ids([]) == []
+    assert get_einzelspiel_ids_by_teilnehmer_ids([]) == []
+
+
+def test_baked_queries(monkeypatch):
+    init_database_with_random_games(monkeypatch, 30)
+    assert inactivate_einzelspiel_by_einzelspiel_id(30)
+    session = Sessions.get_session()
+    einzelspiele = session.query(Einzelspiel).all()
+    resultate = session.query(Resultat).all()
+    session.close()
+    aktive_ids = {e.id for e in einzelspiele if e.is_active}
+
+    def check():
+        for einzelspiel_ids in [[], [3], [1, 2, 30], list(range(1, 31))]:
+            assert {r.id for r in get_resultate_by_einzelspiele_ids(einzelspiel_ids)} == \
+                   {r.id for r in resultate if r.einzelspiel_id in einzelspiel_ids}
+            assert {e.id for e in get_einzelspiele_by_einzelspiel_ids(einzelspiel_ids)} == \
+                   aktive_ids.intersection(einzelspiel_ids)
+            assert {e.id for e in get_einzelspiele_by_einzelspiel_ids(einzelspiel_ids, active=False)} == \
+                   set(einzelspiel_ids)
+        assert set(get_einzelspiel_ids_by_runde_ids([1])) == aktive_ids
+        assert len(get_einzelspiel_ids_by_runde_ids([1], active=False)) == 30
+        assert get_einzelspiel_ids_by_runde_ids([2]) == []
+        assert get_latest_einzelspiel_id() == 29
+        assert get_teilnehmer_by_id(3, session=Sessions.get_session()).name == 'Spieler_3'
+
+    check()
+    cached = len(_bakery.cache)
+    # The queries and their compiled statements come from the cache of the bakery
+    check()
+    assert len(_bakery.cache) == cached
+
+
+def test_projections_and_streams(monkeypatch):
+    init_database_with_random_games(monkeypatch, 40)
+    assert inactivate_einzelspiel_by_einzelspiel_id(7)
+    session = Sessions.get_session()
+    einzelspiele = session.query(Einzelspiel).order_by(Einzelspiel.id).all()
+    resultate = session.query(Resultat).order_by(Resultat.id).all()
+    verdopplungen = session.query(Verdopplung).all()
+    session.close()
+    einzelspiel_ids = [3, 7, 12, 40]
+
+    zeilen = get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids, ['einzelspiel_id', 'teilnehmer_id', 'punkte'])
+    assert sorted(zeilen) == sorted((r.einzelspiel_id, r.teilnehmer_id, r.punkte) for r in resultate
+                                    if r.einzelspiel_id in einzelspiel_ids)
+    assert all(z.keys() == ['einzelspiel_id', 'teilnehmer_id', 'punkte'] for z in zeilen)
+    zeilen = get_einzelspiel_zeilen_by_einzelspiel_ids(einzelspiel_ids, ['id', 'spielart'])
+    assert sorted(zeilen) == [(e.id, e.spielart) for e in einzelspiele if e.id in [3, 12, 40]]
+    assert len(get_einzelspiel_zeilen_by_einzelspiel_ids(einzelspiel_ids, ['id'], active=False)) == 4
+    assert sorted(get_verdopplung_zeilen_by_einzelspiel_ids(einzelspiel_ids, ['teilnehmer_id', 'doppler'])) == \
+        sorted((v.teilnehmer_id, v.doppler) for v in verdopplungen if v.einzelspiel_id in einzelspiel_ids)
+    with pytest.raises(KeyError):
+        get_resultat_zeilen_by_einzelspiel_ids(einzelspiel_ids, ['unbekannt'])
+
+    for batch_size in [1, 7, 1000]:
+        assert [tuple(z) for z in stream_einzelspiel_zeilen(['id', 'spielpunkte'], batch_size=batch_size)] == \
+               [(e.id, e.spielpunkte) for e in einzelspiele if e.is_active]
+        assert [z.id for z in stream_einzelspiel_zeilen(['id'], active=False, batch_size=batch_size)] == \
+               [e.id for e in einzelspiele]
+        assert [tuple(z) for z in stream_resultat_zeilen(['id', 'punkte'], batch_size=batch_size)] == \
+               [(r.id, r.punkte) for r in resultate]
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig, Teilnehmer, Runde
+from schafkopf.database.queries import get_teilnehmer_by_id, get_runde_by_id, get_teilnehmer
+from schafkopf.database.query_executor import run_queries, set_query_pool_size, get_query_executor
+from schafkopf.database.session import Sessions
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch, tmpdir):
+    monkeypatch.setattr(Sessions, 'engine', create_engine(f'sqlite:///{tmpdir.join("test.db")}', poolclass=NullPool))
+    Base.metadata.create_all(Sessions.engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                     for i in range(1, 5)] +
+                    [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    yield
+    set_query_pool_size()
+
+
+def test_run_queries_results_by_name():
+    results = run_queries(dict(teilnehmer=lambda s: get_teilnehmer_by_id(2, session=s).name,
+                               runde=lambda s: get_runde_by_id(1, session=s).name,
+                               leer=lambda s: None))
+    assert results == dict(teilnehmer='Spieler_2', runde='Sonntagsspiel', leer=None)
+    assert run_queries({}) == {}
+
+
+def test_run_queries_concurrently_with_own_sessions():
+    set_query_pool_size(3)
+    barrier = threading.Barrier(3, timeout=5)
+    sessions, threads = [], []
+
+    def query(session):
+        # Passes the barrier only when all three queries run at the same time
+        barrier.wait()
+        sessions.append(session)
+        threads.append(threading.current_thread().name)
+        return len(get_teilnehmer_by_id(1, session=session).name)
+
+    assert run_queries({f'q{i}': query for i in range(3)}) == dict(q0=9, q1=9, q2=9)
+    assert len(set(map(id, sessions))) == 3
+    assert len(set(threads)) == 3
+    assert all(t.startswith('query') for t in threads)
+
+
+def test_run_queries_read_own_writes():
+    # After a write of the request the queries run in its session and see its changes which are not committed yet
+    with Sessions.request_scope():
+        assert run_queries(dict(thread=lambda s: threading.current_thread().name))['thread'].startswith('query')
+        Sessions.get_session().add(Teilnehmer(id=5, name='Neu', vorname='Neu', nachname='Neu'))
+        Sessions.get_session().flush()
+        assert len(get_teilnehmer()) == 5
+        assert run_queries(dict(teilnehmer=lambda s: len(get_teilnehmer(session=s)),
+                                session=lambda s: s is Sessions.get_request_session())) == \
+               dict(teilnehmer=5, session=True)
+
+
+def test_run_queries_raises_exception_of_query():
+    def fehler(session):
+        raise KeyError('fehler')
+
+    with pytest.raises(KeyError):
+        run_queries(dict(teilnehmer=lambda s: get_teilnehmer_by_id(1, session=s), fehler=fehler))
+    # The pool keeps working
+    assert run_queries(dict(runde=lambda s: get_runde_by_id(1, session=s).ort)) == dict(runde='Nürnberg')
+
+
+def test_set_query_pool_size():
+    set_query_pool_size(2)
+    executor = get_query_executor()
+    assert executor._max_workers == 2
+    assert get_query_executor() is executor
+    set_query_pool_size()
+    assert get_query_executor() is not executor
+    assert get_query_executor()._max_workers == 4
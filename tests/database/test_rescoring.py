@@ -0,0 +1,83 @@
+from dataclasses import replace
+from typing import List
+
+import numpy as np
+import pytest
+
+from schafkopf.backend.batch_calculator import BatchCalculator
+from schafkopf.database.configs import BatchConfig, Config
+from schafkopf.database.data_model import Punkteconfig, Einzelspiel, Resultat
+from schafkopf.database.rescoring import rescore
+from schafkopf.database.session import Sessions
+from tests.helpers import WRITERS, init_database_with_random_games
+
+
+@pytest.fixture
+def configs(monkeypatch) -> List[Config]:
+    return init_database_with_random_games(monkeypatch, 300)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 10000])
+def test_rescore_report(configs: List[Config], chunk_size: int):
+    neu = build_neue_punkteconfig()
+    report = rescore(neu, chunk_size=chunk_size)
+    assert report.einzelspiele == len(configs)
+    assert not report.written
+
+    punkte_alt = BatchCalculator(BatchConfig.from_configs(configs)).get_punkte()
+    batch_config_neu = BatchConfig.from_configs(configs)
+    batch_config_neu.punkteconfig = neu
+    punkte_neu = BatchCalculator(batch_config_neu).get_punkte()
+    for teilnehmer_id in range(1, 9):
+        seats = batch_config_neu.teilnehmer_ids == teilnehmer_id
+        assert report.teilnehmer_id_to_punkte_alt[teilnehmer_id] == pytest.approx(punkte_alt[seats].sum())
+        assert report.teilnehmer_id_to_punkte_neu[teilnehmer_id] == pytest.approx(punkte_neu[seats].sum())
+    assert report.geaenderte_einzelspiele == int(np.any(punkte_alt != punkte_neu, axis=1).sum())
+    assert report.get_dataframe()['Differenz'].sum() == pytest.approx(0.0)
+
+    # Nothing is written without write=True
+    session = Sessions.get_session()
+    assert sum(r.punkte for r in session.query(Resultat).all()) == pytest.approx(0.0)
+    assert [e.spielpunkte for e in session.query(Einzelspiel).order_by(Einzelspiel.id).all()] == \
+           BatchCalculator(BatchConfig.from_configs(configs)).get_spielpunkte().tolist()
+    session.close()
+
+
+def test_rescore_write(configs: List[Config]):
+    neu = build_neue_punkteconfig()
+    report = rescore(neu, write=True, chunk_size=50)
+    assert report.written
+
+    session = Sessions.get_session()
+    for einzelspiel, c in zip(session.query(Einzelspiel).order_by(Einzelspiel.id).all(), configs):
+        abrechnung = WRITERS[type(c)][0](replace(c, punkteconfig=neu)).get_abrechnung()
+        assert einzelspiel.spielpunkte == abrechnung.spielpunkte
+        assert {r.teilnehmer_id: r.punkte for r in einzelspiel.resultate} == dict(abrechnung.teilnehmer_id_to_punkte)
+    session.close()
+
+    # A second pass under the same Punkteconfig finds nothing left to change
+    assert rescore(neu).geaenderte_einzelspiele == 0
+
+
+def test_rescore_write_leaves_given_session_to_caller(configs: List[Config]):
+    neu = build_neue_punkteconfig()
+    session = Sessions.get_session()
+    assert rescore(neu, write=True, chunk_size=50, session=session).geaenderte_einzelspiele > 0
+    assert rescore(neu, session=session).geaenderte_einzelspiele == 0
+    session.rollback()
+    session.close()
+    assert rescore(neu).geaenderte_einzelspiele > 0
+
+
+def test_rescore_filters(configs: List[Config]):
+    session = Sessions.get_session()
+    session.query(Einzelspiel).filter(Einzelspiel.id <= 100).update({Einzelspiel.is_active: False})
+    session.commit()
+    session.close()
+    assert rescore(build_neue_punkteconfig()).einzelspiele == len(configs) - 100
+    assert rescore(build_neue_punkteconfig(), active=False).einzelspiele == len(configs)
+    assert rescore(build_neue_punkteconfig(), runde_ids=[2]).einzelspiele == 0
+
+
+def build_neue_punkteconfig() -> Punkteconfig:
+    return Punkteconfig(name='neu', rufspiel=10, hochzeit=20, laufende=5.0, schneider=5.0, schwarz=15.0, solo=40)
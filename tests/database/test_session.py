@@ -0,0 +1,142 @@
+import shutil
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.data_model import Base, Punkteconfig, Teilnehmer, Runde
+from schafkopf.database.queries import get_teilnehmer, get_teilnehmer_by_id, insert_teilnehmer, get_runde_by_id, \
+    get_teilnehmer_namen_by_ids
+from schafkopf.database.query_executor import run_queries
+from schafkopf.database.session import Sessions, reader_scoped
+from schafkopf.database.sqlite_profile import create_sqlite_engine, PROFILES
+
+
+@pytest.fixture
+def connections(monkeypatch, tmpdir) -> list:
+    # Like the application, a SQLite file without a pool
+    monkeypatch.setattr(Sessions, 'engine', create_engine(f'sqlite:///{tmpdir.join("test.db")}', poolclass=NullPool))
+    Base.metadata.create_all(Sessions.engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                     for i in range(1, 5)] +
+                    [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    connections = []
+    event.listen(Sessions.engine, 'connect', lambda *args: connections.append(1))
+    return connections
+
+
+def test_request_scope_shares_one_session(connections: list):
+    assert Sessions.get_session() is not Sessions.get_session()
+    with Sessions.request_scope():
+        session = Sessions.get_session()
+        assert Sessions.get_session() is session
+        assert Sessions.get_new_session() is not session
+        assert get_teilnehmer_namen_by_ids([1, 2])[1] == {1: 'vorname_1', 2: 'vorname_2'}
+        assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+        assert len(get_teilnehmer()) == 5
+        assert get_teilnehmer_by_id(5).name == 'Spieler, Neu'
+        assert get_runde_by_id(1).name == 'Sonntagsspiel'
+    # After its own changes the request reads reference data through its session, not from the cache
+    assert len(connections) == 1
+    assert Sessions.get_session() is not session
+    assert len(get_teilnehmer()) == 5
+    assert len(connections) == 2
+
+
+@pytest.mark.skipif(int(pd.__version__.split('.')[0]) > 1,
+                    reason='Only the pandas of the requirements reads statements of SQLAlchemy 1.3')
+def test_request_scope_dataframes_read_own_writes(connections: list):
+    with Sessions.request_scope():
+        assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+        # Not committed yet, a connection of its own would not see the new Teilnehmer
+        assert len(get_teilnehmer(dataframe=True)) == 5
+    assert len(connections) == 1
+
+
+def test_request_scope_reference_cache(connections: list):
+    assert get_runde_by_id(1).name == 'Sonntagsspiel'
+    with Sessions.request_scope():
+        assert get_runde_by_id(1).name == 'Sonntagsspiel'
+        assert get_teilnehmer_by_id(1).name == 'Spieler_1'
+    # The cache loads with sessions of its own, its objects stay usable after the request
+    assert len(connections) == 2
+    assert get_runde_by_id(1).name == 'Sonntagsspiel'
+
+
+def test_request_scope_rolls_back(connections: list):
+    with pytest.raises(ValueError):
+        with Sessions.request_scope():
+            assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+            raise ValueError
+    session = Sessions.get_session()
+    assert session.query(Teilnehmer).count() == 4
+    session.close()
+    Sessions.begin_request()
+    insert_teilnehmer(vorname='Neu', nachname='Spieler')
+    Sessions.end_request(commit=False)
+    Sessions.end_request()
+    session = Sessions.get_session()
+    assert session.query(Teilnehmer).count() == 4
+    session.close()
+
+
+@pytest.fixture
+def reader(connections: list, monkeypatch, tmpdir):
+    # A snapshot of the database with the four Teilnehmer, the writer gets a fifth one afterwards
+    shutil.copy(str(tmpdir.join('test.db')), str(tmpdir.join('snapshot.db')))
+    monkeypatch.setattr(Sessions, 'reader_engine',
+                        create_sqlite_engine(f'sqlite:///{tmpdir.join("snapshot.db")}', PROFILES['DEFAULT'],
+                                             read_only=True))
+    assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+    return Sessions.reader_engine
+
+
+def _count_teilnehmer() -> int:
+    session = Sessions.get_session()
+    count = session.query(Teilnehmer).count()
+    session.close()
+    return count
+
+
+def test_reader_scope(reader):
+    assert Sessions.get_reader_engine() is reader
+    assert _count_teilnehmer() == 5
+    with Sessions.reader_scope():
+        session = Sessions.get_session()
+        assert session.bind is reader
+        assert Sessions.get_session() is session
+        assert _count_teilnehmer() == 4
+        with pytest.raises(OperationalError):
+            session.execute(Teilnehmer.__table__.delete())
+    assert reader_scoped(_count_teilnehmer)() == 4
+    assert _count_teilnehmer() == 5
+    assert run_queries(dict(teilnehmer=lambda s: s.query(Teilnehmer).count())) == dict(teilnehmer=4)
+
+
+def test_reader_scope_reads_own_writes(reader):
+    with Sessions.request_scope():
+        assert reader_scoped(_count_teilnehmer)() == 4
+        assert not Sessions.reads_own_writes()
+        assert insert_teilnehmer(vorname='Zweiter', nachname='Spieler')[1] == []
+        assert Sessions.reads_own_writes()
+        # Not committed yet, only visible in the session of the request
+        assert reader_scoped(_count_teilnehmer)() == 6
+        assert run_queries(dict(teilnehmer=lambda s: s.query(Teilnehmer).count())) == dict(teilnehmer=6)
+    with Sessions.request_scope():
+        assert reader_scoped(_count_teilnehmer)() == 4
+        Sessions.read_own_writes()
+        assert reader_scoped(_count_teilnehmer)() == 6
+
+
+def test_reader_scope_without_reader(connections: list):
+    assert Sessions.get_reader_engine() is Sessions.engine
+    with Sessions.request_scope():
+        session = Sessions.get_session()
+        with Sessions.reader_scope():
+            assert Sessions.get_session() is session
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy.pool import NullPool, QueuePool
+
+from schafkopf.database import sqlite_profile
+from schafkopf.database.sqlite_profile import PROFILES, SqliteProfile, create_sqlite_engine, get_sqlite_profile
+from schafkopf.utils import settings_utils
+
+
+@pytest.fixture
+def ini(monkeypatch, tmpdir):
+    path = tmpdir.join('settings.ini')
+    monkeypatch.setattr(settings_utils, 'ini', str(path))
+    return path
+
+
+def test_get_sqlite_profile(ini):
+    ini.write('[Database]\ndb = SQLITE\n')
+    assert get_sqlite_profile() == PROFILES['DEFAULT']
+    ini.write('[SQLite]\n')
+    assert get_sqlite_profile() == PROFILES['WAL']
+    ini.write('[SQLite]\nprofile = default\nsynchronous = full\nbusy_timeout = 1000\n')
+    assert get_sqlite_profile() == SqliteProfile(synchronous='FULL', busy_timeout=1000)
+    ini.write('[SQLite]\nprofile = WAL\npool_size = 2\n')
+    assert get_sqlite_profile().pool_size == 2
+    assert get_sqlite_profile().journal_mode == 'WAL'
+
+
+@pytest.mark.parametrize('entries', ['profile = TURBO', 'page_size = 4096', 'cache_size = gross'])
+def test_get_sqlite_profile_invalid(ini, entries: str):
+    ini.write(f'[SQLite]\n{entries}\n')
+    with pytest.raises(ValueError):
+        get_sqlite_profile()
+
+
+def test_create_sqlite_engine_default(tmpdir):
+    engine = create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}', PROFILES['DEFAULT'])
+    assert isinstance(engine.pool, NullPool)
+    assert engine.execute('PRAGMA journal_mode').scalar() == 'delete'
+    assert engine.execute('PRAGMA synchronous').scalar() == 2
+
+
+def test_create_sqlite_engine_wal(tmpdir):
+    engine = create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}', PROFILES['WAL'])
+    assert isinstance(engine.pool, QueuePool)
+    with engine.connect() as connection:
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA synchronous').scalar() == 1
+        assert connection.execute('PRAGMA cache_size').scalar() == -64000
+        assert connection.execute('PRAGMA mmap_size').scalar() == 268435456
+        assert connection.execute('PRAGMA temp_store').scalar() == 2
+        assert connection.execute('PRAGMA busy_timeout').scalar() == 5000
+    engine.dispose()
+
+
+def test_create_sqlite_engine_wal_reader_and_writer(tmpdir):
+    # A reader sees the last committed state while a transaction of the writer is open
+    engine = create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}', PROFILES['WAL'])
+    engine.execute('CREATE TABLE t (id INTEGER)')
+    writer = engine.connect()
+    transaction = writer.begin()
+    writer.execute('INSERT INTO t VALUES (1)')
+    counts = []
+    reader = threading.Thread(target=lambda: counts.append(engine.execute('SELECT count(*) FROM t').scalar()))
+    reader.start()
+    reader.join()
+    transaction.commit()
+    writer.close()
+    assert counts == [0]
+    assert engine.execute('SELECT count(*) FROM t').scalar() == 1
+    engine.dispose()
+
+
+def test_create_sqlite_engine_after_fork(monkeypatch, tmpdir):
+    # A forked worker opens its own connection instead of reusing the one of the pool
+    engine = create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}', SqliteProfile(pool_size=1))
+    with engine.connect() as connection:
+        dbapi_connection = connection.connection.connection
+    pid = os.getpid()
+    monkeypatch.setattr(sqlite_profile.os, 'getpid', lambda: pid + 1)
+    with engine.connect() as connection:
+        assert connection.connection.connection is not dbapi_connection
+        assert connection.execute('SELECT 1').scalar() == 1
+    engine.dispose()
@@ -0,0 +1,175 @@
+import random
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import event
+
+from schafkopf.database.data_model import Einzelspiel, Runde, WriteBehindStand, Resultat
+from schafkopf.database.session import Sessions
+from schafkopf.database.sqlite_profile import create_sqlite_engine, PROFILES
+from schafkopf.database.write_behind import WriteBehindQueue
+from tests.helpers import build_random_configs, dump_database, init_database_with_random_games, WRITERS
+
+
+def build_writers(n: int, runde_ids: list) -> list:
+    writers = []
+    for i, c in enumerate(build_random_configs(random.Random(11), n)):
+        calculator_type, writer_type = WRITERS[type(c)]
+        writers.append(writer_type(calculator_type(replace(c, runde_id=runde_ids[i % len(runde_ids)]))))
+    return writers
+
+
+def get_runde_id_to_spielpunkte() -> dict:
+    session = Sessions.get_session()
+    runde_id_to_spielpunkte = {}
+    for e in session.query(Einzelspiel).order_by(Einzelspiel.id).all():
+        runde_id_to_spielpunkte.setdefault(e.runde_id, []).append(e.spielpunkte)
+    session.close()
+    return runde_id_to_spielpunkte
+
+
+def test_write_behind_matches_writers(monkeypatch, tmpdir):
+    init_database_with_random_games(monkeypatch, 0)
+    writers = build_writers(250, [1])
+    for writer in writers:
+        writer.write()
+    expected = dump_database()
+
+    init_database_with_random_games(monkeypatch, 0)
+    queue = WriteBehindQueue(f'sqlite:///{tmpdir.join("journal.db")}', batch_size=40)
+    for writer in writers:
+        queue.put(writer)
+    assert queue.get_depth() == len(writers)
+    assert queue.get_depth(runde_id=1) == len(writers)
+    assert queue.get_depth(runde_id=2) == 0
+    queue.start()
+    assert queue.flush(timeout=30)
+    queue.stop()
+    assert queue.get_depth() == 0
+    assert dump_database() == expected
+
+
+def test_write_behind_keeps_order_per_runde(monkeypatch, tmpdir):
+    init_database_with_random_games(monkeypatch, 0)
+    session = Sessions.get_session()
+    session.add(Runde(id=2, name='Zweite', ort='Fürth', punkteconfig_id=1))
+    session.commit()
+    session.close()
+    writers = build_writers(120, [1, 2])
+    queue = WriteBehindQueue(f'sqlite:///{tmpdir.join("journal.db")}', batch_size=7)
+    queue.start()
+    for writer in writers:
+        queue.put(writer)
+    assert queue.flush(timeout=30)
+    queue.stop()
+    runde_id_to_spielpunkte = get_runde_id_to_spielpunkte()
+    for runde_id in [1, 2]:
+        assert runde_id_to_spielpunkte[runde_id] == [w.get_spiel()[0]['spielpunkte'] for w in writers
+                                                     if w.get_spiel()[0]['runde_id'] == runde_id]
+
+
+@pytest.mark.parametrize('crash', ['before_commit', 'after_commit'])
+def test_write_behind_crash(monkeypatch, tmpdir, crash: str):
+    init_database_with_random_games(monkeypatch, 0)
+    writers = build_writers(60, [1])
+    for writer in writers:
+        writer.write()
+    expected = dump_database()
+
+    init_database_with_random_games(monkeypatch, 0)
+    journal_url = f'sqlite:///{tmpdir.join("journal.db")}'
+    queue = WriteBehindQueue(journal_url, batch_size=25)
+    for writer in writers:
+        queue.put(writer)
+    assert queue.write_batch() == 25
+
+    # The process dies while the second batch is written, before or after the database transaction
+    if crash == 'before_commit':
+        monkeypatch.setattr(WriteBehindQueue, '_get_eintraege', lambda self: [(1000, '[{}, [], []]')])
+        with pytest.raises(Exception):
+            queue.write_batch()
+    else:
+        monkeypatch.setattr(WriteBehindQueue, '_delete_written', lambda self: None)
+        assert queue.write_batch() == 25
+    engine = Sessions.engine
+    monkeypatch.undo()
+    monkeypatch.setattr(Sessions, 'engine', engine)
+
+    restarted = WriteBehindQueue(journal_url, batch_size=25)
+    assert restarted.get_depth() == (35 if crash == 'before_commit' else 10)
+    restarted.start()
+    assert restarted.flush(timeout=30)
+    restarted.stop()
+    assert dump_database() == expected
+    session = Sessions.get_session()
+    assert session.query(WriteBehindStand.eintrag_id).scalar() == len(writers)
+    session.close()
+
+
+def test_write_behind_stand_per_journal(monkeypatch, tmpdir):
+    init_database_with_random_games(monkeypatch, 0)
+    writers = build_writers(10, [1])
+    for i, name in enumerate(['journal.db', 'journal.db', 'neu.db']):
+        queue = WriteBehindQueue(f'sqlite:///{tmpdir.join(name)}')
+        queue.put(writers[i])
+        assert queue.write_batch() == 1
+    # Entry ids are not reused after deletes, a new journal starts at 1 with a stand of its own
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == 3
+    assert sorted(s.eintrag_id for s in session.query(WriteBehindStand).all()) == [1, 2]
+    session.close()
+
+
+def test_write_behind_submission_token(monkeypatch, tmpdir):
+    init_database_with_random_games(monkeypatch, 0)
+    writers = build_writers(3, [1])
+    queue = WriteBehindQueue(f'sqlite:///{tmpdir.join("journal.db")}')
+    queue.put(writers[0], 'a')
+    queue.put(writers[0], 'a')
+    assert queue.contains('a')
+    # A token written directly and through the journal is stored once
+    writers[1].write('b')
+    queue.put(writers[1], 'b')
+    queue.put(writers[2])
+    assert queue.get_depth() == 3
+    assert queue.write_batch() == 3
+    queue.put(writers[0], 'a')
+    assert queue.write_batch() == 1
+    session = Sessions.get_session()
+    assert sorted(str(t) for t, in session.query(Einzelspiel.submission_token).all()) == ['None', 'a', 'b']
+    session.close()
+
+
+@pytest.mark.parametrize('fehler', ['exception', 'other_process'])
+def test_write_behind_batch_is_one_transaction(monkeypatch, tmpdir, fehler: str):
+    # Entries without a submission token: only the transaction keeps a retry from writing a game twice
+    init_database_with_random_games(monkeypatch, 0, create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}',
+                                                                         PROFILES['WAL']))
+    writers = build_writers(3, [1])
+    queue = WriteBehindQueue(f'sqlite:///{tmpdir.join("journal.db")}')
+    for writer in writers:
+        queue.put(writer)
+
+    def fail_stand(_, __, statement, *args):
+        if statement.startswith('UPDATE write_behind_stand'):
+            raise RuntimeError
+
+    if fehler == 'exception':
+        event.listen(Sessions.engine, 'before_cursor_execute', fail_stand)
+        with pytest.raises(RuntimeError):
+            queue.write_batch()
+        event.remove(Sessions.engine, 'before_cursor_execute', fail_stand)
+    else:
+        # The stand does not match, as if another process wrote the journal
+        queue._eintrag_id = -1
+        assert queue.write_batch() == 0
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == 0
+    assert session.query(Resultat).count() == 0
+    session.close()
+    assert queue.get_depth() == 3
+    assert queue.write_batch() == 3
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == 3
+    session.close()
+    Sessions.engine.dispose()
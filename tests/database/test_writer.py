@@ -0,0 +1,178 @@
+import random
+import threading
+import uuid
+from collections import Counter
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import NullPool
+
+from schafkopf.database.configs import RamschConfig, SoloConfig, NormalspielConfig
+from schafkopf.database.data_model import Einzelspiel, Resultat, Verdopplung, Doppler, Base, Punkteconfig, \
+    Teilnehmer, Runde, Teilnahme
+from schafkopf.database.queries import insert_spiel, insert_teilnehmer
+from schafkopf.database.session import Sessions
+from schafkopf.database.sqlite_profile import create_sqlite_engine, PROFILES
+from schafkopf.database.write_behind import write_spiel
+from tests.helpers import build_random_configs, WRITERS, init_database_with_random_games, record_statements
+
+
+def test_writers_store_games(monkeypatch):
+    configs = init_database_with_random_games(monkeypatch, 200)
+    session = Sessions.get_session()
+    einzelspiele = session.query(Einzelspiel).order_by(Einzelspiel.id).all()
+    assert len(einzelspiele) == len(configs)
+    for einzelspiel, c in zip(einzelspiele, configs):
+        abrechnung = WRITERS[type(c)][0](c).get_abrechnung()
+        assert einzelspiel.is_active
+        assert einzelspiel.created_on is not None
+        assert einzelspiel.spielpunkte == abrechnung.spielpunkte
+        assert [einzelspiel.ausspieler_id, einzelspiel.mittelhand_id, einzelspiel.hinterhand_id,
+                einzelspiel.geberhand_id] == list(c.teilnehmer_ids)
+        assert {r.teilnehmer_id: r.punkte for r in einzelspiel.resultate} == dict(abrechnung.teilnehmer_id_to_punkte)
+        assert {r.teilnehmer_id for r in einzelspiel.resultate if r.gewonnen} == set(abrechnung.gewinner_ids)
+        verdopplungen = Counter((v.teilnehmer_id, v.doppler) for v in einzelspiel.verdopplungen)
+        expected = Counter((t, Doppler.GELEGT.name) for t in c.gelegt_ids)
+        if isinstance(c, RamschConfig):
+            assert einzelspiel.durchmarsch == c.durchmarsch
+            assert einzelspiel.laufende == 0
+            expected.update((t, Doppler.JUNGFRAU.name) for t in c.jungfrau_ids)
+        else:
+            assert einzelspiel.ansager_id == c.ansager_id
+            assert einzelspiel.laufende == c.laufende
+            assert einzelspiel.schneider == abrechnung.schneider
+            assert einzelspiel.tout == (isinstance(c, SoloConfig) and
+                                        (c.tout_gespielt_gewonnen or c.tout_gespielt_verloren))
+            expected.update([(c.kontriert_id, Doppler.KONTRIERT.name)] if c.kontriert_id is not None else [])
+            expected.update([(c.re_id, Doppler.RE.name)] if c.re_id is not None else [])
+        assert verdopplungen == expected
+    session.close()
+
+
+def test_writer_statements(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    statements = record_statements()
+    for c in build_random_configs(random.Random(6), 50):
+        calculator_type, writer_type = WRITERS[type(c)]
+        statements.clear()
+        writer_type(calculator_type(c)).write()
+        if isinstance(c, RamschConfig):
+            verdopplungen = len(c.gelegt_ids) + len(c.jungfrau_ids)
+        else:
+            verdopplungen = len(c.gelegt_ids) + (c.kontriert_id is not None) + (c.re_id is not None)
+        # One INSERT per table, Resultate, Teilnahmen and Verdopplungen as executemany, within a savepoint
+        assert statements[0].startswith('SAVEPOINT') and statements[-1].startswith('RELEASE SAVEPOINT')
+        assert [s.split()[2] for s in statements[1:-1]] == ['einzelspiel', 'resultat', 'teilnahme'] + \
+            ['verdopplung'] * (verdopplungen > 0)
+
+
+def test_insert_spiel_is_atomic(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    einzelspiel = dict(runde_id=1, geber_id=4, ausspieler_id=1, mittelhand_id=2, hinterhand_id=3, geberhand_id=4,
+                       spielpunkte=20, spielart='RUFSPIEL')
+    resultat = dict(teilnehmer_id=1, augen=61, punkte=20, gewonnen=True)
+    with pytest.raises(IntegrityError):
+        insert_spiel(einzelspiel, [resultat, resultat], [])
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == 0
+    assert session.query(Resultat).count() == 0
+    session.close()
+    assert insert_spiel(einzelspiel, [resultat], [dict(teilnehmer_id=1, doppler=Doppler.GELEGT.name)]) == 1
+
+
+def test_writer_uses_defaults_for_none(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    c = replace(next(c for c in build_random_configs(random.Random(7), 20) if isinstance(c, NormalspielConfig)),
+                schwarz=None)
+    calculator_type, writer_type = WRITERS[type(c)]
+    einzelspiel_id = writer_type(calculator_type(c)).write()
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).get(einzelspiel_id).schwarz is False
+    session.close()
+
+
+def test_writer_stores_submission_token_once(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    c = build_random_configs(random.Random(8), 1)[0]
+    calculator_type, writer_type = WRITERS[type(c)]
+    token = str(uuid.uuid4())
+    einzelspiel_id = writer_type(calculator_type(c)).write(token)
+    assert writer_type(calculator_type(c)).write(token) == einzelspiel_id
+    assert writer_type(calculator_type(c)).write() != einzelspiel_id
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).filter(Einzelspiel.submission_token == token).count() == 1
+    assert session.query(Resultat).filter(Resultat.einzelspiel_id == einzelspiel_id).count() == 4
+    session.close()
+
+
+def test_duplicate_submit_keeps_request(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    c = build_random_configs(random.Random(10), 1)[0]
+    calculator_type, writer_type = WRITERS[type(c)]
+    token = str(uuid.uuid4())
+    einzelspiel_id = writer_type(calculator_type(c)).write(token)
+    with Sessions.request_scope():
+        assert insert_teilnehmer(vorname='Neu', nachname='Spieler')[1] == []
+        # Only the savepoint of the duplicate game rolls back, the new Teilnehmer of the request stays
+        assert writer_type(calculator_type(c)).write(token) == einzelspiel_id
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == 1
+    assert session.query(Teilnehmer).filter(Teilnehmer.vorname == 'Neu').count() == 1
+    session.close()
+
+
+@pytest.mark.parametrize('profile', ['DEFAULT', 'WAL'])
+def test_failed_request_writes_no_game(monkeypatch, tmpdir, profile: str):
+    # The savepoint of insert_spiel is part of the transaction of the request, its RELEASE commits nothing
+    init_database_with_random_games(monkeypatch, 0, create_sqlite_engine(f'sqlite:///{tmpdir.join("test.db")}',
+                                                                         PROFILES[profile]))
+    c = build_random_configs(random.Random(12), 1)[0]
+    calculator_type, writer_type = WRITERS[type(c)]
+    with pytest.raises(ValueError):
+        with Sessions.request_scope():
+            assert write_spiel(writer_type(calculator_type(c)), str(uuid.uuid4())) is not None
+            raise ValueError
+    session = Sessions.get_session()
+    assert [session.query(t).count() for t in [Einzelspiel, Resultat, Teilnahme, Verdopplung]] == [0, 0, 0, 0]
+    session.close()
+    Sessions.engine.dispose()
+
+
+def test_concurrent_submits_write_one_game(monkeypatch, tmpdir):
+    # Like the application, every thread opens connections of its own to a SQLite file
+    monkeypatch.setattr(Sessions, 'engine', create_engine(f'sqlite:///{tmpdir.join("test.db")}', poolclass=NullPool))
+    Base.metadata.create_all(Sessions.engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1)] +
+                    [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                     for i in range(1, 9)] +
+                    [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    configs = build_random_configs(random.Random(9), 5)
+    tokens = [str(uuid.uuid4()) for _ in configs]
+    barrier = threading.Barrier(4 * len(configs))
+    einzelspiel_ids = {token: [] for token in tokens}
+
+    def submit(c, token: str):
+        calculator_type, writer_type = WRITERS[type(c)]
+        writer = writer_type(calculator_type(c))
+        barrier.wait()
+        einzelspiel_ids[token].append(writer.write(token))
+
+    threads = [threading.Thread(target=submit, args=(c, token)) for c, token in zip(configs, tokens) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session = Sessions.get_session()
+    assert session.query(Einzelspiel).count() == len(configs)
+    assert session.query(Resultat).count() == 4 * len(configs)
+    for token in tokens:
+        assert len(einzelspiel_ids[token]) == 4
+        assert len(set(einzelspiel_ids[token])) == 1
+        assert session.query(Einzelspiel.submission_token).filter(Einzelspiel.id == einzelspiel_ids[token][0]) \
+            .scalar() == token
+    session.close()
@@ -0,0 +1,115 @@
+import random
+from dataclasses import fields
+from types import MappingProxyType
+from typing import List
+
+import numpy as np
+import pytest
+
+from schafkopf.database.configs import RufspielRawConfig, SoloRawConfig, HochzeitRawConfig, RamschRawConfig, \
+    RawConfig, BatchRawConfig, PunkteconfigRef, BatchConfig
+from schafkopf.database.snapshot import Snapshot
+from schafkopf.frontend.validator import RufspielValidator, SoloValidator, HochzeitValidator, RamschValidator, \
+    BatchValidator
+
+VALIDATORS = {RufspielRawConfig: RufspielValidator, SoloRawConfig: SoloValidator,
+              HochzeitRawConfig: HochzeitValidator, RamschRawConfig: RamschValidator}
+
+# Augen of the Ramsch test games, shuffled over the seats
+RAMSCH_AUGEN = [(120, 0, 0, 0), (91, 29, 0, 0), (90, 30, 0, 0), (40, 40, 20, 20), (30, 30, 30, 30), (60, 60, 0, 0),
+                (50, 30, 20, 20), (70, 20, 20, 10), (45, 45, 30, 0)]
+
+
+def build_snapshot() -> Snapshot:
+    return Snapshot(teilnehmer_id_to_name=MappingProxyType({i: f'Name {i}' for i in range(1, 6)}),
+                    teilnehmer_id_to_vorname=MappingProxyType({i: f'Vorname {i}' for i in range(1, 6)}),
+                    runde_id_to_punkteconfig=MappingProxyType(
+                        {1: PunkteconfigRef(None, None, 20, 10, 20, 10.0, 10.0, 10.0, 50)}))
+
+
+def build_random_raw_configs(rnd: random.Random, n: int) -> List[RawConfig]:
+    # Mostly plausible input with some broken fields, so that every rule of the validators is hit. Id 5 is no seat.
+    def some_id():
+        return rnd.choice([None, 1, 2, 3, 4, 5] + [1, 2, 3, 4] * 5)
+
+    def some_ids(ids=(1, 2, 3, 4, 5)):
+        return rnd.sample(ids, rnd.choice([0, 0, 0, 0, 1, 1, 1, 2]))
+
+    raw_configs = []
+    for _ in range(n):
+        teilnehmer_ids = rnd.sample([1, 2, 3, 4], 4)
+        common = dict(runde_id=rnd.choice([None] + [1] * 20), geber_id=teilnehmer_ids[3], teilnehmer_ids=teilnehmer_ids,
+                      gelegt_ids=some_ids())
+        art = rnd.choice([RufspielRawConfig, SoloRawConfig, HochzeitRawConfig, RamschRawConfig])
+        if art is RamschRawConfig:
+            augen = list(rnd.choice(RAMSCH_AUGEN))
+            rnd.shuffle(augen)
+            if rnd.random() < 0.05:
+                augen[rnd.randrange(4)] = None
+            elif rnd.random() < 0.05:
+                augen[rnd.randrange(4)] += 1
+            raw_configs.append(RamschRawConfig(jungfrau_ids=some_ids(), ausspieler_augen=augen[0],
+                                               mittelhand_augen=augen[1], hinterhand_augen=augen[2],
+                                               geberhand_augen=augen[3], manuelle_verlierer_ids=some_ids(), **common))
+            continue
+        common.update(ansager_id=some_id(), kontriert_id=some_ids(), re_id=some_ids(),
+                      laufende=rnd.choice([None, 0, 0, 0, 1, 2, 3, 4, 5, 8, 9]),
+                      spieler_nichtspieler_augen=rnd.choice([None, 0, 1, 1, 2]),
+                      augen=rnd.choice([None, 0, 30, 31, 60, 61, 90, 91, 119, 120]),
+                      schwarz=rnd.choice([None, 0, 0, 1]))
+        if art is RufspielRawConfig:
+            raw_configs.append(RufspielRawConfig(rufsau=rnd.choice([None, 'EICHEL', 'BLATT', 'SCHELLEN']),
+                                                 partner_id=some_id(), **common))
+        elif art is HochzeitRawConfig:
+            raw_configs.append(HochzeitRawConfig(partner_id=some_id(), **common))
+        else:
+            raw_configs.append(SoloRawConfig(spielart=rnd.choice([None, 'FARBSOLO', 'WENZ', 'GEIER']),
+                                             farbe=rnd.sample(['EICHEL', 'BLATT', 'HERZ', 'SCHELLEN'],
+                                                              rnd.choice([0, 1, 1, 2])),
+                                             tout=sorted(rnd.sample([0, 1], rnd.choice([0, 0, 0, 1, 2]))), **common))
+    return raw_configs
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_batch_validator_matches_validators(seed: int):
+    snapshot = build_snapshot()
+    raw_configs = build_random_raw_configs(random.Random(seed), 3000)
+    validator = BatchValidator(BatchRawConfig.from_raw_configs(raw_configs), snapshot)
+    error_mask = validator.get_error_mask()
+    messages = validator.get_validation_messages()
+    expected = [VALIDATORS[type(r)](r, snapshot).validation_messages for r in raw_configs]
+    assert error_mask.tolist() == [len(m) > 0 for m in expected]
+    assert messages == {i: m for i, m in enumerate(expected) if len(m) > 0}
+    assert 0 < error_mask.sum() < len(raw_configs)
+
+
+def test_batch_raw_config_round_trip():
+    raw_configs = build_random_raw_configs(random.Random(4), 500)
+    batch_raw_config = BatchRawConfig.from_raw_configs(raw_configs)
+    assert len(batch_raw_config) == 500
+    assert [batch_raw_config.get_raw_config(i) for i in range(500)] == raw_configs
+
+
+def test_batch_validator_without_errors():
+    raw_configs = [RamschRawConfig(runde_id=1, geber_id=4, teilnehmer_ids=[1, 2, 3, 4], gelegt_ids=[], jungfrau_ids=[],
+                                   ausspieler_augen=60, mittelhand_augen=30, hinterhand_augen=30, geberhand_augen=0,
+                                   manuelle_verlierer_ids=[])]
+    validator = BatchValidator(BatchRawConfig.from_raw_configs(raw_configs), build_snapshot())
+    assert np.array_equal(validator.get_error_mask(), [False])
+    assert validator.get_validation_messages() == {}
+
+
+def test_batch_raw_config_requires_raw_configs():
+    with pytest.raises(ValueError):
+        BatchRawConfig.from_raw_configs([])
+
+
+def test_batch_raw_config_to_batch_config():
+    snapshot = build_snapshot()
+    raw_configs = build_random_raw_configs(random.Random(5), 3000)
+    validators = [VALIDATORS[type(r)](r, snapshot) for r in raw_configs]
+    valid = [i for i, v in enumerate(validators) if len(v.validation_messages) == 0]
+    expected = BatchConfig.from_configs([validators[i].validated_config for i in valid])
+    actual = BatchRawConfig.from_raw_configs(raw_configs).take(valid).to_batch_config(snapshot.get_punkteconfig(1))
+    for f in fields(BatchConfig):
+        assert np.array_equal(getattr(actual, f.name), getattr(expected, f.name)), f.name
@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+from schafkopf.database.data_model import Runde
+from schafkopf.database.queries import get_teilnehmer, get_runden
+from schafkopf.database.session import Sessions
+from schafkopf.frontend.runde_anlegen import wrap_runde_anlegen_layout
+from schafkopf.frontend.spiele_loeschen import wrap_letztes_spiel_loeschen_layout
+from schafkopf.database.page_loaders import load_spielverlauf_seite
+from schafkopf.frontend.spielen import wrap_spielen_layout
+from schafkopf.frontend.spielverlauf import wrap_spielverlauf_layout, wrap_spielverlauf_table, to_cursor_data, \
+    from_cursor_data
+from schafkopf.frontend.statistiken import wrap_statistiken_layout
+from schafkopf.frontend.teilnehmer_anlegen import wrap_teilnehmer_anlegen_layout
+from tests.helpers import init_database_with_random_games, record_statements
+
+
+@pytest.mark.parametrize('wrap_layout, queries', [(wrap_spielen_layout, 1), (wrap_statistiken_layout, 1),
+                                                  (wrap_letztes_spiel_loeschen_layout, 1),
+                                                  (wrap_runde_anlegen_layout, 1),
+                                                  (wrap_teilnehmer_anlegen_layout, 0),
+                                                  (wrap_spielverlauf_layout, 0)])
+def test_page_load_queries(monkeypatch, wrap_layout, queries: int):
+    init_database_with_random_games(monkeypatch, 20)
+    session = Sessions.get_session()
+    session.query(Runde).update({Runde.datum: datetime.datetime(2020, 6, 7)})
+    session.commit()
+    session.close()
+    statements = record_statements()
+    # With an empty reference cache Teilnehmer and Runden take one query each
+    wrap_layout()
+    assert len(statements) <= queries + 2
+    get_teilnehmer()
+    get_runden()
+    statements.clear()
+    wrap_layout()
+    assert len(statements) == queries
+
+
+def test_spielverlauf_table(monkeypatch):
+    init_database_with_random_games(monkeypatch, 20)
+    seite = load_spielverlauf_seite(limit=5)
+    assert from_cursor_data(to_cursor_data(seite.naechster_cursor)) == seite.naechster_cursor
+    assert from_cursor_data(to_cursor_data(None)) is None
+    assert str(wrap_spielverlauf_table(seite)).count('Tr(') == 6
+    assert 'Keine Spiele vorhanden' in str(wrap_spielverlauf_table(load_spielverlauf_seite(teilnehmer_ids=[99])))
@@ -0,0 +1,42 @@
+import random
+
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig
+from schafkopf.database.queries import get_teilnehmer_namen_by_ids
+from schafkopf.frontend.presenter import RufspielPresenter, SoloPresenter, HochzeitPresenter, RamschPresenter, \
+    Presenter
+from tests.helpers import build_random_configs, init_database_with_random_games, record_statements
+
+PRESENTERS = {RufspielConfig: (RufspielCalculator, RufspielPresenter), SoloConfig: (SoloCalculator, SoloPresenter),
+              HochzeitConfig: (HochzeitCalculator, HochzeitPresenter),
+              RamschConfig: (RamschCalculator, RamschPresenter)}
+
+
+def count_teilnehmer_queries(statements: list) -> int:
+    return len([s for s in statements if s.startswith('SELECT') and 'FROM teilnehmer' in s])
+
+
+def test_get_teilnehmer_namen_by_ids(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    assert get_teilnehmer_namen_by_ids([]) == ({}, {})
+    assert get_teilnehmer_namen_by_ids([None, 2, '3', 2, 99]) == ({2: 'Spieler_2', 3: 'Spieler_3'},
+                                                                  {2: 'vorname_2', 3: 'vorname_3'})
+
+
+def test_presenter_resolves_names_once(monkeypatch):
+    init_database_with_random_games(monkeypatch, 0)
+    statements = record_statements()
+    for c in build_random_configs(random.Random(3), 100):
+        calculator_type, presenter_type = PRESENTERS[type(c)]
+        statements.clear()
+        result = str(presenter_type(calculator_type(c)).get_result())
+        assert count_teilnehmer_queries(statements) == 1
+        for teilnehmer_id, punkte in calculator_type(c).get_abrechnung().teilnehmer_id_to_punkte.items():
+            if punkte != 0:
+                assert f'vorname_{teilnehmer_id}' in result
+        for teilnehmer_id in c.gelegt_ids:
+            assert f'Spieler_{teilnehmer_id}' in result
+    statements.clear()
+    Presenter.get_result_message({1: 20.0, 2: -20.0})
+    assert count_teilnehmer_queries(statements) == 1
+
@@ -0,0 +1,90 @@
+from types import MappingProxyType
+
+import pytest
+
+from schafkopf.database.configs import RufspielRawConfig, RamschRawConfig, PunkteconfigRef
+from schafkopf.database.data_model import Punkteconfig, Runde, Teilnehmer
+from schafkopf.database.queries import insert_teilnehmer
+from schafkopf.database.session import Sessions
+from schafkopf.database.snapshot import Snapshot, load_snapshot, get_snapshot, invalidate_snapshot
+from schafkopf.frontend.validator import RufspielValidator, RamschValidator
+from tests.helpers import init_in_memory_engine
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setattr(Sessions, 'engine', init_in_memory_engine())
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1, rufspiel=10)] +
+                    [Teilnehmer(id=i, name=f'nachname_{i}, vorname_{i}', vorname=f'vorname_{i}',
+                                nachname=f'nachname_{i}') for i in range(1, 5)] +
+                    [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    invalidate_snapshot()
+    yield
+    invalidate_snapshot()
+
+
+def build_rufspiel_raw_config(**kwargs) -> RufspielRawConfig:
+    values = dict(runde_id=1, geber_id=4, teilnehmer_ids=[1, 2, 3, 4], gelegt_ids=[], ansager_id=1, rufsau='BLATT',
+                  kontriert_id=[], re_id=[], partner_id=2, laufende=0, spieler_nichtspieler_augen=1, augen=70,
+                  schwarz=None)
+    values.update(kwargs)
+    return RufspielRawConfig(**values)
+
+
+def build_ramsch_raw_config(**kwargs) -> RamschRawConfig:
+    values = dict(runde_id=1, geber_id=4, teilnehmer_ids=[1, 2, 3, 4], gelegt_ids=[], jungfrau_ids=[],
+                  ausspieler_augen=40, mittelhand_augen=40, hinterhand_augen=20, geberhand_augen=20,
+                  manuelle_verlierer_ids=[])
+    values.update(kwargs)
+    return RamschRawConfig(**values)
+
+
+def test_validators_without_database(statements: list):
+    snapshot = load_snapshot()
+    statements.clear()
+    validator = RufspielValidator(build_rufspiel_raw_config(kontriert_id=[1]), snapshot)
+    assert validator.validation_messages == ['Spieler darf nicht Kontra geben. Momentan: vorname_1.']
+    validator = RufspielValidator(build_rufspiel_raw_config(kontriert_id=[3]), snapshot)
+    assert validator.validation_messages == []
+    assert validator.validated_config.punkteconfig == snapshot.get_punkteconfig(1)
+    assert validator.validated_config.punkteconfig.rufspiel == 10
+    validator = RamschValidator(build_ramsch_raw_config(), snapshot)
+    assert validator.validation_messages == ['Bei Augengleichheit muss ein manueller Verlierer gewählt werden. '
+                                             'Manuellen Verlierer aus folgenden Teilnehmern wählen: '
+                                             'vorname_1; vorname_2']
+    validator = RamschValidator(build_ramsch_raw_config(manuelle_verlierer_ids=[2]), snapshot)
+    assert validator.validated_config.verlierer_id == 2
+    assert statements == []
+
+
+def test_validators_use_injected_snapshot(statements: list):
+    snapshot = Snapshot(teilnehmer_id_to_name=MappingProxyType({i: f'Name {i}' for i in range(1, 5)}),
+                        teilnehmer_id_to_vorname=MappingProxyType({i: f'Vorname {i}' for i in range(1, 5)}),
+                        runde_id_to_punkteconfig=MappingProxyType(
+                            {1: PunkteconfigRef(None, None, 20, 15, 30, 10.0, 10.0, 10.0, 50)}))
+    validator = RufspielValidator(build_rufspiel_raw_config(kontriert_id=[2]), snapshot)
+    assert validator.validation_messages == ['Spieler darf nicht Kontra geben. Momentan: Vorname 2.']
+    assert RufspielValidator(build_rufspiel_raw_config(), snapshot).validated_config.punkteconfig.rufspiel == 15
+    assert statements == []
+
+
+def test_snapshot_refresh(statements: list):
+    snapshot = get_snapshot()
+    assert get_snapshot() is snapshot
+    assert len(statements) == 2
+
+    # Inserts in this process invalidate the snapshot
+    teilnehmer_id, _ = insert_teilnehmer(vorname='Neu', nachname='Teilnehmer')
+    assert get_snapshot() is not snapshot
+    assert get_snapshot().get_teilnehmer_vorname(teilnehmer_id) == 'Neu'
+
+    # Ids unknown to the snapshot, e.g. inserted by another process, trigger a reload
+    snapshot = get_snapshot()
+    with Sessions.get_engine().connect() as connection:
+        connection.execute(Runde.__table__.insert(), dict(id=2, name='Montagsspiel', ort='Fürth', punkteconfig_id=1,
+                                                          is_active=True))
+    assert get_snapshot(runde_ids=[1]) is snapshot
+    assert get_snapshot(runde_ids=[2]).get_punkteconfig(2).rufspiel == 10
@@ -0,0 +1,119 @@
+import random
+from collections import Counter
+from typing import List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+from schafkopf.backend.calculator import RufspielCalculator, SoloCalculator, HochzeitCalculator, RamschCalculator
+from schafkopf.database.configs import RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig, Config
+from schafkopf.database.data_model import Base, Punkteconfig, Runde, Teilnehmer, Einzelspiel, Resultat, Verdopplung, \
+    Teilnahme, Farbgebung, Spielart
+from schafkopf.database.session import Sessions
+from schafkopf.database.writer import RufspielWriter, SoloWriter, HochzeitWriter, RamschWriter
+
+
+WRITERS = {RufspielConfig: (RufspielCalculator, RufspielWriter), SoloConfig: (SoloCalculator, SoloWriter),
+           HochzeitConfig: (HochzeitCalculator, HochzeitWriter), RamschConfig: (RamschCalculator, RamschWriter)}
+
+
+def build_punkteconfig() -> Punkteconfig:
+    return Punkteconfig(ramsch=20, rufspiel=20, hochzeit=30, laufende=10.0, schneider=10.0, schwarz=10.0, solo=50)
+
+
+def build_random_configs(rnd: random.Random, n: int, punkteconfig: Punkteconfig = None) -> List[Config]:
+    punkteconfig = build_punkteconfig() if punkteconfig is None else punkteconfig
+    configs = []
+    for _ in range(n):
+        teilnehmer_ids = rnd.sample(range(1, 9), 4)
+        gelegt_ids = [t for t in teilnehmer_ids if rnd.random() < 0.2]
+        art = rnd.choice([RufspielConfig, SoloConfig, HochzeitConfig, RamschConfig])
+        if art == RamschConfig:
+            durchmarsch = rnd.random() < 0.2
+            spieler = rnd.choice(teilnehmer_ids)
+            configs.append(RamschConfig(runde_id=1, punkteconfig=punkteconfig, geber_id=teilnehmer_ids[3],
+                                        teilnehmer_ids=teilnehmer_ids, gelegt_ids=gelegt_ids,
+                                        jungfrau_ids=[t for t in teilnehmer_ids if t != spieler and
+                                                      rnd.random() < 0.2 and not durchmarsch],
+                                        ausspieler_augen=30, mittelhand_augen=30, hinterhand_augen=30,
+                                        geberhand_augen=30,
+                                        verlierer_id=None if durchmarsch else spieler,
+                                        durchmarsch_id=spieler if durchmarsch else None,
+                                        durchmarsch=durchmarsch))
+            continue
+        ansager_id, partner_id = rnd.sample(teilnehmer_ids, 2)
+        spieler_augen = rnd.choice([0, 29, 30, 31, 59, 60, 61, 89, 90, 91, 119, 120, rnd.randint(0, 120)])
+        kontriert_id = rnd.choice([None, None, rnd.choice(teilnehmer_ids)])
+        re_id = None if kontriert_id is None or rnd.random() < 0.5 else ansager_id
+        common = dict(runde_id=1, punkteconfig=punkteconfig, geber_id=teilnehmer_ids[3],
+                      teilnehmer_ids=teilnehmer_ids, gelegt_ids=gelegt_ids, ansager_id=ansager_id,
+                      kontriert_id=kontriert_id, re_id=re_id, laufende=rnd.choice([0, 2, 3, 4, 5, 8]),
+                      spieler_augen=spieler_augen, nicht_spieler_augen=120 - spieler_augen,
+                      schwarz=spieler_augen in [0, 120] and rnd.random() < 0.5)
+        if art == SoloConfig:
+            tout = rnd.choice([(False, False), (False, False), (True, False), (False, True)])
+            spielart = rnd.choice([Spielart.FARBSOLO, Spielart.WENZ, Spielart.GEIER])
+            configs.append(SoloConfig(spielart=spielart,
+                                      farbe=Farbgebung.EICHEL if spielart == Spielart.FARBSOLO else None,
+                                      tout_gespielt_gewonnen=tout[0], tout_gespielt_verloren=tout[1], **common))
+        elif art == RufspielConfig:
+            configs.append(RufspielConfig(partner_id=partner_id, rufsau=Farbgebung.BLATT, **common))
+        else:
+            configs.append(HochzeitConfig(partner_id=partner_id, **common))
+    return configs
+
+
+def init_in_memory_engine():
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def init_database_with_random_games(monkeypatch, n: int, engine: Engine = None) -> List[Config]:
+    # Writes n random games with the Writers into a database used by Sessions, by default an in-memory one
+    if engine is None:
+        engine = init_in_memory_engine()
+    else:
+        Base.metadata.create_all(engine)
+    monkeypatch.setattr(Sessions, 'engine', engine)
+    session = Sessions.get_session()
+    session.add_all([Punkteconfig(id=1, name='alt')] +
+                    [Teilnehmer(id=i, name=f'Spieler_{i}', vorname=f'vorname_{i}', nachname=f'nachname_{i}')
+                     for i in range(1, 9)] +
+                    [Runde(id=1, name='Sonntagsspiel', ort='Nürnberg', punkteconfig_id=1)])
+    session.commit()
+    session.close()
+    configs = build_random_configs(random.Random(5), n)
+    for c in configs:
+        calculator_type, writer_type = WRITERS[type(c)]
+        writer_type(calculator_type(c)).write()
+    return configs
+
+
+def dump_database() -> tuple:
+    session = Sessions.get_session()
+    spalten = ['runde_id', 'ansager_id', 'partner_id', 'geber_id', 'ausspieler_id', 'mittelhand_id', 'hinterhand_id',
+               'geberhand_id', 'farbe', 'laufende', 'spielart', 'schneider', 'schwarz', 'durchmarsch', 'tout',
+               'spielpunkte', 'is_active']
+    einzelspiel_ids = [e.id for e in session.query(Einzelspiel).order_by(Einzelspiel.id).all()]
+    nummer = {e: i for i, e in enumerate(einzelspiel_ids)}
+    einzelspiele = [tuple(getattr(e, s) for s in spalten)
+                    for e in session.query(Einzelspiel).order_by(Einzelspiel.id).all()]
+    resultate = Counter((nummer[r.einzelspiel_id], r.teilnehmer_id, r.augen, r.punkte, r.gewonnen)
+                        for r in session.query(Resultat).all())
+    verdopplungen = Counter((nummer[v.einzelspiel_id], v.teilnehmer_id, v.doppler)
+                            for v in session.query(Verdopplung).all())
+    teilnahmen = Counter((nummer[t.einzelspiel_id], t.teilnehmer_id, t.sitz, t.rolle)
+                         for t in session.query(Teilnahme).all())
+    teilnehmer = sorted((t.id, t.name, t.vorname, t.nachname) for t in session.query(Teilnehmer).all())
+    session.close()
+    return einzelspiele, resultate, verdopplungen, teilnahmen, teilnehmer
+
+
+def record_statements(engine: Engine = None, parameters: bool = False) -> list:
+    # The statements the engine, by default the one of Sessions, sends to the database from now on
+    statements = []
+    event.listen(Sessions.engine if engine is None else engine, 'before_cursor_execute',
+                 lambda *args: statements.append((args[2], args[3]) if parameters else args[2]))
+    return statements